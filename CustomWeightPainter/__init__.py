@@ -4,19 +4,83 @@ try:
 except:
     pass
 import sys
-from importlib import reload
+import os
+import time
+from importlib import import_module,reload
 sys.dont_write_bytecode = True
 # ------------------------------------------------------------------------------
-from . import ui
-reload(ui)
+# 環境変数CUSTOMWEIGHTPAINTER_DEVを設定すると、起動のたびにモジュールをリロードする
+DEV_MODE = os.environ.get('CUSTOMWEIGHTPAINTER_DEV','') not in ('','0')
 
-def show(*args,**kwargs):
+# reload(CustomWeightPainter)されても起動中のToolを保持する
+try:
+    _tool
+except NameError:
+    _tool = None
+
+# 開発時にリロードするモジュール (依存される側から順に並べる)
+_MODULE_NAMES = ('perf','parallel','scheduler','modifierCommand','weightMath','weightData','weightFile','weightHistory',
+                 'meshTopology','mirrorMap','utilityProc','influenceIndex','dragPose',
+                 'poseSnapshot','romSweep','lockMonitor','ui')
+
+def _reloadModules(*args,**kwargs):
+    """Toolのモジュールをリロードする
+    開発時に、編集したモジュールを読み込みなおすために使います。
+    依存される側から順にリロードします。
+    """
+    for name in _MODULE_NAMES:
+        reload(import_module('.{}'.format(name),__name__))
+
+def show(dev = None,*args,**kwargs):
     """Toolの起動
     CostomWeightPainterのUIを起動する
+    既にToolが起動済みの場合は、そのToolを使いまわして起動します。
+
     Args:
+        dev (bool): Trueの場合はモジュールをリロードして、Toolを作り直す
+                    Noneの場合は環境変数CUSTOMWEIGHTPAINTER_DEVに従う
+    Returns:
         None
+    """
+    global _tool
+    if dev is None:
+        dev = DEV_MODE
+
+    startTime = time.time()
+    if dev:
+        _reloadModules()
+    from . import ui
+    importTime = time.time() - startTime
+
+    if dev or not isinstance(_tool,ui.CustomWeightPainterUI):
+        _tool = ui.CustomWeightPainterUI()
+        _tool.startupTimer.begin('cold')
+    else:
+        _tool.startupTimer.begin('warm')
+    _tool.startupTimer.record('import',importTime)
+    _tool.showWindow()
+
+def printStartupTimings(*args,**kwargs):
+    """Toolの起動時間の内訳を表示する
+    cold起動とwarm起動の最新の記録をスクリプトエディタに表示します。
+
+    Args:
+        None
+    Returns:
+        None
+    """
+    if _tool is None:
+        return
+    print(_tool.startupTimer.report())
+
+def printActionProfile(limit = 10,*args,**kwargs):
+    """記録した操作の処理時間とcmds/melの呼び出し回数を表示する
+    UIのProfileをオンにしている間に記録した操作のうち、処理時間の長いものをスクリプトエディタに表示します。
+
+    Args:
+        limit (int): 表示する数
     Returns:
         None
-    """ 
-    tool = ui.CustomWeightPainterUI()
-    tool.showWindow()
\ No newline at end of file
+    """
+    from . import perf
+    print(perf.actionProfiler.report(limit))
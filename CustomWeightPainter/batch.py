@@ -0,0 +1,517 @@
+# -*- coding: utf-8 -*-
+"""複数のシーンファイルに、skinClusterの後始末をまとめて実行するバッチ処理
+UIを使わずに、シーンファイルを1つずつ開いて指定の処理を順に実行し、保存します。
+ファイルはワーカープロセスに分けて処理し、ファイルごとに処理時間と件数をJSONのレポートに書き出します。
+途中で止まった場合も、同じ設定で実行しなおせば、完了したファイルは飛ばして続きから処理します。
+
+コマンドラインから実行できます:
+    mayapy -m CustomWeightPainter.batch --report-dir reports --in-place "assets/**/*.mb"
+    python -m CustomWeightPainter.batch --standin --report-dir reports --output-dir out scenes/*.ma
+
+--output-dirと--in-placeのどちらも指定しない場合は保存しない試し実行(dry run)になり、
+結果はレポートに記録しますが、完了したファイルとしては扱いません。
+--standinを指定した場合はmayaStandinの代用品を使うので、Mayaなしで動作を確認できます。
+代用品のシーンファイルはmayaStandinの形式で、Mayaのシーンファイルは開けません。
+
+Attributes:
+    * None
+Todo:
+    * None
+"""
+from __future__ import absolute_import, division, generators, print_function
+try:
+    from future_builtins import *
+except:
+    pass
+import sys
+sys.dont_write_bytecode = True
+# ------------------------------------------------------------------------------
+import argparse
+import atexit
+import glob
+import hashlib
+import io
+import json
+import os
+import time
+import traceback
+from collections import OrderedDict
+try:
+    import multiprocessing
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    from concurrent.futures.process import BrokenProcessPool
+except ImportError:
+    ProcessPoolExecutor = None
+
+# レポートの形式のバージョン
+REPORT_VERSION = 1
+# 全体の結果を書き出すファイル名
+SUMMARY_NAME = 'summary.json'
+
+# 既定で実行する処理
+# バインドポーズには、選択に依存せずundoもできるrestoreBindPoseを使う
+# (GoToBindPoseは選択したノードに対して動くので、UIのないバッチでは何もしません)
+DEFAULT_OPERATIONS = ('cutKeyInflenceLock','cutKeyTotargetInflence','restoreBindPose','pruneWeights')
+# 処理の設定の既定値
+DEFAULT_OPTIONS = {'maxInfluences':4,'threshold':0.001}
+
+# ワーカープロセスで読み込んだモジュール
+_cmds = None
+_utilityProc = None
+
+# ------------------------------------------------------------------------------
+# worker
+def initializeMaya(standin = False,*args,**kwargs):
+    """Mayaを使える状態にして、Toolのモジュールを読み込む
+    プロセスごとに1回だけ初期化します。
+
+    Args:
+        standin (bool): Trueの場合はmayaStandinの代用品を使い、Falseの場合はmaya.standaloneを初期化する
+
+    Returns:
+        None
+    """
+    global _cmds,_utilityProc
+    if _utilityProc is not None:
+        return
+    if standin:
+        from . import mayaStandin
+        mayaStandin.install()
+    else:
+        import maya.standalone
+        maya.standalone.initialize(name = 'python')
+        atexit.register(maya.standalone.uninitialize)
+    from maya import cmds
+    from . import utilityProc
+    _cmds = cmds
+    _utilityProc = utilityProc
+
+def _sceneInfluences(*args,**kwargs):
+    """シーン内の全skinClusterのインフルエンスを取得する
+
+    Returns:
+        list: インフルエンスのリスト (重複なし)
+    """
+    influences = []
+    for skinCluster in _cmds.ls(type = 'skinCluster') or []:
+        influences.extend(_cmds.skinCluster(skinCluster,q = True,inf = True) or [])
+    return _utilityProc._uniqueList(influences)
+
+def _cutKeyInflenceLock(options,*args,**kwargs):
+    result = _utilityProc.cutKeyInflenceLock(_sceneInfluences())
+    return {'keyed':result['keyed'],'unlocked':result['unlocked']}
+
+def _cutKeyTotargetInflence(options,*args,**kwargs):
+    influences = _sceneInfluences()
+    _utilityProc.cutKeyTotargetInflence(influences)
+    return {'influences':len(influences)}
+
+def _gotoBindPose(options,*args,**kwargs):
+    _utilityProc.gotoBindPose()
+    return {}
+
+def _restoreBindPose(options,*args,**kwargs):
+    result = _utilityProc.restoreBindPose()
+    return {'restored':len(result['restored']),'failed':len(result['failed'])}
+
+def _pruneWeights(options,*args,**kwargs):
+    result = _utilityProc.pruneWeights(maxInfluences = options['maxInfluences'],
+                                       threshold = options['threshold'],
+                                       useSelection = False)
+    if result is None:
+        raise RuntimeError('NumPyが見つからないため、ウエイトを刈り込めません。')
+    return {'skinClusters':len(result['skinClusters']),'vertices':result['vertices']}
+
+# 処理の名前 → 関数 (処理の設定を受け取り、レポートに書く件数の辞書を返す)
+OPERATIONS = OrderedDict([
+    ('cutKeyInflenceLock',_cutKeyInflenceLock),
+    ('cutKeyTotargetInflence',_cutKeyTotargetInflence),
+    ('gotoBindPose',_gotoBindPose),
+    ('restoreBindPose',_restoreBindPose),
+    ('pruneWeights',_pruneWeights),
+])
+
+def _fileType(path,*args,**kwargs):
+    """拡張子から保存するファイルの形式を返す
+    """
+    return 'mayaAscii' if path.lower().endswith('.ma') else 'mayaBinary'
+
+def processFile(path,settings,reportDir,*args,**kwargs):
+    """1つのシーンファイルを開いて処理を順に実行し、保存してレポートを書き出す
+    処理の途中で例外が発生した場合は、残りの処理と保存を行わず、失敗としてレポートに記録します。
+    保存先の指定がない場合は保存せず、試し実行(dryRun)としてレポートに記録します。
+
+    Args:
+        path (str): シーンファイルのパス
+        settings (dict): 処理の設定 (makeSettingsの結果)
+        reportDir (str): レポートを書き出すフォルダ
+
+    Returns:
+        dict: レポート
+    """
+    report = {'version':REPORT_VERSION,
+              'file':path,
+              'settings':settings,
+              'status':'failed',
+              'operations':[],
+              'output':None,
+              'dryRun':not settings['output'],
+              'stamp':None,
+              'pid':os.getpid(),
+              'started':time.time()}
+    startTime = time.time()
+    try:
+        _cmds.file(path,open = True,force = True)
+        report['openTime'] = time.time() - startTime
+
+        for name in settings['operations']:
+            operationStart = time.time()
+            counts = OPERATIONS[name](settings['options'])
+            report['operations'].append({'name':name,'time':time.time() - operationStart,'counts':counts})
+
+        saveStart = time.time()
+        output = settings['output']
+        if output == 'inplace':
+            _cmds.file(save = True,force = True)
+            report['output'] = path
+        elif output:
+            outputPath = os.path.join(output,os.path.basename(path))
+            _cmds.file(rename = outputPath)
+            _cmds.file(save = True,force = True,type = _fileType(outputPath))
+            report['output'] = outputPath
+        report['saveTime'] = time.time() - saveStart
+        report['status'] = 'ok'
+    except Exception as e:
+        report['error'] = '{}: {}'.format(type(e).__name__,e)
+        report['traceback'] = traceback.format_exc()
+    finally:
+        try:
+            _cmds.file(new = True,force = True)
+        except Exception:
+            pass
+    report['time'] = time.time() - startTime
+    report['finished'] = time.time()
+    # 上書き保存した場合は、保存後のファイルで完了を判定する
+    report['stamp'] = _fileStamp(path)
+    writeJson(reportPath(reportDir,path),report)
+    return report
+
+def _processFileTask(path,settings,reportDir,standin,*args,**kwargs):
+    """ワーカープロセスで1つのシーンファイルを処理する
+    """
+    initializeMaya(standin)
+    return processFile(path,settings,reportDir)
+
+# ------------------------------------------------------------------------------
+# reports
+def makeSettings(operations = DEFAULT_OPERATIONS,options = None,outputDir = None,inPlace = False,*args,**kwargs):
+    """処理の設定をまとめる
+    レポートに記録し、同じ設定で完了したファイルかどうかの判定に使います。
+
+    Args:
+        operations (list): 実行する処理の名前 (OPERATIONSのキー)
+        options (dict): 処理の設定。指定しなかった項目はDEFAULT_OPTIONSの値
+        outputDir (str): 保存先のフォルダ。Noneの場合は保存しない
+        inPlace (bool): Trueの場合は元のファイルに上書き保存する
+
+    Returns:
+        dict: 処理の設定 (operations, options, output: 'inplace'・保存先のフォルダ・None)
+
+    Raises:
+        ValueError: 処理の名前が正しくない、または保存先の指定が重複している場合
+    """
+    unknown = [name for name in operations if not name in OPERATIONS]
+    if unknown:
+        raise ValueError('未対応の処理です: {}'.format(', '.join(unknown)))
+    if outputDir and inPlace:
+        raise ValueError('保存先のフォルダと上書き保存は同時に指定できません。')
+    merged = dict(DEFAULT_OPTIONS)
+    merged.update(options or {})
+    return {'operations':list(operations),
+            'options':merged,
+            'output':'inplace' if inPlace else (os.path.abspath(outputDir) if outputDir else None)}
+
+def _fileStamp(path,*args,**kwargs):
+    """ファイルの大きさと更新日時を返す。ファイルがない場合はNone
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size,stat.st_mtime]
+
+def reportPath(reportDir,path,*args,**kwargs):
+    """シーンファイルのレポートのパスを返す
+    同じ名前の別のフォルダのファイルと区別するため、フルパスのハッシュを付けます。
+
+    Args:
+        reportDir (str): レポートを書き出すフォルダ
+        path (str): シーンファイルのパス
+
+    Returns:
+        str: レポートのパス
+    """
+    digest = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:10]
+    return os.path.join(reportDir,'{}.{}.json'.format(os.path.basename(path),digest))
+
+def writeJson(path,data,*args,**kwargs):
+    """JSONファイルを書き出す
+    一時ファイルに書いてから置き換えるので、途中で止まっても壊れたファイルは残りません。
+
+    Args:
+        path (str): 書き出すパス
+        data (dict): 書き出す内容
+
+    Returns:
+        None
+    """
+    tempPath = '{}.{}.tmp'.format(path,os.getpid())
+    with io.open(tempPath,'w',encoding = 'utf-8') as f:
+        f.write(json.dumps(data,indent = 2,ensure_ascii = False))
+    os.replace(tempPath,path)
+
+def loadReport(path,*args,**kwargs):
+    """レポートを読み込む
+
+    Returns:
+        dict: レポート。ない、または読み込めない場合はNone
+    """
+    try:
+        with io.open(path,'r',encoding = 'utf-8') as f:
+            return json.load(f)
+    except (IOError,OSError,ValueError):
+        return None
+
+def isCompleted(report,path,settings,*args,**kwargs):
+    """レポートから、シーンファイルが同じ設定で処理済みかどうかを判定する
+    処理後にファイルが変更された場合や、保存したファイルがない場合は処理済みとしません。
+    保存していない試し実行の結果も、処理済みとしません。
+
+    Args:
+        report (dict): レポート (Noneの場合は未処理)
+        path (str): シーンファイルのパス
+        settings (dict): 処理の設定
+
+    Returns:
+        bool: 処理済みの場合はTrue
+    """
+    if not report or report.get('version') != REPORT_VERSION or report.get('status') != 'ok':
+        return False
+    if report.get('settings') != settings or report.get('stamp') != _fileStamp(path):
+        return False
+    if report.get('dryRun') or not report.get('output'):
+        return False
+    return os.path.exists(report['output'])
+
+def expandFiles(patterns,*args,**kwargs):
+    """パス・globのパターン・ファイルのリストから、シーンファイルのパスを集める
+    @で始まる場合は、1行に1つのパスまたはパターンを書いたテキストファイルとして読み込みます。
+
+    Args:
+        patterns (list): パス・パターン・@リストファイル
+
+    Returns:
+        list: シーンファイルのフルパスのリスト (重複なし、指定順)
+    """
+    files = []
+    found = set()
+    for pattern in patterns:
+        if pattern.startswith('@'):
+            with io.open(pattern[1:],'r',encoding = 'utf-8') as f:
+                lines = [line.strip() for line in f]
+            paths = expandFiles([line for line in lines if line and not line.startswith('#')])
+        elif glob.has_magic(pattern):
+            paths = sorted(glob.glob(pattern,recursive = True))
+        else:
+            paths = [pattern]
+        for path in paths:
+            path = os.path.abspath(path)
+            if path in found or not os.path.isfile(path):
+                continue
+            found.add(path)
+            files.append(path)
+    return files
+
+# ------------------------------------------------------------------------------
+# batch
+def _crashReport(path,settings,reportDir,*args,**kwargs):
+    """ワーカープロセスが落ちたファイルのレポートを書き出す
+    """
+    report = {'version':REPORT_VERSION,
+              'file':path,
+              'settings':settings,
+              'status':'crashed',
+              'operations':[],
+              'output':None,
+              'stamp':_fileStamp(path),
+              'error':'ワーカープロセスが異常終了しました',
+              'finished':time.time()}
+    writeJson(reportPath(reportDir,path),report)
+    return report
+
+def _runPool(queue,settings,reportDir,workers,standin,onReport,*args,**kwargs):
+    """ワーカープロセスでqueueのファイルを処理する
+    同時に渡すファイルはワーカーの数までにするので、プロセスが落ちた場合に
+    原因の候補になるのは、そのとき処理中だったファイルだけです。
+
+    Args:
+        queue (list): 処理するファイル。渡したファイルは取り除く
+
+    Returns:
+        list: プロセスが落ちた場合は、そのとき処理中だったファイルのリスト。落ちなかった場合は空のリスト
+    """
+    executor = ProcessPoolExecutor(max_workers = workers,mp_context = multiprocessing.get_context('spawn'))
+    running = {}
+    try:
+        while queue or running:
+            while queue and len(running) < workers:
+                path = queue.pop(0)
+                running[executor.submit(_processFileTask,path,settings,reportDir,standin)] = path
+            done = wait(running,return_when = FIRST_COMPLETED)[0]
+            if any(isinstance(future.exception(),BrokenProcessPool) for future in done):
+                break
+            for future in done:
+                onReport(future.result())
+                del running[future]
+    finally:
+        executor.shutdown(wait = True)
+
+    suspects = []
+    for future,path in running.items():
+        if isinstance(future.exception(),BrokenProcessPool):
+            suspects.append(path)
+        else:
+            onReport(future.result())
+    return suspects
+
+def _runParallel(files,settings,reportDir,workers,standin,onReport,*args,**kwargs):
+    """ワーカープロセスでファイルを処理する
+    プロセスが落ちた場合は、そのとき処理中だったファイルを1つずつ新しいプロセスで処理しなおして
+    原因のファイルを特定し、異常終了としてレポートに記録します。残りのファイルは新しいプロセスで続けます。
+    """
+    queue = list(files)
+    suspects = []
+    while queue or suspects:
+        for path in suspects:
+            if _runPool([path],settings,reportDir,1,standin,onReport):
+                onReport(_crashReport(path,settings,reportDir))
+        suspects = _runPool(queue,settings,reportDir,workers,standin,onReport)
+
+def runBatch(files,operations = DEFAULT_OPERATIONS,reportDir = 'cwpBatchReports',workers = 1,standin = False,
+             outputDir = None,inPlace = False,resume = True,options = None,verbose = True,*args,**kwargs):
+    """シーンファイルをまとめて処理する
+    resumeがTrueの場合、同じ設定で完了したレポートがあるファイルは飛ばします。
+    workersが2以上の場合はワーカープロセスに分けて処理し、1の場合はこのプロセスで順に処理します。
+
+    Args:
+        files (list): シーンファイルのパス
+        operations (list): 実行する処理の名前 (OPERATIONSのキー、指定順に実行)
+        reportDir (str): レポートを書き出すフォルダ
+        workers (int): ワーカープロセスの数
+        standin (bool): Trueの場合はmayaStandinの代用品を使う
+        outputDir (str): 保存先のフォルダ。inPlaceもFalseの場合は保存しない試し実行になる
+        inPlace (bool): Trueの場合は元のファイルに上書き保存する
+        resume (bool): Trueの場合は処理済みのファイルを飛ばす
+        options (dict): 処理の設定 (maxInfluences, threshold)
+        verbose (bool): Trueの場合はファイルごとの結果を表示する
+
+    Returns:
+        dict: 全体の結果 (files: ファイル数, ok, failed, crashed, skipped: 状態ごとのファイル数,
+              failures: 失敗したファイルのリスト, time: 処理時間[秒], workers: ワーカープロセスの数,
+              dryRun: 保存しない試し実行の場合はTrue)
+    """
+    startTime = time.time()
+    settings = makeSettings(operations,options = options,outputDir = outputDir,inPlace = inPlace)
+    if not os.path.isdir(reportDir):
+        os.makedirs(reportDir)
+    if settings['output'] and settings['output'] != 'inplace' and not os.path.isdir(settings['output']):
+        os.makedirs(settings['output'])
+
+    pending = []
+    skipped = []
+    for path in files:
+        if resume and isCompleted(loadReport(reportPath(reportDir,path)),path,settings):
+            skipped.append(path)
+        else:
+            pending.append(path)
+
+    counts = {'ok':0,'failed':0,'crashed':0}
+    failures = []
+    def onReport(report):
+        counts[report['status']] += 1
+        if report['status'] != 'ok':
+            failures.append(report['file'])
+        if verbose:
+            print('[{}] {} ({:.2f} s){}'.format(report['status'],report['file'],report.get('time',0.0),
+                                                ' ' + report['error'] if 'error' in report else ''))
+
+    workers = max(1,int(workers))
+    if workers > 1 and len(pending) > 1 and ProcessPoolExecutor is not None:
+        _runParallel(pending,settings,reportDir,workers,standin,onReport)
+    else:
+        workers = 1
+        if pending:
+            initializeMaya(standin)
+        for path in pending:
+            onReport(processFile(path,settings,reportDir))
+
+    summary = {'version':REPORT_VERSION,
+               'settings':settings,
+               'files':len(files),
+               'ok':counts['ok'],
+               'failed':counts['failed'],
+               'crashed':counts['crashed'],
+               'skipped':len(skipped),
+               'failures':failures,
+               'workers':workers,
+               'dryRun':not settings['output'],
+               'time':time.time() - startTime}
+    writeJson(os.path.join(reportDir,SUMMARY_NAME),summary)
+    if verbose:
+        print('{files} files: {ok} ok, {failed} failed, {crashed} crashed, {skipped} skipped ({time:.2f} s)'.format(**summary))
+        if summary['dryRun']:
+            print('dry run: --output-dir, --in-place are not specified. No scenes were saved.')
+    return summary
+
+def main(argv = None,*args,**kwargs):
+    """コマンドラインから実行する
+
+    Args:
+        argv (list): 引数。Noneの場合はsys.argv
+
+    Returns:
+        int: 全てのファイルが完了した場合は0、失敗したファイルがある場合は1
+    """
+    parser = argparse.ArgumentParser(description = 'CustomWeightPainter batch skin cleanup')
+    parser.add_argument('files',nargs = '+',help = 'シーンファイルのパス・globのパターン・@リストファイル')
+    parser.add_argument('--ops',default = ','.join(DEFAULT_OPERATIONS),
+                        help = '実行する処理 (カンマ区切り、指定順に実行): {}'.format(', '.join(OPERATIONS)))
+    parser.add_argument('--report-dir',default = 'cwpBatchReports',help = 'レポートを書き出すフォルダ')
+    parser.add_argument('--workers',type = int,default = 1,help = 'ワーカープロセスの数')
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument('--output-dir',help = '処理したシーンの保存先のフォルダ (--in-placeもない場合は保存しない試し実行)')
+    output.add_argument('--in-place',action = 'store_true',help = '元のファイルに上書き保存する')
+    parser.add_argument('--no-resume',action = 'store_true',help = '処理済みのファイルも処理しなおす')
+    parser.add_argument('--max-influences',type = int,default = DEFAULT_OPTIONS['maxInfluences'],
+                        help = 'pruneWeightsの1頂点あたりの最大インフルエンス数')
+    parser.add_argument('--threshold',type = float,default = DEFAULT_OPTIONS['threshold'],
+                        help = 'pruneWeightsで0にするウエイトのしきい値')
+    parser.add_argument('--standin',action = 'store_true',help = 'Mayaの代わりにmayaStandinの代用品を使う')
+    options = parser.parse_args(argv)
+
+    operations = [name.strip() for name in options.ops.split(',') if name.strip()]
+    unknown = [name for name in operations if not name in OPERATIONS]
+    if unknown:
+        parser.error('未対応の処理です: {}'.format(', '.join(unknown)))
+    files = expandFiles(options.files)
+    if not files:
+        parser.error('シーンファイルが見つかりません。')
+    summary = runBatch(files,operations = operations,reportDir = options.report_dir,
+                       workers = options.workers,standin = options.standin,
+                       outputDir = options.output_dir,inPlace = options.in_place,
+                       resume = not options.no_resume,
+                       options = {'maxInfluences':options.max_influences,'threshold':options.threshold})
+    return 1 if summary['failed'] or summary['crashed'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,783 @@
+# -*- coding: utf-8 -*-
+"""Toolの処理速度を計測するためのベンチマークをまとめたモジュール
+合成したリグを使って、Toolの処理と標準の処理の速度を比較します。
+シーンを新規作成して計測するので、作業中のシーンでは実行しないでください。
+
+Attributes:
+    * None
+Todo:
+    * None
+"""
+from __future__ import absolute_import, division, generators, print_function
+try:
+    from future_builtins import *
+except:
+    pass
+import sys
+sys.dont_write_bytecode = True
+# ------------------------------------------------------------------------------
+import os
+import random
+import time
+
+def _printResult(title,result,*args,**kwargs):
+    """ベンチマークの結果を表示する
+
+    Args:
+        title (str): ベンチマークの名前
+        result (dict): 結果
+
+    Returns:
+        None
+    """
+    print('# {}'.format(title))
+    for key,value in result.items():
+        if isinstance(value,float):
+            print('    {:<24}{:>12.4f}'.format(key,value))
+        else:
+            print('    {:<24}{:>12}'.format(key,value))
+
+def createSyntheticRig(jointCount = 1000,meshDivisions = 40,seed = 0,*args,**kwargs):
+    """ベンチマーク用のリグを作成する
+    ランダムに枝分かれしたジョイント階層と、それにバインドしたメッシュを作成します。
+
+    Args:
+        jointCount (int): ジョイントの数
+        meshDivisions (int): メッシュの分割数
+        seed (int): 乱数のシード
+
+    Returns:
+        tuple: (ジョイントのリスト, メッシュ, skinCluster)
+    """
+    import maya.cmds as cmds
+
+    rng = random.Random(seed)
+    joints = [cmds.createNode('joint',n = 'benchRoot_jnt')]
+    for i in range(1,jointCount):
+        # 直前のジョイントにつなげて鎖を作り、ときどき途中から枝分かれさせる
+        parent = joints[-1] if rng.random() < 0.8 else rng.choice(joints)
+        joint = cmds.createNode('joint',n = 'bench{}_jnt'.format(i),p = parent)
+        cmds.setAttr('{}.t'.format(joint),rng.uniform(0.5,1.0),rng.uniform(-0.2,0.2),rng.uniform(-0.2,0.2))
+        cmds.setAttr('{}.jo'.format(joint),rng.uniform(-30,30),rng.uniform(-30,30),rng.uniform(-30,30))
+        joints.append(joint)
+
+    mesh = cmds.polyPlane(w = 20,h = 20,sx = meshDivisions,sy = meshDivisions,n = 'bench_mesh')[0]
+    skinCluster = cmds.skinCluster(joints,mesh,tsb = True,mi = 4)[0]
+    return joints,mesh,skinCluster
+
+def _randomizePose(joints,rng,*args,**kwargs):
+    """ジョイントをランダムに回転させる
+    """
+    import maya.cmds as cmds
+    for joint in joints:
+        cmds.setAttr('{}.r'.format(joint),rng.uniform(-45,45),rng.uniform(-45,45),rng.uniform(-45,45))
+
+def _poseError(joints,reference,*args,**kwargs):
+    """ジョイントのワールド行列と基準の行列の最大の差を求める
+    """
+    import maya.cmds as cmds
+    error = 0.0
+    for joint,matrix in zip(joints,reference):
+        current = cmds.xform(joint,q = True,ws = True,m = True)
+        error = max(error,max(abs(a - b) for a,b in zip(current,matrix)))
+    return error
+
+def benchmarkBindPose(jointCount = 1000,repeat = 3,seed = 0,*args,**kwargs):
+    """バインドポーズに戻す処理のベンチマーク
+    melのGoToBindPoseと、utilityProc.restoreBindPoseの処理時間を比較します。
+    シーンを新規作成して、合成したリグで計測します。
+
+    Args:
+        jointCount (int): ジョイントの数
+        repeat (int): 計測の回数
+        seed (int): 乱数のシード
+
+    Returns:
+        dict: 計測結果 (mel/nativeそれぞれの最短時間[秒]と、バインドポーズとの最大誤差)
+    """
+    import maya.cmds as cmds
+    import maya.mel as mel
+    from . import utilityProc
+
+    cmds.file(new = True,force = True)
+    joints,mesh,skinCluster = createSyntheticRig(jointCount = jointCount,seed = seed)
+    reference = [cmds.xform(joint,q = True,ws = True,m = True) for joint in joints]
+    rng = random.Random(seed)
+
+    melTimes = []
+    nativeTimes = []
+    melError = 0.0
+    nativeError = 0.0
+    for i in range(repeat):
+        _randomizePose(joints,rng)
+        cmds.select(joints[0])
+        startTime = time.time()
+        mel.eval('GoToBindPose')
+        melTimes.append(time.time() - startTime)
+        melError = max(melError,_poseError(joints,reference))
+
+        _randomizePose(joints,rng)
+        startTime = time.time()
+        utilityProc.restoreBindPose(skinClusters = [skinCluster])
+        nativeTimes.append(time.time() - startTime)
+        nativeError = max(nativeError,_poseError(joints,reference))
+
+    result = {'joints':jointCount,
+              'mel':min(melTimes),
+              'native':min(nativeTimes),
+              'speedup':min(melTimes) / max(min(nativeTimes),1.0e-9),
+              'melError':melError,
+              'nativeError':nativeError}
+    _printResult('bindPose',result)
+    return result
+
+def createSyntheticWeights(vertexCount = 100000,influenceCount = 60,maxInfluences = 4,seed = 0,*args,**kwargs):
+    """ベンチマーク用のウエイト配列を作成する
+    各頂点がmaxInfluences個のインフルエンスを持ち、合計が1になるウエイト配列を作成します。
+    Mayaを使わずに作成できます。
+
+    Args:
+        vertexCount (int): 頂点数
+        influenceCount (int): インフルエンス数
+        maxInfluences (int): 1頂点あたりのインフルエンス数
+        seed (int): 乱数のシード
+
+    Returns:
+        numpy.ndarray: ウエイト配列 (頂点数 x インフルエンス数)
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    maxInfluences = min(maxInfluences,influenceCount)
+    weights = np.zeros((vertexCount,influenceCount),dtype = np.float64)
+    # 近い頂点が近いインフルエンスを持つように、頂点番号に沿ってインフルエンスを割り当てる
+    base = (np.arange(vertexCount) * influenceCount // max(vertexCount,1))[:,None]
+    columns = (base + np.arange(maxInfluences)[None,:]) % influenceCount
+    values = rng.random((vertexCount,maxInfluences))
+    values /= values.sum(axis = 1,keepdims = True)
+    weights[np.arange(vertexCount)[:,None],columns] = values
+    return weights
+
+def benchmarkWeightStats(vertexCount = 500000,influenceCount = 60,repeat = 5,*args,**kwargs):
+    """インフルエンスのウエイトの統計を求める処理のベンチマーク
+    インフルエンスを切り替えたときに、キャッシュしたウエイト配列から統計を求める時間を計測します。
+    Mayaを使わずに実行できます。
+
+    Args:
+        vertexCount (int): 頂点数
+        influenceCount (int): インフルエンス数
+        repeat (int): 計測の回数
+
+    Returns:
+        dict: 計測結果 (1インフルエンスあたりの最短時間[秒])
+    """
+    from . import weightMath
+
+    weights = createSyntheticWeights(vertexCount,influenceCount)
+    times = []
+    for i in range(repeat):
+        column = i % influenceCount
+        startTime = time.time()
+        weightMath.computeInfluenceStats(weights[:,column])
+        times.append(time.time() - startTime)
+
+    result = {'vertices':vertexCount,
+              'influences':influenceCount,
+              'stats':min(times)}
+    _printResult('weightStats',result)
+    return result
+
+def benchmarkPrune(vertexCount = 1000000,influenceCount = 200,maxInfluences = 4,repeat = 3,*args,**kwargs):
+    """ウエイトの刈り込みとインフルエンス数の制限のベンチマーク
+    1頂点あたり8個のインフルエンスを持つウエイト配列を、maxInfluences個に制限する時間を計測します。
+    ロックされたインフルエンスがない場合とある場合の両方を計測します。
+    Mayaを使わずに実行できます。
+
+    Args:
+        vertexCount (int): 頂点数
+        influenceCount (int): インフルエンス数
+        maxInfluences (int): 1頂点あたりの最大インフルエンス数
+        repeat (int): 計測の回数
+
+    Returns:
+        dict: 計測結果 (最短時間[秒]と、処理後の1頂点あたりの最大インフルエンス数)
+    """
+    import numpy as np
+    from . import weightMath
+
+    weights = createSyntheticWeights(vertexCount,influenceCount,maxInfluences = 8)
+    locked = np.zeros(influenceCount,dtype = bool)
+    locked[::max(influenceCount // 10,1)] = True
+
+    times = []
+    lockedTimes = []
+    for i in range(repeat):
+        startTime = time.time()
+        pruned = weightMath.limitInfluencesChunked(weights,maxInfluences = maxInfluences,threshold = 0.001)
+        times.append(time.time() - startTime)
+
+        startTime = time.time()
+        weightMath.limitInfluencesChunked(weights,locked = locked,maxInfluences = maxInfluences,threshold = 0.001)
+        lockedTimes.append(time.time() - startTime)
+
+    result = {'vertices':vertexCount,
+              'influences':influenceCount,
+              'prune':min(times),
+              'pruneLocked':min(lockedTimes),
+              'maxInfluences':int(weightMath.countInfluences(pruned).max())}
+    _printResult('prune',result)
+    return result
+
+def createSymmetricPoints(vertexCount = 500000,seed = 0,*args,**kwargs):
+    """ベンチマーク用の、X軸で左右対称な頂点座標を作成する
+    頂点の順番はシャッフルし、ミラーの許容範囲より小さいノイズを加えます。
+
+    Args:
+        vertexCount (int): 頂点数
+        seed (int): 乱数のシード
+
+    Returns:
+        numpy.ndarray: 頂点の座標 (頂点数 x 3)
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    half = rng.random((vertexCount // 2,3)) * 10.0
+    half[:,0] += 0.01
+    points = np.vstack([half,half * np.array([-1.0,1.0,1.0])])
+    points = points[rng.permutation(len(points))]
+    return points + rng.normal(0.0,1.0e-5,points.shape)
+
+def benchmarkMirror(vertexCount = 500000,influenceCount = 60,repeat = 3,*args,**kwargs):
+    """ウエイトのミラーのベンチマーク
+    空間ハッシュによる頂点の対応付け(キャッシュがない場合の初回)と、
+    対応付けを済ませた後のウエイトの入れ替えの時間を計測します。
+    Mayaを使わずに実行できます。
+
+    Args:
+        vertexCount (int): 頂点数
+        influenceCount (int): インフルエンス数 (半分をL_、半分をR_の名前にします)
+        repeat (int): 計測の回数
+
+    Returns:
+        dict: 計測結果 (対応付けとウエイトの入れ替えの最短時間[秒]と、対応が見つからなかった頂点数)
+    """
+    import numpy as np
+    from . import weightMath
+
+    points = createSymmetricPoints(vertexCount)
+    weights = createSyntheticWeights(len(points),influenceCount)
+    influences = ['{}_joint{}'.format('L' if i % 2 else 'R',i // 2) for i in range(influenceCount)]
+
+    matchTimes = []
+    mirrorTimes = []
+    for i in range(repeat):
+        startTime = time.time()
+        vertexMap = weightMath.matchMirrorVertices(points,axis = 'x',tolerance = 0.001)
+        matchTimes.append(time.time() - startTime)
+
+        startTime = time.time()
+        columnMap,unmatched = weightMath.buildInfluenceMirrorMap(influences)
+        weightMath.mirrorWeights(weights,vertexMap,columnMap,np.flatnonzero(points[:,0] < 0.0))
+        mirrorTimes.append(time.time() - startTime)
+
+    result = {'vertices':len(points),
+              'influences':influenceCount,
+              'match':min(matchTimes),
+              'mirror':min(mirrorTimes),
+              'unmatched':int(np.count_nonzero(vertexMap < 0))}
+    _printResult('mirror',result)
+    return result
+
+def benchmarkWeightFile(vertexCount = 1000000,influenceCount = 200,chunkVertices = 65536,directory = None,*args,**kwargs):
+    """ウエイトファイルの書き出し・読み込みのベンチマーク
+    合成したウエイト配列をweightFileの形式で書き出し、メモリマップして読み込みなおす時間と、
+    ファイルサイズ、読み込んだウエイトの誤差を計測します。
+    Mayaを使わずに実行できます。
+
+    Args:
+        vertexCount (int): 頂点数
+        influenceCount (int): インフルエンス数
+        chunkVertices (int): 一度に読み込む頂点数
+        directory (str): 一時ファイルを置くディレクトリ。Noneの場合はシステムの一時ディレクトリ
+
+    Returns:
+        dict: 計測結果 (書き出し・読み込みの時間[秒]、ファイルサイズ[MB]、最大誤差)
+    """
+    import os
+    import tempfile
+    import numpy as np
+    from . import weightFile
+
+    weights = createSyntheticWeights(vertexCount,influenceCount)
+    influences = ['joint{}'.format(i) for i in range(influenceCount)]
+    # 読み込み先はインフルエンスの順番を逆にして、名前での対応付けも計測する
+    targetInfluences = list(reversed(influences))
+    handle,path = tempfile.mkstemp(suffix = weightFile.FILE_EXTENSION,dir = directory)
+    os.close(handle)
+    try:
+        startTime = time.time()
+        weightFile.writeSparseWeights(path,weights,influences)
+        writeTime = time.time() - startTime
+
+        startTime = time.time()
+        error = 0.0
+        for vertices,chunk in weightFile.iterSparseWeights(path,targetInfluences,chunkVertices = chunkVertices):
+            error = max(error,float(np.abs(chunk[:,::-1] - weights[vertices]).max()))
+        readTime = time.time() - startTime
+        size = os.path.getsize(path)
+    finally:
+        os.remove(path)
+
+    result = {'vertices':vertexCount,
+              'influences':influenceCount,
+              'write':writeTime,
+              'read':readTime,
+              'sizeMB':size / 1048576.0,
+              'denseMB':weights.nbytes / 1048576.0,
+              'maxError':error}
+    _printResult('weightFile',result)
+    return result
+
+def benchmarkWeightFileMaya(jointCount = 100,meshDivisions = 300,directory = None,*args,**kwargs):
+    """ウエイトの書き出し・読み込みを、deformerWeights(XML)と比較するベンチマーク
+    シーンを新規作成して、合成したリグで計測します。
+
+    Args:
+        jointCount (int): ジョイントの数
+        meshDivisions (int): メッシュの分割数
+        directory (str): 一時ファイルを置くディレクトリ。Noneの場合はシステムの一時ディレクトリ
+
+    Returns:
+        dict: 計測結果 (xml/nativeそれぞれの書き出し・読み込みの時間[秒]とファイルサイズ[MB])
+    """
+    import os
+    import shutil
+    import tempfile
+    import maya.cmds as cmds
+    from . import utilityProc
+    from . import weightData
+
+    cmds.file(new = True,force = True)
+    joints,mesh,skinCluster = createSyntheticRig(jointCount = jointCount,meshDivisions = meshDivisions)
+    reference = weightData.readWeights(skinCluster)[0]
+    directory = tempfile.mkdtemp(dir = directory)
+    try:
+        xmlName = 'bench_weights.xml'
+        startTime = time.time()
+        cmds.deformerWeights(xmlName,ex = True,deformer = skinCluster,path = directory)
+        xmlWrite = time.time() - startTime
+        startTime = time.time()
+        cmds.deformerWeights(xmlName,im = True,deformer = skinCluster,method = 'index',path = directory)
+        cmds.skinCluster(skinCluster,e = True,forceNormalizeWeights = True)
+        xmlRead = time.time() - startTime
+        xmlSize = os.path.getsize(os.path.join(directory,xmlName))
+
+        startTime = time.time()
+        files = utilityProc.exportSkinWeights([skinCluster],directory)['files']
+        nativeWrite = time.time() - startTime
+        startTime = time.time()
+        utilityProc.importSkinWeights([skinCluster],directory)
+        nativeRead = time.time() - startTime
+        nativeSize = os.path.getsize(files[skinCluster])
+        error = float(abs(weightData.readWeights(skinCluster)[0] - reference).max())
+    finally:
+        shutil.rmtree(directory,ignore_errors = True)
+
+    result = {'vertices':reference.shape[0],
+              'influences':reference.shape[1],
+              'xmlWrite':xmlWrite,
+              'xmlRead':xmlRead,
+              'xmlSizeMB':xmlSize / 1048576.0,
+              'nativeWrite':nativeWrite,
+              'nativeRead':nativeRead,
+              'nativeSizeMB':nativeSize / 1048576.0,
+              'maxError':error}
+    _printResult('weightFileMaya',result)
+    return result
+
+def createGridFaces(divisions = 700,*args,**kwargs):
+    """ベンチマーク用の、四角形を格子状に並べたメッシュのフェースを作成する
+
+    Args:
+        divisions (int): 1辺の分割数
+
+    Returns:
+        tuple: (フェースごとの頂点数の配列, 頂点番号を並べた配列, 頂点数)
+    """
+    import numpy as np
+
+    grid = np.arange((divisions + 1) * (divisions + 1)).reshape(divisions + 1,divisions + 1)
+    quads = np.stack([grid[:-1,:-1],grid[:-1,1:],grid[1:,1:],grid[1:,:-1]],axis = -1).reshape(-1,4)
+    return np.full(len(quads),4),quads.ravel(),grid.size
+
+def benchmarkSmooth(divisions = 706,influenceCount = 60,iterations = 20,*args,**kwargs):
+    """ウエイトのスムースのベンチマーク
+    格子状のメッシュ(既定で約50万頂点)で、隣接行列の作成と、
+    1つのインフルエンスと重なるインフルエンスの列をiterations回スムースする時間を計測します。
+    Mayaを使わずに実行できます。SciPyがない場合は、weightMath.CsrMatrixで計測します。
+
+    Args:
+        divisions (int): メッシュの1辺の分割数
+        influenceCount (int): インフルエンス数
+        iterations (int): 反復回数
+
+    Returns:
+        dict: 計測結果 (隣接行列の作成とスムースの時間[秒]、スムースした列数、合計の最大誤差)
+    """
+    import numpy as np
+    from . import weightMath
+
+    counts,connects,vertexCount = createGridFaces(divisions)
+    weights = createSyntheticWeights(vertexCount,influenceCount)
+    locked = np.zeros(influenceCount,dtype = bool)
+    locked[0] = True
+
+    startTime = time.time()
+    edges = weightMath.buildEdgesFromFaces(counts,connects)
+    adjacency = weightMath.buildAdjacency(edges,vertexCount)
+    buildTime = time.time() - startTime
+
+    startTime = time.time()
+    columns = weightMath.findSmoothColumns(weights,adjacency,influenceCount // 2,locked = locked)
+    rows,smoothed = weightMath.smoothWeights(weights,adjacency,columns,iterations = iterations,locked = locked)
+    smoothTime = time.time() - startTime
+
+    result = {'vertices':vertexCount,
+              'backend':'scipy' if weightMath.sparse is not None else 'numpy',
+              'adjacency':buildTime,
+              'smooth':smoothTime,
+              'columns':len(columns),
+              'sumError':float(np.abs(smoothed.sum(axis = 1) - 1.0).max())}
+    _printResult('smooth',result)
+    return result
+
+def benchmarkWeightSelection(divisions = 1000,influenceCount = 60,steps = 3,*args,**kwargs):
+    """ウエイトによる頂点選択のベンチマーク
+    格子状のメッシュ(既定で約100万頂点)で、インフルエンスのウエイトが範囲内の頂点のマスクを作る時間と、
+    選択をウエイトの範囲に沿ってsteps回広げる・狭める時間、選択に渡す頂点番号のリストを作る時間を計測します。
+    隣接行列はキャッシュ済みの想定で、計測に含めません。Mayaを使わずに実行できます。
+
+    Args:
+        divisions (int): メッシュの1辺の分割数
+        influenceCount (int): インフルエンス数
+        steps (int): 広げる・狭める回数
+
+    Returns:
+        dict: 計測結果 (マスク・広げる・狭める・頂点番号のリストの時間[秒]、選択した頂点数)
+    """
+    import numpy as np
+    from . import weightMath
+
+    counts,connects,vertexCount = createGridFaces(divisions)
+    weights = createSyntheticWeights(vertexCount,influenceCount)
+    adjacency = weightMath.buildAdjacency(weightMath.buildEdgesFromFaces(counts,connects),vertexCount)
+    column = weights[:,influenceCount // 2]
+
+    startTime = time.time()
+    mask = column >= 0.5
+    maskTime = time.time() - startTime
+    band = column > 0.0
+
+    startTime = time.time()
+    grown = weightMath.growVertexMask(mask,adjacency,band = band,steps = steps)
+    growTime = time.time() - startTime
+
+    startTime = time.time()
+    shrunk = weightMath.growVertexMask(grown,adjacency,band = mask,steps = steps,shrink = True)
+    shrinkTime = time.time() - startTime
+
+    startTime = time.time()
+    vertices = np.flatnonzero(grown).tolist()
+    listTime = time.time() - startTime
+
+    result = {'vertices':vertexCount,
+              'backend':'scipy' if weightMath.sparse is not None else 'numpy',
+              'mask':maskTime,
+              'grow':growTime,
+              'shrink':shrinkTime,
+              'list':listTime,
+              'selected':int(mask.sum()),
+              'grown':len(vertices),
+              'shrunk':int(shrunk.sum())}
+    _printResult('weight selection',result)
+    return result
+
+def benchmarkDominantInfluence(vertexCount = 1000000,influenceCount = 200,patchVertices = 2000,picks = 10000,*args,**kwargs):
+    """インフルエンスを選ぶときの、頂点ごとのウエイトが最も大きいインフルエンスのベンチマーク
+    全頂点の列番号を一括で求める時間、ストロークで変更された頂点だけを求めなおす時間、
+    キャッシュした列番号を引く時間を計測し、部分的に求めなおした結果が一括で求めた結果と一致するかを調べます。
+    Mayaを使わずに実行できます。
+
+    Args:
+        vertexCount (int): 頂点数
+        influenceCount (int): インフルエンス数
+        patchVertices (int): ストロークで変更された頂点数
+        picks (int): 列番号を引く回数
+
+    Returns:
+        dict: 計測結果 (一括・部分的に求めなおす時間[秒]、1回あたりの引く時間[マイクロ秒]、結果が一致するか)
+    """
+    import numpy as np
+    from . import weightMath
+
+    weights = createSyntheticWeights(vertexCount,influenceCount)
+    rng = np.random.RandomState(0)
+    vertices = rng.randint(0,vertexCount,picks)
+
+    startTime = time.time()
+    dominant = weightMath.dominantInfluences(weights)
+    buildTime = time.time() - startTime
+
+    rows = np.unique(rng.randint(0,vertexCount,patchVertices))
+    weights[rows] = weights[rows][:,::-1]
+    startTime = time.time()
+    dominant[rows] = weightMath.dominantInfluences(weights[rows])
+    patchTime = time.time() - startTime
+
+    startTime = time.time()
+    for vertex in vertices:
+        dominant[vertex]
+    lookupTime = (time.time() - startTime) / picks
+
+    result = {'vertices':vertexCount,
+              'influences':influenceCount,
+              'build':buildTime,
+              'patch':patchTime,
+              'lookupMicroseconds':lookupTime * 1.0e6,
+              'match':bool(np.array_equal(dominant,weightMath.dominantInfluences(weights)))}
+    _printResult('dominant influence',result)
+    return result
+
+def benchmarkParallelPrune(meshCount = 8,vertexCount = 200000,influenceCount = 60,maxInfluences = 4,workerCounts = (1,2,4,8),*args,**kwargs):
+    """複数のskinClusterのウエイトをまとめて刈り込むときの、スレッド数ごとのベンチマーク
+    meshCount個のウエイト配列を、MeshPipelineで読み込み・計算・書き込みする時間をスレッド数ごとに計測し、
+    1スレッドに対する速度比を求めます。速度比はCPUのコア数を超えません。
+    Mayaを使わずに実行できます。
+
+    Args:
+        meshCount (int): メッシュの数
+        vertexCount (int): 1メッシュあたりの頂点数
+        influenceCount (int): インフルエンス数
+        maxInfluences (int): 1頂点あたりの最大インフルエンス数
+        workerCounts (tuple): 計測するスレッド数
+
+    Returns:
+        dict: 計測結果 (スレッド数ごとの処理時間[秒]と速度比、結果が1スレッドと一致するか)
+    """
+    import numpy as np
+    from . import parallel
+    from . import weightMath
+
+    meshes = dict(('mesh{}'.format(i),createSyntheticWeights(vertexCount,influenceCount,maxInfluences = 8,seed = i))
+                  for i in range(meshCount))
+    names = sorted(meshes)
+
+    def read(name):
+        return meshes[name]
+
+    def compute(name,weights):
+        return weightMath.limitInfluencesChunked(weights,maxInfluences = maxInfluences,threshold = 0.001)
+
+    written = {}
+    def write(name,weights,result):
+        written[name] = result
+
+    result = {'meshes':meshCount,
+              'vertices':vertexCount,
+              'influences':influenceCount,
+              'cpus':parallel.defaultWorkerCount()}
+    reference = None
+    match = True
+    for workerCount in workerCounts:
+        pipeline = parallel.MeshPipeline(workerCount)
+        try:
+            written.clear()
+            pipeline.run(names,read,compute,write)
+            result['workers{}'.format(workerCount)] = pipeline.elapsed
+        finally:
+            pipeline.shutdown()
+        if reference is None:
+            reference = dict(written)
+        else:
+            match = match and all(np.array_equal(reference[name],written[name]) for name in names)
+        result['speedup{}'.format(workerCount)] = result['workers{}'.format(workerCounts[0])] / max(pipeline.elapsed,1.0e-9)
+    result['match'] = match
+    _printResult('parallel prune',result)
+    return result
+
+def benchmarkBatch(fileCount = 8,influenceCount = 100,skinClusterCount = 2,meshDivisions = 60,workerCounts = (1,2,4),*args,**kwargs):
+    """複数のシーンファイルをまとめて処理するバッチ処理のベンチマーク
+    mayaStandinの代用品で合成したリグのシーンファイルを作成し、batch.runBatchで
+    ワーカープロセスの数ごとに全ファイルを処理する時間と、処理済みのファイルを飛ばして
+    実行しなおす時間を計測します。
+    代用品をmaya以下のモジュールとして登録するので、Mayaの中では実行できません。
+
+    Args:
+        fileCount (int): シーンファイルの数
+        influenceCount (int): 1ファイルあたりのインフルエンス数
+        skinClusterCount (int): 1ファイルあたりのskinClusterの数
+        meshDivisions (int): メッシュの1辺の分割数
+        workerCounts (tuple): 計測するワーカープロセスの数
+
+    Returns:
+        dict: 計測結果 (ワーカープロセスの数ごとの処理時間[秒]、実行しなおす時間[秒]、飛ばしたファイル数)
+    """
+    import shutil
+    import tempfile
+    from . import batch
+    from . import mayaStandin
+
+    mayaStandin.install()
+    cmds = sys.modules['maya.cmds']
+    directory = tempfile.mkdtemp(prefix = 'cwpBatch')
+    try:
+        files = []
+        for i in range(fileCount):
+            mayaStandin.newScene()
+            mayaStandin.createSyntheticRig(influenceCount = influenceCount,skinClusterCount = skinClusterCount,
+                                           meshDivisions = meshDivisions,seed = i)
+            path = os.path.join(directory,'asset{}.ma'.format(i))
+            cmds.file(rename = path)
+            cmds.file(save = True,force = True)
+            files.append(path)
+
+        result = {'files':fileCount,
+                  'vertices':fileCount * skinClusterCount * (meshDivisions + 1) ** 2}
+        for workerCount in workerCounts:
+            reportDir = os.path.join(directory,'reports{}'.format(workerCount))
+            summary = batch.runBatch(files,reportDir = reportDir,workers = workerCount,standin = True,
+                                     outputDir = os.path.join(directory,'out{}'.format(workerCount)),
+                                     verbose = False)
+            result['workers{}'.format(workerCount)] = summary['time']
+            result['ok{}'.format(workerCount)] = summary['ok']
+
+        summary = batch.runBatch(files,reportDir = reportDir,workers = workerCounts[-1],standin = True,
+                                 outputDir = os.path.join(directory,'out{}'.format(workerCounts[-1])),
+                                 verbose = False)
+        result['resume'] = summary['time']
+        result['skipped'] = summary['skipped']
+    finally:
+        shutil.rmtree(directory,ignore_errors = True)
+    _printResult('batch',result)
+    return result
+
+def createSyntheticSparseWeights(vertexCount = 100000,influenceCount = 60,maxInfluences = 4,seed = 0,*args,**kwargs):
+    """ベンチマーク用の、疎行列のウエイトを作成する
+    createSyntheticWeightsと同じ割り当てで、密な配列を作らずに作成します。
+    SciPyがある場合はscipy.sparse.csr_matrixを、ない場合はweightMath.CsrMatrixを返します。
+
+    Args:
+        vertexCount (int): 頂点数
+        influenceCount (int): インフルエンス数
+        maxInfluences (int): 1頂点あたりのインフルエンス数
+        seed (int): 乱数のシード
+
+    Returns:
+        scipy.sparse.csr_matrix or weightMath.CsrMatrix: ウエイト (頂点数 x インフルエンス数)
+    """
+    import numpy as np
+    from . import weightMath
+
+    rng = np.random.default_rng(seed)
+    maxInfluences = min(maxInfluences,influenceCount)
+    base = (np.arange(vertexCount) * influenceCount // max(vertexCount,1))[:,None]
+    columns = np.sort((base + np.arange(maxInfluences)[None,:]) % influenceCount,axis = 1)
+    values = rng.random((vertexCount,maxInfluences))
+    values /= values.sum(axis = 1,keepdims = True)
+    indptr = np.arange(vertexCount + 1,dtype = np.int64) * maxInfluences
+    if weightMath.sparse is not None:
+        return weightMath.sparse.csr_matrix((values.ravel(),columns.ravel(),indptr),
+                                            shape = (vertexCount,influenceCount))
+    return weightMath.CsrMatrix(values.ravel(),columns.ravel(),indptr,(vertexCount,influenceCount))
+
+def createSyntheticSkeleton(influenceCount = 60,seed = 0,*args,**kwargs):
+    """ベンチマーク用の、バインドプレ行列とポーズをとったワールド行列を作成する
+
+    Args:
+        influenceCount (int): インフルエンス数
+        seed (int): 乱数のシード
+
+    Returns:
+        tuple: (バインドプレ行列, ワールド行列) (それぞれインフルエンス数 x 4 x 4)
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    def randomMatrices():
+        matrices = np.tile(np.eye(4),(influenceCount,1,1))
+        rotations,_ = np.linalg.qr(rng.normal(size = (influenceCount,3,3)))
+        matrices[:,:3,:3] = rotations
+        matrices[:,3,:3] = rng.normal(size = (influenceCount,3)) * 10.0
+        return matrices
+    bindMatrices = randomMatrices()
+    return np.linalg.inv(bindMatrices),randomMatrices()
+
+def benchmarkLbs(vertexCounts = (100000,500000,2000000),influenceCount = 60,maxInfluences = 4,chunkSize = 65536,denseMaxMB = 512,*args,**kwargs):
+    """NumPyのLBSによる変形と、ウエイトの変更による頂点ごとの誤差のベンチマーク
+    頂点数ごとに、全頂点をまとめた変形・分割した変形・密な配列のウエイトでの変形と、
+    インフルエンス数を半分にしたウエイトとの誤差を求める時間を計測します。
+    作業用のメモリの最大値(結果の配列を除く)をtracemallocで計測します。
+    Mayaを使わずに実行できます。
+
+    Args:
+        vertexCounts (list): 頂点数
+        influenceCount (int): インフルエンス数
+        maxInfluences (int): 1頂点あたりのインフルエンス数
+        chunkSize (int): 分割して計算するときの、一度に処理する頂点数
+        denseMaxMB (int): 密な配列のウエイトで計測する、ウエイト配列の大きさの上限[MB]
+
+    Returns:
+        dict: 計測結果 (頂点数ごとの処理時間[秒]と作業用のメモリの最大値[MB]、誤差の最大値と平均値)
+    """
+    import tracemalloc
+    import numpy as np
+    from . import lbs
+    from . import weightMath
+
+    def traced(func):
+        tracemalloc.start()
+        try:
+            startTime = time.time()
+            func()
+            return time.time() - startTime,tracemalloc.get_traced_memory()[1] / (1024.0 * 1024.0)
+        finally:
+            tracemalloc.stop()
+
+    bindPreMatrices,worldMatrices = createSyntheticSkeleton(influenceCount)
+    result = {'influences':influenceCount,'chunkSize':chunkSize}
+    for vertexCount in vertexCounts:
+        label = '{}k '.format(vertexCount // 1000)
+        points = np.random.default_rng(vertexCount).normal(size = (vertexCount,3)) * 10.0
+        weights = createSyntheticSparseWeights(vertexCount,influenceCount,maxInfluences)
+        out = np.empty((vertexCount,3),dtype = np.float64)
+
+        result[label + 'deform'],result[label + 'deformMB'] = traced(
+            lambda:lbs.deformPoints(points,bindPreMatrices,worldMatrices,weights,out = out))
+        result[label + 'chunked'],result[label + 'chunkedMB'] = traced(
+            lambda:lbs.deformPointsChunked(points,bindPreMatrices,worldMatrices,weights,
+                                           chunkSize = chunkSize,out = out))
+        if vertexCount * influenceCount * 8 <= denseMaxMB * 1024 * 1024:
+            dense = createSyntheticWeights(vertexCount,influenceCount,maxInfluences)
+            result[label + 'dense'] = traced(
+                lambda:lbs.deformPointsChunked(points,bindPreMatrices,worldMatrices,dense,
+                                               chunkSize = chunkSize,out = out))[0]
+            del dense
+
+        # 各頂点の小さい方から半分のウエイトを0にして正規化しなおしたウエイトと比べる
+        values = weights.data.reshape(vertexCount,-1).copy()
+        values[values < np.median(values,axis = 1,keepdims = True)] = 0.0
+        values /= values.sum(axis = 1,keepdims = True)
+        if isinstance(weights,weightMath.CsrMatrix):
+            pruned = weightMath.CsrMatrix(values.ravel(),weights.indices,weights.indptr,weights.shape)
+        else:
+            pruned = weightMath.sparse.csr_matrix((values.ravel(),weights.indices,weights.indptr),shape = weights.shape)
+        distances = []
+        result[label + 'error'] = traced(
+            lambda:distances.append(lbs.weightError(points,bindPreMatrices,worldMatrices,weights,pruned,
+                                                    chunkSize = chunkSize)))[0]
+        stats = lbs.errorStats(distances[0])
+        result[label + 'errorMax'] = stats['max']
+        result[label + 'errorMean'] = stats['mean']
+    _printResult('lbs',result)
+    return result
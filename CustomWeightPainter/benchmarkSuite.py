@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""Mayaを使わずにToolの処理速度とコマンドの呼び出し回数を計測するベンチマーク
+mayaStandinの代用品と合成したリグで、UIの作成からウエイトの処理までを順に実行し、
+処理ごとの時間とcmds/melの呼び出し回数を計測します。
+計測値が処理ごとに設定した上限(バジェット)を超えた場合は失敗になります。
+
+コマンドラインから実行できます:
+    python -m CustomWeightPainter.benchmarkSuite [--preset small] [--budgets budgets.json]
+
+代用品をmaya以下のモジュールとして登録するので、Mayaの中では実行できません。
+
+Attributes:
+    * None
+Todo:
+    * None
+"""
+from __future__ import absolute_import, division, generators, print_function
+try:
+    from future_builtins import *
+except:
+    pass
+import sys
+sys.dont_write_bytecode = True
+# ------------------------------------------------------------------------------
+import argparse
+import io
+import json
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from importlib import import_module
+
+from . import mayaStandin
+
+# 合成するリグの設定 (mayaStandin.createSyntheticRigの引数)
+RIG_PRESETS = OrderedDict([
+    ('small',{'influenceCount':10,'skinClusterCount':2,'meshDivisions':20}),
+    ('medium',{'influenceCount':500,'skinClusterCount':3,'meshDivisions':50}),
+    ('large',{'influenceCount':5000,'skinClusterCount':2,'meshDivisions':20}),
+])
+
+# 処理ごとの上限 (time: 処理時間[秒], calls: cmdsとmelの呼び出し回数の合計)
+BUDGETS = {
+    'small':{
+        'showWindow':{'time':0.5,'calls':180},
+        'createUI':{'time':0.2,'calls':145},
+        'setTargetJoint':{'time':0.1,'calls':10},
+        'cutKeyInflenceLock':{'time':0.1,'calls':10},
+        'setKeyToInflences':{'time':0.1,'calls':5},
+        'cutKeyInflences':{'time':0.1,'calls':5},
+        'pruneWeights':{'time':0.5,'calls':5},
+        'validateSkinWeights':{'time':0.5,'calls':5},
+        'normalizeSkinWeights':{'time':0.5,'calls':5},
+        'mirrorSkinWeights':{'time':0.5,'calls':5},
+        'smoothSkinWeights':{'time':0.5,'calls':5},
+        'exportSkinWeights':{'time':0.5,'calls':5},
+        'importSkinWeights':{'time':0.5,'calls':5},
+        'sweepRom':{'time':0.5,'calls':20},
+        'scrubRom':{'time':0.5,'calls':5},
+        'pickInflence':{'time':0.1,'calls':20},
+    },
+    'medium':{
+        'showWindow':{'time':1.0,'calls':280},
+        'createUI':{'time':0.2,'calls':145},
+        'setTargetJoint':{'time':0.1,'calls':10},
+        'cutKeyInflenceLock':{'time':0.3,'calls':10},
+        'setKeyToInflences':{'time':0.2,'calls':5},
+        'cutKeyInflences':{'time':1.0,'calls':5},
+        'pruneWeights':{'time':2.0,'calls':5},
+        'validateSkinWeights':{'time':1.0,'calls':5},
+        'normalizeSkinWeights':{'time':2.0,'calls':5},
+        'mirrorSkinWeights':{'time':1.0,'calls':5},
+        'smoothSkinWeights':{'time':1.5,'calls':5},
+        'exportSkinWeights':{'time':1.0,'calls':5},
+        'importSkinWeights':{'time':2.0,'calls':5},
+        'sweepRom':{'time':1.0,'calls':20},
+        'scrubRom':{'time':0.5,'calls':5},
+        'pickInflence':{'time':0.3,'calls':20},
+    },
+    'large':{
+        'showWindow':{'time':3.0,'calls':1300},
+        'createUI':{'time':0.2,'calls':145},
+        'setTargetJoint':{'time':0.1,'calls':10},
+        'cutKeyInflenceLock':{'time':0.5,'calls':10},
+        'setKeyToInflences':{'time':1.0,'calls':5},
+        'cutKeyInflences':{'time':1.0,'calls':5},
+        'pruneWeights':{'time':2.5,'calls':5},
+        'validateSkinWeights':{'time':1.0,'calls':5},
+        'normalizeSkinWeights':{'time':2.5,'calls':5},
+        'mirrorSkinWeights':{'time':1.0,'calls':5},
+        'smoothSkinWeights':{'time':1.5,'calls':5},
+        'exportSkinWeights':{'time':1.0,'calls':5},
+        'importSkinWeights':{'time':2.5,'calls':5},
+        'sweepRom':{'time':1.0,'calls':20},
+        'scrubRom':{'time':0.5,'calls':5},
+        'pickInflence':{'time':0.3,'calls':20},
+    },
+}
+
+# 計測する処理の順番
+OPERATIONS = ('showWindow','createUI','setTargetJoint','cutKeyInflenceLock','setKeyToInflences',
+              'cutKeyInflences','pruneWeights','validateSkinWeights','normalizeSkinWeights','mirrorSkinWeights','smoothSkinWeights',
+              'exportSkinWeights','importSkinWeights','sweepRom','scrubRom','pickInflence')
+
+def _loadToolModules(*args,**kwargs):
+    """代用品を登録して、Toolのモジュールを読み込む
+
+    Returns:
+        tuple: (uiモジュール, utilityProcモジュール)
+    """
+    mayaStandin.install()
+    return import_module('.ui',__package__),import_module('.utilityProc',__package__)
+
+def measure(name,func,*args,**kwargs):
+    """処理の時間と、cmdsとmelの呼び出し回数を計測する
+
+    Args:
+        name (str): 処理の名前
+        func (function): 計測する関数
+
+    Returns:
+        dict: 計測結果 (operation: 処理の名前, time: 処理時間[秒], calls: 呼び出し回数の合計,
+              commands: コマンド → 呼び出し回数の辞書)
+    """
+    mayaStandin.resetCallCounts()
+    startTime = time.time()
+    func()
+    elapsed = time.time() - startTime
+    counts = mayaStandin.getCallCounts()
+    return {'operation':name,
+            'time':elapsed,
+            'calls':sum(counts.values()),
+            'commands':dict(counts.most_common())}
+
+def checkBudget(measurement,budget,timeScale = 1.0,*args,**kwargs):
+    """計測結果が上限を超えていないかを調べる
+
+    Args:
+        measurement (dict): measureの計測結果
+        budget (dict): 上限 (time, calls)。指定のない項目は調べない
+        timeScale (float): 処理時間の上限に掛ける倍率 (遅いマシンで実行する場合に使います)
+
+    Returns:
+        list: 超えた項目の説明のリスト。超えていない場合は空
+    """
+    failures = []
+    if not budget:
+        return failures
+    if 'time' in budget and measurement['time'] > budget['time'] * timeScale:
+        failures.append('{}: time {:.4f}s > {:.4f}s'.format(
+                        measurement['operation'],measurement['time'],budget['time'] * timeScale))
+    if 'calls' in budget and measurement['calls'] > budget['calls']:
+        failures.append('{}: calls {} > {}'.format(
+                        measurement['operation'],measurement['calls'],budget['calls']))
+    return failures
+
+def _disposeTool(tool,*args,**kwargs):
+    """Toolが登録したコールバックを解除する
+    """
+    tool.index.stopWatching()
+    tool.lockDetector.stopWatching()
+    tool.weightCache.invalidate()
+    tool.meshPipeline.shutdown()
+    tool.romPreview.end()
+
+def runPreset(preset,rigOptions = None,seed = 0,*args,**kwargs):
+    """1つのリグで全ての処理を計測する
+    新しいシーンにリグを作成し、OPERATIONSの順に同じリグで処理を続けて実行します。
+    evalDeferredで予約された処理は、showWindow以外では計測の外で実行します。
+
+    Args:
+        preset (str): リグの設定の名前
+        rigOptions (dict): リグの設定。Noneの場合はRIG_PRESETSの設定
+        seed (int): 乱数のシード
+
+    Returns:
+        dict: 計測結果 (preset: 設定の名前, rig: リグの設定, measurements: 処理ごとの計測結果のリスト,
+              errors: MGlobal.displayErrorで表示されたメッセージのリスト)
+    """
+    ui,utilityProc = _loadToolModules()
+    rigOptions = dict(RIG_PRESETS[preset] if rigOptions is None else rigOptions)
+    scene = mayaStandin.newScene()
+    rig = mayaStandin.createSyntheticRig(seed = seed,**rigOptions)
+    skinClusters = rig['skinClusters']
+    directory = tempfile.mkdtemp(prefix = 'cwpBenchmark')
+
+    tool = ui.CustomWeightPainterUI()
+    def showWindow():
+        tool.showWindow()
+        scene.flushIdle()
+    operations = {
+        'showWindow':showWindow,
+        'createUI':tool.createUI,
+        'setTargetJoint':tool.setTargetJoint,
+        'cutKeyInflenceLock':lambda:utilityProc.cutKeyInflenceLock(
+                                    tool.index.influences(),index = tool.index,
+                                    keyedInflences = tool.lockDetector.keyed),
+        'setKeyToInflences':lambda:utilityProc.setKeyToInflences(tool.index.influences(),index = tool.index),
+        'cutKeyInflences':lambda:utilityProc.cutKeyInflences(tool.index.influences(),index = tool.index),
+        'pruneWeights':lambda:utilityProc.pruneWeights(
+                                    skinClusters,maxInfluences = tool.pruneMaxInfluences,
+                                    threshold = tool.pruneThreshold,useSelection = False,
+                                    weightCache = tool.weightCache,history = tool.weightHistory,
+                                    pipeline = tool.meshPipeline),
+        'validateSkinWeights':lambda:utilityProc.validateSkinWeights(
+                                    skinClusters,maxInfluences = tool.pruneMaxInfluences,
+                                    weightCache = tool.weightCache,pipeline = tool.meshPipeline),
+        'normalizeSkinWeights':lambda:utilityProc.normalizeSkinWeights(
+                                    skinClusters,useSelection = False,weightCache = tool.weightCache,
+                                    history = tool.weightHistory,pipeline = tool.meshPipeline),
+        'mirrorSkinWeights':lambda:utilityProc.mirrorSkinWeights(
+                                    skinClusters,axis = tool.mirrorAxis,useSelection = False,
+                                    weightCache = tool.weightCache,mirrorCache = tool.mirrorCache,
+                                    history = tool.weightHistory),
+        'smoothSkinWeights':lambda:utilityProc.smoothSkinWeights(
+                                    skinClusters,influence = tool.targetInflence,
+                                    iterations = tool.smoothIterations,strength = tool.smoothStrength,
+                                    useSelection = False,weightCache = tool.weightCache,
+                                    adjacencyCache = tool.adjacencyCache,history = tool.weightHistory),
+        'exportSkinWeights':lambda:utilityProc.exportSkinWeights(skinClusters,directory),
+        'importSkinWeights':lambda:utilityProc.importSkinWeights(
+                                    skinClusters,directory,weightCache = tool.weightCache,
+                                    history = tool.weightHistory),
+        'sweepRom':tool.sweepRom,
+        'scrubRom':lambda:[tool.scrubRom(axis,angle) for axis in ('x','y','z')
+                                                      for angle in range(-90,91,15)],
+        'pickInflence':lambda:tool.pickInflence(mayaStandin.VIEW_PORT_SIZE[0] // 2,
+                                                mayaStandin.VIEW_PORT_SIZE[1] // 2),
+    }
+
+    measurements = []
+    try:
+        for name in OPERATIONS:
+            measurements.append(measure(name,operations[name]))
+            scene.flushIdle()
+        errors = [text for level,text in scene.log if level == 'Error']
+    finally:
+        _disposeTool(tool)
+        shutil.rmtree(directory,ignore_errors = True)
+    return {'preset':preset,
+            'rig':dict(rigOptions,seed = seed),
+            'measurements':measurements,
+            'errors':errors}
+
+def runSuite(presets = None,budgets = None,timeScale = 1.0,verbose = True,*args,**kwargs):
+    """全てのリグの設定で計測し、上限と比べる
+
+    Args:
+        presets (list): 計測するリグの設定の名前。Noneの場合はRIG_PRESETSの全て
+        budgets (dict): 上限 (設定の名前 → 処理の名前 → 上限)。Noneの場合はBUDGETS
+        timeScale (float): 処理時間の上限に掛ける倍率
+        verbose (bool): Trueの場合は結果を表示する
+
+    Returns:
+        dict: 結果 (results: runPresetの結果のリスト, failures: 上限を超えた項目の説明のリスト)
+    """
+    budgets = BUDGETS if budgets is None else budgets
+    results = []
+    failures = []
+    for preset in presets or list(RIG_PRESETS):
+        result = runPreset(preset)
+        presetBudgets = budgets.get(preset,{})
+        for measurement in result['measurements']:
+            budget = presetBudgets.get(measurement['operation'])
+            measurement['budget'] = budget
+            measurement['failures'] = checkBudget(measurement,budget,timeScale = timeScale)
+            failures.extend('{} {}'.format(preset,failure) for failure in measurement['failures'])
+        failures.extend('{} error: {}'.format(preset,error) for error in result['errors'])
+        results.append(result)
+        if verbose:
+            printResult(result,timeScale = timeScale)
+    if verbose:
+        print('# {} failure(s)'.format(len(failures)))
+        for failure in failures:
+            print('    {}'.format(failure))
+    return {'results':results,'failures':failures}
+
+def printResult(result,timeScale = 1.0,*args,**kwargs):
+    """runPresetの結果を表で表示する
+
+    Args:
+        result (dict): runPresetの結果
+        timeScale (float): 処理時間の上限に掛ける倍率
+
+    Returns:
+        None
+    """
+    rig = result['rig']
+    print('# {} (influences {}, skinClusters {}, divisions {})'.format(
+            result['preset'],rig['influenceCount'],rig['skinClusterCount'],rig['meshDivisions']))
+    print('    {:<22}{:>10}{:>10}{:>8}{:>8}  {}'.format('operation','time','budget','calls','budget','top commands'))
+    for measurement in result['measurements']:
+        budget = measurement.get('budget') or {}
+        timeBudget = '{:.4f}'.format(budget['time'] * timeScale) if 'time' in budget else '-'
+        top = ', '.join('{} {}'.format(name,count) for name,count in list(measurement['commands'].items())[:3])
+        print('    {:<22}{:>10.4f}{:>10}{:>8}{:>8}  {}{}'.format(
+                measurement['operation'],measurement['time'],timeBudget,measurement['calls'],
+                budget.get('calls','-'),top,'  FAILED' if measurement.get('failures') else ''))
+
+def loadBudgets(path,*args,**kwargs):
+    """JSONファイルから上限を読み込み、BUDGETSに上書きした辞書を返す
+
+    Args:
+        path (str): JSONファイルのパス (設定の名前 → 処理の名前 → {time, calls})
+
+    Returns:
+        dict: 上限
+    """
+    with io.open(path,'r',encoding = 'utf-8') as f:
+        overrides = json.load(f)
+    budgets = dict((preset,dict((name,dict(budget)) for name,budget in operations.items()))
+                   for preset,operations in BUDGETS.items())
+    for preset,operations in overrides.items():
+        for name,budget in operations.items():
+            budgets.setdefault(preset,{}).setdefault(name,{}).update(budget)
+    return budgets
+
+def main(argv = None,*args,**kwargs):
+    """コマンドラインから実行する
+
+    Args:
+        argv (list): 引数。Noneの場合はsys.argv
+
+    Returns:
+        int: 上限を超えた項目がない場合は0、ある場合は1
+    """
+    parser = argparse.ArgumentParser(description = 'CustomWeightPainter headless benchmark suite')
+    parser.add_argument('--preset',action = 'append',choices = list(RIG_PRESETS),
+                        help = '計測するリグの設定 (複数指定可、省略時は全て)')
+    parser.add_argument('--budgets',help = '上限を上書きするJSONファイル')
+    parser.add_argument('--time-scale',type = float,default = 1.0,help = '処理時間の上限に掛ける倍率')
+    parser.add_argument('--json',help = '結果を書き出すJSONファイル')
+    options = parser.parse_args(argv)
+
+    budgets = loadBudgets(options.budgets) if options.budgets else None
+    suite = runSuite(options.preset,budgets = budgets,timeScale = options.time_scale)
+    if options.json:
+        with io.open(options.json,'w',encoding = 'utf-8') as f:
+            f.write(json.dumps(suite,indent = 2,ensure_ascii = False))
+    return 1 if suite['failures'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""スライダーのドラッグでインフルエンスを回転させるためのモジュール
+ドラッグ中の回転は上限のレートで間引いてAPIで反映し、
+スライダーを離したときにポーズアクションを1回だけ実行します。
+
+Attributes:
+    * None
+Todo:
+    * None
+"""
+from __future__ import absolute_import, division, generators, print_function
+try:
+    from future_builtins import *
+except:
+    pass
+import sys
+sys.dont_write_bytecode = True
+# ------------------------------------------------------------------------------
+from . import scheduler
+from . import utilityProc
+
+AXES = ('x','y','z')
+
+class DragPoser(object):
+    """ドラッグ中のインフルエンスの回転を管理するクラス
+    ドラッグ中はmaxRateを上限に、最新の値だけをAPIで3軸まとめて反映します。
+    間隔はscheduler.RateLimiterで守り、間に合わなかった途中の値は捨て、
+    最後の値は残りの時間が経った後のアイドル時に反映します。
+    ドラッグ中の反映はundoキューに積まず、終了時に1回のsetAttrで確定するため、
+    ドラッグ全体が1回のundoになります。
+
+    Attributes:
+        maxRate (float): ドラッグ中に回転を反映する最大の頻度[Hz]
+        targetNode (str): 回転させるノード
+        active (bool): ドラッグ中かどうか
+        received (int): 受け付けた値の数
+        applied (int): 実際に反映した回数
+    """
+
+    def __init__(self,maxRate = 30.0,*args,**kwargs):
+        self.maxRate = maxRate
+        self.targetNode = None
+        self.active = False
+        self.received = 0
+        self.applied = 0
+        self._transformFn = None
+        self._startValues = [0.0,0.0,0.0]
+        self._values = [0.0,0.0,0.0]
+        self._limiter = scheduler.RateLimiter(self._apply,interval = 1.0 / maxRate)
+
+    def begin(self,targetNode,*args,**kwargs):
+        """ドラッグを開始する
+        開始時の回転値を記憶します。
+
+        Args:
+            targetNode (str): 回転させるノード
+
+        Returns:
+            None
+        """
+        self.targetNode = targetNode
+        self._transformFn = utilityProc.getTransformFn(targetNode)
+        self._startValues = utilityProc.getRotation(self._transformFn)
+        self._values = list(self._startValues)
+        self._limiter.cancel()
+        self._limiter.interval = 1.0 / self.maxRate
+        self.received = 0
+        self.applied = 0
+        self.active = True
+
+    def update(self,axis,value,*args,**kwargs):
+        """ドラッグ中の値を受け付ける
+        前回の反映から1/maxRate秒経っていればすぐに反映し、
+        経っていなければ残りの時間が経った後の反映を予約します。
+
+        Args:
+            axis (str): 回転軸
+            value (float): 回転値
+
+        Returns:
+            None
+        """
+        if not self.active:
+            return
+        self.received += 1
+        self._values[AXES.index(axis)] = value
+        self._limiter.request()
+
+    def _apply(self,*args,**kwargs):
+        """現在の値をAPIで反映する
+        """
+        if not self.active:
+            return
+        self.applied += 1
+        utilityProc.setRotation(self._transformFn,self._values)
+
+    def end(self,axis,value,actionType = 'hold',preValues = [0.0,0.0,0.0],*args,**kwargs):
+        """ドラッグを終了する
+        ポーズアクションに応じた最終的な値を計算し、一旦開始時の値に戻してから
+        1回のsetAttrで確定します。
+
+        actionType = hold: 離したときの値を保つ
+        actionType = revert: 操作した軸を元の値に戻す
+        actionType = zero: 操作した軸を0にする
+
+        Args:
+            axis (str): 回転軸
+            value (float): 離したときの回転値
+            actionType (str): ポーズアクションの種類
+            preValues (list): ポーズアクションを実行する前の値
+
+        Returns:
+            list: 確定した回転値 [x,y,z]
+        """
+        if not self.active:
+            return None
+        self.active = False
+        self._limiter.cancel()
+
+        axisIndex = AXES.index(axis)
+        values = list(self._values)
+        values[axisIndex] = value
+        if actionType == 'revert':
+            values[axisIndex] = preValues[axisIndex]
+        elif actionType == 'zero':
+            values[axisIndex] = 0.0
+
+        utilityProc.setRotation(self._transformFn,self._startValues)
+        if values != self._startValues:
+            utilityProc.applyRotation(self.targetNode,values)
+        return values
@@ -0,0 +1,452 @@
+# -*- coding: utf-8 -*-
+"""ペイント対象のメッシュ・skinCluster・インフルエンスの対応をキャッシュするモジュール
+ウエイトペイントToolを立ち上げたときに一度だけシーンを調べ、
+以降はシーンのコールバックで変更があった部分だけを更新します。
+
+Attributes:
+    * None
+Todo:
+    * None
+"""
+from __future__ import absolute_import, division, generators, print_function
+try:
+    from future_builtins import *
+except:
+    pass
+import sys
+sys.dont_write_bytecode = True
+# ------------------------------------------------------------------------------
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+from . import scheduler
+
+class InfluenceIndex(object):
+    """ペイント対象のskinClusterとインフルエンスの対応を保持するクラス
+    artAttrSkinPaintCtxのペイント可能ノードから、
+    メッシュ → skinCluster → インフルエンスの対応と、
+    インフルエンス名 ⇔ インデックスの対応を作成して保持します。
+
+    cmdsModuleに偽のmaya.cmdsを渡すと、Mayaを使わずに動作を確認することができます。
+
+    Attributes:
+        toolName (str): ウエイトペイントモードToolの名前
+        meshes (dict): メッシュ名 → skinClusterのリスト
+        skinClusters (dict): skinCluster名 → 情報の辞書
+            (meshes: メッシュのリスト, influences: インフルエンスのリスト,
+             nameToIndex: 名前 → インデックス, indexToName: インデックス → 名前)
+        removeScheduler (scheduler.IdleCoalescer): 削除されたノードをまとめてインデックスに反映するオブジェクト
+    """
+
+    # 現在コールバックを登録しているインデックス
+    _watchingIndex = None
+
+    def __init__(self,cmdsModule = None,*args,**kwargs):
+        self.cmds = cmdsModule or cmds
+        self.toolName = None
+        self.meshes = {}
+        self.skinClusters = {}
+        self._dirty = set()
+        self._callbackIds = []
+        # 削除されたノードのパス (コールバックの中では記録だけして、アイドル時に反映する)
+        self._removed = []
+        self.removeScheduler = scheduler.IdleCoalescer(self._applyRemoved)
+
+    def build(self,toolName = None,*args,**kwargs):
+        """インデックスを作成する
+        ペイント可能なskinClusterを調べ、インデックスを作り直します。
+
+        Args:
+            toolName (str): ウエイトペイントモードToolの名前
+
+        Returns:
+            None
+        """
+        if toolName:
+            self.toolName = toolName
+        self.meshes = {}
+        self.skinClusters = {}
+        self._dirty = set()
+        self._removed = []
+        self.removeScheduler.cancel()
+        if not self.toolName:
+            return
+
+        paintableNodes = self.cmds.artAttrSkinPaintCtx(self.toolName,q = True,pna = True) or ''
+        for token in paintableNodes.split(' '):
+            skinCluster = token.split('.')[0]
+            if not skinCluster or skinCluster in self.skinClusters:
+                continue
+            if not self.cmds.objExists(skinCluster):
+                continue
+            if self.cmds.objectType(skinCluster) != 'skinCluster':
+                continue
+            self._addSkinCluster(skinCluster)
+
+    def _addSkinCluster(self,skinCluster,*args,**kwargs):
+        """skinClusterの情報をシーンから取得して登録する
+
+        Args:
+            skinCluster (str): skinClusterの名前
+
+        Returns:
+            None
+        """
+        influences = self.cmds.skinCluster(skinCluster,q = True,inf = True) or []
+        geometries = self.cmds.skinCluster(skinCluster,q = True,g = True) or []
+        self.skinClusters[skinCluster] = {
+            'meshes':list(geometries),
+            'influences':list(influences),
+            'nameToIndex':dict((name,i) for i,name in enumerate(influences)),
+            'indexToName':dict(enumerate(influences)),
+        }
+        for mesh in geometries:
+            skinClusters = self.meshes.setdefault(mesh,[])
+            if not skinCluster in skinClusters:
+                skinClusters.append(skinCluster)
+
+    def _removeSkinCluster(self,skinCluster,*args,**kwargs):
+        """skinClusterをインデックスから取り除く
+
+        Args:
+            skinCluster (str): skinClusterの名前
+
+        Returns:
+            None
+        """
+        info = self.skinClusters.pop(skinCluster,None)
+        self._dirty.discard(skinCluster)
+        if not info:
+            return
+        for mesh in info['meshes']:
+            skinClusters = self.meshes.get(mesh,[])
+            if skinCluster in skinClusters:
+                skinClusters.remove(skinCluster)
+            if not skinClusters:
+                self.meshes.pop(mesh,None)
+
+    def _update(self,*args,**kwargs):
+        """変更のあったskinClusterだけを作り直す
+        アイドル時の反映を待っている削除されたノードがあれば、先に反映します。
+        """
+        if self._removed:
+            self._applyRemoved()
+        if not self._dirty:
+            return
+        dirty = list(self._dirty)
+        for skinCluster in dirty:
+            self._removeSkinCluster(skinCluster)
+            if self.cmds.objExists(skinCluster):
+                self._addSkinCluster(skinCluster)
+        self._dirty = set()
+
+    # query
+    def paintableSkinClusters(self,*args,**kwargs):
+        """ペイント可能なskinClusterのリストを返す
+
+        Returns:
+            list: skinClusterのリスト
+        """
+        self._update()
+        return list(self.skinClusters.keys())
+
+    def influences(self,skinCluster = None,*args,**kwargs):
+        """インフルエンスのリストを返す
+        skinClusterを指定しない場合は、全skinClusterのインフルエンスを重複なしで返します。
+
+        Args:
+            skinCluster (str): skinClusterの名前
+
+        Returns:
+            list: インフルエンスのリスト
+        """
+        self._update()
+        if skinCluster:
+            info = self.skinClusters.get(skinCluster)
+            return list(info['influences']) if info else []
+
+        result = []
+        found = set()
+        for info in self.skinClusters.values():
+            for influence in info['influences']:
+                if influence in found:
+                    continue
+                found.add(influence)
+                result.append(influence)
+        return result
+
+    def hasInfluence(self,influence,*args,**kwargs):
+        """ペイント対象のインフルエンスかどうかを判定する
+
+        Args:
+            influence (str): インフルエンスの名前
+
+        Returns:
+            bool: ペイント対象のインフルエンスの場合はTrue
+        """
+        self._update()
+        for info in self.skinClusters.values():
+            if influence in info['nameToIndex']:
+                return True
+        return False
+
+    def influenceIndex(self,skinCluster,influence,*args,**kwargs):
+        """インフルエンスのインデックスを返す
+
+        Args:
+            skinCluster (str): skinClusterの名前
+            influence (str): インフルエンスの名前
+
+        Returns:
+            int: インフルエンスのインデックス。見つからない場合はNone
+        """
+        self._update()
+        info = self.skinClusters.get(skinCluster)
+        if not info:
+            return None
+        return info['nameToIndex'].get(influence)
+
+    def influenceName(self,skinCluster,index,*args,**kwargs):
+        """インデックスからインフルエンスの名前を返す
+
+        Args:
+            skinCluster (str): skinClusterの名前
+            index (int): インフルエンスのインデックス
+
+        Returns:
+            str: インフルエンスの名前。見つからない場合はNone
+        """
+        self._update()
+        info = self.skinClusters.get(skinCluster)
+        if not info:
+            return None
+        return info['indexToName'].get(index)
+
+    def skinClustersOfInfluence(self,influence,*args,**kwargs):
+        """インフルエンスを使っているskinClusterのリストを返す
+
+        Args:
+            influence (str): インフルエンスの名前
+
+        Returns:
+            list: skinClusterのリスト
+        """
+        self._update()
+        return [skinCluster for skinCluster,info in self.skinClusters.items()
+                if influence in info['nameToIndex']]
+
+    # update
+    def invalidate(self,skinCluster = None,*args,**kwargs):
+        """インデックスを無効にする
+        skinClusterを指定した場合は、そのskinClusterだけを次回参照時に作り直します。
+        指定しない場合はインデックス全体を作り直します。
+
+        Args:
+            skinCluster (str): skinClusterの名前
+
+        Returns:
+            None
+        """
+        if skinCluster is None:
+            self.build()
+        elif skinCluster in self.skinClusters:
+            self._dirty.add(skinCluster)
+
+    def _indexedNames(self,*args,**kwargs):
+        """インデックスに登録されている全ての名前を返す
+        """
+        names = set(self.skinClusters)
+        names.update(self.meshes)
+        for info in self.skinClusters.values():
+            names.update(info['nameToIndex'])
+        return names
+
+    def resolveName(self,fullPath,*args,**kwargs):
+        """DAGノードのフルパスから、インデックスに登録されている名前を探す
+        インデックスの名前はペイントコンテキストが返す最短のパス(partialPathName)なので、
+        フルパスの末尾と一致する名前を探します。
+
+        Args:
+            fullPath (str): DAGノードのフルパス
+
+        Returns:
+            str: インデックスに登録されている名前。見つからない場合はNone
+        """
+        for name in self._indexedNames():
+            if fullPath == name or fullPath.endswith('|' + name.lstrip('|')):
+                return name
+        return None
+
+    def rename(self,oldName,newName,*args,**kwargs):
+        """ノードのリネームをインデックスに反映する
+        oldNameにフルパス('|'で始まる名前)を渡した場合は、インデックスに登録されている
+        partialPathNameに解決してから反映します。
+        名前が一意でない(パスで登録されている)ノードが関わる場合は、
+        同じ名前の他のノードのpartialPathNameも変わりうるので、そのノードを使っている
+        skinClusterを次回参照時に作り直します。
+
+        Args:
+            oldName (str): 変更前の名前 (partialPathName、またはフルパス)
+            newName (str): 変更後の名前 (partialPathName)
+
+        Returns:
+            None
+        """
+        shortName = oldName.rpartition('|')[2]
+        if oldName.startswith('|'):
+            resolved = self.resolveName(oldName)
+            if resolved is None:
+                # 親がリネームされた子のパスなど、登録されている名前が変わったノードを作り直す
+                self._invalidateNamesContaining(shortName)
+                return
+            oldName = resolved
+        if oldName == newName:
+            return
+        if '|' in oldName or '|' in newName:
+            self._invalidateNamesContaining(shortName)
+            self._invalidateNamesContaining(newName.rpartition('|')[2])
+        if oldName in self.skinClusters:
+            self.skinClusters[newName] = self.skinClusters.pop(oldName)
+            if oldName in self._dirty:
+                self._dirty.discard(oldName)
+                self._dirty.add(newName)
+            for skinClusters in self.meshes.values():
+                if oldName in skinClusters:
+                    skinClusters[skinClusters.index(oldName)] = newName
+
+        if oldName in self.meshes:
+            self.meshes[newName] = self.meshes.pop(oldName)
+            for info in self.skinClusters.values():
+                if oldName in info['meshes']:
+                    info['meshes'][info['meshes'].index(oldName)] = newName
+
+        for info in self.skinClusters.values():
+            index = info['nameToIndex'].pop(oldName,None)
+            if index is None:
+                continue
+            info['nameToIndex'][newName] = index
+            info['indexToName'][index] = newName
+            info['influences'][index] = newName
+
+    def _invalidateNamesContaining(self,shortName,*args,**kwargs):
+        """パスの要素にshortNameを含む名前を使っているskinClusterを無効にする
+
+        Args:
+            shortName (str): ノードの短い名前
+
+        Returns:
+            None
+        """
+        for skinCluster,info in self.skinClusters.items():
+            names = [skinCluster] + info['meshes'] + info['influences']
+            if any(shortName in name.split('|') for name in names):
+                self._dirty.add(skinCluster)
+
+    def remove(self,nodeName,*args,**kwargs):
+        """ノードの削除をインデックスに反映する
+        インデックスを作り直さず、cmdsも呼び出しません。影響するskinClusterは次回参照時に作り直します。
+
+        Args:
+            nodeName (str): 削除されたノードの名前 (partialPathName)
+
+        Returns:
+            None
+        """
+        if nodeName in self.skinClusters:
+            self._removeSkinCluster(nodeName)
+            return
+        if nodeName in self.meshes:
+            for skinCluster in list(self.meshes[nodeName]):
+                self._dirty.add(skinCluster)
+            return
+        for skinCluster,info in self.skinClusters.items():
+            if nodeName in info['nameToIndex']:
+                self._dirty.add(skinCluster)
+
+    def _applyRemoved(self,*args,**kwargs):
+        """記録しておいた削除されたノードをインデックスに反映する
+        DAGノードのフルパスは、インデックスに登録されているpartialPathNameに解決してから反映します。
+
+        Returns:
+            None
+        """
+        removed = self._removed
+        self._removed = []
+        for path in removed:
+            name = self.resolveName(path) if path.startswith('|') else path
+            if name is not None:
+                self.remove(name)
+
+    # scene callbacks
+    def startWatching(self,*args,**kwargs):
+        """シーンのコールバックを登録する
+        インフルエンスの追加・削除、リネーム、ノードの削除を監視します。
+        別のインデックスがコールバックを登録していた場合は、そちらを解除します。
+
+        Returns:
+            None
+        """
+        watching = InfluenceIndex._watchingIndex
+        if watching is not None and watching is not self:
+            watching.stopWatching()
+        self.stopWatching()
+
+        self._callbackIds = [
+            om.MDGMessage.addConnectionCallback(self._connectionCallback),
+            om.MDGMessage.addNodeRemovedCallback(self._nodeRemovedCallback,'dependNode'),
+            om.MNodeMessage.addNameChangedCallback(om.MObject(),self._nameChangedCallback),
+        ]
+        InfluenceIndex._watchingIndex = self
+
+    def stopWatching(self,*args,**kwargs):
+        """シーンのコールバックを解除する
+
+        Returns:
+            None
+        """
+        if self._callbackIds:
+            om.MMessage.removeCallbacks(self._callbackIds)
+        self._callbackIds = []
+        # 記録済みの削除は、次回参照時に反映する
+        self.removeScheduler.cancel()
+        if InfluenceIndex._watchingIndex is self:
+            InfluenceIndex._watchingIndex = None
+
+    def _connectionCallback(self,srcPlug,dstPlug,made,*args):
+        """接続変更のコールバック
+        skinClusterのmatrixアトリビュートの接続が変わった場合
+        (addInfluence/removeInfluence)、そのskinClusterを無効にします。
+        """
+        if not dstPlug.node().hasFn(om.MFn.kSkinClusterFilter):
+            return
+        if dstPlug.partialName(useLongNames = True).split('[')[0] != 'matrix':
+            return
+        self.invalidate(om.MFnDependencyNode(dstPlug.node()).name())
+
+    def _nodeRemovedCallback(self,node,*args):
+        """ノード削除のコールバック
+        削除中やundo中はシーンを問い合わせられないので、ノードのパスを記録するだけにして、
+        インデックスへの反映はアイドル時にまとめて行います。
+        DAGノードは短い名前では一意に決まらないので、フルパスを記録します。
+        """
+        if node.hasFn(om.MFn.kDagNode):
+            path = om.MFnDagNode(node).fullPathName()
+        else:
+            path = om.MFnDependencyNode(node).name()
+        if path:
+            self._removed.append(path)
+            self.removeScheduler.request()
+
+    def _nameChangedCallback(self,node,prevName,*args):
+        """リネームのコールバック
+        コールバックには短い名前が渡されるので、DAGノードの場合は変更前のフルパスを組み立て、
+        変更後の名前はインデックスと同じpartialPathNameにします。
+        """
+        if not prevName:
+            return
+        if not node.hasFn(om.MFn.kDagNode):
+            self.rename(prevName,om.MFnDependencyNode(node).name())
+            return
+        dagFn = om.MFnDagNode(node)
+        parentPath = dagFn.fullPathName().rpartition('|')[0]
+        self.rename('{}|{}'.format(parentPath,prevName),dagFn.partialPathName())
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""リニアブレンドスキニング(LBS)をNumPyで計算するモジュール
+バインド時の頂点座標・バインドプレ行列・ジョイントのワールド行列・ウエイトから、
+skinClusterと同じ変形後の頂点座標を求めます。
+ウエイトを変更したときに変形がどれだけ変わるかを、Mayaを使わずに調べるために使います。
+Mayaに依存しないので、Maya外からも読み込むことができます。
+
+行列はMayaと同じ行ベクトルの形式(4 x 4、平行移動は4行目)です。
+変形後の座標は、頂点ごとに sum(w_j * p * bindPreMatrix_j * worldMatrix_j) です。
+
+Attributes:
+    * None
+Todo:
+    * None
+"""
+from __future__ import absolute_import, division, generators, print_function
+try:
+    from future_builtins import *
+except:
+    pass
+import sys
+sys.dont_write_bytecode = True
+# ------------------------------------------------------------------------------
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    import scipy.sparse as sparse
+except ImportError:
+    sparse = None
+
+from . import weightMath
+
+# 分割して計算するときの、一度に処理する頂点数
+DEFAULT_CHUNK_SIZE = 65536
+
+def skinMatrices(bindPreMatrices,worldMatrices,*args,**kwargs):
+    """インフルエンスごとのスキニング行列を求める
+    bindPreMatrix * worldMatrixの、平行移動を含む4 x 3の部分を1行12要素に並べます。
+
+    Args:
+        bindPreMatrices (numpy.ndarray): バインドプレ行列 (インフルエンス数 x 4 x 4)
+        worldMatrices (numpy.ndarray): ジョイントのワールド行列 (インフルエンス数 x 4 x 4)
+                                       または、複数のポーズの行列 (ポーズ数 x インフルエンス数 x 4 x 4)
+
+    Returns:
+        numpy.ndarray: スキニング行列 (インフルエンス数 x 12)。
+                       複数のポーズの場合はポーズごとに列を並べた (インフルエンス数 x ポーズ数 * 12)
+    """
+    bindPreMatrices = np.asarray(bindPreMatrices,dtype = np.float64).reshape(-1,4,4)
+    worldMatrices = np.asarray(worldMatrices,dtype = np.float64)
+    poses = worldMatrices.reshape(-1,bindPreMatrices.shape[0],4,4)
+    if len(bindPreMatrices) != poses.shape[1]:
+        raise ValueError('バインドプレ行列とワールド行列の数が一致しません: {} != {}'.format(
+                         len(bindPreMatrices),poses.shape[1]))
+    matrices = np.matmul(bindPreMatrices[None],poses)[:,:,:,:3]
+    # (ポーズ数 x インフルエンス数 x 12) → (インフルエンス数 x ポーズ数 * 12)
+    return np.ascontiguousarray(matrices.reshape(len(poses),-1,12).transpose(1,0,2).reshape(-1,len(poses) * 12))
+
+def _isSparse(weights,*args,**kwargs):
+    """疎行列のウエイトかどうかを判定する
+    """
+    return isinstance(weights,weightMath.CsrMatrix) or (sparse is not None and sparse.issparse(weights))
+
+def _blend(weights,matrices,start,end,*args,**kwargs):
+    """指定の範囲の頂点のスキニング行列をウエイトで混ぜる
+
+    Args:
+        weights (numpy.ndarray, scipy.sparse.csr_matrix or weightMath.CsrMatrix): ウエイト (頂点数 x インフルエンス数)
+        matrices (numpy.ndarray): スキニング行列 (skinMatrices)
+        start (int): 開始の頂点番号
+        end (int): 終了の頂点番号 (含まない)
+
+    Returns:
+        numpy.ndarray: 頂点ごとのスキニング行列 (頂点数 x 列数)
+    """
+    if weights.shape[1] != matrices.shape[0]:
+        raise ValueError('ウエイトとスキニング行列のインフルエンス数が一致しません: {} != {}'.format(
+                         weights.shape[1],matrices.shape[0]))
+    whole = start == 0 and end == weights.shape[0]
+    if isinstance(weights,weightMath.CsrMatrix):
+        block = weights if whole else weights.getRows(np.arange(start,end))
+        return block.dot(matrices)
+    if sparse is not None and sparse.issparse(weights):
+        block = weights if whole else weights[start:end]
+        return np.asarray(block.dot(matrices))
+    return np.dot(np.asarray(weights[start:end],dtype = np.float64),matrices)
+
+def _transform(points,blended,out,*args,**kwargs):
+    """頂点ごとのスキニング行列で頂点座標を変換する
+
+    Args:
+        points (numpy.ndarray): 頂点座標 (頂点数 x 3)
+        blended (numpy.ndarray): 頂点ごとのスキニング行列 (頂点数 x 12)
+        out (numpy.ndarray): 結果を書き込む配列 (頂点数 x 3)
+
+    Returns:
+        numpy.ndarray: out
+    """
+    np.einsum('ni,nij->nj',points,blended[:,:9].reshape(-1,3,3),out = out)
+    out += blended[:,9:]
+    return out
+
+def deformPoints(points,bindPreMatrices,worldMatrices,weights,out = None,*args,**kwargs):
+    """頂点座標をLBSで変形する
+    全頂点をまとめて計算するので、頂点数 x 12の作業用の配列を使います。
+    メモリを抑える場合はdeformPointsChunkedを使ってください。
+
+    Args:
+        points (numpy.ndarray): バインド時の頂点座標 (頂点数 x 3)
+        bindPreMatrices (numpy.ndarray): バインドプレ行列 (インフルエンス数 x 4 x 4)
+        worldMatrices (numpy.ndarray): ジョイントのワールド行列 (インフルエンス数 x 4 x 4)
+        weights (numpy.ndarray, scipy.sparse.csr_matrix or weightMath.CsrMatrix): ウエイト (頂点数 x インフルエンス数)
+        out (numpy.ndarray): 結果を書き込む配列 (頂点数 x 3)。Noneの場合は作成する
+
+    Returns:
+        numpy.ndarray: 変形後の頂点座標 (頂点数 x 3)
+    """
+    return deformPointsChunked(points,bindPreMatrices,worldMatrices,weights,
+                               chunkSize = max(len(points),1),out = out)
+
+def deformPointsChunked(points,bindPreMatrices,worldMatrices,weights,chunkSize = DEFAULT_CHUNK_SIZE,out = None,*args,**kwargs):
+    """頂点座標をLBSで変形する。頂点を分割して計算する
+    作業用の配列はchunkSize x 12に収まるので、頂点数によらずメモリを抑えられます。
+    outにnumpy.memmapを渡せば、結果もメモリに置かずに書き出せます。
+
+    Args:
+        points (numpy.ndarray): バインド時の頂点座標 (頂点数 x 3)
+        bindPreMatrices (numpy.ndarray): バインドプレ行列 (インフルエンス数 x 4 x 4)
+        worldMatrices (numpy.ndarray): ジョイントのワールド行列 (インフルエンス数 x 4 x 4)
+        weights (numpy.ndarray, scipy.sparse.csr_matrix or weightMath.CsrMatrix): ウエイト (頂点数 x インフルエンス数)
+        chunkSize (int): 一度に処理する頂点数
+        out (numpy.ndarray): 結果を書き込む配列 (頂点数 x 3)。Noneの場合は作成する
+
+    Returns:
+        numpy.ndarray: 変形後の頂点座標 (頂点数 x 3)
+    """
+    matrices = skinMatrices(bindPreMatrices,worldMatrices)
+    if matrices.shape[1] != 12:
+        raise ValueError('ワールド行列は1つのポーズだけを指定してください')
+    vertexCount = len(points)
+    if out is None:
+        out = np.empty((vertexCount,3),dtype = np.float64)
+    chunkSize = max(int(chunkSize),1)
+    for start in range(0,vertexCount,chunkSize):
+        end = min(start + chunkSize,vertexCount)
+        block = np.asarray(points[start:end],dtype = np.float64)
+        if out.dtype == np.float64:
+            _transform(block,_blend(weights,matrices,start,end),out[start:end])
+        else:
+            out[start:end] = _transform(block,_blend(weights,matrices,start,end),np.empty((end - start,3)))
+    return out
+
+def weightError(points,bindPreMatrices,worldMatrices,weights,otherWeights,chunkSize = DEFAULT_CHUNK_SIZE,*args,**kwargs):
+    """2つのウエイトで変形したときの、頂点ごとの位置の差を求める
+    LBSはウエイトについて線形なので、混ぜたスキニング行列の差で頂点座標を変換して差を求めます。
+    複数のポーズを指定した場合は、ポーズごとの差の最大値を返します。
+    刈り込みの前後など、ウエイトの変更が変形に与える影響を調べるのに使います。
+
+    Args:
+        points (numpy.ndarray): バインド時の頂点座標 (頂点数 x 3)
+        bindPreMatrices (numpy.ndarray): バインドプレ行列 (インフルエンス数 x 4 x 4)
+        worldMatrices (numpy.ndarray): ジョイントのワールド行列 (インフルエンス数 x 4 x 4)
+                                       または (ポーズ数 x インフルエンス数 x 4 x 4)
+        weights (numpy.ndarray, scipy.sparse.csr_matrix or weightMath.CsrMatrix): 基準のウエイト
+        otherWeights (numpy.ndarray, scipy.sparse.csr_matrix or weightMath.CsrMatrix): 比べるウエイト
+        chunkSize (int): 一度に処理する頂点数
+
+    Returns:
+        numpy.ndarray: 頂点ごとの位置の差の距離 (頂点数)
+    """
+    if weights.shape != otherWeights.shape:
+        raise ValueError('ウエイトの形が一致しません: {} != {}'.format(weights.shape,otherWeights.shape))
+    matrices = skinMatrices(bindPreMatrices,worldMatrices)
+    poseCount = matrices.shape[1] // 12
+    vertexCount = len(points)
+    distances = np.zeros(vertexCount,dtype = np.float64)
+    chunkSize = max(int(chunkSize),1)
+    for start in range(0,vertexCount,chunkSize):
+        end = min(start + chunkSize,vertexCount)
+        block = np.asarray(points[start:end],dtype = np.float64)
+        delta = _blend(weights,matrices,start,end)
+        delta -= _blend(otherWeights,matrices,start,end)
+        offset = np.empty((end - start,3),dtype = np.float64)
+        for pose in range(poseCount):
+            _transform(block,delta[:,pose * 12:(pose + 1) * 12],offset)
+            np.maximum(distances[start:end],np.sqrt(np.einsum('ij,ij->i',offset,offset)),out = distances[start:end])
+    return distances
+
+def errorStats(distances,tolerance = 0.001,*args,**kwargs):
+    """頂点ごとの位置の差の統計を求める
+
+    Args:
+        distances (numpy.ndarray): 頂点ごとの位置の差の距離 (weightError)
+        tolerance (float): この距離を超える頂点を数える
+
+    Returns:
+        dict: 統計 (vertices: 頂点数, max: 最大値, maxVertex: 最大値の頂点番号, mean: 平均値,
+              rms: 二乗平均平方根, overTolerance: toleranceを超える頂点数)
+    """
+    distances = np.asarray(distances,dtype = np.float64)
+    if not len(distances):
+        return {'vertices':0,'max':0.0,'maxVertex':-1,'mean':0.0,'rms':0.0,'overTolerance':0}
+    maxVertex = int(np.argmax(distances))
+    return {'vertices':len(distances),
+            'max':float(distances[maxVertex]),
+            'maxVertex':maxVertex,
+            'mean':float(distances.mean()),
+            'rms':float(np.sqrt(np.dot(distances,distances) / len(distances))),
+            'overTolerance':int(np.count_nonzero(distances > tolerance))}
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""inflenceLockにキーが振られているインフルエンスを監視するモジュール
+Tool起動時に一度だけ全インフルエンスを調べ、以降は接続変更のコールバックで
+変化があったインフルエンスだけを更新します。
+
+Attributes:
+    * None
+Todo:
+    * None
+"""
+from __future__ import absolute_import, division, generators, print_function
+try:
+    from future_builtins import *
+except:
+    pass
+import sys
+sys.dont_write_bytecode = True
+# ------------------------------------------------------------------------------
+import maya.cmds as cmds
+import maya.mel as mel
+import maya.api.OpenMaya as om
+
+from . import scheduler
+from . import utilityProc
+
+class KeyedLockDetector(object):
+    """inflenceLock(liw)にキーが振られているインフルエンスを保持するクラス
+    インフルエンスリストの南京錠ボタンの色を、キーが振られている場合は赤に、
+    それ以外の場合は通常の色にします。
+
+    Attributes:
+        index (influenceIndex.InfluenceIndex): ペイント対象のインフルエンスのインデックス
+        keyed (set): liwにキーが振られているインフルエンス
+        refreshScheduler (scheduler.IdleCoalescer): 接続変更による表示の更新をまとめて処理するオブジェクト
+        keyedColor (tuple): キーが振られている場合の南京錠ボタンの色
+        defaultColor (tuple): 通常の南京錠ボタンの色
+    """
+
+    keyedColor = (0.9,0.2,0.2)
+    defaultColor = (0.27,0.27,0.27)
+
+    # 現在コールバックを登録している検出器
+    _watchingDetector = None
+
+    def __init__(self,index,*args,**kwargs):
+        self.index = index
+        self.keyed = set()
+        self.refreshScheduler = scheduler.IdleCoalescer(self._refreshChangedRows)
+        self._changed = set()
+        self._callbackIds = []
+
+    def build(self,*args,**kwargs):
+        """全インフルエンスを調べなおす
+        liwの接続をAPIで一括して調べ、インフルエンスリストの表示を更新します。
+
+        Returns:
+            None
+        """
+        previous = self.keyed
+        keyed,locked = utilityProc.findInflenceLockTargets(self.index.influences())
+        self.keyed = set(keyed)
+        self.refreshRows(previous | self.keyed)
+
+    def refreshRows(self,influences,*args,**kwargs):
+        """指定のインフルエンスの南京錠ボタンの色を更新する
+
+        Args:
+            influences (list): 更新するインフルエンス
+
+        Returns:
+            None
+        """
+        if not influences:
+            return
+        infListUi = mel.eval('$temp=$gArtSkinInfluencesList;')
+        if not infListUi or not cmds.treeView(infListUi,q = True,ex = True):
+            return
+        for influence in influences:
+            if not cmds.treeView(infListUi,q = True,iex = influence):
+                continue
+            color = self.keyedColor if influence in self.keyed else self.defaultColor
+            cmds.treeView(infListUi,e = True,btc = (influence,1) + tuple(color))
+
+    def _refreshChangedRows(self,*args,**kwargs):
+        """接続変更のあったインフルエンスの南京錠ボタンの色をまとめて更新する
+
+        Returns:
+            None
+        """
+        changed = self._changed
+        self._changed = set()
+        self.refreshRows(changed)
+
+    # scene callbacks
+    def startWatching(self,*args,**kwargs):
+        """接続変更とリネームのコールバックを登録する
+        別の検出器がコールバックを登録していた場合は、そちらを解除します。
+
+        Returns:
+            None
+        """
+        watching = KeyedLockDetector._watchingDetector
+        if watching is not None and watching is not self:
+            watching.stopWatching()
+        self.stopWatching()
+
+        self._callbackIds = [
+            om.MDGMessage.addConnectionCallback(self._connectionCallback),
+            om.MNodeMessage.addNameChangedCallback(om.MObject(),self._nameChangedCallback),
+        ]
+        KeyedLockDetector._watchingDetector = self
+
+    def stopWatching(self,*args,**kwargs):
+        """コールバックを解除する
+
+        Returns:
+            None
+        """
+        if self._callbackIds:
+            om.MMessage.removeCallbacks(self._callbackIds)
+        self._callbackIds = []
+        if KeyedLockDetector._watchingDetector is self:
+            KeyedLockDetector._watchingDetector = None
+
+    def _connectionCallback(self,srcPlug,dstPlug,made,*args):
+        """接続変更のコールバック
+        インフルエンスのliwにアニメーションカーブが接続・切断された場合に更新します。
+        """
+        if dstPlug.partialName(useLongNames = True) != 'lockInfluenceWeights':
+            return
+        influence = om.MFnDependencyNode(dstPlug.node()).name()
+        if not self.index.hasInfluence(influence):
+            return
+
+        if made and srcPlug.node().hasFn(om.MFn.kAnimCurve):
+            self.keyed.add(influence)
+        elif not made:
+            self.keyed.discard(influence)
+        else:
+            return
+        # コールバック中はUIを編集せず、まとめてアイドル時に更新する
+        self._changed.add(influence)
+        self.refreshScheduler.request()
+
+    def _nameChangedCallback(self,node,prevName,*args):
+        """リネームのコールバック
+        """
+        if not prevName in self.keyed:
+            return
+        self.keyed.discard(prevName)
+        self.keyed.add(om.MFnDependencyNode(node).name())
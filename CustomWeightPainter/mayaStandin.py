@@ -0,0 +1,2788 @@
+# -*- coding: utf-8 -*-
+"""Mayaを使わずにToolを動かすための、maya.cmds / maya.mel / maya.api.OpenMayaの代用品
+Toolが使っている範囲だけを、Pythonのプロセス内のシーンモデルで置き換えます。
+install()でsys.modulesにmaya以下のモジュールとして登録するので、
+その後に読み込んだToolのモジュールは、Mayaなしでそのまま動きます。
+
+createSyntheticRig()で、インフルエンス数・skinCluster数・liwのキーを指定して
+合成したリグを作成できます。cmdsとmelの呼び出し回数はgetCallCounts()で取得できます。
+
+代用品の前提:
+    * ノード名とUIの名前はシーン内で一意として扱います
+    * デフォーマーは評価しないので、skinClusterの入力メッシュと出力メッシュは同じ形状です
+    * evalDeferredで予約した処理は、flushIdle()を呼び出すまで実行しません
+    * file -open / -saveのシーンファイルは、ノードと接続をpickleで保存したもので、Mayaでは開けません
+    * コールバックの中で起きた例外は、握りつぶさずに呼び出し元に伝えます
+    * undoキューに積むのは、cmds.setAttr・cmds.cutKey・プラグインのコマンドだけです。
+      Mayaと同じく、MDGModifierのdoItだけでは積みません
+    * file -saveでは、doNotWriteのノードとその子孫、それらとの接続を保存しません
+    * シーンの変更フラグ(file -q -modified)は、ノードの作成・削除・名前の変更・アトリビュートの設定・
+      接続の変更で立ち、file -new / -open / -saveで下ります
+
+Attributes:
+    * None
+Todo:
+    * 行列はXYZの回転順だけに対応し、回転軸・ピボット・segmentScaleCompensateは扱いません
+"""
+from __future__ import absolute_import, division, generators, print_function
+try:
+    from future_builtins import *
+except:
+    pass
+import sys
+sys.dont_write_bytecode = True
+# ------------------------------------------------------------------------------
+import math
+import os
+import pickle
+import re
+import time
+import types
+from array import array
+from collections import Counter, OrderedDict
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 代用品として登録するモジュールの名前
+MODULE_NAMES = ('maya','maya.cmds','maya.mel','maya.api','maya.api.OpenMaya',
+                'maya.api.OpenMayaAnim','maya.api.OpenMayaUI','maya.common','maya.common.ui')
+
+# ウエイトペイントモードToolのコンテキストと、toolPropertyWindowのUIの名前
+PAINT_CONTEXT = 'artAttrSkinContext'
+TOOL_SETTINGS_LAYOUT = 'MainToolSettingsLayout'
+INFLUENCE_LIST = 'theSkinClusterInflList'
+
+# アクティブなビューの大きさ[ピクセル]と、ビューに映るワールドの横幅
+# ビューはY軸の上から見下ろす平行投影で、画面の上が-Z方向です
+VIEW_PORT_SIZE = (640,480)
+VIEW_WORLD_WIDTH = 24.0
+
+# アトリビュートの短い名前 → 長い名前
+ATTR_ALIASES = {
+    'liw':'lockInfluenceWeights',
+    'rx':'rotateX','ry':'rotateY','rz':'rotateZ',
+    'tx':'translateX','ty':'translateY','tz':'translateZ',
+    'sx':'scaleX','sy':'scaleY','sz':'scaleZ',
+    'jox':'jointOrientX','joy':'jointOrientY','joz':'jointOrientZ',
+    'v':'visibility',
+}
+# まとめて指定できるアトリビュート → 要素のアトリビュート
+COMPOUND_ATTRS = {
+    'r':('rotateX','rotateY','rotateZ'),'rotate':('rotateX','rotateY','rotateZ'),
+    't':('translateX','translateY','translateZ'),'translate':('translateX','translateY','translateZ'),
+    's':('scaleX','scaleY','scaleZ'),'scale':('scaleX','scaleY','scaleZ'),
+    'jo':('jointOrientX','jointOrientY','jointOrientZ'),
+    'jointOrient':('jointOrientX','jointOrientY','jointOrientZ'),
+}
+# cmdsでは度、内部ではラジアンで扱うアトリビュート
+ANGLE_ATTRS = frozenset(('rotateX','rotateY','rotateZ','jointOrientX','jointOrientY','jointOrientZ'))
+
+TRANSFORM_ATTRS = dict([('rotateX',0.0),('rotateY',0.0),('rotateZ',0.0),
+                        ('translateX',0.0),('translateY',0.0),('translateZ',0.0),
+                        ('scaleX',1.0),('scaleY',1.0),('scaleZ',1.0),
+                        ('visibility',True)])
+SHAPE_ATTRS = dict([('visibility',True),('intermediateObject',False)])
+JOINT_ATTRS = dict(TRANSFORM_ATTRS,jointOrientX = 0.0,jointOrientY = 0.0,jointOrientZ = 0.0,
+                   lockInfluenceWeights = False)
+
+# シーンファイルの形式のバージョン
+SCENE_FILE_VERSION = 1
+
+# cmdsとmelの呼び出し回数
+_callCounts = Counter()
+# 読み込んだプラグインのパス → モジュール
+_plugins = OrderedDict()
+# 現在のシーン
+_scene = None
+_installed = False
+
+def _longAttr(attr,*args,**kwargs):
+    """アトリビュートの長い名前を返す
+    """
+    return ATTR_ALIASES.get(attr,attr)
+
+# ------------------------------------------------------------------------------
+# scene model
+class Node(object):
+    """シーンのノード
+
+    Attributes:
+        name (str): ノード名
+        nodeType (str): ノードタイプ
+        parent (Node): 親のノード。DAGノードでない、またはワールド直下の場合はNone
+        children (list): 子のノードのリスト
+        attrs (dict): アトリビュートの値 (長い名前 → 値)
+        data (dict): メッシュやskinClusterのデータ
+        doNotWrite (bool): Trueの場合、シーンファイルに保存しない
+    """
+
+    doNotWrite = False
+
+    def __init__(self,name,nodeType,parent = None,*args,**kwargs):
+        self.name = name
+        self.nodeType = nodeType
+        self.parent = parent
+        self.children = []
+        self.attrs = {}
+        self.data = {}
+
+    def __repr__(self):
+        return 'Node({!r}, {!r})'.format(self.name,self.nodeType)
+
+    @property
+    def isDag(self):
+        return self.nodeType in DAG_TYPES
+
+class Scene(object):
+    """代用品のシーン
+    ノード・接続・コールバック・アイドル時の処理の予約・UIをまとめて保持します。
+
+    Attributes:
+        nodes (OrderedDict): ノード名 → Node
+        connections (dict): (接続先のNode, アトリビュート) → (接続元のNode, アトリビュート)
+        selection (list): 選択しているオブジェクト・コンポーネントの名前
+        currentTime (float): 現在のフレーム
+        autoKey (bool): オートキーの状態
+        undoDepth (int): 開いているundoチャンクの数
+        undoQueue (list): undoできる操作のリスト。1つの操作は(undo, redo)の関数の組のリスト
+        redoQueue (list): redoできる操作のリスト
+        paintContext (dict): ウエイトペイントモードToolの状態
+                             (influence: 選択しているインフルエンス, paintable: ペイント対象のskinClusterのリスト)
+        ui (UiRegistry): UI
+        contexts (dict): draggerContextの名前 → フラグ
+        currentContext (str): 現在のツールのコンテキスト
+        sceneName (str): シーンファイルのパス。新規シーンの場合は空文字
+        modified (bool): 保存してからシーンを変更したかどうか
+        log (list): MGlobalで表示したメッセージ ((種類, メッセージ)のリスト)
+        verbose (bool): Trueの場合、MGlobalのメッセージを表示する
+    """
+
+    def __init__(self,*args,**kwargs):
+        self.ui = UiRegistry()
+        self.log = []
+        self.verbose = False
+        self._callbacks = OrderedDict()
+        self._nextCallbackId = 1
+        self._deferred = []
+        self.scriptJobs = {}
+        self.contexts = {}
+        self.currentContext = 'selectSuperContext'
+        self.clear()
+
+    def clear(self,*args,**kwargs):
+        """ノードを全て削除する (file -newに相当)
+        コールバックとUIは残します。
+        """
+        self.nodes = OrderedDict()
+        self.connections = {}
+        # ノード → そのノードが関わる接続の接続先のセット
+        self._nodeConnections = {}
+        self.selection = []
+        self.currentTime = 1.0
+        self.autoKey = False
+        self.undoDepth = 0
+        self.undoQueue = []
+        self.redoQueue = []
+        self._undoChunk = None
+        self.paintContext = {'influence':None,'paintable':[]}
+        self._nameCounters = Counter()
+        self.sceneName = ''
+        self.createNode('shadingEngine',name = 'initialShadingGroup')
+        self.modified = False
+
+    # file
+    def save(self,path,*args,**kwargs):
+        """ノードと接続をシーンファイルに保存する (file -saveに相当)
+        doNotWriteのノードとその子孫は、ノードの一覧・接続・親の子のリストから取り除いて保存します。
+
+        Args:
+            path (str): シーンファイルのパス
+
+        Returns:
+            None
+        """
+        excluded = set(node for node in self.nodes.values() if not self.isWritable(node))
+        state = {'version':SCENE_FILE_VERSION,
+                 'nodes':OrderedDict((name,node) for name,node in self.nodes.items() if not node in excluded),
+                 'connections':dict((dst,src) for dst,src in self.connections.items()
+                                    if not dst[0] in excluded and not src[0] in excluded),
+                 'currentTime':self.currentTime,
+                 'paintable':self.paintContext['paintable'],
+                 'nameCounters':self._nameCounters}
+        with open(path,'wb') as f:
+            _ScenePickler(f,excluded).dump(state)
+        self.sceneName = path
+        self.modified = False
+
+    def isWritable(self,node,*args,**kwargs):
+        """ノードをシーンファイルに保存するかどうかを判定する
+        ノードか、その親のいずれかがdoNotWriteの場合は保存しません。
+        """
+        while node is not None:
+            if node.doNotWrite:
+                return False
+            node = node.parent
+        return True
+
+    def load(self,path,*args,**kwargs):
+        """シーンファイルを開く (file -openに相当)
+        今のノードは全て削除します。コールバックとUIは残します。
+
+        Args:
+            path (str): シーンファイルのパス
+
+        Returns:
+            None
+
+        Raises:
+            RuntimeError: ファイルがない、または形式が違う場合
+        """
+        try:
+            with open(path,'rb') as f:
+                state = _SceneUnpickler(f).load()
+        except (IOError,OSError,pickle.UnpicklingError,EOFError) as e:
+            raise RuntimeError('File not found or unreadable: {} ({})'.format(path,e))
+        if not isinstance(state,dict) or state.get('version') != SCENE_FILE_VERSION:
+            raise RuntimeError('Unsupported scene file: {}'.format(path))
+        self.clear()
+        self.nodes = state['nodes']
+        self.connections = state['connections']
+        for dst,src in self.connections.items():
+            self._nodeConnections.setdefault(src[0],set()).add(dst)
+            self._nodeConnections.setdefault(dst[0],set()).add(dst)
+        self.currentTime = state['currentTime']
+        self.paintContext['paintable'] = list(state['paintable'])
+        self._nameCounters = state['nameCounters']
+        for node in self.nodes.values():
+            # 保存しなかった子はNoneとして読み込まれる
+            node.children = [child for child in node.children if child is not None]
+        self.sceneName = path
+        self.modified = False
+
+    # nodes
+    def uniqueName(self,base,*args,**kwargs):
+        """シーン内で一意なノード名を返す
+        """
+        if base and not base in self.nodes:
+            return base
+        prefix = (base or 'node').rstrip('0123456789')
+        while True:
+            self._nameCounters[prefix] += 1
+            name = '{}{}'.format(prefix,self._nameCounters[prefix])
+            if not name in self.nodes:
+                return name
+
+    def createNode(self,nodeType,name = None,parent = None,*args,**kwargs):
+        """ノードを作成する
+
+        Args:
+            nodeType (str): ノードタイプ
+            name (str): ノード名。Noneや既にある名前の場合は番号を付けた名前にする
+            parent (Node): 親のノード
+
+        Returns:
+            Node: 作成したノード
+        """
+        return self.addNode(Node(name,nodeType,parent = parent))
+
+    def addNode(self,node,*args,**kwargs):
+        """作成済みのNodeをシーンに追加する
+        名前は一意な名前にし、ノードタイプの既定のアトリビュートを設定します。
+
+        Args:
+            node (Node): 追加するノード
+
+        Returns:
+            Node: 追加したノード
+        """
+        nodeType = node.nodeType
+        parent = node.parent
+        node.name = self.uniqueName(node.name or nodeType)
+        if nodeType == 'joint':
+            node.attrs.update(JOINT_ATTRS)
+        elif nodeType == 'transform':
+            node.attrs.update(TRANSFORM_ATTRS)
+        elif nodeType in SHAPE_TYPES:
+            node.attrs.update(SHAPE_ATTRS)
+        if parent is not None:
+            parent.children.append(node)
+        self.nodes[node.name] = node
+        self.modified = True
+        return node
+
+    def findNode(self,name,*args,**kwargs):
+        """名前からノードを探す
+        DAGパスの場合は最後の名前で探します。
+
+        Returns:
+            Node: ノード。見つからない場合はNone
+        """
+        if not name:
+            return None
+        return self.nodes.get(name.rpartition('|')[2])
+
+    def node(self,name,*args,**kwargs):
+        """名前からノードを取得する
+
+        Raises:
+            RuntimeError: ノードが見つからない場合
+        """
+        node = self.findNode(name)
+        if node is None:
+            raise RuntimeError('No object matches name: {}'.format(name))
+        return node
+
+    def fullPath(self,node,*args,**kwargs):
+        """ノードのフルパスを返す
+        """
+        if not node.isDag:
+            return node.name
+        names = []
+        while node is not None:
+            names.append(node.name)
+            node = node.parent
+        return '|' + '|'.join(reversed(names))
+
+    def shape(self,node,*args,**kwargs):
+        """トランスフォームの下のシェイプを返す。シェイプの場合はそのまま返す
+        """
+        if node.nodeType in SHAPE_TYPES:
+            return node
+        for child in node.children:
+            if child.nodeType in SHAPE_TYPES:
+                return child
+        return None
+
+    def deleteNode(self,node,*args,**kwargs):
+        """ノードを削除する
+        子のノードと接続も削除し、ノード削除のコールバックを呼び出します。
+        """
+        for child in list(node.children):
+            self.deleteNode(child)
+        for dst in list(self._nodeConnections.pop(node,())):
+            src = self.connections.get(dst)
+            if src is not None:
+                self.disconnect(src[0],src[1],dst[0],dst[1])
+        if node.parent is not None:
+            node.parent.children.remove(node)
+        self.nodes.pop(node.name,None)
+        self.modified = True
+        obj = MObject(node)
+        self._fire('nodeRemoved',None,obj)
+
+    def rename(self,node,newName,*args,**kwargs):
+        """ノードの名前を変更する
+
+        Returns:
+            str: 変更後の名前
+        """
+        prevName = node.name
+        if newName == prevName:
+            return prevName
+        newName = self.uniqueName(newName)
+        del self.nodes[prevName]
+        node.name = newName
+        self.nodes[newName] = node
+        self.modified = True
+        self._fire('nameChanged',node,MObject(node),prevName)
+        return newName
+
+    # attributes
+    def hasAttr(self,node,attr,*args,**kwargs):
+        """ノードがアトリビュートを持っているかどうかを判定する
+        """
+        attr = _longAttr(attr)
+        return attr in node.attrs or attr in COMPOUND_ATTRS
+
+    def getAttr(self,node,attr,*args,**kwargs):
+        """アトリビュートの値を取得する
+
+        Raises:
+            RuntimeError: アトリビュートがない場合
+        """
+        attr = _longAttr(attr)
+        if attr in COMPOUND_ATTRS:
+            return [self.getAttr(node,child) for child in COMPOUND_ATTRS[attr]]
+        if not attr in node.attrs:
+            raise RuntimeError('No attribute: {}.{}'.format(node.name,attr))
+        return node.attrs[attr]
+
+    def setAttr(self,node,attr,value,*args,**kwargs):
+        """アトリビュートに値を設定し、アトリビュート変更のコールバックを呼び出す
+
+        Raises:
+            RuntimeError: アトリビュートがない場合
+        """
+        attr = _longAttr(attr)
+        if attr in COMPOUND_ATTRS:
+            for child,childValue in zip(COMPOUND_ATTRS[attr],value):
+                self.setAttr(node,child,childValue)
+            return
+        if not attr in node.attrs:
+            raise RuntimeError('No attribute: {}.{}'.format(node.name,attr))
+        current = node.attrs[attr]
+        node.attrs[attr] = type(current)(value) if isinstance(current,(bool,float)) else value
+        self.modified = True
+        self.attributeChanged(node,attr)
+
+    def attributeChanged(self,node,attrs,*args,**kwargs):
+        """アトリビュート変更のコールバックを呼び出す
+
+        Args:
+            node (Node): ノード
+            attrs (str or list): 変更したアトリビュート。複数の場合はアトリビュートごとに呼び出す
+        """
+        callbacks = [entry for entry in self._callbacks.values()
+                     if entry[0] == 'attributeChanged' and entry[1] is node]
+        if not callbacks:
+            return
+        msg = MNodeMessage.kAttributeSet | MNodeMessage.kIncomingDirection
+        for attr in _asList(attrs):
+            plug = MPlug(node,attr)
+            for kind,target,func,clientData in callbacks:
+                func(msg,plug,MPlug(),clientData)
+
+    # undo
+    def openUndoChunk(self,*args,**kwargs):
+        """undoチャンクを開く (undoInfo -openChunkに相当)
+        """
+        self.undoDepth += 1
+        if self.undoDepth == 1:
+            self._undoChunk = []
+
+    def closeUndoChunk(self,*args,**kwargs):
+        """undoチャンクを閉じる (undoInfo -closeChunkに相当)
+        最も外側のチャンクを閉じたときに、記録した操作を1つの操作としてundoキューに積みます。
+        """
+        if self.undoDepth == 0:
+            return
+        self.undoDepth -= 1
+        if self.undoDepth == 0:
+            chunk,self._undoChunk = self._undoChunk,None
+            if chunk:
+                self.undoQueue.append(chunk)
+
+    def recordUndo(self,undo,redo,*args,**kwargs):
+        """undoできる操作を記録する
+        undoチャンクが開いている場合はそのチャンクに、開いていない場合は1つの操作として積みます。
+
+        Args:
+            undo (function): 元に戻す関数
+            redo (function): やり直す関数
+        """
+        self.redoQueue = []
+        if self._undoChunk is not None:
+            self._undoChunk.append((undo,redo))
+        else:
+            self.undoQueue.append([(undo,redo)])
+
+    def undoName(self,*args,**kwargs):
+        """次にundoする操作を区別する文字列を返す (undoInfo -q -undoNameに相当)
+        操作の名前は記録しないので、操作ごとに異なる文字列を返します。
+
+        Returns:
+            str: 操作を区別する文字列。undoできる操作がない場合は空文字
+        """
+        if not self.undoQueue:
+            return ''
+        return 'operation{}'.format(id(self.undoQueue[-1]))
+
+    def undo(self,*args,**kwargs):
+        """最後の操作を元に戻す
+
+        Returns:
+            bool: 元に戻した場合はTrue
+        """
+        if not self.undoQueue:
+            return False
+        chunk = self.undoQueue.pop()
+        for undo,redo in reversed(chunk):
+            undo()
+        self.redoQueue.append(chunk)
+        return True
+
+    def redo(self,*args,**kwargs):
+        """最後に元に戻した操作をやり直す
+
+        Returns:
+            bool: やり直した場合はTrue
+        """
+        if not self.redoQueue:
+            return False
+        chunk = self.redoQueue.pop()
+        for undo,redo in chunk:
+            redo()
+        self.undoQueue.append(chunk)
+        return True
+
+    # connections
+    def source(self,node,attr,*args,**kwargs):
+        """アトリビュートの接続元を返す
+
+        Returns:
+            tuple: (接続元のNode, アトリビュート)。接続されていない場合はNone
+        """
+        return self.connections.get((node,_longAttr(attr)))
+
+    def connect(self,srcNode,srcAttr,dstNode,dstAttr,notify = True,*args,**kwargs):
+        """アトリビュートを接続し、接続変更のコールバックを呼び出す
+
+        Args:
+            notify (bool): Falseの場合はコールバックを呼び出さない (リグの作成用)
+        """
+        dst = (dstNode,_longAttr(dstAttr))
+        if dst in self.connections:
+            self.disconnect(self.connections[dst][0],self.connections[dst][1],dstNode,dstAttr)
+        self.connections[dst] = (srcNode,srcAttr)
+        self._nodeConnections.setdefault(srcNode,set()).add(dst)
+        self._nodeConnections.setdefault(dstNode,set()).add(dst)
+        self.modified = True
+        if notify:
+            self._fire('connection',None,MPlug(srcNode,srcAttr),MPlug(dstNode,dst[1]),True)
+
+    def disconnect(self,srcNode,srcAttr,dstNode,dstAttr,*args,**kwargs):
+        """接続を切断し、接続変更のコールバックを呼び出す
+        """
+        dst = (dstNode,_longAttr(dstAttr))
+        if self.connections.get(dst) != (srcNode,srcAttr):
+            return
+        del self.connections[dst]
+        for node in (srcNode,dstNode):
+            self._nodeConnections.get(node,set()).discard(dst)
+        self.modified = True
+        self._fire('connection',None,MPlug(srcNode,srcAttr),MPlug(dstNode,dst[1]),False)
+
+    # callbacks
+    def addCallback(self,kind,func,clientData = None,node = None,*args,**kwargs):
+        """コールバックを登録する
+
+        Args:
+            kind (str or tuple): 種類 (connection, nodeRemoved, nameChanged, attributeChanged,
+                                 または(sceneMessage, MSceneMessageのメッセージ))
+            func (function): 呼び出す関数
+            clientData: 関数に渡すデータ
+            node (Node): 監視するノード。Noneの場合は全ノード
+
+        Returns:
+            int: コールバックの番号
+        """
+        callbackId = self._nextCallbackId
+        self._nextCallbackId += 1
+        self._callbacks[callbackId] = (kind,node,func,clientData)
+        return callbackId
+
+    def removeCallback(self,callbackId,*args,**kwargs):
+        """コールバックを解除する
+
+        Raises:
+            RuntimeError: 登録されていない番号の場合
+        """
+        if self._callbacks.pop(callbackId,None) is None:
+            raise RuntimeError('Invalid callback id: {}'.format(callbackId))
+
+    def callbackCount(self,*args,**kwargs):
+        """登録されているコールバックの数を返す
+        """
+        return len(self._callbacks)
+
+    def _fire(self,kind,node,*args):
+        """コールバックを呼び出す
+        """
+        for entryKind,target,func,clientData in list(self._callbacks.values()):
+            if entryKind != kind or (target is not None and target is not node):
+                continue
+            func(*(args + (clientData,)))
+
+    # idle
+    def evalDeferred(self,func,*args,**kwargs):
+        """アイドル時に実行する処理を予約する
+        """
+        self._deferred.append(func)
+
+    def pendingCount(self,*args,**kwargs):
+        """予約されている処理の数を返す
+        """
+        return len(self._deferred)
+
+    def flushIdle(self,timeout = 2.0,*args,**kwargs):
+        """予約されている処理を実行する
+        実行中に予約された処理も、予約がなくなるかtimeout秒経つまで続けて実行します。
+
+        Args:
+            timeout (float): 最大の待ち時間[秒]
+
+        Returns:
+            int: 実行した処理の数
+        """
+        count = 0
+        endTime = time.time() + timeout
+        while self._deferred:
+            pending = self._deferred
+            self._deferred = []
+            for func in pending:
+                if isinstance(func,str):
+                    Mel.eval(func)
+                else:
+                    func()
+                count += 1
+            if self._deferred and time.time() > endTime:
+                break
+            if self._deferred and len(self._deferred) >= len(pending):
+                # 待ち時間のある処理が予約しなおしている間は、少し待つ
+                time.sleep(0.002)
+        return count
+
+    # messages
+    def message(self,level,text,*args,**kwargs):
+        """MGlobalのメッセージを記録する
+        """
+        self.log.append((level,text))
+        if self.verbose:
+            print('# {}: {}'.format(level,text))
+
+class _ScenePickler(pickle.Pickler):
+    """保存しないノードを参照の代わりにNoneとして書き出すPickler
+    """
+
+    def __init__(self,f,excluded,*args,**kwargs):
+        pickle.Pickler.__init__(self,f,pickle.HIGHEST_PROTOCOL)
+        self._excluded = excluded
+
+    def persistent_id(self,obj):
+        if isinstance(obj,Node) and obj in self._excluded:
+            return 'excluded'
+        return None
+
+class _SceneUnpickler(pickle.Unpickler):
+    """_ScenePicklerが書き出さなかったノードをNoneとして読み込むUnpickler
+    """
+
+    def persistent_load(self,pid):
+        return None
+
+# DAGノードとシェイプのノードタイプ
+DAG_TYPES = frozenset(('transform','joint','mesh'))
+SHAPE_TYPES = frozenset(('mesh',))
+
+def currentScene(*args,**kwargs):
+    """現在のシーンを返す
+
+    Returns:
+        Scene: シーン
+    """
+    global _scene
+    if _scene is None:
+        _scene = Scene()
+    return _scene
+
+def newScene(*args,**kwargs):
+    """シーンとUIとコールバックを全て作り直す
+
+    Returns:
+        Scene: 新しいシーン
+    """
+    global _scene
+    _scene = Scene()
+    return _scene
+
+def flushIdle(timeout = 2.0,*args,**kwargs):
+    """現在のシーンで予約されている処理を実行する (Scene.flushIdleを参照)
+    """
+    return currentScene().flushIdle(timeout = timeout)
+
+def getCallCounts(*args,**kwargs):
+    """cmdsとmelの呼び出し回数を返す
+
+    Returns:
+        Counter: 関数名 (cmds.ls, mel.evalなど) → 呼び出し回数
+    """
+    return Counter(_callCounts)
+
+def resetCallCounts(*args,**kwargs):
+    """cmdsとmelの呼び出し回数をリセットする
+    """
+    _callCounts.clear()
+
+# ------------------------------------------------------------------------------
+# ui
+# 子のUIの親になるUIのタイプ
+LAYOUT_TYPES = frozenset(('columnLayout','rowLayout','rowColumnLayout','paneLayout','formLayout',
+                          'frameLayout','tabLayout'))
+UI_TYPES = ('text','shelfButton','columnLayout','rowLayout','treeView','textScrollList',
+            'attrFieldSliderGrp','separator','paneLayout','radioButton','radioCollection','intField',
+            'frameLayout','floatSliderGrp','floatField','optionMenu','menuItem','formLayout','checkBox',
+            'button','tabLayout','rowColumnLayout')
+# UIのフラグの短い名前 → 長い名前
+UI_FLAG_ALIASES = {
+    'ex':'exists','ca':'childArray','l':'label','v':'value','p':'parent','fpn':'fullPathName',
+    'vis':'visible','si':'selectItem','sii':'selectIndexedItem','a':'append','ra':'removeAll',
+    'ai':'allItems','iex':'itemExists','at':'attribute','scc':'selectionChangedCommand',
+    'c':'command','cc':'changeCommand','dc':'dragCommand','btc':'buttonTextColor',
+    'ac':'attachControl','af':'attachForm','sl':'select','adj':'adjustableColumn',
+}
+
+class UiRegistry(object):
+    """UIの階層と、UIごとのフラグの値を保持するクラス
+
+    Attributes:
+        controls (OrderedDict): フルパス → UIの情報 (type, parent, children, flags, items)
+        currentParent (str): 現在の親のレイアウトのフルパス
+        currentMenu (str): 現在のメニューのフルパス
+    """
+
+    def __init__(self,*args,**kwargs):
+        self.controls = OrderedDict()
+        self.currentParent = None
+        self.currentMenu = None
+        self._counters = Counter()
+
+    def resolve(self,name,*args,**kwargs):
+        """UIの名前からフルパスを返す。見つからない場合はNone
+        """
+        if not name:
+            return None
+        if name in self.controls:
+            return name
+        shortName = name.rpartition('|')[2]
+        for path in self.controls:
+            if path.rpartition('|')[2] == shortName:
+                return path
+        return None
+
+    def create(self,uiType,name = None,parent = None,flags = None,*args,**kwargs):
+        """UIを作成する
+
+        Returns:
+            str: 作成したUIのフルパス
+
+        Raises:
+            RuntimeError: 親がない、または同じ名前のUIが既にある場合
+        """
+        if uiType == 'menuItem':
+            parentPath = self.resolve(parent) if parent else self.currentMenu
+        else:
+            parentPath = self.resolve(parent) if parent else self.currentParent
+        if parentPath is None and not uiType in LAYOUT_TYPES:
+            raise RuntimeError('{}: 親のレイアウトが見つかりません'.format(uiType))
+        if not name:
+            self._counters[uiType] += 1
+            name = '{}{}'.format(uiType,self._counters[uiType])
+        path = '{}|{}'.format(parentPath,name) if parentPath else name
+        if path in self.controls:
+            raise RuntimeError('Object\'s name \'{}\' is not unique.'.format(name))
+        self.controls[path] = {'type':uiType,'parent':parentPath,'children':[],
+                               'flags':dict(flags or {}),'items':[]}
+        if parentPath:
+            self.controls[parentPath]['children'].append(name)
+        if uiType in LAYOUT_TYPES:
+            self.currentParent = path
+        elif uiType == 'optionMenu':
+            self.currentMenu = path
+        return path
+
+    def delete(self,path,*args,**kwargs):
+        """UIと子のUIを削除する
+        """
+        control = self.controls.pop(path,None)
+        if control is None:
+            return
+        for child in control['children']:
+            self.delete('{}|{}'.format(path,child))
+        parent = self.controls.get(control['parent'])
+        if parent is not None:
+            parent['children'].remove(path.rpartition('|')[2])
+        for attr in ('currentParent','currentMenu'):
+            current = getattr(self,attr)
+            if current and (current == path or current.startswith(path + '|')):
+                setattr(self,attr,control['parent'])
+
+    def setParent(self,name,*args,**kwargs):
+        """現在の親のレイアウトを変更する
+
+        Returns:
+            str: 変更後の親のフルパス
+        """
+        if name == '..':
+            control = self.controls.get(self.currentParent)
+            self.currentParent = control['parent'] if control else None
+        else:
+            path = self.resolve(name)
+            if path is None:
+                raise RuntimeError('setParent: Object \'{}\' not found.'.format(name))
+            self.currentParent = path
+        return self.currentParent
+
+def _normalizeUiFlags(kwargs,*args,**kw):
+    """UIのフラグを長い名前にそろえる
+    """
+    return dict((UI_FLAG_ALIASES.get(key,key),value) for key,value in kwargs.items())
+
+def _uiCommand(uiType,*args,**kwargs):
+    """UIコマンドの作成・問い合わせ・編集を行う
+    """
+    ui = currentScene().ui
+    flags = _normalizeUiFlags(kwargs)
+    query = flags.pop('query',flags.pop('q',False))
+    edit = flags.pop('edit',flags.pop('e',False))
+    name = args[0] if args else None
+
+    if not query and not edit:
+        parent = flags.pop('parent',None)
+        return ui.create(uiType,name = name,parent = parent,flags = flags)
+
+    path = ui.resolve(name)
+    if query and 'exists' in flags:
+        return path is not None
+    if path is None:
+        raise RuntimeError('{}: Object \'{}\' not found.'.format(uiType,name))
+    control = ui.controls[path]
+
+    if query:
+        if 'childArray' in flags:
+            return list(control['children']) or None
+        if 'fullPathName' in flags:
+            return path
+        if 'itemExists' in flags:
+            return flags['itemExists'] in control['items']
+        if 'allItems' in flags:
+            return list(control['items']) or None
+        if 'selectIndexedItem' in flags:
+            selected = control['flags'].get('selectIndexedItem')
+            return [selected] if selected else None
+        if 'selectItem' in flags:
+            return list(control['flags'].get('selectItem') or []) or None
+        for flag in flags:
+            return control['flags'].get(flag)
+        return None
+
+    for flag,value in flags.items():
+        if flag == 'append':
+            control['items'].extend(value if isinstance(value,(list,tuple)) else [value])
+        elif flag == 'removeAll':
+            control['items'] = []
+            control['flags'].pop('selectIndexedItem',None)
+        elif flag == 'attribute':
+            node,_,attr = (value or '').partition('.')
+            scene = currentScene()
+            if scene.findNode(node) is None or not scene.hasAttr(scene.findNode(node),attr):
+                raise RuntimeError('{}: No object matches name: {}'.format(uiType,value))
+            control['flags'][flag] = value
+        elif flag == 'clearSelection':
+            control['flags']['selectItem'] = []
+        elif flag == 'buttonTextColor':
+            control.setdefault('buttonTextColors',{})[value[0]] = tuple(value[1:])
+        elif flag == 'selectItem':
+            item,state = value
+            selected = [i for i in control['flags'].get('selectItem') or [] if i != item]
+            if state:
+                selected.append(item)
+            control['flags']['selectItem'] = selected
+        else:
+            control['flags'][flag] = value
+    return None
+
+def _buildToolSettingsUi(scene,*args,**kwargs):
+    """ウエイトペイントモードToolのtoolPropertyWindowのUIを作成する
+    インフルエンスリストのframeLayoutの中に、formLayoutとtreeViewを作ります。
+    既にある場合は、treeViewの項目だけを更新します。
+    """
+    ui = scene.ui
+    if ui.resolve(TOOL_SETTINGS_LAYOUT) is None:
+        currentParent = ui.currentParent
+        tab = ui.create('tabLayout',TOOL_SETTINGS_LAYOUT)
+        column = ui.create('columnLayout','artAttrSkin',parent = tab)
+        ui.create('frameLayout','brushFrame',parent = column,flags = {'label':'Brush'})
+        ui.setParent(column)
+        frame = ui.create('frameLayout','influenceFrame',parent = column,flags = {'label':'Influences'})
+        form = ui.create('formLayout','influenceForm',parent = frame)
+        ui.create('textField','influenceFilter',parent = form)
+        ui.create('treeView',INFLUENCE_LIST,parent = form)
+        ui.currentParent = currentParent
+
+    treeView = scene.ui.controls[ui.resolve(INFLUENCE_LIST)]
+    items = []
+    for skinCluster in scene.paintContext['paintable']:
+        for influence in scene.nodes[skinCluster].data['influences']:
+            if not influence.name in items:
+                items.append(influence.name)
+    treeView['items'] = items
+    influence = scene.paintContext['influence']
+    treeView['flags']['selectItem'] = [influence] if influence else []
+
+# ------------------------------------------------------------------------------
+# maya.cmds
+_COMPONENT = re.compile(r'^(?P<node>[^.]+)\.(?P<type>vtx|f)\[(?P<start>\d+)(?::(?P<end>\d+))?\]$')
+
+def _parseComponent(name,*args,**kwargs):
+    """コンポーネントの名前を(ノード, 種類, 番号のリスト)に分解する。コンポーネントでない場合はNone
+    """
+    match = _COMPONENT.match(name)
+    if not match:
+        return None
+    start = int(match.group('start'))
+    end = int(match.group('end') or start)
+    return match.group('node'),match.group('type'),list(range(start,end + 1))
+
+def _asList(value,*args,**kwargs):
+    """文字列とリストをリストにそろえる
+    """
+    if value is None:
+        return []
+    if isinstance(value,(list,tuple,set)):
+        return list(value)
+    return [value]
+
+class Commands(object):
+    """maya.cmdsの代用品
+    公開しているメソッドが、maya.cmdsの関数としてモジュールに登録されます。
+    """
+
+    # scene
+    def file(self,*args,**kwargs):
+        scene = currentScene()
+        if kwargs.get('query') or kwargs.get('q'):
+            if kwargs.get('sceneName') or kwargs.get('sn'):
+                return scene.sceneName
+            if kwargs.get('modified') or kwargs.get('mf'):
+                return scene.modified
+            raise NotImplementedError('mayaStandin: file -q は sceneName と modified だけに対応しています')
+        if kwargs.get('new') or kwargs.get('n'):
+            scene._fire(('sceneMessage',MSceneMessage.kBeforeNew),None)
+            scene.clear()
+            return 'untitled'
+        if kwargs.get('open') or kwargs.get('o'):
+            scene._fire(('sceneMessage',MSceneMessage.kBeforeOpen),None)
+            scene.load(args[0])
+            return scene.sceneName
+        rename = kwargs.get('rename',kwargs.get('rn'))
+        if rename:
+            scene.sceneName = rename
+            return rename
+        if kwargs.get('save') or kwargs.get('s'):
+            if not scene.sceneName:
+                raise RuntimeError('Scene has not been named. Use file -rename first.')
+            scene._fire(('sceneMessage',MSceneMessage.kBeforeSave),None)
+            scene.save(scene.sceneName)
+            return scene.sceneName
+        for flag in ('modified','mf'):
+            if flag in kwargs:
+                scene.modified = bool(kwargs[flag])
+                return None
+        raise NotImplementedError('mayaStandin: file は new, open, rename, save, modified と'
+                                  ' -q sceneName, modified だけに対応しています')
+
+    def about(self,*args,**kwargs):
+        if kwargs.get('uiLanguage') or kwargs.get('uil'):
+            return 'en_US'
+        if kwargs.get('batch') or kwargs.get('b'):
+            return True
+        return ''
+
+    def createNode(self,nodeType,*args,**kwargs):
+        scene = currentScene()
+        parent = kwargs.get('p',kwargs.get('parent'))
+        node = scene.createNode(nodeType,name = kwargs.get('n',kwargs.get('name')),
+                                parent = scene.node(parent) if parent else None)
+        return node.name
+
+    def objExists(self,name,*args,**kwargs):
+        scene = currentScene()
+        nodeName,_,attr = name.partition('.')
+        node = scene.findNode(nodeName)
+        if node is None:
+            return False
+        return not attr or scene.hasAttr(node,attr) or _parseComponent(name) is not None
+
+    def objectType(self,name,*args,**kwargs):
+        return currentScene().node(name).nodeType
+
+    def ls(self,*args,**kwargs):
+        scene = currentScene()
+        if kwargs.get('sl') or kwargs.get('selection'):
+            names = list(scene.selection)
+        elif args:
+            names = [name for name in _asList(args[0]) if self.objExists(name)]
+        else:
+            names = list(scene.nodes)
+        nodeType = kwargs.get('type',kwargs.get('typ'))
+        if nodeType:
+            types = _asList(nodeType)
+            names = [name for name in names
+                     if scene.findNode(name) is not None and scene.findNode(name).nodeType in types]
+        return names
+
+    def select(self,*args,**kwargs):
+        scene = currentScene()
+        names = []
+        for arg in args:
+            names.extend(_asList(arg))
+        for name in names:
+            if not self.objExists(name):
+                raise ValueError('No object matches name: {}'.format(name))
+        if kwargs.get('cl') or kwargs.get('clear'):
+            scene.selection = []
+        elif kwargs.get('add'):
+            scene.selection.extend(name for name in names if not name in scene.selection)
+        else:
+            scene.selection = names
+
+    def sets(self,*args,**kwargs):
+        # シェーディンググループの割り当て(forceElement)だけに対応し、割り当ては記録しない
+        if (kwargs.get('e') or kwargs.get('edit')) and (kwargs.get('forceElement') or kwargs.get('fe')):
+            return None
+        raise NotImplementedError('mayaStandin: sets は -e -forceElement だけに対応しています')
+
+    def delete(self,*args,**kwargs):
+        scene = currentScene()
+        for name in _asList(args[0] if args else list(scene.selection)):
+            node = scene.findNode(name)
+            if node is not None:
+                scene.deleteNode(node)
+
+    def rename(self,oldName,newName,*args,**kwargs):
+        scene = currentScene()
+        return scene.rename(scene.node(oldName),newName)
+
+    def getAttr(self,plug,*args,**kwargs):
+        scene = currentScene()
+        nodeName,_,attr = plug.partition('.')
+        value = scene.getAttr(scene.node(nodeName),attr)
+        attrs = COMPOUND_ATTRS.get(attr,(_longAttr(attr),))
+        if isinstance(value,list):
+            return [tuple(math.degrees(v) if a in ANGLE_ATTRS else v for a,v in zip(attrs,value))]
+        return math.degrees(value) if attrs[0] in ANGLE_ATTRS else value
+
+    def setAttr(self,plug,*values,**kwargs):
+        scene = currentScene()
+        nodeName,_,attr = plug.partition('.')
+        node = scene.node(nodeName)
+        attrs = COMPOUND_ATTRS.get(attr,(_longAttr(attr),))
+        if len(values) != len(attrs):
+            raise RuntimeError('setAttr: 値の数が一致しません: {}'.format(plug))
+        for name in attrs:
+            if scene.source(node,name) is not None:
+                raise RuntimeError('setAttr: {}.{} は接続されているため変更できません'.format(nodeName,name))
+        newValues = [math.radians(value) if name in ANGLE_ATTRS else value for name,value in zip(attrs,values)]
+        oldValues = [scene.getAttr(node,name) for name in attrs]
+        def apply(values):
+            for name,value in zip(attrs,values):
+                scene.setAttr(node,name,value)
+        apply(newValues)
+        scene.recordUndo(lambda:apply(oldValues),lambda:apply(newValues))
+
+    def skinCluster(self,*args,**kwargs):
+        if not (kwargs.get('q') or kwargs.get('query')):
+            raise NotImplementedError('mayaStandin: skinClusterの作成にはcreateSyntheticRigを使ってください')
+        scene = currentScene()
+        node = scene.node(args[0])
+        if kwargs.get('inf') or kwargs.get('influence'):
+            return [influence.name for influence in node.data['influences']]
+        if kwargs.get('g') or kwargs.get('geometry'):
+            return [node.data['geometry'].name]
+        raise NotImplementedError('mayaStandin: skinClusterの問い合わせは inf, g だけに対応しています')
+
+    def polyListComponentConversion(self,components,*args,**kwargs):
+        if not (kwargs.get('tv') or kwargs.get('toVertex')):
+            raise NotImplementedError('mayaStandin: polyListComponentConversion は tv だけに対応しています')
+        scene = currentScene()
+        result = []
+        for name in _asList(components):
+            parsed = _parseComponent(name)
+            if parsed is None:
+                continue
+            nodeName,componentType,indices = parsed
+            if componentType == 'f':
+                shape = scene.shape(scene.node(nodeName))
+                counts,connects = shape.data['counts'],shape.data['connects']
+                offsets = np.concatenate(([0],np.cumsum(counts)))
+                vertices = set()
+                for face in indices:
+                    vertices.update(int(v) for v in connects[offsets[face]:offsets[face + 1]])
+                indices = sorted(vertices)
+            result.extend('{}.vtx[{}]'.format(nodeName,index) for index in indices)
+        return result or None
+
+    # animation
+    def autoKeyframe(self,*args,**kwargs):
+        scene = currentScene()
+        if kwargs.get('q') or kwargs.get('query'):
+            return scene.autoKey
+        if 'state' in kwargs:
+            scene.autoKey = bool(kwargs['state'])
+
+    def undoInfo(self,*args,**kwargs):
+        scene = currentScene()
+        if kwargs.get('openChunk') or kwargs.get('ock'):
+            scene.openUndoChunk()
+        elif kwargs.get('closeChunk') or kwargs.get('cck'):
+            scene.closeUndoChunk()
+        elif kwargs.get('q') or kwargs.get('query'):
+            if kwargs.get('undoName') or kwargs.get('un'):
+                return scene.undoName()
+            return True
+
+    def undo(self,*args,**kwargs):
+        currentScene().undo()
+
+    def redo(self,*args,**kwargs):
+        currentScene().redo()
+
+    # plugins
+    def loadPlugin(self,path,*args,**kwargs):
+        if path in _plugins:
+            return [_pluginName(path)]
+        if not os.path.isfile(path):
+            raise RuntimeError('Plug-in, "{}", was not found on MAYA_PLUG_IN_PATH.'.format(path))
+        module = _loadSource('_mayaStandinPlugin_' + _pluginName(path),path)
+        _plugins[path] = module
+        module.initializePlugin(MObject())
+        return [_pluginName(path)]
+
+    def unloadPlugin(self,name,*args,**kwargs):
+        for path,module in list(_plugins.items()):
+            if name in (path,_pluginName(path)):
+                module.uninitializePlugin(MObject())
+                del _plugins[path]
+                return [_pluginName(path)]
+        raise RuntimeError('Plug-in, "{}", is not loaded.'.format(name))
+
+    def pluginInfo(self,name,*args,**kwargs):
+        if not (kwargs.get('q') or kwargs.get('query')) or not (kwargs.get('loaded') or kwargs.get('l')):
+            raise NotImplementedError('mayaStandin: pluginInfo は -q -loaded だけに対応しています')
+        return any(name in (path,_pluginName(path)) for path in _plugins)
+
+    def currentTime(self,*args,**kwargs):
+        scene = currentScene()
+        if kwargs.get('q') or kwargs.get('query') or not args:
+            return scene.currentTime
+        scene.currentTime = float(args[0])
+        return scene.currentTime
+
+    def setKeyframe(self,*args,**kwargs):
+        scene = currentScene()
+        targets = _asList(args[0]) if args else list(scene.selection)
+        attributes = [_longAttr(attr) for attr in _asList(kwargs.get('at',kwargs.get('attribute')))]
+        times = [float(t) for t in _asList(kwargs.get('t',kwargs.get('time')))] or [scene.currentTime]
+        count = 0
+        for target in targets:
+            node = scene.node(target)
+            for attr in attributes or [a for a in ('rotateX','rotateY','rotateZ') if a in node.attrs]:
+                for child in COMPOUND_ATTRS.get(attr,(attr,)):
+                    curve = self._animCurve(scene,node,child,create = True)
+                    for t in times:
+                        curve.data['keys'][t] = node.attrs[child]
+                    count += 1
+        return count
+
+    def cutKey(self,*args,**kwargs):
+        scene = currentScene()
+        targets = _asList(args[0]) if args else list(scene.selection)
+        attributes = [_longAttr(attr) for attr in _asList(kwargs.get('at',kwargs.get('attribute')))]
+        timeRange = kwargs.get('time',kwargs.get('t'))
+        count = 0
+        removed = []
+        for target in targets:
+            node = scene.node(target)
+            for attr in attributes or list(node.attrs):
+                for child in COMPOUND_ATTRS.get(attr,(attr,)):
+                    curve = self._animCurve(scene,node,child)
+                    if curve is None:
+                        continue
+                    keys = curve.data['keys']
+                    removed.append((curve,dict(keys),node,child))
+                    if timeRange:
+                        start,end = timeRange[0],timeRange[-1]
+                        for t in [t for t in keys if start <= t <= end]:
+                            del keys[t]
+                    else:
+                        keys.clear()
+                    if not keys:
+                        scene.deleteNode(curve)
+                    count += 1
+        if removed:
+            after = [dict(curve.data['keys']) for curve,keys,node,attr in removed]
+            def undo():
+                for curve,keys,node,attr in removed:
+                    curve.data['keys'] = dict(keys)
+                    if not curve.name in scene.nodes:
+                        scene.nodes[curve.name] = curve
+                        scene.connect(curve,'output',node,attr)
+            def redo():
+                for (curve,keys,node,attr),keys in zip(removed,after):
+                    curve.data['keys'] = dict(keys)
+                    if not keys:
+                        scene.deleteNode(curve)
+            scene.recordUndo(undo,redo)
+        return count
+
+    def _animCurve(self,scene,node,attr,create = False,*args,**kwargs):
+        """アトリビュートに接続されているアニメーションカーブを返す
+        """
+        source = scene.source(node,attr)
+        if source is not None and source[0].nodeType.startswith('animCurve'):
+            return source[0]
+        if not create:
+            return None
+        curveType = 'animCurveTA' if attr in ANGLE_ATTRS else (
+                    'animCurveTL' if attr.startswith('translate') else 'animCurveTU')
+        curve = scene.createNode(curveType,name = '{}_{}'.format(node.name,attr))
+        curve.data['keys'] = {}
+        scene.connect(curve,'output',node,attr)
+        return curve
+
+    # idle and jobs
+    def evalDeferred(self,*args,**kwargs):
+        if args:
+            currentScene().evalDeferred(args[0])
+
+    def scriptJob(self,*args,**kwargs):
+        scene = currentScene()
+        if 'kill' in kwargs or 'k' in kwargs:
+            scene.scriptJobs.pop(kwargs.get('kill',kwargs.get('k')),None)
+            return None
+        jobId = len(scene.scriptJobs) + 1
+        while jobId in scene.scriptJobs:
+            jobId += 1
+        scene.scriptJobs[jobId] = dict(kwargs)
+        return jobId
+
+    # paint tool
+    def artAttrSkinPaintCtx(self,*args,**kwargs):
+        scene = currentScene()
+        name = args[0] if args else PAINT_CONTEXT
+        query = kwargs.get('q') or kwargs.get('query')
+        if query and (kwargs.get('ex') or kwargs.get('exists')):
+            return name == PAINT_CONTEXT
+        if name != PAINT_CONTEXT:
+            raise RuntimeError('artAttrSkinPaintCtx: Object \'{}\' not found.'.format(name))
+        context = scene.paintContext
+        if query:
+            if kwargs.get('inf') or kwargs.get('influence'):
+                return context['influence']
+            if kwargs.get('pna') or kwargs.get('paintNodeArray'):
+                return ' '.join('{}.paintWeights'.format(skinCluster) for skinCluster in context['paintable'])
+            return None
+        influence = kwargs.get('inf',kwargs.get('influence'))
+        if influence is not None:
+            context['influence'] = influence
+
+    def draggerContext(self,*args,**kwargs):
+        scene = currentScene()
+        name = args[0] if args else 'draggerContext1'
+        query = kwargs.pop('q',kwargs.pop('query',False))
+        edit = kwargs.pop('e',kwargs.pop('edit',False))
+        if query:
+            if kwargs.get('ex') or kwargs.get('exists'):
+                return name in scene.contexts
+            flags = scene.contexts[name]
+            if kwargs.get('ap') or kwargs.get('anchorPoint'):
+                return list(flags.get('anchorPoint',(0.0,0.0,0.0)))
+            for flag in kwargs:
+                return flags.get(flag)
+            return None
+        if edit:
+            scene.contexts[name].update(kwargs)
+        else:
+            scene.contexts[name] = dict(kwargs)
+        return name
+
+    def setToolTo(self,context,*args,**kwargs):
+        scene = currentScene()
+        if context != PAINT_CONTEXT and not context in scene.contexts and context != 'selectSuperContext':
+            raise RuntimeError('setToolTo: Object \'{}\' not found.'.format(context))
+        scene.currentContext = context
+
+    def currentCtx(self,*args,**kwargs):
+        return currentScene().currentContext
+
+    def toolPropertyWindow(self,*args,**kwargs):
+        if kwargs.get('loc') or kwargs.get('location'):
+            return currentScene().ui.resolve(TOOL_SETTINGS_LAYOUT)
+        return None
+
+    # ui
+    def setParent(self,*args,**kwargs):
+        ui = currentScene().ui
+        if kwargs.get('q') or kwargs.get('query'):
+            return ui.currentParent
+        return ui.setParent(args[0])
+
+    def deleteUI(self,*args,**kwargs):
+        ui = currentScene().ui
+        for name in args:
+            for item in _asList(name):
+                path = ui.resolve(item)
+                if path is None:
+                    raise RuntimeError('deleteUI: Object \'{}\' not found.'.format(item))
+                ui.delete(path)
+
+    def fileDialog2(self,*args,**kwargs):
+        return None
+
+    def fileDialog(self,*args,**kwargs):
+        return ''
+
+def _createUiCommand(uiType,*args,**kwargs):
+    """UIコマンドの関数を作成する
+    """
+    def command(*args,**kwargs):
+        return _uiCommand(uiType,*args,**kwargs)
+    command.__name__ = uiType
+    return command
+
+# ------------------------------------------------------------------------------
+# maya.mel
+class Mel(object):
+    """maya.melの代用品
+    Toolが実行するmelの文字列だけに対応します。
+    """
+
+    @staticmethod
+    def eval(command,*args,**kwargs):
+        scene = currentScene()
+        command = command.strip()
+        if command.startswith('artAttrSkinToolScript'):
+            _buildToolSettingsUi(scene)
+            return PAINT_CONTEXT
+        if command == '$temp=$gArtSkinInfluencesList;':
+            return scene.ui.resolve(INFLUENCE_LIST) or ''
+        if command.startswith('artSkinInflListChanged'):
+            path = scene.ui.resolve(INFLUENCE_LIST)
+            selected = scene.ui.controls[path]['flags'].get('selectItem') if path else None
+            if selected:
+                scene.paintContext['influence'] = selected[-1]
+            return None
+        if command.startswith('uiRes('):
+            if 'kInfluences' in command:
+                return 'Influences'
+            raise RuntimeError('mayaStandin: 未対応のuiResです: {}'.format(command))
+        if command.rstrip(';') in ('CreateQuickSelectSet','GoToBindPose'):
+            # 選択とダイアログに依存するので再現せず、何もせずに成功したように見せない
+            raise NotImplementedError('mayaStandin: {} には対応していません'.format(command))
+        raise RuntimeError('mayaStandin: 未対応のmelです: {}'.format(command))
+
+# ------------------------------------------------------------------------------
+# maya.api.OpenMaya
+class MFn(object):
+    kInvalid = 0
+    kDependencyNode = 4
+    kAnimCurve = 7
+    kDagNode = 107
+    kTransform = 110
+    kJoint = 121
+    kShape = 248
+    kMesh = 296
+    kGeometryFilt = 334
+    kComponent = 524
+    kSingleIndexedComponent = 525
+    kMeshVertComponent = 551
+    kMeshPolygonComponent = 553
+    kSkinClusterFilter = 682
+
+# ノードタイプ → hasFnで真になるMFnの種類
+_FN_TYPES = {
+    'transform':(MFn.kTransform,MFn.kDagNode,MFn.kDependencyNode),
+    'joint':(MFn.kJoint,MFn.kTransform,MFn.kDagNode,MFn.kDependencyNode),
+    'mesh':(MFn.kMesh,MFn.kShape,MFn.kDagNode,MFn.kDependencyNode),
+    'skinCluster':(MFn.kSkinClusterFilter,MFn.kGeometryFilt,MFn.kDependencyNode),
+    'animCurveTA':(MFn.kAnimCurve,MFn.kDependencyNode),
+    'animCurveTL':(MFn.kAnimCurve,MFn.kDependencyNode),
+    'animCurveTU':(MFn.kAnimCurve,MFn.kDependencyNode),
+}
+
+class MSpace(object):
+    kInvalid = 0
+    kTransform = 1
+    kPreTransform = 2
+    kPostTransform = 3
+    kWorld = 4
+    kObject = kPreTransform
+
+class MObject(object):
+    """ノード、またはコンポーネントを指すオブジェクト
+    """
+
+    def __init__(self,node = None,*args,**kwargs):
+        if isinstance(node,MObject):
+            self._node = node._node
+            self._component = node._component
+        else:
+            self._node = node
+            self._component = None
+
+    def __eq__(self,other):
+        return (isinstance(other,MObject) and self._node is other._node and
+                self._component is other._component)
+
+    def __ne__(self,other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((id(self._node),id(self._component)))
+
+    def isNull(self,*args,**kwargs):
+        return self._node is None and self._component is None
+
+    def apiType(self,*args,**kwargs):
+        if self._component is not None:
+            return self._component['type']
+        if self._node is None:
+            return MFn.kInvalid
+        return _FN_TYPES.get(self._node.nodeType,(MFn.kDependencyNode,))[0]
+
+    def hasFn(self,fnType,*args,**kwargs):
+        if self._component is not None:
+            return fnType in (self._component['type'],MFn.kComponent,MFn.kSingleIndexedComponent)
+        if self._node is None:
+            return False
+        return fnType in _FN_TYPES.get(self._node.nodeType,(MFn.kDependencyNode,))
+
+class MObjectArray(list):
+    pass
+
+class _MatrixDataObject(MObject):
+    """MPlug.asMObjectで返す行列のデータ
+    """
+
+    def __init__(self,matrix,*args,**kwargs):
+        MObject.__init__(self)
+        self.matrix = matrix
+
+class MIntArray(array):
+    """intの配列 (array.arrayで保持する)
+    """
+
+    def __new__(cls,values = (),*args,**kwargs):
+        if np is not None and isinstance(values,np.ndarray):
+            values = values.astype(np.int32).tobytes()
+        return array.__new__(cls,'i',values)
+
+class MDoubleArray(array):
+    """doubleの配列 (array.arrayで保持する)
+    """
+
+    def __new__(cls,values = (),*args,**kwargs):
+        if np is not None and isinstance(values,np.ndarray):
+            values = values.astype(np.float64).tobytes()
+        return array.__new__(cls,'d',values)
+
+class MVector(object):
+    def __init__(self,x = 0.0,y = 0.0,z = 0.0,*args,**kwargs):
+        if isinstance(x,MVector):
+            x,y,z = x.x,x.y,x.z
+        self.x,self.y,self.z = float(x),float(y),float(z)
+
+    def __iter__(self):
+        return iter((self.x,self.y,self.z))
+
+class MFloatVector(MVector):
+    pass
+
+class MPoint(MVector):
+    def __init__(self,x = 0.0,y = 0.0,z = 0.0,w = 1.0,*args,**kwargs):
+        MVector.__init__(self,x,y,z)
+        self.w = float(w)
+
+    # Mayaと同じく、w成分を含めた4要素のシーケンスとして扱える
+    def __iter__(self):
+        return iter((self.x,self.y,self.z,self.w))
+
+    def __len__(self):
+        return 4
+
+    def __getitem__(self,i):
+        return (self.x,self.y,self.z,self.w)[i]
+
+    def distanceTo(self,other,*args,**kwargs):
+        return math.sqrt((self.x - other.x) ** 2 + (self.y - other.y) ** 2 + (self.z - other.z) ** 2)
+
+class MFloatPoint(MPoint):
+    pass
+
+class MPointArray(list):
+    pass
+
+def _eulerMatrix(x,y,z,*args,**kwargs):
+    """XYZの回転順のオイラー角[ラジアン]から、行ベクトル形式の3 x 3の回転行列を求める
+    """
+    cx,sx,cy,sy,cz,sz = math.cos(x),math.sin(x),math.cos(y),math.sin(y),math.cos(z),math.sin(z)
+    rx = np.array([[1.0,0.0,0.0],[0.0,cx,sx],[0.0,-sx,cx]])
+    ry = np.array([[cy,0.0,-sy],[0.0,1.0,0.0],[sy,0.0,cy]])
+    rz = np.array([[cz,sz,0.0],[-sz,cz,0.0],[0.0,0.0,1.0]])
+    return rx.dot(ry).dot(rz)
+
+def _localMatrix(node,*args,**kwargs):
+    """ノードのローカル行列(4 x 4)を求める
+    transformは [S][R][T]、jointは [S][R][JO][T] です。回転軸とピボットには対応していません。
+    """
+    attrs = node.attrs
+    matrix = np.identity(4)
+    rotation = _eulerMatrix(attrs['rotateX'],attrs['rotateY'],attrs['rotateZ'])
+    if 'jointOrientX' in attrs:
+        rotation = rotation.dot(_eulerMatrix(attrs['jointOrientX'],attrs['jointOrientY'],attrs['jointOrientZ']))
+    matrix[:3,:3] = np.diag([attrs['scaleX'],attrs['scaleY'],attrs['scaleZ']]).dot(rotation)
+    matrix[3,:3] = (attrs['translateX'],attrs['translateY'],attrs['translateZ'])
+    return matrix
+
+def _worldMatrix(node,*args,**kwargs):
+    """ノードのワールド行列(4 x 4)を求める
+    """
+    matrix = np.identity(4)
+    while node is not None:
+        if 'translateX' in node.attrs:
+            matrix = matrix.dot(_localMatrix(node))
+        node = node.parent
+    return matrix
+
+class MEulerRotation(object):
+    kXYZ = 0
+
+    def __init__(self,x = 0.0,y = 0.0,z = 0.0,order = 0,*args,**kwargs):
+        self.x,self.y,self.z = float(x),float(y),float(z)
+        self.order = order
+
+    def reorderIt(self,order,*args,**kwargs):
+        if order != MEulerRotation.kXYZ:
+            raise NotImplementedError('mayaStandin: XYZ以外の回転順には対応していません')
+        return self
+
+class MQuaternion(object):
+    """回転を表すクォータニオン
+    値は行ベクトル形式の3 x 3の回転行列で保持し、積は行列の積で求めます。
+    """
+
+    def __init__(self,matrix = None,*args,**kwargs):
+        self._rotation = np.identity(3) if matrix is None else np.asarray(matrix,dtype = np.float64)
+
+    def __mul__(self,other):
+        return MQuaternion(self._rotation.dot(other._rotation))
+
+    def inverse(self,*args,**kwargs):
+        return MQuaternion(self._rotation.T)
+
+    def asEulerRotation(self,*args,**kwargs):
+        m = self._rotation
+        return MEulerRotation(math.atan2(m[1,2],m[2,2]),
+                              math.asin(max(-1.0,min(1.0,-m[0,2]))),
+                              math.atan2(m[0,1],m[0,0]))
+
+class MMatrix(object):
+    """4 x 4の行列 (行ベクトル形式、平行移動は4行目)
+    """
+
+    def __init__(self,values = None,*args,**kwargs):
+        if isinstance(values,MMatrix):
+            values = values._matrix
+        self._matrix = np.identity(4) if values is None else np.array(values,dtype = np.float64).reshape(4,4)
+
+    def __mul__(self,other):
+        return MMatrix(self._matrix.dot(other._matrix))
+
+    def __len__(self):
+        return 16
+
+    def __iter__(self):
+        return iter(self._matrix.ravel().tolist())
+
+    def __getitem__(self,i):
+        return float(self._matrix.ravel()[i])
+
+    def inverse(self,*args,**kwargs):
+        return MMatrix(np.linalg.inv(self._matrix))
+
+    def det4x4(self,*args,**kwargs):
+        return float(np.linalg.det(self._matrix))
+
+    def getElement(self,row,column,*args,**kwargs):
+        return float(self._matrix[row,column])
+
+class MTransformationMatrix(object):
+    kXYZ = 1
+
+    def __init__(self,matrix = None,*args,**kwargs):
+        self._matrix = MMatrix(matrix)
+
+    def asMatrix(self,*args,**kwargs):
+        return MMatrix(self._matrix)
+
+    def rotation(self,asQuaternion = False,*args,**kwargs):
+        rotation = self._matrix._matrix[:3,:3]
+        rotation = rotation / np.linalg.norm(rotation,axis = 1)[:,None]
+        quaternion = MQuaternion(rotation)
+        return quaternion if asQuaternion else quaternion.asEulerRotation()
+
+class MFnMatrixData(object):
+    def __init__(self,obj = None,*args,**kwargs):
+        if not isinstance(obj,_MatrixDataObject):
+            raise RuntimeError('(kInvalidParameter): Object is incompatible with this method')
+        self._obj = obj
+
+    def matrix(self,*args,**kwargs):
+        return MMatrix(self._obj.matrix)
+
+class MAngle(object):
+    kInvalid = 0
+    kRadians = 1
+    kDegrees = 2
+    kAngMinutes = 3
+    kAngSeconds = 4
+    _toRadians = {kRadians:1.0,kDegrees:math.pi / 180.0,
+                  kAngMinutes:math.pi / 10800.0,kAngSeconds:math.pi / 648000.0}
+
+    def __init__(self,value = 0.0,unit = kRadians,*args,**kwargs):
+        self._radians = float(value) * self._toRadians[unit]
+
+    @staticmethod
+    def uiUnit(*args,**kwargs):
+        return MAngle.kDegrees
+
+    def asUnits(self,unit,*args,**kwargs):
+        return self._radians / self._toRadians[unit]
+
+    def asRadians(self,*args,**kwargs):
+        return self._radians
+
+    def asDegrees(self,*args,**kwargs):
+        return math.degrees(self._radians)
+
+class MDistance(object):
+    kCentimeters = 6
+
+    def __init__(self,value = 0.0,unit = kCentimeters,*args,**kwargs):
+        self._value = float(value)
+
+    @staticmethod
+    def uiUnit(*args,**kwargs):
+        return MDistance.kCentimeters
+
+    def asUnits(self,unit,*args,**kwargs):
+        return self._value
+
+    def asCentimeters(self,*args,**kwargs):
+        return self._value
+
+class MPlug(object):
+    """ノードのアトリビュートを指すプラグ
+    """
+
+    def __init__(self,node = None,attr = None,*args,**kwargs):
+        if isinstance(node,MPlug):
+            node,attr = node._node,node._attr
+        self._node = node
+        self._attr = attr
+
+    @property
+    def isNull(self):
+        return self._node is None
+
+    @property
+    def isLocked(self):
+        return False
+
+    @property
+    def isDestination(self):
+        return currentScene().source(self._node,self._attr) is not None
+
+    def node(self,*args,**kwargs):
+        return MObject(self._node)
+
+    def name(self,*args,**kwargs):
+        return '{}.{}'.format(self._node.name,self._attr)
+
+    def partialName(self,includeNodeName = False,*args,**kwargs):
+        name = self._attr
+        if name.startswith('weightList['):
+            name += '.weights'
+        if not kwargs.get('useLongNames',False):
+            shortNames = dict((long,short) for short,long in ATTR_ALIASES.items())
+            name = shortNames.get(name,name).replace('weightList','wl').replace('.weights','.w')
+        if includeNodeName:
+            return '{}.{}'.format(self._node.name,name)
+        return name
+
+    def source(self,*args,**kwargs):
+        source = currentScene().source(self._node,self._attr)
+        if source is None:
+            return MPlug()
+        return MPlug(*source)
+
+    def _value(self,*args,**kwargs):
+        return currentScene().getAttr(self._node,self._attr)
+
+    def asBool(self,*args,**kwargs):
+        return bool(self._value())
+
+    def asDouble(self,*args,**kwargs):
+        return float(self._value())
+
+    def asInt(self,*args,**kwargs):
+        return int(self._value())
+
+    def asMAngle(self,*args,**kwargs):
+        return MAngle(self._value())
+
+    def setBool(self,value,*args,**kwargs):
+        currentScene().setAttr(self._node,self._attr,bool(value))
+
+    def setDouble(self,value,*args,**kwargs):
+        currentScene().setAttr(self._node,self._attr,float(value))
+
+    def setMAngle(self,angle,*args,**kwargs):
+        currentScene().setAttr(self._node,self._attr,angle.asRadians())
+
+    def elementByLogicalIndex(self,index,*args,**kwargs):
+        return MPlug(self._node,'{}[{}]'.format(self._attr,index))
+
+    def asMObject(self,*args,**kwargs):
+        # skinClusterのbindPreMatrixだけに対応する
+        attr,_,index = self._attr.partition('[')
+        matrices = self._node.data.get(attr) if attr == 'bindPreMatrix' else None
+        if matrices is None or not index:
+            raise RuntimeError('mayaStandin: {} の値はMObjectとして取得できません'.format(self.name()))
+        matrix = matrices.get(int(index.rstrip(']')))
+        if matrix is None:
+            raise RuntimeError('(kInvalidParameter): {} に値がありません'.format(self.name()))
+        return _MatrixDataObject(matrix)
+
+class MDagPath(object):
+    """DAGノードのパス
+    """
+
+    def __init__(self,other = None,*args,**kwargs):
+        self._node = other._node if isinstance(other,MDagPath) else None
+
+    @classmethod
+    def _fromNode(cls,node,*args,**kwargs):
+        dagPath = cls()
+        dagPath._node = node
+        return dagPath
+
+    def node(self,*args,**kwargs):
+        return MObject(self._node)
+
+    def transform(self,*args,**kwargs):
+        node = self._node
+        if node is not None and node.nodeType in SHAPE_TYPES:
+            node = node.parent
+        return MObject(node)
+
+    def hasFn(self,fnType,*args,**kwargs):
+        return MObject(self._node).hasFn(fnType)
+
+    def apiType(self,*args,**kwargs):
+        return MObject(self._node).apiType()
+
+    @staticmethod
+    def getAPathTo(obj,*args,**kwargs):
+        return MDagPath._fromNode(obj._node)
+
+    def isValid(self,*args,**kwargs):
+        return self._node is not None and currentScene().nodes.get(self._node.name) is self._node
+
+    def length(self,*args,**kwargs):
+        length = 0
+        node = self._node
+        while node is not None:
+            length += 1
+            node = node.parent
+        return length
+
+    def pop(self,num = 1,*args,**kwargs):
+        for i in range(num):
+            if self._node is not None:
+                self._node = self._node.parent
+        return self
+
+    def extendToShape(self,*args,**kwargs):
+        shape = currentScene().shape(self._node)
+        if shape is None:
+            raise RuntimeError('{}: シェイプがありません'.format(self._node.name))
+        self._node = shape
+        return self
+
+    def fullPathName(self,*args,**kwargs):
+        if self._node is None:
+            return ''
+        return currentScene().fullPath(self._node)
+
+    def partialPathName(self,*args,**kwargs):
+        if self._node is None:
+            return ''
+        return self._node.name
+
+    def inclusiveMatrix(self,*args,**kwargs):
+        return MMatrix(_worldMatrix(self._node))
+
+    def exclusiveMatrixInverse(self,*args,**kwargs):
+        return MMatrix(np.linalg.inv(_worldMatrix(self._node.parent)))
+
+class MDagPathArray(list):
+    pass
+
+class MSelectionList(object):
+    """オブジェクトとコンポーネントのリスト
+    """
+
+    def __init__(self,other = None,*args,**kwargs):
+        self._items = list(other._items) if isinstance(other,MSelectionList) else []
+
+    def add(self,item,mergeWithExisting = False,*args,**kwargs):
+        scene = currentScene()
+        if isinstance(item,tuple):
+            dagPath,component = item
+            if component is not None and component.isNull():
+                component = None
+            return self._append(dagPath._node,component,mergeWithExisting)
+        if isinstance(item,MObject):
+            return self._append(item._node,None,mergeWithExisting)
+        if isinstance(item,MDagPath):
+            return self._append(item._node,None,mergeWithExisting)
+        parsed = _parseComponent(item)
+        if parsed is not None:
+            nodeName,componentType,indices = parsed
+            node = scene.findNode(nodeName)
+            if node is None:
+                raise RuntimeError('(kInvalidParameter): Object does not exist')
+            componentFn = MFnSingleIndexedComponent()
+            component = componentFn.create(MFn.kMeshVertComponent if componentType == 'vtx'
+                                           else MFn.kMeshPolygonComponent)
+            componentFn.addElements(indices)
+            self._items.append((node,component))
+            return self
+        node = scene.findNode(item.partition('.')[0])
+        if node is None:
+            raise RuntimeError('(kInvalidParameter): Object does not exist')
+        self._items.append((node,None))
+        return self
+
+    def _append(self,node,component,mergeWithExisting = False,*args,**kwargs):
+        """要素を追加する。mergeWithExistingの場合は、同じノード・同じ種類のコンポーネントにまとめる
+        """
+        if mergeWithExisting:
+            for i,(otherNode,otherComponent) in enumerate(self._items):
+                if otherNode is not node:
+                    continue
+                if component is None and otherComponent is None:
+                    return self
+                if (component is not None and otherComponent is not None and
+                    component._component['type'] == otherComponent._component['type']):
+                    rows = np.union1d(_componentRows(otherComponent),_componentRows(component))
+                    componentFn = MFnSingleIndexedComponent()
+                    merged = componentFn.create(component._component['type'])
+                    componentFn.addElements(rows.tolist())
+                    self._items[i] = (node,merged)
+                    return self
+        self._items.append((node,component))
+        return self
+
+    def getSelectionStrings(self,index = None,*args,**kwargs):
+        """要素の名前のリストを返す。コンポーネントは連続する番号を[開始:終了]にまとめる
+        """
+        items = self._items if index is None else [self._item(index)]
+        names = []
+        for node,component in items:
+            if component is None:
+                names.append(node.name)
+                continue
+            rows = np.unique(_componentRows(component))
+            if not len(rows):
+                continue
+            token = 'vtx' if component._component['type'] == MFn.kMeshVertComponent else 'f'
+            breaks = np.flatnonzero(np.diff(rows) != 1)
+            starts = np.concatenate(([rows[0]],rows[breaks + 1]))
+            ends = np.concatenate((rows[breaks],[rows[-1]]))
+            for start,end in zip(starts.tolist(),ends.tolist()):
+                names.append('{}.{}[{}]'.format(node.name,token,start if start == end else '{}:{}'.format(start,end)))
+        return names
+
+    def length(self,*args,**kwargs):
+        return len(self._items)
+
+    def isEmpty(self,*args,**kwargs):
+        return not self._items
+
+    def clear(self,*args,**kwargs):
+        self._items = []
+        return self
+
+    def _item(self,index,*args,**kwargs):
+        if not 0 <= index < len(self._items):
+            raise IndexError('selection list index out of range')
+        return self._items[index]
+
+    def getDependNode(self,index,*args,**kwargs):
+        return MObject(self._item(index)[0])
+
+    def getDagPath(self,index,*args,**kwargs):
+        node = self._item(index)[0]
+        if not node.isDag:
+            raise TypeError('{} はDAGノードではありません'.format(node.name))
+        return MDagPath._fromNode(node)
+
+    def getComponent(self,index,*args,**kwargs):
+        node,component = self._item(index)
+        if not node.isDag:
+            raise TypeError('{} はDAGノードではありません'.format(node.name))
+        return MDagPath._fromNode(node),component if component is not None else MObject()
+
+class MFnBase(object):
+    """関数セットの基底クラス
+    """
+
+    def __init__(self,obj = None,*args,**kwargs):
+        self._node = None
+        self._dagPath = None
+        if obj is not None:
+            self.setObject(obj)
+
+    def setObject(self,obj,*args,**kwargs):
+        if isinstance(obj,MDagPath):
+            self._dagPath = MDagPath(obj)
+            self._node = obj._node
+        else:
+            self._node = obj._node
+        if self._node is None:
+            raise RuntimeError('(kInvalidParameter): Object is incompatible with this method')
+        return self
+
+    def object(self,*args,**kwargs):
+        return MObject(self._node)
+
+class MFnDependencyNode(MFnBase):
+    def name(self,*args,**kwargs):
+        return self._node.name
+
+    def typeName(self,*args,**kwargs):
+        return self._node.nodeType
+
+    def hasAttribute(self,attr,*args,**kwargs):
+        return currentScene().hasAttr(self._node,attr)
+
+    def findPlug(self,attr,wantNetworkedPlug = False,*args,**kwargs):
+        if not self.hasAttribute(attr):
+            raise RuntimeError('(kInvalidParameter): No attribute {}.{}'.format(self._node.name,attr))
+        return MPlug(self._node,_longAttr(attr))
+
+    def setDoNotWrite(self,flag,*args,**kwargs):
+        self._node.doNotWrite = bool(flag)
+        return self
+
+    def canBeWritten(self,*args,**kwargs):
+        return currentScene().isWritable(self._node)
+
+class MFnDagNode(MFnDependencyNode):
+    def fullPathName(self,*args,**kwargs):
+        return currentScene().fullPath(self._node)
+
+    def partialPathName(self,*args,**kwargs):
+        return self._node.name
+
+    def getPath(self,*args,**kwargs):
+        return MDagPath._fromNode(self._node)
+
+class MFnTransform(MFnDagNode):
+    def rotation(self,space = MSpace.kTransform,asQuaternion = False,*args,**kwargs):
+        attrs = self._node.attrs
+        if asQuaternion:
+            return MQuaternion(_eulerMatrix(attrs['rotateX'],attrs['rotateY'],attrs['rotateZ']))
+        return MEulerRotation(attrs['rotateX'],attrs['rotateY'],attrs['rotateZ'])
+
+    def rotateOrientation(self,space = MSpace.kTransform,*args,**kwargs):
+        # 回転軸(rotateAxis)はモデル化していないので、常に回転なし
+        return MQuaternion()
+
+    def rotationOrder(self,*args,**kwargs):
+        return MTransformationMatrix.kXYZ
+
+    def transformation(self,*args,**kwargs):
+        return MTransformationMatrix(_localMatrix(self._node))
+
+    def setTransformation(self,transformation,*args,**kwargs):
+        # 行列を平行移動・XYZの回転順の回転・スケールに分解して設定する (シアーは扱わない)
+        scene = currentScene()
+        matrix = transformation._matrix._matrix
+        rotation = transformation.rotation()
+        values = zip(('translateX','translateY','translateZ','rotateX','rotateY','rotateZ','scaleX','scaleY','scaleZ'),
+                     list(matrix[3,:3]) + [rotation.x,rotation.y,rotation.z] +
+                     list(np.linalg.norm(matrix[:3,:3],axis = 1)))
+        for attr,value in values:
+            scene.setAttr(self._node,attr,float(value))
+        return self
+
+    def setRotation(self,rotation,space = MSpace.kTransform,*args,**kwargs):
+        scene = currentScene()
+        for attr,value in zip(('rotateX','rotateY','rotateZ'),(rotation.x,rotation.y,rotation.z)):
+            scene.setAttr(self._node,attr,value)
+        return self
+
+    def translation(self,space = MSpace.kTransform,*args,**kwargs):
+        attrs = self._node.attrs
+        return MVector(attrs['translateX'],attrs['translateY'],attrs['translateZ'])
+
+    def scale(self,*args,**kwargs):
+        attrs = self._node.attrs
+        return [attrs['scaleX'],attrs['scaleY'],attrs['scaleZ']]
+
+class MFnMesh(MFnDagNode):
+    def setObject(self,obj,*args,**kwargs):
+        MFnDagNode.setObject(self,obj)
+        shape = currentScene().shape(self._node)
+        if shape is None:
+            raise RuntimeError('(kInvalidParameter): Object is incompatible with this method')
+        self._node = shape
+        return self
+
+    @property
+    def numVertices(self):
+        return len(self._node.data['points'])
+
+    @property
+    def numEdges(self):
+        return self._node.data['edgeCount']
+
+    @property
+    def numPolygons(self):
+        return len(self._node.data['counts'])
+
+    def getPoints(self,space = MSpace.kObject,*args,**kwargs):
+        return MPointArray(MPoint(*point) for point in self._node.data['points'].tolist())
+
+    def getVertices(self,*args,**kwargs):
+        return MIntArray(self._node.data['counts']),MIntArray(self._node.data['connects'])
+
+    def setPoints(self,points,space = MSpace.kObject,*args,**kwargs):
+        values = [(point.x,point.y,point.z) if isinstance(point,MVector) else tuple(point)[:3] for point in points]
+        if len(values) != len(self._node.data['points']):
+            raise RuntimeError('(kInvalidParameter): 頂点数が一致しません')
+        self._node.data['points'] = np.array(values,dtype = np.float64).reshape(-1,3)
+        return self
+
+    def copy(self,source,parent = None,*args,**kwargs):
+        # parentを指定しない場合はトランスフォームを作成して、そのMObjectを返す
+        scene = currentScene()
+        sourceShape = scene.shape(source._node)
+        transform = parent._node if parent is not None and not parent.isNull() else None
+        created = transform is None
+        if created:
+            transform = scene.createNode('transform',name = 'polySurface1')
+        shape = scene.createNode('mesh',name = 'polySurfaceShape1',parent = transform)
+        shape.data.update({'points':sourceShape.data['points'].copy(),
+                           'counts':sourceShape.data['counts'].copy(),
+                           'connects':sourceShape.data['connects'].copy(),
+                           'edgeCount':sourceShape.data['edgeCount']})
+        self._node = shape
+        return MObject(transform if created else shape)
+
+    def getPoint(self,vertex,space = MSpace.kObject,*args,**kwargs):
+        return MPoint(*self._node.data['points'][vertex].tolist())
+
+    def getPolygonVertices(self,polygon,*args,**kwargs):
+        data = self._node.data
+        start = int(data['counts'][:polygon].sum())
+        return MIntArray(data['connects'][start:start + int(data['counts'][polygon])].tolist())
+
+    def _triangles(self,*args,**kwargs):
+        """フェースを扇形に分割した三角形の頂点番号と、元のフェース番号を返す
+        """
+        data = self._node.data
+        cached = data.get('_triangles')
+        if cached is not None and cached[0] is data['connects']:
+            return cached[1],cached[2]
+        counts = np.asarray(data['counts'],dtype = np.int64)
+        connects = np.asarray(data['connects'],dtype = np.int64)
+        offsets = np.concatenate(([0],np.cumsum(counts)[:-1]))
+        triangleCounts = counts - 2
+        faces = np.repeat(np.arange(len(counts)),triangleCounts)
+        local = np.arange(triangleCounts.sum()) - np.repeat(np.cumsum(triangleCounts) - triangleCounts,triangleCounts)
+        base = offsets[faces]
+        triangles = np.column_stack((connects[base],connects[base + local + 1],connects[base + local + 2]))
+        data['_triangles'] = (data['connects'],triangles,faces)
+        return triangles,faces
+
+    def closestIntersection(self,raySource,rayDirection,space,maxParam,testBothDirections,*args,**kwargs):
+        points = self._node.data['points']
+        triangles,faces = self._triangles()
+        source = np.array((raySource.x,raySource.y,raySource.z))
+        direction = np.array((rayDirection.x,rayDirection.y,rayDirection.z))
+        p0,p1,p2 = points[triangles[:,0]],points[triangles[:,1]],points[triangles[:,2]]
+        # Moller-Trumboreの交差判定を全三角形でまとめて行う
+        edge1 = p1 - p0
+        edge2 = p2 - p0
+        pvec = np.cross(direction,edge2)
+        det = (edge1 * pvec).sum(axis = 1)
+        valid = np.abs(det) > 1.0e-12
+        inverse = np.divide(1.0,det,out = np.zeros_like(det),where = valid)
+        tvec = source - p0
+        u = (tvec * pvec).sum(axis = 1) * inverse
+        qvec = np.cross(tvec,edge1)
+        v = (qvec * direction).sum(axis = 1) * inverse
+        t = (edge2 * qvec).sum(axis = 1) * inverse
+        hit = valid & (u >= 0.0) & (v >= 0.0) & (u + v <= 1.0) & (np.abs(t) <= maxParam)
+        if not testBothDirections:
+            hit &= t >= 0.0
+        if not hit.any():
+            return MFloatPoint(),0.0,-1,-1,0.0,0.0
+        candidates = np.flatnonzero(hit)
+        best = candidates[np.abs(t[candidates]).argmin()]
+        hitPoint = source + direction * t[best]
+        return (MFloatPoint(*hitPoint.tolist()),float(t[best]),int(faces[best]),int(best),
+                float(u[best]),float(v[best]))
+
+class MFnSingleIndexedComponent(object):
+    """頂点などの1つの番号で指定するコンポーネント
+    """
+
+    def __init__(self,component = None,*args,**kwargs):
+        self._component = component._component if component is not None else None
+
+    def create(self,componentType,*args,**kwargs):
+        obj = MObject()
+        obj._component = {'type':componentType,'elements':[],'complete':None}
+        self._component = obj._component
+        return obj
+
+    def addElements(self,elements,*args,**kwargs):
+        self._component['elements'].extend(int(element) for element in elements)
+        return self
+
+    def addElement(self,element,*args,**kwargs):
+        self._component['elements'].append(int(element))
+        return self
+
+    def setCompleteData(self,count,*args,**kwargs):
+        self._component['complete'] = int(count)
+        return self
+
+    def isComplete(self,*args,**kwargs):
+        return self._component['complete'] is not None
+
+    @property
+    def elementCount(self):
+        if self._component['complete'] is not None:
+            return self._component['complete']
+        return len(self._component['elements'])
+
+    def getElements(self,*args,**kwargs):
+        if self._component['complete'] is not None:
+            return MIntArray(range(self._component['complete']))
+        return MIntArray(self._component['elements'])
+
+def _componentRows(component,*args,**kwargs):
+    """コンポーネントの頂点番号の配列を返す
+    """
+    data = component._component
+    if data['complete'] is not None:
+        return np.arange(data['complete'])
+    return np.asarray(data['elements'],dtype = np.int64)
+
+class MGlobal(object):
+    kReplaceList = 0
+    kXORWithList = 1
+    kAddToList = 2
+    kRemoveFromList = 3
+    kAddToHeadOfList = 4
+
+    @staticmethod
+    def getActiveSelectionList(*args,**kwargs):
+        selList = MSelectionList()
+        for name in currentScene().selection:
+            selList.add(name)
+        return selList
+
+    @staticmethod
+    def setActiveSelectionList(selList,listAdjustment = 0,*args,**kwargs):
+        scene = currentScene()
+        names = selList.getSelectionStrings()
+        if listAdjustment == MGlobal.kReplaceList:
+            scene.selection = names
+        elif listAdjustment == MGlobal.kAddToList:
+            scene.selection.extend(name for name in names if not name in scene.selection)
+        else:
+            raise NotImplementedError('mayaStandin: setActiveSelectionList は kReplaceList, kAddToList だけに対応しています')
+
+    @staticmethod
+    def displayInfo(message,*args,**kwargs):
+        currentScene().message('Info',message)
+
+    @staticmethod
+    def displayWarning(message,*args,**kwargs):
+        currentScene().message('Warning',message)
+
+    @staticmethod
+    def displayError(message,*args,**kwargs):
+        currentScene().message('Error',message)
+
+class MMessage(object):
+    @staticmethod
+    def removeCallback(callbackId,*args,**kwargs):
+        currentScene().removeCallback(callbackId)
+
+    @staticmethod
+    def removeCallbacks(callbackIds,*args,**kwargs):
+        for callbackId in callbackIds:
+            currentScene().removeCallback(callbackId)
+
+class MDGMessage(MMessage):
+    @staticmethod
+    def addConnectionCallback(func,clientData = None,*args,**kwargs):
+        return currentScene().addCallback('connection',func,clientData)
+
+    @staticmethod
+    def addNodeRemovedCallback(func,nodeType = 'dependNode',clientData = None,*args,**kwargs):
+        return currentScene().addCallback('nodeRemoved',func,clientData)
+
+class MNodeMessage(MMessage):
+    kConnectionMade = 0x01
+    kConnectionBroken = 0x02
+    kAttributeEval = 0x04
+    kAttributeSet = 0x08
+    kAttributeLocked = 0x10
+    kAttributeUnlocked = 0x20
+    kAttributeAdded = 0x40
+    kAttributeRemoved = 0x80
+    kAttributeRenamed = 0x100
+    kIncomingDirection = 0x800
+    kOtherPlugSet = 0x4000
+
+    @staticmethod
+    def addAttributeChangedCallback(obj,func,clientData = None,*args,**kwargs):
+        return currentScene().addCallback('attributeChanged',func,clientData,node = obj._node)
+
+    @staticmethod
+    def addNameChangedCallback(obj,func,clientData = None,*args,**kwargs):
+        return currentScene().addCallback('nameChanged',func,clientData,node = obj._node)
+
+class MSceneMessage(MMessage):
+    # file -new / -open / -saveの前だけに対応する
+    kBeforeNew = 1
+    kBeforeOpen = 5
+    kBeforeSave = 9
+    kBeforeExport = 11
+
+    @staticmethod
+    def addCallback(message,func,clientData = None,*args,**kwargs):
+        return currentScene().addCallback(('sceneMessage',message),func,clientData)
+
+class MDGModifier(object):
+    """プラグへの書き込みをまとめて実行する
+    """
+
+    def __init__(self,*args,**kwargs):
+        self._operations = []
+
+    def newPlugValueMAngle(self,plug,angle,*args,**kwargs):
+        self._operations.append((plug,angle.asRadians()))
+        return self
+
+    def newPlugValueMDistance(self,plug,distance,*args,**kwargs):
+        self._operations.append((plug,distance.asCentimeters()))
+        return self
+
+    def newPlugValueDouble(self,plug,value,*args,**kwargs):
+        self._operations.append((plug,float(value)))
+        return self
+
+    def newPlugValueBool(self,plug,value,*args,**kwargs):
+        self._operations.append((plug,bool(value)))
+        return self
+
+    def doIt(self,*args,**kwargs):
+        scene = currentScene()
+        self._previous = [(plug,scene.getAttr(plug._node,plug._attr)) for plug,value in self._operations]
+        for plug,value in self._operations:
+            scene.setAttr(plug._node,plug._attr,value)
+        return self
+
+    def undoIt(self,*args,**kwargs):
+        scene = currentScene()
+        for plug,value in reversed(getattr(self,'_previous',[])):
+            scene.setAttr(plug._node,plug._attr,value)
+        return self
+
+class MDagModifier(MDGModifier):
+    """DAGノードの作成・名前の変更・削除とプラグへの書き込みをまとめて実行する
+    作成したノードは、doItを呼び出すまでシーンに追加しません。undoItはプラグへの書き込みだけを戻します。
+    """
+
+    def __init__(self,*args,**kwargs):
+        MDGModifier.__init__(self)
+        self._nodeOperations = []
+
+    def createNode(self,typeName,parent = None,*args,**kwargs):
+        parentNode = parent._node if parent is not None else None
+        node = Node(None,typeName,parent = parentNode)
+        self._nodeOperations.append(('create',node,None))
+        return MObject(node)
+
+    def renameNode(self,obj,newName,*args,**kwargs):
+        self._nodeOperations.append(('rename',obj._node,newName))
+        return self
+
+    def deleteNode(self,obj,*args,**kwargs):
+        self._nodeOperations.append(('delete',obj._node,None))
+        return self
+
+    def doIt(self,*args,**kwargs):
+        scene = currentScene()
+        names = {}
+        for operation,node,value in self._nodeOperations:
+            if operation == 'create':
+                node.name = names.get(node,node.name)
+                scene.addNode(node)
+            elif operation == 'rename' and not node.name in scene.nodes:
+                # 作成前のノードは、作成するときの名前にする
+                names[node] = value
+            elif operation == 'rename':
+                scene.rename(node,value)
+            elif scene.nodes.get(node.name) is node:
+                scene.deleteNode(node)
+        self._nodeOperations = []
+        return MDGModifier.doIt(self)
+
+class MFnSet(MFnDependencyNode):
+    """シェーディンググループへの割り当てだけに対応する
+    割り当てはメンバーのNode.data['shadingGroup']にシェーディンググループの名前で記録します。
+    """
+
+    def addMember(self,member,*args,**kwargs):
+        member._node.data['shadingGroup'] = self._node.name
+        currentScene().modified = True
+        return self
+
+    def isMember(self,member,*args,**kwargs):
+        return member._node.data.get('shadingGroup') == self._node.name
+
+class MArgList(object):
+    """コマンドの引数 (引数には対応していない)
+    """
+
+    def __len__(self):
+        return 0
+
+class MPxCommand(object):
+    """プラグインのコマンドの基底クラス
+    """
+
+    def __init__(self,*args,**kwargs):
+        pass
+
+    def isUndoable(self,*args,**kwargs):
+        return False
+
+    def doIt(self,argList,*args,**kwargs):
+        pass
+
+    def undoIt(self,*args,**kwargs):
+        pass
+
+    def redoIt(self,*args,**kwargs):
+        pass
+
+class MFnPlugin(object):
+    """プラグインのコマンドをmaya.cmdsに登録する
+    """
+
+    def __init__(self,obj = None,vendor = '',version = '',*args,**kwargs):
+        pass
+
+    def registerCommand(self,name,creator,*args,**kwargs):
+        cmds = sys.modules.get('maya.cmds')
+        if cmds is None or hasattr(cmds,name):
+            raise RuntimeError('(kFailure): コマンド {} を登録できません'.format(name))
+        setattr(cmds,name,_countedCall('cmds.' + name,_createPluginCommand(creator)))
+
+    def deregisterCommand(self,name,*args,**kwargs):
+        cmds = sys.modules.get('maya.cmds')
+        if cmds is not None and hasattr(cmds,name):
+            delattr(cmds,name)
+
+def _createPluginCommand(creator,*args,**kwargs):
+    """プラグインのコマンドを実行する関数を作成する
+    undoできるコマンドは、doItの後にundoキューに積みます。
+    """
+    def command(*args,**kwargs):
+        instance = creator()
+        instance.doIt(MArgList())
+        if instance.isUndoable():
+            currentScene().recordUndo(instance.undoIt,instance.redoIt)
+    return command
+
+def _loadSource(name,path,*args,**kwargs):
+    """ファイルをモジュールとして読み込む (Mayaがプラグインのファイルを読み込むのに相当)
+    """
+    try:
+        import importlib.util
+    except ImportError:
+        import imp
+        return imp.load_source(name,path)
+    spec = importlib.util.spec_from_file_location(name,path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def _pluginName(path,*args,**kwargs):
+    """プラグインのパスからプラグイン名を返す
+    """
+    return os.path.splitext(os.path.basename(path))[0]
+
+# maya.api.OpenMayaに登録する名前
+OPEN_MAYA_NAMES = ('MFn','MSpace','MObject','MObjectArray','MIntArray','MDoubleArray','MVector',
+                   'MFloatVector','MPoint','MFloatPoint','MPointArray','MEulerRotation','MAngle','MDistance','MPlug','MDagPath',
+                   'MDagPathArray','MSelectionList','MFnBase','MFnDependencyNode','MFnDagNode',
+                   'MFnTransform','MFnMesh','MFnSingleIndexedComponent','MGlobal','MMessage',
+                   'MDGMessage','MNodeMessage','MDGModifier','MArgList','MPxCommand','MFnPlugin',
+                   'MQuaternion','MMatrix','MTransformationMatrix','MFnMatrixData',
+                   'MSceneMessage','MDagModifier','MFnSet')
+
+# ------------------------------------------------------------------------------
+# maya.api.OpenMayaAnim
+class MFnSkinCluster(MFnDependencyNode):
+    def setObject(self,obj,*args,**kwargs):
+        MFnDependencyNode.setObject(self,obj)
+        if self._node.nodeType != 'skinCluster':
+            raise RuntimeError('(kInvalidParameter): Object is incompatible with this method')
+        return self
+
+    def findPlug(self,attr,wantNetworkedPlug = False,*args,**kwargs):
+        if attr == 'bindPreMatrix':
+            return MPlug(self._node,attr)
+        return MFnDependencyNode.findPlug(self,attr,wantNetworkedPlug)
+
+    def influenceObjects(self,*args,**kwargs):
+        return MDagPathArray(MDagPath._fromNode(node) for node in self._node.data['influences'])
+
+    def indexForInfluenceObject(self,dagPath,*args,**kwargs):
+        return self._node.data['influences'].index(dagPath._node)
+
+    def indexForOutputConnection(self,connectionIndex,*args,**kwargs):
+        if connectionIndex != 0:
+            raise RuntimeError('(kInvalidParameter): Index not found')
+        return 0
+
+    def getPathAtIndex(self,index,*args,**kwargs):
+        if index != 0:
+            raise RuntimeError('(kInvalidParameter): Index not found')
+        return MDagPath._fromNode(self._node.data['geometry'])
+
+    def getInputGeometry(self,*args,**kwargs):
+        return MObjectArray([MObject(self._node.data['geometry'])])
+
+    def getOutputGeometry(self,*args,**kwargs):
+        return MObjectArray([MObject(self._node.data['geometry'])])
+
+    def getWeights(self,shape,components,influence = None,*args,**kwargs):
+        weights = self._node.data['weights']
+        rows = _componentRows(components)
+        if influence is None:
+            return MDoubleArray(weights[rows]),weights.shape[1]
+        if isinstance(influence,int):
+            return MDoubleArray(weights[rows,influence])
+        return MDoubleArray(weights[np.ix_(rows,np.asarray(influence,dtype = np.int64))])
+
+    def setWeights(self,shape,components,influences,values,normalize = True,returnOldWeights = False,*args,**kwargs):
+        weights = self._node.data['weights']
+        rows = _componentRows(components)
+        columns = np.asarray(influences,dtype = np.int64)
+        values = np.asarray(values,dtype = np.float64).reshape(len(rows),len(columns))
+        oldWeights = weights[np.ix_(rows,columns)] if returnOldWeights else None
+        weights[np.ix_(rows,columns)] = values
+        if normalize:
+            others = np.ones(weights.shape[1],dtype = bool)
+            others[columns] = False
+            remainder = np.clip(1.0 - values.sum(axis = 1),0.0,1.0)
+            otherWeights = weights[rows][:,others]
+            total = otherWeights.sum(axis = 1)
+            scale = np.divide(remainder,total,out = np.zeros_like(total),where = total > 0.0)
+            weights[np.ix_(rows,np.flatnonzero(others))] = otherWeights * scale[:,None]
+        currentScene().attributeChanged(self._node,['weightList[{}]'.format(row) for row in rows.tolist()])
+        if returnOldWeights:
+            return MDoubleArray(oldWeights)
+        return None
+
+class MFnIkJoint(MFnTransform):
+    def setObject(self,obj,*args,**kwargs):
+        MFnTransform.setObject(self,obj)
+        if self._node.nodeType != 'joint':
+            raise RuntimeError('(kInvalidParameter): Object is incompatible with this method')
+        return self
+
+    def orientation(self,*args,**kwargs):
+        attrs = self._node.attrs
+        return MQuaternion(_eulerMatrix(attrs['jointOrientX'],attrs['jointOrientY'],attrs['jointOrientZ']))
+
+# maya.api.OpenMayaAnimに登録する名前
+OPEN_MAYA_ANIM_NAMES = ('MFnSkinCluster','MFnIkJoint')
+
+# ------------------------------------------------------------------------------
+# maya.api.OpenMayaUI
+class M3dView(object):
+    """アクティブなビュー
+    Y軸の上から見下ろす平行投影のビューとして、ビューの位置とワールドの位置を変換します。
+    """
+
+    @staticmethod
+    def active3dView(*args,**kwargs):
+        return M3dView()
+
+    def portWidth(self,*args,**kwargs):
+        return VIEW_PORT_SIZE[0]
+
+    def portHeight(self,*args,**kwargs):
+        return VIEW_PORT_SIZE[1]
+
+    def viewToWorld(self,x,y,*args,**kwargs):
+        width,height = VIEW_PORT_SIZE
+        scale = VIEW_WORLD_WIDTH / width
+        return (MPoint((x - width * 0.5) * scale,1000.0,-(y - height * 0.5) * scale),
+                MVector(0.0,-1.0,0.0))
+
+    def worldToView(self,point,*args,**kwargs):
+        width,height = VIEW_PORT_SIZE
+        scale = VIEW_WORLD_WIDTH / width
+        x = int(round(point.x / scale + width * 0.5))
+        y = int(round(-point.z / scale + height * 0.5))
+        return x,y,0 <= x < width and 0 <= y < height
+
+OPEN_MAYA_UI_NAMES = ('M3dView',)
+
+# ------------------------------------------------------------------------------
+# maya.common.ui
+class LayoutManager(object):
+    """withブロックを抜けたときに、親のレイアウトに戻す
+    """
+
+    def __init__(self,name,*args,**kwargs):
+        self.name = name
+
+    def __enter__(self):
+        return self.name
+
+    def __exit__(self,excType,excValue,excTraceback):
+        currentScene().ui.setParent('..')
+
+# ------------------------------------------------------------------------------
+# install
+def _countedCall(name,func,*args,**kwargs):
+    """呼び出し回数を数える関数を作成する
+    """
+    def wrapper(*args,**kwargs):
+        _callCounts[name] += 1
+        return func(*args,**kwargs)
+    wrapper.__name__ = func.__name__
+    return wrapper
+
+def _createModules(*args,**kwargs):
+    """maya以下の代用品のモジュールを作成する
+
+    Returns:
+        dict: モジュール名 → モジュール
+    """
+    modules = dict((name,types.ModuleType(name)) for name in MODULE_NAMES)
+    for module in modules.values():
+        module.__standin__ = True
+
+    cmds = modules['maya.cmds']
+    commands = Commands()
+    for name in dir(Commands):
+        if name.startswith('_'):
+            continue
+        setattr(cmds,name,_countedCall('cmds.' + name,getattr(commands,name)))
+    for uiType in UI_TYPES + ('textField',):
+        setattr(cmds,uiType,_countedCall('cmds.' + uiType,_createUiCommand(uiType)))
+
+    modules['maya.mel'].eval = _countedCall('mel.eval',Mel.eval)
+    for name in OPEN_MAYA_NAMES:
+        setattr(modules['maya.api.OpenMaya'],name,globals()[name])
+    modules['maya.api.OpenMaya'].maya_useNewAPI = True
+    for name in OPEN_MAYA_ANIM_NAMES:
+        setattr(modules['maya.api.OpenMayaAnim'],name,globals()[name])
+    for name in OPEN_MAYA_UI_NAMES:
+        setattr(modules['maya.api.OpenMayaUI'],name,globals()[name])
+    modules['maya.common.ui'].LayoutManager = LayoutManager
+
+    for name,module in modules.items():
+        parent,_,child = name.rpartition('.')
+        if parent:
+            setattr(modules[parent],child,module)
+    return modules
+
+def isInstalled(*args,**kwargs):
+    """代用品がsys.modulesに登録されているかどうかを判定する
+    """
+    return _installed and getattr(sys.modules.get('maya'),'__standin__',False)
+
+def install(*args,**kwargs):
+    """代用品をmaya以下のモジュールとしてsys.modulesに登録する
+    Toolのモジュールは、この関数を呼び出した後に読み込んでください。
+
+    Returns:
+        Scene: 現在のシーン
+
+    Raises:
+        RuntimeError: 本物のMayaのモジュールが既に読み込まれている場合
+    """
+    global _installed
+    if isInstalled():
+        return currentScene()
+    maya = sys.modules.get('maya')
+    if maya is not None and not getattr(maya,'__standin__',False):
+        raise RuntimeError('本物のMayaのモジュールが読み込まれているため、代用品を登録できません。')
+    sys.modules.update(_createModules())
+    _installed = True
+    return currentScene()
+
+def uninstall(*args,**kwargs):
+    """代用品をsys.modulesから取り除く
+    代用品を読み込んだモジュールは、引き続き代用品を参照します。
+
+    Returns:
+        None
+    """
+    global _installed
+    for name in MODULE_NAMES:
+        module = sys.modules.get(name)
+        if module is not None and getattr(module,'__standin__',False):
+            del sys.modules[name]
+    _installed = False
+
+# ------------------------------------------------------------------------------
+# synthetic rig
+def createGridMesh(scene,name,divisions,size = 20.0,*args,**kwargs):
+    """XZ平面のグリッドのメッシュを作成する
+    X軸について左右対称な形状です。
+
+    Args:
+        scene (Scene): シーン
+        name (str): トランスフォームの名前
+        divisions (int): 1辺の分割数
+        size (float): 1辺の長さ
+
+    Returns:
+        Node: メッシュのシェイプ
+    """
+    side = divisions + 1
+    coordinates = np.linspace(-size * 0.5,size * 0.5,side)
+    x,z = np.meshgrid(coordinates,coordinates)
+    points = np.column_stack((x.ravel(),np.zeros(side * side),z.ravel()))
+
+    corner = (np.arange(divisions)[:,None] * side + np.arange(divisions)[None,:]).ravel()
+    connects = np.column_stack((corner,corner + 1,corner + side + 1,corner + side)).astype(np.int32)
+
+    transform = scene.createNode('transform',name = name)
+    shape = scene.createNode('mesh',name = name + 'Shape',parent = transform)
+    shape.data.update({'points':points,
+                       'counts':np.full(divisions * divisions,4,dtype = np.int32),
+                       'connects':connects.ravel(),
+                       'edgeCount':2 * divisions * side})
+    return shape
+
+def createSyntheticRig(influenceCount = 100,skinClusterCount = 2,meshDivisions = 40,maxInfluences = 4,
+                       keyedRatio = 0.1,lockedRatio = 0.05,noiseInfluences = 2,seed = 0,scene = None,*args,**kwargs):
+    """合成したリグを作成する
+    X軸について左右対称に並べたジョイント(L_/R_の対)と、それにバインドしたグリッドのメッシュを作成し、
+    ウエイトペイントモードToolでペイントできる状態にします。
+    ウエイトは近いジョイントからmaxInfluences個を距離で重み付けし、刈り込みの対象になる
+    小さなウエイトをnoiseInfluences個加えます。
+    一部のインフルエンスのliwには、キーを振る、またはロックします。
+
+    cmdsを使わずにシーンへ直接作成するので、呼び出し回数には数えません。
+
+    Args:
+        influenceCount (int): インフルエンスの数
+        skinClusterCount (int): skinClusterの数 (メッシュごとに1つ)
+        meshDivisions (int): メッシュの1辺の分割数
+        maxInfluences (int): 1頂点あたりのインフルエンス数 (小さなウエイトを除く)
+        keyedRatio (float): liwにキーを振るインフルエンスの割合
+        lockedRatio (float): liwをロックするインフルエンスの割合
+        noiseInfluences (int): 1頂点あたりに加える小さなウエイトの数
+        seed (int): 乱数のシード
+        scene (Scene): シーン。Noneの場合は現在のシーン
+
+    Returns:
+        dict: 作成したリグ (joints: ジョイント名のリスト, meshes: メッシュ名のリスト,
+              skinClusters: skinCluster名のリスト, keyed: liwにキーを振ったインフルエンスのリスト,
+              locked: liwをロックしたインフルエンスのリスト)
+    """
+    scene = scene or currentScene()
+    rng = np.random.RandomState(seed)
+
+    joints = []
+    positions = []
+    root = scene.createNode('joint',name = 'C_root_jnt')
+    joints.append(root)
+    positions.append((0.0,0.0))
+    pairCount = (influenceCount - 1) // 2
+    for i in range(pairCount):
+        x,z = rng.uniform(0.2,10.0),rng.uniform(-10.0,10.0)
+        rotation = rng.uniform(-0.5,0.5,3)
+        # 直前の対につなげて鎖を作り、ときどきルートから枝分かれさせる
+        chained = i and rng.rand() < 0.8
+        for prefix,sign in (('L',1.0),('R',-1.0)):
+            parent = joints[-2] if chained else root
+            joint = scene.createNode('joint',name = '{}_bone{}_jnt'.format(prefix,i),parent = parent)
+            joint.attrs.update({'translateX':sign * x,'translateZ':z,
+                                'rotateX':rotation[0],'rotateY':sign * rotation[1],'rotateZ':sign * rotation[2]})
+            joints.append(joint)
+            positions.append((sign * x,z))
+    for i in range(influenceCount - len(joints)):
+        joint = scene.createNode('joint',name = 'C_spine{}_jnt'.format(i),parent = root)
+        z = rng.uniform(-10.0,10.0)
+        joint.attrs['translateZ'] = z
+        joints.append(joint)
+        positions.append((0.0,z))
+    positions = np.asarray(positions)
+
+    meshes = []
+    skinClusters = []
+    keep = min(maxInfluences,len(joints))
+    for i in range(skinClusterCount):
+        shape = createGridMesh(scene,'body{}'.format(i),meshDivisions)
+        points = shape.data['points'][:,[0,2]]
+        vertexCount = len(points)
+        weights = np.zeros((vertexCount,len(joints)),dtype = np.float64)
+        rows = np.arange(vertexCount)[:,None]
+        # 頂点の範囲ごとに近いジョイントを探す (頂点数 x ジョイント数の距離を一度に作らない)
+        for start in range(0,vertexCount,4096):
+            chunk = points[start:start + 4096]
+            distance = ((chunk[:,None,:] - positions[None,:,:]) ** 2).sum(axis = 2)
+            nearest = np.argpartition(distance,keep - 1,axis = 1)[:,:keep]
+            inverse = 1.0 / (np.sqrt(np.take_along_axis(distance,nearest,axis = 1)) + 0.1)
+            weights[rows[:len(chunk)] + start,nearest] = inverse / inverse.sum(axis = 1,keepdims = True)
+        if noiseInfluences and len(joints) > keep:
+            noise = rng.randint(0,len(joints),(vertexCount,noiseInfluences))
+            np.add.at(weights,(np.repeat(np.arange(vertexCount),noiseInfluences),noise.ravel()),
+                      rng.uniform(0.0,0.0005,vertexCount * noiseInfluences))
+            weights /= weights.sum(axis = 1,keepdims = True)
+
+        skinCluster = scene.createNode('skinCluster',name = 'skinCluster{}'.format(i))
+        # 作成時のポーズをバインドポーズにする
+        bindPreMatrix = dict((index,np.linalg.inv(_worldMatrix(joint))) for index,joint in enumerate(joints))
+        skinCluster.data.update({'influences':list(joints),'geometry':shape,'weights':weights,
+                                 'bindPreMatrix':bindPreMatrix})
+        for index,joint in enumerate(joints):
+            scene.connect(joint,'worldMatrix[0]',skinCluster,'matrix[{}]'.format(index),notify = False)
+        meshes.append(shape.parent.name)
+        skinClusters.append(skinCluster.name)
+
+    order = rng.permutation(len(joints))
+    keyedCount = int(round(len(joints) * keyedRatio))
+    lockedCount = int(round(len(joints) * lockedRatio))
+    keyed = [joints[i] for i in order[:keyedCount]]
+    locked = [joints[i] for i in order[keyedCount:keyedCount + lockedCount]]
+    for joint in keyed:
+        joint.attrs['lockInfluenceWeights'] = True
+        curve = scene.createNode('animCurveTU',name = '{}_lockInfluenceWeights'.format(joint.name))
+        curve.data['keys'] = {1.0:True}
+        scene.connect(curve,'output',joint,'lockInfluenceWeights',notify = False)
+    for joint in locked:
+        joint.attrs['lockInfluenceWeights'] = True
+
+    scene.paintContext['paintable'] = list(skinClusters)
+    scene.paintContext['influence'] = joints[min(1,len(joints) - 1)].name
+    return {'joints':[joint.name for joint in joints],
+            'meshes':meshes,
+            'skinClusters':skinClusters,
+            'keyed':[joint.name for joint in keyed],
+            'locked':[joint.name for joint in locked]}
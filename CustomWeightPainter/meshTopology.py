@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""skinClusterのメッシュのトポロジーを扱うモジュール
+skinClusterの入力メッシュ(バインド時の形状)の頂点座標やフェースの構成を配列で取得し、
+トポロジー・頂点座標を識別するキーと、頂点の隣接行列のキャッシュを提供します。
+
+Attributes:
+    * None
+Todo:
+    * None
+"""
+from __future__ import absolute_import, division, generators, print_function
+try:
+    from future_builtins import *
+except:
+    pass
+import sys
+sys.dont_write_bytecode = True
+# ------------------------------------------------------------------------------
+import zlib
+from collections import OrderedDict
+import maya.api.OpenMaya as om
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from . import weightData
+from . import weightMath
+
+def getInputMesh(skinCluster,*args,**kwargs):
+    """skinClusterの入力メッシュのMFnMeshを取得する
+    デフォーム前の形状なので、ポーズを変えても頂点の位置は変わりません。
+
+    Args:
+        skinCluster (str): skinClusterの名前
+
+    Returns:
+        om.MFnMesh: 入力メッシュ
+    """
+    skinFn,dagPath = weightData.getSkinClusterFn(skinCluster)
+    inputs = skinFn.getInputGeometry()
+    if not len(inputs):
+        return om.MFnMesh(dagPath)
+    return om.MFnMesh(inputs[0])
+
+def getOutputMesh(skinCluster,*args,**kwargs):
+    """skinClusterの出力メッシュのMFnMeshを取得する
+    デフォーム後の形状なので、ポーズを変えると頂点の位置が変わります。
+
+    Args:
+        skinCluster (str): skinClusterの名前
+
+    Returns:
+        om.MFnMesh: 出力メッシュ
+    """
+    skinFn,dagPath = weightData.getSkinClusterFn(skinCluster)
+    return om.MFnMesh(dagPath)
+
+def getFaceVertices(meshFn,*args,**kwargs):
+    """フェースごとの頂点数と、フェースを構成する頂点番号を配列で取得する
+
+    Args:
+        meshFn (om.MFnMesh): メッシュ
+
+    Returns:
+        tuple: (フェースごとの頂点数の配列, 頂点番号を並べた配列)
+    """
+    counts,connects = meshFn.getVertices()
+    return (np.fromiter(counts,dtype = np.int32,count = len(counts)),
+            np.fromiter(connects,dtype = np.int32,count = len(connects)))
+
+def getTopologyKey(meshFn,faceVertices = None,*args,**kwargs):
+    """メッシュのトポロジーを識別するキーを求める
+    頂点数・エッジ数・フェース数と、フェースを構成する頂点番号のCRCをまとめます。
+
+    Args:
+        meshFn (om.MFnMesh): メッシュ
+        faceVertices (tuple): getFaceVerticesの結果。Noneの場合は取得する
+
+    Returns:
+        tuple: トポロジーのキー
+    """
+    counts,connects = faceVertices or getFaceVertices(meshFn)
+    return (meshFn.numVertices,meshFn.numEdges,meshFn.numPolygons,
+            zlib.crc32(connects.tobytes()) & 0xffffffff)
+
+def getPoints(meshFn,*args,**kwargs):
+    """メッシュの頂点座標を配列で取得する
+    MPointArrayを一括でnumpyの配列に変換し、w成分を取り除きます。
+
+    Args:
+        meshFn (om.MFnMesh): メッシュ
+
+    Returns:
+        numpy.ndarray: 頂点の座標 (頂点数 x 3)
+    """
+    points = meshFn.getPoints(om.MSpace.kObject)
+    if not len(points):
+        return np.zeros((0,3),dtype = np.float64)
+    return np.ascontiguousarray(np.array(points,dtype = np.float64)[:,:3])
+
+def getPointsKey(points,*args,**kwargs):
+    """頂点座標を識別するキーを求める
+    頂点座標のバイト列のCRCなので、頂点を動かすとキーが変わります。
+
+    Args:
+        points (numpy.ndarray): 頂点の座標 (getPoints)
+
+    Returns:
+        int: 頂点座標のキー
+    """
+    return zlib.crc32(np.ascontiguousarray(points,dtype = np.float64).tobytes()) & 0xffffffff
+
+def setPoints(meshFn,points,*args,**kwargs):
+    """メッシュの頂点座標を配列から一括で設定する
+
+    Args:
+        meshFn (om.MFnMesh): メッシュ
+        points (numpy.ndarray): 頂点の座標 (頂点数 x 3)
+
+    Returns:
+        None
+    """
+    meshFn.setPoints(om.MPointArray(np.asarray(points,dtype = np.float64).tolist()),om.MSpace.kObject)
+
+class AdjacencyCache(object):
+    """メッシュのトポロジーごとに頂点の隣接行列をキャッシュするクラス
+    隣接行列はCSR形式の疎行列(weightMath.buildAdjacency)です。
+    トポロジーが変わるとキーが変わるので、古い隣接行列は使われなくなります。
+    保持できる数には上限があり、上限を超えた場合は最も長く使われていないものから破棄します。
+
+    Attributes:
+        maxEntries (int): 保持できる隣接行列の数
+        hits (int): キャッシュを使った回数
+        misses (int): 隣接行列を作成した回数
+    """
+
+    def __init__(self,maxEntries = 4,*args,**kwargs):
+        self.maxEntries = maxEntries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def adjacency(self,skinCluster,*args,**kwargs):
+        """skinClusterのメッシュの隣接行列を取得する
+
+        Args:
+            skinCluster (str): skinClusterの名前
+
+        Returns:
+            scipy.sparse.csr_matrix or weightMath.CsrMatrix: 隣接行列 (頂点数 x 頂点数)
+        """
+        meshFn = getInputMesh(skinCluster)
+        faceVertices = getFaceVertices(meshFn)
+        key = getTopologyKey(meshFn,faceVertices)
+        adjacency = self._entries.get(key)
+        if adjacency is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return adjacency
+
+        self.misses += 1
+        edges = weightMath.buildEdgesFromFaces(*faceVertices)
+        adjacency = weightMath.buildAdjacency(edges,meshFn.numVertices)
+        self._entries[key] = adjacency
+        while len(self._entries) > max(self.maxEntries,1):
+            self._entries.popitem(last = False)
+        return adjacency
+
+    def invalidate(self,*args,**kwargs):
+        """キャッシュを破棄する
+
+        Returns:
+            None
+        """
+        self._entries.clear()
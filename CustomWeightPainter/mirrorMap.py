@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""ウエイトのミラーに使う頂点の対応をキャッシュするモジュール
+skinClusterの入力メッシュ(バインド時の形状)から、軸で反転した位置にある頂点を探し、
+メッシュのトポロジーごとに結果をキャッシュします。
+同じセッションで繰り返しミラーする場合は、頂点の対応付けを省略できます。
+
+頂点の対応付けとウエイトの入れ替えはweightMathモジュールにまとめています。
+
+Attributes:
+    * None
+Todo:
+    * None
+"""
+from __future__ import absolute_import, division, generators, print_function
+try:
+    from future_builtins import *
+except:
+    pass
+import sys
+sys.dont_write_bytecode = True
+# ------------------------------------------------------------------------------
+from collections import OrderedDict
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from . import meshTopology
+from . import weightMath
+
+class MirrorMapCache(object):
+    """メッシュのトポロジーと頂点座標ごとに頂点の対応をキャッシュするクラス
+    頂点の対応は頂点の位置で決まるので、入力メッシュの頂点を動かした場合も作り直します。
+    保持できる数には上限があり、上限を超えた場合は最も長く使われていないものから破棄します。
+
+    Attributes:
+        maxEntries (int): 保持できる対応の数
+        hits (int): キャッシュを使った回数
+        misses (int): 頂点の対応付けを行った回数
+    """
+
+    def __init__(self,maxEntries = 8,*args,**kwargs):
+        self.maxEntries = maxEntries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def entry(self,skinCluster,axis = 'x',tolerance = 0.001,*args,**kwargs):
+        """skinClusterのメッシュの頂点の対応を取得する
+
+        Args:
+            skinCluster (str): skinClusterの名前
+            axis (str): 反転する軸 (x, y, z)
+            tolerance (float): 一致とみなす距離
+
+        Returns:
+            dict: 頂点の対応 (vertexMap: 頂点ごとの反対側の頂点番号(見つからない場合は-1),
+                  side: 頂点ごとの軸の正負(1, -1, 中央は0))
+        """
+        meshFn = meshTopology.getInputMesh(skinCluster)
+        points = meshTopology.getPoints(meshFn)
+        key = (meshTopology.getTopologyKey(meshFn),meshTopology.getPointsKey(points),axis,tolerance)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        coordinates = points[:,weightMath.AXIS_INDEX[axis]]
+        side = np.where(coordinates > tolerance,1,np.where(coordinates < -tolerance,-1,0))
+        entry = {'vertexMap':weightMath.matchMirrorVertices(points,axis = axis,tolerance = tolerance),
+                 'side':side.astype(np.int8)}
+        self._entries[key] = entry
+        while len(self._entries) > max(self.maxEntries,1):
+            self._entries.popitem(last = False)
+        return entry
+
+    def invalidate(self,*args,**kwargs):
+        """キャッシュを破棄する
+
+        Returns:
+            None
+        """
+        self._entries.clear()
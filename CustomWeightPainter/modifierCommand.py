@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""MDGModifierの書き込みをMayaのundoキューに積むためのモジュール
+MDGModifierのdoItだけではundoキューに積まれないので、このファイル自身をプラグインとして読み込み、
+MDGModifierを実行するコマンド(customWeightPainterModifier)を登録します。
+commit()に渡したMDGModifierはこのコマンドの中で実行されるので、
+AutoKeyGuardのundoチャンクに入り、1回のundoで元に戻ります。
+
+プラグインとして読み込まれたときはパッケージの外のモジュールになるので、
+相対importは使わず、実行待ちのMDGModifierはsys.modulesに登録した共有のモジュールで受け渡します。
+
+Attributes:
+    * None
+Todo:
+    * None
+"""
+from __future__ import absolute_import, division, generators, print_function
+try:
+    from future_builtins import *
+except:
+    pass
+import sys
+sys.dont_write_bytecode = True
+# ------------------------------------------------------------------------------
+import os
+import types
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+# 登録するコマンドの名前
+COMMAND_NAME = 'customWeightPainterModifier'
+# プラグインとして読み込まれたモジュールと共有する状態を置くモジュールの名前
+SHARED_MODULE_NAME = '_customWeightPainterModifierShared'
+
+def maya_useNewAPI():
+    """プラグインがAPI 2.0を使うことをMayaに知らせる
+    """
+    pass
+
+def _pending(*args,**kwargs):
+    """実行待ちのMDGModifierのリストを取得する
+    パッケージのモジュールとプラグインのモジュールで同じリストを返します。
+
+    Returns:
+        list: 実行待ちのMDGModifierのリスト
+    """
+    shared = sys.modules.get(SHARED_MODULE_NAME)
+    if shared is None:
+        shared = types.ModuleType(SHARED_MODULE_NAME)
+        shared.pending = []
+        sys.modules[SHARED_MODULE_NAME] = shared
+    return shared.pending
+
+class ModifierCommand(om.MPxCommand):
+    """実行待ちのMDGModifierを実行し、undo・redoできるようにするコマンド
+    """
+
+    def __init__(self):
+        om.MPxCommand.__init__(self)
+        self._modifier = None
+
+    @staticmethod
+    def creator():
+        return ModifierCommand()
+
+    def isUndoable(self):
+        return True
+
+    def doIt(self,argList):
+        pending = _pending()
+        if not pending:
+            raise RuntimeError('{}: 実行するMDGModifierがありません'.format(COMMAND_NAME))
+        self._modifier = pending.pop()
+        self._modifier.doIt()
+
+    def redoIt(self):
+        self._modifier.doIt()
+
+    def undoIt(self):
+        self._modifier.undoIt()
+
+def initializePlugin(plugin):
+    om.MFnPlugin(plugin).registerCommand(COMMAND_NAME,ModifierCommand.creator)
+
+def uninitializePlugin(plugin):
+    om.MFnPlugin(plugin).deregisterCommand(COMMAND_NAME)
+
+def pluginPath(*args,**kwargs):
+    """プラグインとして読み込むファイルのパスを返す
+
+    Returns:
+        str: このモジュールの.pyファイルのパス
+    """
+    return os.path.splitext(os.path.abspath(__file__))[0] + '.py'
+
+def ensureLoaded(*args,**kwargs):
+    """プラグインが読み込まれていなければ読み込む
+    コマンドが登録済みの場合は、cmdsを呼び出さずに戻ります。
+
+    Returns:
+        None
+    """
+    if not hasattr(cmds,COMMAND_NAME):
+        cmds.loadPlugin(pluginPath(),quiet = True)
+
+def commit(modifier,*args,**kwargs):
+    """MDGModifierをコマンドとして実行し、undoキューに積む
+    開いているundoチャンクがあれば、その中の1つの操作になります。
+
+    Args:
+        modifier (om.MDGModifier): 実行するMDGModifier
+
+    Returns:
+        om.MDGModifier: 実行したMDGModifier
+    """
+    ensureLoaded()
+    pending = _pending()
+    pending.append(modifier)
+    try:
+        getattr(cmds,COMMAND_NAME)()
+    finally:
+        del pending[:]
+    return modifier
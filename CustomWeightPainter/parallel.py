@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""skinClusterごとの独立した計算を並列に実行するモジュール
+シーンの読み込みと書き込みはメインスレッドで行い、NumPyの計算だけをスレッドプールで実行します。
+NumPyの配列の計算の多くはGILを解放するので、ペイント対象のskinClusterが多い場合
+(体・服・装飾品など)に複数のコアを使うことができます。
+Mayaに依存しないので、Maya外からも読み込むことができます。
+
+Attributes:
+    * None
+Todo:
+    * None
+"""
+from __future__ import absolute_import, division, generators, print_function
+try:
+    from future_builtins import *
+except:
+    pass
+import sys
+sys.dont_write_bytecode = True
+# ------------------------------------------------------------------------------
+import os
+import time
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+
+# 既定のワーカー数の上限
+MAX_DEFAULT_WORKERS = 8
+
+def defaultWorkerCount(*args,**kwargs):
+    """既定のワーカー数を返す
+    CPUのコア数(MAX_DEFAULT_WORKERSまで)です。
+
+    Returns:
+        int: ワーカー数
+    """
+    return max(1,min(MAX_DEFAULT_WORKERS,os.cpu_count() or 1))
+
+class MeshPipeline(object):
+    """skinClusterごとの読み込み・計算・書き込みを、計算だけ並列に実行するクラス
+    runでは、メインスレッドで1つ読み込むたびにその計算をスレッドプールに渡すので、
+    残りの読み込みと計算が重なります。書き込みは渡した順にメインスレッドで行います。
+
+    ワーカー数が1以下、対象が1つだけ、またはconcurrent.futuresがない場合は、
+    スレッドを使わずに順番に実行します。
+
+    Attributes:
+        workerCount (int): 計算に使うスレッド数
+        timings (list): 直近のrunの対象ごとの処理時間
+                        (item: 対象, read: 読み込み, compute: 計算, write: 書き込み[秒])
+        elapsed (float): 直近のrunの処理時間[秒]
+    """
+
+    def __init__(self,workerCount = 1,*args,**kwargs):
+        self.workerCount = max(1,int(workerCount))
+        self.timings = []
+        self.elapsed = 0.0
+        self._executor = None
+
+    def setWorkerCount(self,workerCount,*args,**kwargs):
+        """ワーカー数を変更する
+        作成済みのスレッドプールは終了し、次回の実行時に作りなおします。
+
+        Args:
+            workerCount (int): ワーカー数
+
+        Returns:
+            None
+        """
+        self.shutdown()
+        self.workerCount = max(1,int(workerCount))
+
+    def shutdown(self,*args,**kwargs):
+        """スレッドプールを終了する
+
+        Returns:
+            None
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait = True)
+            self._executor = None
+
+    def isParallel(self,itemCount,*args,**kwargs):
+        """指定の数の対象を並列に実行するかどうかを判定する
+
+        Args:
+            itemCount (int): 対象の数
+
+        Returns:
+            bool: 並列に実行する場合はTrue
+        """
+        return ThreadPoolExecutor is not None and self.workerCount > 1 and itemCount > 1
+
+    def _getExecutor(self,*args,**kwargs):
+        """スレッドプールを取得する。ない場合は作成する
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers = self.workerCount)
+        return self._executor
+
+    def run(self,items,read,compute,write = None,*args,**kwargs):
+        """対象ごとに、読み込み・計算・書き込みを実行する
+
+        Args:
+            items (list): 対象 (skinClusterの名前など)
+            read (function): read(item)でメインスレッドで呼び出す関数。
+                             Noneを返した対象は、計算と書き込みを行わない
+            compute (function): compute(item, data)でスレッドプールで呼び出す関数。
+                                Mayaの関数を呼び出してはいけない
+            write (function): write(item, data, result)でメインスレッドで呼び出す関数。Noneの場合は書き込まない
+
+        Returns:
+            list: 計算した対象の(対象, computeの結果)のリスト (itemsの順)
+        """
+        startTime = time.time()
+        items = list(items)
+        timings = []
+        parallel = self.isParallel(len(items))
+
+        def timedCompute(item,data,timing):
+            computeStart = time.time()
+            try:
+                return compute(item,data)
+            finally:
+                timing['compute'] = time.time() - computeStart
+
+        pending = []
+        try:
+            for item in items:
+                timing = {'item':item,'read':0.0,'compute':0.0,'write':0.0}
+                timings.append(timing)
+                readStart = time.time()
+                data = read(item)
+                timing['read'] = time.time() - readStart
+                if data is None:
+                    continue
+                if parallel:
+                    pending.append((item,data,timing,self._getExecutor().submit(timedCompute,item,data,timing)))
+                else:
+                    pending.append((item,data,timing,timedCompute(item,data,timing)))
+
+            results = []
+            for item,data,timing,value in pending:
+                result = value.result() if parallel else value
+                if write is not None:
+                    writeStart = time.time()
+                    write(item,data,result)
+                    timing['write'] = time.time() - writeStart
+                results.append((item,result))
+        except:
+            # 例外が発生した場合は、まだ始まっていない計算を取り消す
+            if parallel:
+                for item,data,timing,future in pending:
+                    future.cancel()
+            raise
+        finally:
+            self.timings = timings
+            self.elapsed = time.time() - startTime
+        return results
+
+    def map(self,func,items,*args,**kwargs):
+        """対象ごとにfunc(item)を実行し、結果を返す
+        Mayaの関数を呼び出さない計算だけに使ってください。
+
+        Args:
+            func (function): 実行する関数
+            items (list): 対象
+
+        Returns:
+            list: 結果のリスト (itemsの順)
+        """
+        items = list(items)
+        if not self.isParallel(len(items)):
+            return [func(item) for item in items]
+        return list(self._getExecutor().map(func,items))
+
+    def report(self,*args,**kwargs):
+        """直近のrunの対象ごとの処理時間を文字列にする
+
+        Returns:
+            str: 対象ごとの読み込み・計算・書き込みの処理時間
+        """
+        lines = ['[pipeline] workers {}  {:.1f} ms'.format(self.workerCount,self.elapsed * 1000.0)]
+        lines.append('    {:<32}{:>10}{:>10}{:>10}'.format('item','read ms','comp ms','write ms'))
+        for timing in self.timings:
+            lines.append('    {:<32}{:>10.1f}{:>10.1f}{:>10.1f}'.format(
+                            timing['item'],timing['read'] * 1000.0,
+                            timing['compute'] * 1000.0,timing['write'] * 1000.0))
+        return '\n'.join(lines)
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""処理時間の計測をまとめたモジュール
+Toolの起動にかかった時間や、ボタンなどの操作ごとの処理時間とcmds/melの呼び出し回数を計測し、
+スクリプトエディタに表示します。
+Mayaに依存しないので、Maya外からも読み込むことができます。
+
+Attributes:
+    * None
+Todo:
+    * None
+"""
+from __future__ import absolute_import, division, generators, print_function
+try:
+    from future_builtins import *
+except:
+    pass
+import sys
+sys.dont_write_bytecode = True
+# ------------------------------------------------------------------------------
+import functools
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+
+class StartupTimer(object):
+    """Toolの起動時間の内訳を記録するクラス
+    起動ごとに各工程の処理時間を記録します。
+    cold(新規にToolを作成した起動)とwarm(既存のToolを使いまわした起動)の
+    最新の記録をそれぞれ保持するので、両者を比較することができます。
+
+    Attributes:
+        mode (str): 現在計測している起動の種類 ('cold' or 'warm')
+        timings (OrderedDict): 現在計測している起動の工程名 → 処理時間[秒]
+        history (dict): 起動の種類 → 最新のtimings
+    """
+
+    def __init__(self,*args,**kwargs):
+        self.mode = None
+        self.timings = OrderedDict()
+        self.history = {}
+
+    def begin(self,mode = 'cold',*args,**kwargs):
+        """新しい起動の計測を開始する
+
+        Args:
+            mode (str): 起動の種類 ('cold' or 'warm')
+
+        Returns:
+            None
+        """
+        self.mode = mode
+        self.timings = OrderedDict()
+        self.history[mode] = self.timings
+
+    def record(self,name,seconds,*args,**kwargs):
+        """工程の処理時間を記録する
+
+        Args:
+            name (str): 工程名
+            seconds (float): 処理時間[秒]
+
+        Returns:
+            None
+        """
+        self.timings[name] = self.timings.get(name,0.0) + seconds
+
+    @contextmanager
+    def measure(self,name,*args,**kwargs):
+        """withブロック内の処理時間を記録する
+
+        Args:
+            name (str): 工程名
+        """
+        startTime = time.time()
+        try:
+            yield
+        finally:
+            self.record(name,time.time() - startTime)
+
+    def report(self,*args,**kwargs):
+        """記録した処理時間を文字列にする
+
+        Returns:
+            str: 起動の種類ごとの処理時間の内訳
+        """
+        lines = []
+        for mode in ('cold','warm'):
+            timings = self.history.get(mode)
+            if not timings:
+                continue
+            lines.append('[{}] total {:.1f} ms'.format(mode,sum(timings.values()) * 1000.0))
+            for name,seconds in timings.items():
+                lines.append('    {:<24}{:>10.1f} ms'.format(name,seconds * 1000.0))
+        return '\n'.join(lines)
+
+class CallCounter(Counter):
+    """コマンド名 → 呼び出し回数に加えて、呼び出し回数の合計を保持するCounter
+    合計はCallCountingProxyが呼び出しごとに加算するので、入れ子の操作の呼び出し回数を
+    Counterを複製せずに求められます。
+
+    Attributes:
+        total (int): 呼び出し回数の合計
+    """
+
+    def __init__(self,*args,**kwargs):
+        Counter.__init__(self,*args,**kwargs)
+        self.total = sum(self.values())
+
+class CallCountingProxy(object):
+    """モジュールの関数の呼び出し回数を数える代理オブジェクト
+    モジュールのグローバル変数(cmds, melなど)と置き換えて使います。
+    関数以外の属性はそのまま返します。
+    呼び出し回数はCallCounterに、コマンドごとと合計の両方を加算します。
+    """
+
+    def __init__(self,target,prefix,counts,*args,**kwargs):
+        self._target = target
+        self._prefix = prefix
+        self._counts = counts
+        self._wrappers = {}
+
+    def __getattr__(self,name):
+        value = getattr(self._target,name)
+        if not callable(value):
+            return value
+        wrapper = self._wrappers.get(name)
+        if wrapper is None:
+            counts = self._counts
+            key = self._prefix + name
+            def wrapper(*args,**kwargs):
+                counts[key] += 1
+                counts.total += 1
+                return value(*args,**kwargs)
+            self._wrappers[name] = wrapper
+        return wrapper
+
+class ActionRecord(object):
+    """1回の操作の計測結果を保持するクラス
+
+    Attributes:
+        name (str): 操作の名前 (モジュール名.関数名)
+        startTime (float): 開始した時刻
+        seconds (float): 処理時間[秒]
+        calls (int): cmds/melの呼び出し回数の合計 (内側の操作の分も含む)
+        commands (dict): コマンド名 → 呼び出し回数。内側の操作では記録しないので空
+        depth (int): 操作の入れ子の深さ。ボタンなどから直接呼ばれた操作は0
+        failed (bool): 例外が発生した場合はTrue
+    """
+
+    __slots__ = ('name','startTime','seconds','calls','commands','depth','failed')
+
+    def __init__(self,name,startTime,seconds,calls,commands,depth,failed,*args,**kwargs):
+        self.name = name
+        self.startTime = startTime
+        self.seconds = seconds
+        self.calls = calls
+        self.commands = commands
+        self.depth = depth
+        self.failed = failed
+
+class ActionProfiler(object):
+    """操作ごとの処理時間とcmds/melの呼び出し回数を記録するクラス
+    profiledデコレーターをかけた関数の呼び出しを記録します。
+    記録は有効にした場合だけ行い、無効の間はフラグを1回調べるだけで関数をそのまま呼び出します。
+
+    有効にしている間は、指定したモジュールのcmds/melをCallCountingProxyに置き換えて呼び出し回数を数えます。
+    直近の記録はmaxRecords件まで保持し、操作ごとの集計はセッション中保持します。
+
+    Attributes:
+        enabled (bool): 記録しているかどうか
+        maxRecords (int): 保持する直近の記録の数
+        records (deque): 直近の記録 (ActionRecordのリスト)
+        stats (dict): 操作の名前 → 集計 (count, total, max, maxCalls, failed)
+        counts (CallCounter): 有効にしてからのコマンド名 → 呼び出し回数
+    """
+
+    # 呼び出し回数を数えるモジュールのグローバル変数名 → コマンド名の接頭辞
+    COUNTED_NAMES = (('cmds','cmds.'),('mel','mel.'))
+
+    def __init__(self,maxRecords = 500,*args,**kwargs):
+        self.enabled = False
+        self.maxRecords = maxRecords
+        self.records = deque(maxlen = maxRecords)
+        self.stats = {}
+        self.counts = CallCounter()
+        self._depth = 0
+        self._patched = []
+
+    def enable(self,targets = (),*args,**kwargs):
+        """記録を開始する
+
+        Args:
+            targets (list): cmds/melを置き換えて呼び出し回数を数えるモジュールやオブジェクト
+
+        Returns:
+            None
+        """
+        self.disable()
+        for target in targets:
+            for name,prefix in self.COUNTED_NAMES:
+                original = getattr(target,name,None)
+                if original is None or isinstance(original,CallCountingProxy):
+                    continue
+                setattr(target,name,CallCountingProxy(original,prefix,self.counts))
+                self._patched.append((target,name,original))
+        self.enabled = True
+
+    def disable(self,*args,**kwargs):
+        """記録を終了し、置き換えたcmds/melを元に戻す
+
+        Returns:
+            None
+        """
+        self.enabled = False
+        for target,name,original in reversed(self._patched):
+            setattr(target,name,original)
+        self._patched = []
+
+    def clear(self,*args,**kwargs):
+        """記録と集計を破棄する
+
+        Returns:
+            None
+        """
+        self.records = deque(maxlen = self.maxRecords)
+        self.stats = {}
+
+    def call(self,name,func,*args,**kwargs):
+        """関数を実行し、処理時間と呼び出し回数を記録する
+        例外が発生した場合も記録してから、そのまま送出します。
+        コマンドごとの内訳は一番外側の操作だけで求め、内側の操作は呼び出し回数の合計だけを記録します。
+
+        Args:
+            name (str): 操作の名前
+            func (function): 実行する関数
+
+        Returns:
+            関数の戻り値
+        """
+        depth = self._depth
+        before = Counter(self.counts) if depth == 0 else None
+        totalBefore = self.counts.total
+        self._depth += 1
+        failed = True
+        startTime = time.time()
+        try:
+            result = func(*args,**kwargs)
+            failed = False
+            return result
+        finally:
+            seconds = time.time() - startTime
+            self._depth = depth
+            commands = {} if before is None else dict(self.counts - before)
+            self._record(ActionRecord(name,startTime,seconds,self.counts.total - totalBefore,
+                                      commands,depth,failed))
+
+    def _record(self,record,*args,**kwargs):
+        """記録を追加し、集計に加える
+        """
+        self.records.append(record)
+        stats = self.stats.get(record.name)
+        if stats is None:
+            stats = {'count':0,'total':0.0,'max':0.0,'maxCalls':0,'failed':0}
+            self.stats[record.name] = stats
+        stats['count'] += 1
+        stats['total'] += record.seconds
+        stats['max'] = max(stats['max'],record.seconds)
+        stats['maxCalls'] = max(stats['maxCalls'],record.calls)
+        stats['failed'] += record.failed
+
+    def slowest(self,limit = 10,*args,**kwargs):
+        """直近の記録から、処理時間の長いものを返す
+
+        Args:
+            limit (int): 返す数
+
+        Returns:
+            list: ActionRecordのリスト (処理時間の長い順)
+        """
+        return sorted(self.records,key = lambda record:record.seconds,reverse = True)[:limit]
+
+    def report(self,limit = 10,*args,**kwargs):
+        """集計と、処理時間の長い記録を文字列にする
+
+        Args:
+            limit (int): 表示する数
+
+        Returns:
+            str: 操作ごとの集計 (最大の処理時間の長い順) と、直近の記録で処理時間の長いもの
+        """
+        lines = ['[actions] {} recorded, {} kept'.format(
+                    sum(stats['count'] for stats in self.stats.values()),len(self.records))]
+        lines.append('    {:<36}{:>7}{:>12}{:>12}{:>10}'.format('name','count','total ms','max ms','max calls'))
+        ranking = sorted(self.stats.items(),key = lambda item:item[1]['max'],reverse = True)
+        for name,stats in ranking[:limit]:
+            lines.append('    {:<36}{:>7}{:>12.1f}{:>12.1f}{:>10}{}'.format(
+                            name,stats['count'],stats['total'] * 1000.0,stats['max'] * 1000.0,
+                            stats['maxCalls'],'  ({} failed)'.format(stats['failed']) if stats['failed'] else ''))
+
+        lines.append('[slowest]')
+        for record in self.slowest(limit):
+            top = ', '.join('{} {}'.format(name,count) for name,count in
+                            sorted(record.commands.items(),key = lambda item:item[1],reverse = True)[:3])
+            lines.append('    {}{:<40}{:>10.1f} ms{:>7} calls  {}{}'.format(
+                            time.strftime('%H:%M:%S ',time.localtime(record.startTime)),
+                            '  ' * record.depth + record.name,record.seconds * 1000.0,record.calls,
+                            top,'  FAILED' if record.failed else ''))
+        return '\n'.join(lines)
+
+# セッション中の操作を記録するオブジェクト
+actionProfiler = ActionProfiler()
+
+def profiled(func,*args,**kwargs):
+    """操作としてactionProfilerに記録するためのデコレーター
+    記録が無効の場合は、関数をそのまま呼び出します。
+
+    Args:
+        func (function): デコレーターをかける関数
+
+    Returns:
+        function: デコレーターをかけた関数
+    """
+    name = '{}.{}'.format(func.__module__.rpartition('.')[2],func.__name__)
+
+    @functools.wraps(func)
+    def wrapper(*args,**kwargs):
+        if not actionProfiler.enabled:
+            return func(*args,**kwargs)
+        return actionProfiler.call(name,func,*args,**kwargs)
+    return wrapper
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""リグ全体のポーズを記録・復元するためのモジュール
+インフルエンスの回転値(必要に応じて移動・スケール・ローカル行列)を
+配列にまとめて記録し、値が変わるアトリビュートだけを1つのMDGModifierにまとめて復元します。
+MDGModifierはmodifierCommandのコマンドで実行するので、リグ全体の復元でもコマンドは1回で、
+1回のundoで元に戻ります。
+
+Attributes:
+    * None
+Todo:
+    * None
+"""
+from __future__ import absolute_import, division, generators, print_function
+try:
+    from future_builtins import *
+except:
+    pass
+import sys
+sys.dont_write_bytecode = True
+# ------------------------------------------------------------------------------
+from array import array
+from collections import OrderedDict
+import maya.api.OpenMaya as om
+
+from . import modifierCommand
+from . import utilityProc
+
+ROTATE_ATTRS = ('rotateX','rotateY','rotateZ')
+TRANSLATE_ATTRS = ('translateX','translateY','translateZ')
+SCALE_ATTRS = ('scaleX','scaleY','scaleZ')
+# 現在の値と同じとみなす差 (内部単位)
+POSE_EPSILON = 1.0e-9
+
+def _getDagPaths(nodes,*args,**kwargs):
+    """ノード名のリストからMDagPathのリストを取得する
+    存在しないノードは取り除きます。
+
+    Args:
+        nodes (list): ノード名のリスト
+
+    Returns:
+        tuple: (取得できたノード名のリスト, MDagPathのリスト)
+    """
+    names = []
+    dagPaths = []
+    for node in nodes:
+        selList = om.MSelectionList()
+        try:
+            selList.add(node)
+            dagPath = selList.getDagPath(0)
+        except (RuntimeError,TypeError):
+            continue
+        names.append(node)
+        dagPaths.append(dagPath)
+    return names,dagPaths
+
+class PoseSnapshot(object):
+    """1つのポーズを保持するクラス
+    ノードごとの値を連続した配列に格納します。
+
+    Attributes:
+        nodes (list): ノード名のリスト
+        rotations (array): 回転値[ラジアン] (ノード数 x 3)
+        translations (array): 移動値 (ノード数 x 3)。full指定なしの場合はNone
+        scales (array): スケール値 (ノード数 x 3)。full指定なしの場合はNone
+        matrices (array): ローカル行列 (ノード数 x 16)。full指定なしの場合はNone
+    """
+
+    def __init__(self,nodes,full = False,*args,**kwargs):
+        self.nodes = list(nodes)
+        self._order = dict((node,i) for i,node in enumerate(self.nodes))
+        count = len(self.nodes)
+        self.rotations = array('d',[0.0]) * (count * 3)
+        self.translations = array('d',[0.0]) * (count * 3) if full else None
+        self.scales = array('d',[1.0]) * (count * 3) if full else None
+        self.matrices = array('d',[0.0]) * (count * 16) if full else None
+
+    def __contains__(self,node):
+        return node in self._order
+
+    def read(self,nodes = None,dagPaths = None,*args,**kwargs):
+        """シーンから値を読み込む
+
+        Args:
+            nodes (list): 読み込むノード。Noneの場合は全ノード
+            dagPaths (list): nodesに対応するMDagPath。Noneの場合は取得する
+
+        Returns:
+            None
+        """
+        if nodes is None:
+            nodes = self.nodes
+        if dagPaths is None:
+            nodes,dagPaths = _getDagPaths([node for node in nodes if node in self._order])
+
+        for node,dagPath in zip(nodes,dagPaths):
+            i = self._order[node]
+            transformFn = om.MFnTransform(dagPath)
+            euler = transformFn.rotation(om.MSpace.kTransform)
+            self.rotations[i * 3:i * 3 + 3] = array('d',(euler.x,euler.y,euler.z))
+            if self.matrices is None:
+                continue
+            translation = transformFn.translation(om.MSpace.kTransform)
+            self.translations[i * 3:i * 3 + 3] = array('d',(translation.x,translation.y,translation.z))
+            self.scales[i * 3:i * 3 + 3] = array('d',transformFn.scale())
+            self.matrices[i * 16:i * 16 + 16] = array('d',transformFn.transformation().asMatrix())
+
+    def rotation(self,node,*args,**kwargs):
+        """ノードの回転値を取得する
+
+        Args:
+            node (str): ノード名
+
+        Returns:
+            list: 回転値 [x,y,z] (UIの角度単位)。記録されていない場合はNone
+        """
+        i = self._order.get(node)
+        if i is None:
+            return None
+        unit = om.MAngle.uiUnit()
+        return [om.MAngle(value).asUnits(unit) for value in self.rotations[i * 3:i * 3 + 3]]
+
+    def matrix(self,node,*args,**kwargs):
+        """ノードのローカル行列を取得する
+
+        Args:
+            node (str): ノード名
+
+        Returns:
+            om.MMatrix: ローカル行列。記録されていない場合はNone
+        """
+        i = self._order.get(node)
+        if i is None or self.matrices is None:
+            return None
+        return om.MMatrix(self.matrices[i * 16:i * 16 + 16])
+
+    def write(self,nodes = None,*args,**kwargs):
+        """記録した値をシーンに書き込む
+        現在の値と変わらないアトリビュートは書き込まず、変わるものだけを1つのMDGModifierにまとめ、
+        modifierCommandのコマンドで1回だけ実行します。ノード数によらずコマンドの呼び出しは一定です。
+        ロックされている、または接続されているアトリビュートは書き込みません。
+        書き込みはAutoKeyGuardの中で行うので、autoKeyは打たれず、1回のundoで元に戻ります。
+
+        Args:
+            nodes (list): 書き込むノード。Noneの場合は全ノード
+
+        Returns:
+            int: 書き込んだノードの数
+        """
+        if nodes is None:
+            nodes = self.nodes
+        names,dagPaths = _getDagPaths([node for node in nodes if node in self._order])
+
+        modifier = om.MDGModifier()
+        changed = False
+        for node,dagPath in zip(names,dagPaths):
+            i = self._order[node]
+            transformFn = om.MFnTransform(dagPath)
+            euler = transformFn.rotation(om.MSpace.kTransform)
+            changed |= _addPlugValues(transformFn,ROTATE_ATTRS,
+                                      self.rotations[i * 3:i * 3 + 3],(euler.x,euler.y,euler.z),
+                                      lambda plug,value:modifier.newPlugValueMAngle(plug,om.MAngle(value)))
+            if self.matrices is None:
+                continue
+            translation = transformFn.translation(om.MSpace.kTransform)
+            changed |= _addPlugValues(transformFn,TRANSLATE_ATTRS,
+                                      self.translations[i * 3:i * 3 + 3],(translation.x,translation.y,translation.z),
+                                      lambda plug,value:modifier.newPlugValueMDistance(plug,om.MDistance(value)))
+            changed |= _addPlugValues(transformFn,SCALE_ATTRS,
+                                      self.scales[i * 3:i * 3 + 3],transformFn.scale(),
+                                      modifier.newPlugValueDouble)
+        if changed:
+            with utilityProc.AutoKeyGuard('restorePose'):
+                modifierCommand.commit(modifier)
+        return len(names)
+
+def _addPlugValues(depFn,attrs,values,currentValues,addValue,*args,**kwargs):
+    """3軸のアトリビュートのうち、値が変わる軸の書き込みをMDGModifierに追加する
+
+    Args:
+        depFn (om.MFnDependencyNode): ノードのファンクションセット
+        attrs (tuple): 各軸のアトリビュート名
+        values (array): 書き込む値 (内部単位)
+        currentValues (tuple): 現在の値 (内部単位)
+        addValue (function): プラグと値を受け取り、MDGModifierに書き込みを追加する関数
+
+    Returns:
+        bool: 書き込みを追加した場合はTrue
+    """
+    added = False
+    for attr,value,current in zip(attrs,values,currentValues):
+        if abs(value - current) <= POSE_EPSILON:
+            continue
+        plug = depFn.findPlug(attr,False)
+        if plug.isLocked or plug.isDestination:
+            continue
+        addValue(plug,value)
+        added = True
+    return added
+
+class PoseSnapshotStore(object):
+    """名前付きのポーズを保持するクラス
+    保持できるポーズの数には上限があり、上限を超えた場合は
+    最も長く使われていないポーズから破棄します。
+
+    Attributes:
+        maxSnapshots (int): 保持できるポーズの数
+    """
+
+    def __init__(self,maxSnapshots = 8,*args,**kwargs):
+        self.maxSnapshots = maxSnapshots
+        self._snapshots = OrderedDict()
+
+    def __contains__(self,name):
+        return name in self._snapshots
+
+    def names(self,*args,**kwargs):
+        """保持しているポーズの名前のリストを返す (古い順)
+
+        Returns:
+            list: ポーズの名前のリスト
+        """
+        return list(self._snapshots.keys())
+
+    def get(self,name,*args,**kwargs):
+        """ポーズを取得する
+
+        Args:
+            name (str): ポーズの名前
+
+        Returns:
+            PoseSnapshot: ポーズ。保持していない場合はNone
+        """
+        snapshot = self._snapshots.get(name)
+        if snapshot is not None:
+            self._snapshots.move_to_end(name)
+        return snapshot
+
+    def capture(self,name,nodes,full = False,*args,**kwargs):
+        """現在のポーズを記録する
+        同じ名前のポーズがある場合は置き換えます。
+
+        Args:
+            name (str): ポーズの名前
+            nodes (list): 記録するノード
+            full (bool): Trueの場合は回転値に加えて移動・スケール・ローカル行列も記録する
+
+        Returns:
+            PoseSnapshot: 記録したポーズ
+        """
+        names,dagPaths = _getDagPaths(nodes)
+        snapshot = PoseSnapshot(names,full = full)
+        snapshot.read(names,dagPaths)
+
+        self._snapshots.pop(name,None)
+        self._snapshots[name] = snapshot
+        while len(self._snapshots) > max(self.maxSnapshots,1):
+            self._snapshots.popitem(last = False)
+        return snapshot
+
+    def update(self,name,nodes,*args,**kwargs):
+        """記録済みのポーズのうち、指定のノードだけを現在の値で更新する
+
+        Args:
+            name (str): ポーズの名前
+            nodes (list): 更新するノード
+
+        Returns:
+            None
+        """
+        snapshot = self.get(name)
+        if snapshot is None:
+            return
+        snapshot.read(nodes)
+
+    def rotation(self,name,node,*args,**kwargs):
+        """記録済みのポーズから、ノードの回転値を取得する
+
+        Args:
+            name (str): ポーズの名前
+            node (str): ノード名
+
+        Returns:
+            list: 回転値 [x,y,z] (UIの角度単位)。記録されていない場合はNone
+        """
+        snapshot = self.get(name)
+        if snapshot is None:
+            return None
+        return snapshot.rotation(node)
+
+    def restore(self,name,nodes = None,*args,**kwargs):
+        """記録済みのポーズを復元する
+        ノードを指定した場合はそのノードだけ、指定しない場合はリグ全体を復元します。
+
+        Args:
+            name (str): ポーズの名前
+            nodes (list): 復元するノード
+
+        Returns:
+            int: 復元したノードの数
+        """
+        snapshot = self.get(name)
+        if snapshot is None:
+            return 0
+        return snapshot.write(nodes)
+
+    def remove(self,name,*args,**kwargs):
+        """ポーズを破棄する
+
+        Args:
+            name (str): ポーズの名前
+
+        Returns:
+            None
+        """
+        self._snapshots.pop(name,None)
@@ -0,0 +1,515 @@
+# -*- coding: utf-8 -*-
+"""インフルエンスの可動域(ROM)を確認するための、回転角度ごとの変形結果のキャッシュ
+インフルエンスを軸ごとに指定の角度だけ回転させ、そのインフルエンス(と子のインフルエンス)が
+影響する頂点だけの変形後の座標をfloat32の配列で記録します。
+記録した後はスライダーを動かしてもskinClusterを評価しなおさず、
+キャッシュした座標をプレビュー用のメッシュに書き込んで表示します。
+プレビュー用のメッシュは一時的なトランスフォームの下にAPIで作成するので、undoキューには積まれず、
+シーンファイルにも保存されません。
+
+キャッシュの大きさには上限があり、超えた場合は最も長く使われていない角度から破棄します。
+ウエイトが変更された場合は、変更された頂点に影響する記録だけを破棄します。
+
+Attributes:
+    * None
+Todo:
+    * None
+"""
+from __future__ import absolute_import, division, generators, print_function
+try:
+    from future_builtins import *
+except:
+    pass
+import sys
+sys.dont_write_bytecode = True
+# ------------------------------------------------------------------------------
+import time
+from collections import OrderedDict
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from . import meshTopology
+from . import utilityProc
+from . import weightData
+
+AXES = ('x','y','z')
+# 角度をキーにするときに丸める桁数
+ANGLE_DIGITS = 3
+# プレビュー用のメッシュの名前に付ける接尾辞
+PREVIEW_SUFFIX = 'RomPreview'
+# プレビュー用のノードをまとめる、ワールド直下の一時的なトランスフォームの名前
+PREVIEW_ROOT = 'customWeightPainterRomPreview'
+# プレビュー用のメッシュを割り当てるシェーディンググループ
+PREVIEW_SHADING_GROUP = 'initialShadingGroup'
+
+def sampleAngles(count = 9,angleRange = 90.0,*args,**kwargs):
+    """記録する角度のリストを返す
+    -angleRangeからangleRangeまでを等間隔に分けます。
+
+    Args:
+        count (int): 角度の数 (2以上)
+        angleRange (float): 回転させる角度の範囲 (UIの角度単位)
+
+    Returns:
+        list: 角度のリスト
+    """
+    return [round(float(angle),ANGLE_DIGITS)
+            for angle in np.linspace(-angleRange,angleRange,max(int(count),2))]
+
+def getInfluenceColumns(skinCluster,influence,*args,**kwargs):
+    """インフルエンスと、その子孫のインフルエンスのウエイト配列の列番号を取得する
+    インフルエンスを回転させると子孫のインフルエンスも一緒に動くので、
+    それらのウエイトを持つ頂点も変形します。
+
+    Args:
+        skinCluster (str): skinClusterの名前
+        influence (str): インフルエンス
+
+    Returns:
+        list: 列番号のリスト。影響するインフルエンスがない場合は空のリスト
+    """
+    selList = om.MSelectionList()
+    try:
+        selList.add(influence)
+        root = selList.getDagPath(0).fullPathName()
+    except (RuntimeError,TypeError):
+        return []
+    skinFn,dagPath = weightData.getSkinClusterFn(skinCluster)
+    columns = []
+    for i,influencePath in enumerate(skinFn.influenceObjects()):
+        fullPath = influencePath.fullPathName()
+        if fullPath == root or fullPath.startswith(root + '|'):
+            columns.append(i)
+    return columns
+
+def affectedRows(weights,columns,*args,**kwargs):
+    """指定の列のいずれかにウエイトを持つ頂点番号を求める
+
+    Args:
+        weights (numpy.ndarray): ウエイト配列 (頂点数 x インフルエンス数)
+        columns (list): 列番号のリスト
+
+    Returns:
+        numpy.ndarray: 頂点番号の配列 (int32)
+    """
+    return np.flatnonzero((weights[:,columns] > 0.0).any(axis = 1)).astype(np.int32)
+
+def _angleKey(angle,*args,**kwargs):
+    return round(float(angle),ANGLE_DIGITS)
+
+class RomSweepCache(object):
+    """インフルエンスを回転させたときの変形後の頂点座標を、角度ごとにキャッシュするクラス
+    skinClusterとインフルエンスの組(以下、記録)ごとに影響する頂点番号を保持し、
+    角度ごとには影響する頂点の座標だけをfloat32で保持します。影響しない頂点の座標は保持しません。
+    記録時のポーズを基準にするので、他のインフルエンスを動かした場合は記録しなおしてください。
+
+    Attributes:
+        maxBytes (int): 保持できる座標の合計の大きさ[バイト]
+        hits (int): キャッシュから座標を返した回数
+        misses (int): キャッシュに記録がなかった回数
+    """
+
+    def __init__(self,maxBytes = 64 * 1024 * 1024,*args,**kwargs):
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        # (skinCluster, インフルエンス) → 記録
+        # (rows: 影響する頂点番号, columns: 列番号, samples: 軸 → {角度: 座標})
+        self._sweeps = OrderedDict()
+        # 最も長く使われていない角度から破棄するための順番 ((skinCluster, インフルエンス, 軸, 角度)のキー)
+        self._order = OrderedDict()
+        self._nbytes = 0
+
+    def __len__(self):
+        return len(self._order)
+
+    def __contains__(self,key):
+        return key in self._sweeps
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def setMaxBytes(self,maxBytes,*args,**kwargs):
+        """保持できる大きさを変更する。超えている場合は古い角度から破棄する
+
+        Args:
+            maxBytes (int): 保持できる大きさ[バイト]
+
+        Returns:
+            None
+        """
+        self.maxBytes = maxBytes
+        self._evict()
+
+    def sweep(self,skinClusters,influence,axes = AXES,angles = None,weightCache = None,*args,**kwargs):
+        """インフルエンスを回転させて、角度ごとの変形後の座標を記録する
+        現在の回転値を基準に、軸ごとにanglesだけ回転させた座標を記録し、最後に元の回転値に戻します。
+        APIで回転させるので、undoキューには積まれず、キーも打ちません。
+        同じ記録が既にある場合は置き換えます。
+
+        Args:
+            skinClusters (list): 対象のskinCluster
+            influence (str): 回転させるインフルエンス
+            axes (list): 回転させる軸
+            angles (list): 基準からの角度 (UIの角度単位)。Noneの場合はsampleAngles()
+            weightCache (weightData.SkinWeightCache): 指定した場合、キャッシュしたウエイトを使う
+
+        Returns:
+            dict: 処理結果 (skinClusters: 記録したskinClusterのリスト, vertices: 影響する頂点数の合計,
+                  samples: 記録した角度の数, time: 処理時間[秒])
+        """
+        startTime = time.time()
+        angles = sampleAngles() if angles is None else [_angleKey(angle) for angle in angles]
+        targets = []
+        for skinCluster in skinClusters:
+            columns = getInfluenceColumns(skinCluster,influence)
+            if not columns:
+                continue
+            if weightCache is not None:
+                weights = weightCache.weights(skinCluster)
+            else:
+                weights = weightData.readWeights(skinCluster)[0]
+            rows = affectedRows(weights,columns)
+            if not len(rows):
+                continue
+            self.remove(skinCluster,influence)
+            meshFn = meshTopology.getOutputMesh(skinCluster)
+            sweep = {'rows':rows,
+                     'columns':columns,
+                     'samples':dict((axis,{}) for axis in AXES)}
+            self._sweeps[(skinCluster,influence)] = sweep
+            self._nbytes += sweep['rows'].nbytes
+            targets.append((skinCluster,sweep,meshFn))
+
+        sampleCount = 0
+        if targets:
+            transformFn = utilityProc.getTransformFn(influence)
+            baseValues = utilityProc.getRotation(transformFn)
+            try:
+                for axis in axes:
+                    axisIndex = AXES.index(axis)
+                    for angle in angles:
+                        values = list(baseValues)
+                        values[axisIndex] += angle
+                        utilityProc.setRotation(transformFn,values)
+                        for skinCluster,sweep,meshFn in targets:
+                            points = meshTopology.getPoints(meshFn)[sweep['rows']].astype(np.float32)
+                            self._store((skinCluster,influence,axis,angle),sweep,points)
+                            sampleCount += 1
+            finally:
+                utilityProc.setRotation(transformFn,baseValues)
+            self._evict()
+
+        result = {'skinClusters':[target[0] for target in targets],
+                  'vertices':sum(len(target[1]['rows']) for target in targets),
+                  'samples':sampleCount,
+                  'time':time.time() - startTime}
+        om.MGlobal.displayInfo('ROM: {} の {} 頂点を {} 回記録しました。({:.3f} 秒, {:.1f} MB)'.format(
+                                influence,result['vertices'],sampleCount,result['time'],
+                                self._nbytes / (1024.0 * 1024.0)))
+        return result
+
+    def _store(self,key,sweep,points,*args,**kwargs):
+        """角度の座標を記録する
+        """
+        samples = sweep['samples'][key[2]]
+        previous = samples.get(key[3])
+        if previous is not None:
+            self._nbytes -= previous.nbytes
+        samples[key[3]] = points
+        self._nbytes += points.nbytes
+        self._order.pop(key,None)
+        self._order[key] = None
+
+    def _evict(self,*args,**kwargs):
+        """上限を超えている間、最も長く使われていない角度から破棄する
+        角度が1つも残っていない記録は、頂点番号も破棄します。
+        """
+        while self._nbytes > self.maxBytes and self._order:
+            key = self._order.popitem(last = False)[0]
+            sweep = self._sweeps.get(key[:2])
+            points = sweep['samples'][key[2]].pop(key[3])
+            self._nbytes -= points.nbytes
+            if not any(sweep['samples'].values()):
+                self.remove(*key[:2])
+
+    def angles(self,skinCluster,influence,axis,*args,**kwargs):
+        """記録している角度のリストを返す
+
+        Args:
+            skinCluster (str): skinClusterの名前
+            influence (str): インフルエンス
+            axis (str): 軸
+
+        Returns:
+            list: 角度のリスト (昇順)
+        """
+        sweep = self._sweeps.get((skinCluster,influence))
+        if sweep is None:
+            return []
+        return sorted(sweep['samples'][axis])
+
+    def sample(self,skinCluster,influence,axis,angle,*args,**kwargs):
+        """指定の角度の、影響する頂点の変形後の座標を返す
+        記録した角度の間は、前後の角度の座標を線形に補間します。
+        記録した範囲の外は、最も近い角度の座標を返します。
+
+        Args:
+            skinCluster (str): skinClusterの名前
+            influence (str): インフルエンス
+            axis (str): 軸
+            angle (float): 基準からの角度 (UIの角度単位)
+
+        Returns:
+            tuple: (影響する頂点番号の配列, その頂点の座標 (頂点数 x 3, float32))。記録がない場合はNone
+        """
+        sweep = self._sweeps.get((skinCluster,influence))
+        samples = sweep['samples'][axis] if sweep is not None else None
+        if not samples:
+            self.misses += 1
+            return None
+        keys = sorted(samples)
+        angle = min(max(_angleKey(angle),keys[0]),keys[-1])
+        i = int(np.searchsorted(keys,angle))
+        upper = keys[i]
+        lower = keys[i - 1] if upper != angle else upper
+        for used in (lower,upper):
+            key = (skinCluster,influence,axis,used)
+            self._order.pop(key,None)
+            self._order[key] = None
+
+        if lower == upper:
+            rowPoints = samples[lower]
+        else:
+            t = np.float32((angle - lower) / (upper - lower))
+            rowPoints = samples[lower] * (np.float32(1.0) - t) + samples[upper] * t
+        self.hits += 1
+        return sweep['rows'],rowPoints
+
+    def invalidateRows(self,skinCluster,rows,weights = None,*args,**kwargs):
+        """ウエイトが変更された頂点に影響する記録を破棄する
+        変更された頂点を含む記録と、weightsを指定した場合は、記録の後に新しく
+        インフルエンスのウエイトを持った頂点がある記録を破棄します。他の記録は残します。
+
+        Args:
+            skinCluster (str): skinClusterの名前
+            rows (numpy.ndarray): 変更された頂点番号。Noneの場合はskinClusterの全記録を破棄する
+            weights (numpy.ndarray): 変更後のウエイト配列 (頂点数 x インフルエンス数)
+
+        Returns:
+            int: 破棄した記録の数
+        """
+        if rows is not None:
+            rows = np.asarray(rows,dtype = np.int64)
+        removed = 0
+        for name,influence in list(self._sweeps):
+            if name != skinCluster:
+                continue
+            sweep = self._sweeps[(name,influence)]
+            if rows is None or np.isin(rows,sweep['rows']).any():
+                stale = True
+            elif weights is not None:
+                changed = rows[rows < weights.shape[0]]
+                stale = bool((weights[changed][:,sweep['columns']] > 0.0).any())
+            else:
+                stale = False
+            if stale:
+                self.remove(name,influence)
+                removed += 1
+        return removed
+
+    def remove(self,skinCluster,influence,*args,**kwargs):
+        """記録を破棄する
+
+        Args:
+            skinCluster (str): skinClusterの名前
+            influence (str): インフルエンス
+
+        Returns:
+            None
+        """
+        sweep = self._sweeps.pop((skinCluster,influence),None)
+        if sweep is None:
+            return
+        self._nbytes -= sweep['rows'].nbytes
+        for axis,samples in sweep['samples'].items():
+            for angle,points in samples.items():
+                self._nbytes -= points.nbytes
+                self._order.pop((skinCluster,influence,axis,angle),None)
+
+    def invalidate(self,skinCluster = None,*args,**kwargs):
+        """キャッシュを破棄する
+
+        Args:
+            skinCluster (str): skinClusterの名前。Noneの場合は全skinCluster
+
+        Returns:
+            None
+        """
+        for name,influence in list(self._sweeps):
+            if skinCluster is None or name == skinCluster:
+                self.remove(name,influence)
+
+class RomPreview(object):
+    """キャッシュした座標を表示するプレビュー用のメッシュを管理するクラス
+    ワールド直下に一時的なトランスフォームを1つ作り、その下にskinClusterの出力メッシュと同じワールド行列の
+    トランスフォームを作って出力メッシュを複製し、元のメッシュは非表示にします。
+    ノードの作成・削除と表示の切り替えはAPIで行うので、undoキューには積まれません。
+    作成したノードはdoNotWriteにし、シーンの保存・書き出し・開く・新規の前にはプレビューを終了するので、
+    プレビュー中の状態はシーンファイルに残りません。終了すると一時的なトランスフォームごと削除し、
+    元のメッシュの表示を戻します。プレビューの前に保存済みだったシーンは、保存済みの状態に戻します。
+
+    Attributes:
+        meshes (dict): skinCluster → プレビュー用のメッシュのMDagPath
+    """
+
+    def __init__(self,*args,**kwargs):
+        self.meshes = {}
+        # skinCluster → プレビュー用のメッシュに書き込んでいる全頂点の座標
+        self._points = {}
+        # skinCluster → (元のメッシュのMDagPath, 非表示にしたか)
+        self._sources = {}
+        self._root = None
+        self._callbackIds = []
+        # プレビューを始める前の (シーンを変更していたか, 次にundoする操作の名前)
+        self._sceneState = None
+
+    def isActive(self,*args,**kwargs):
+        """プレビュー中かどうかを判定する
+        """
+        return bool(self.meshes)
+
+    def begin(self,skinClusters,*args,**kwargs):
+        """プレビュー用のメッシュを作成する
+        既に作成済みのskinClusterはそのまま使います。
+        途中で失敗した場合は、作成したノードを削除してから例外を送出します。
+
+        Args:
+            skinClusters (list): 対象のskinCluster
+
+        Returns:
+            None
+        """
+        targets = [skinCluster for skinCluster in skinClusters if not skinCluster in self.meshes]
+        if not targets:
+            return
+        try:
+            self._begin(targets)
+        except:
+            self.end()
+            raise
+
+    def _begin(self,skinClusters,*args,**kwargs):
+        """プレビュー用のメッシュを作成する
+        """
+        if self._root is None or not self._root.isValid():
+            self._sceneState = (cmds.file(q = True,modified = True),cmds.undoInfo(q = True,undoName = True))
+            self._watchScene()
+            modifier = om.MDagModifier()
+            root = modifier.createNode('transform')
+            modifier.renameNode(root,PREVIEW_ROOT)
+            modifier.doIt()
+            om.MFnDependencyNode(root).setDoNotWrite(True)
+            self._root = om.MDagPath.getAPathTo(root)
+
+        meshFns = [meshTopology.getOutputMesh(skinCluster) for skinCluster in skinClusters]
+        modifier = om.MDagModifier()
+        transforms = []
+        for meshFn in meshFns:
+            transform = modifier.createNode('transform',self._root.node())
+            modifier.renameNode(transform,om.MFnDependencyNode(meshFn.getPath().transform()).name() + PREVIEW_SUFFIX)
+            transforms.append(transform)
+        modifier.doIt()
+
+        selList = om.MSelectionList()
+        selList.add(PREVIEW_SHADING_GROUP)
+        setFn = om.MFnSet(selList.getDependNode(0))
+        for skinCluster,meshFn,transform in zip(skinClusters,meshFns,transforms):
+            dagPath = meshFn.getPath()
+            transformFn = om.MFnTransform(transform)
+            transformFn.setTransformation(om.MTransformationMatrix(dagPath.inclusiveMatrix()))
+            transformFn.setDoNotWrite(True)
+            previewFn = om.MFnMesh()
+            previewFn.copy(meshFn.object(),transform)
+            previewFn.setDoNotWrite(True)
+            setFn.addMember(previewFn.getPath())
+            self.meshes[skinCluster] = previewFn.getPath()
+            self._points[skinCluster] = meshTopology.getPoints(meshFn)
+
+            plug = om.MFnDependencyNode(dagPath.node()).findPlug('visibility',False)
+            hidden = plug.asBool() and not plug.isLocked and not plug.isDestination
+            if hidden:
+                plug.setBool(False)
+            self._sources[skinCluster] = (dagPath,hidden)
+
+    def show(self,skinCluster,rows,points,*args,**kwargs):
+        """プレビュー用のメッシュの、指定の頂点に座標を書き込む
+        他の頂点は、前に書き込んだ座標のままにします。
+
+        Args:
+            skinCluster (str): skinClusterの名前
+            rows (numpy.ndarray): 頂点番号の配列
+            points (numpy.ndarray): 頂点の座標 (頂点数 x 3)
+
+        Returns:
+            bool: 書き込んだ場合はTrue。プレビュー用のメッシュがない場合はFalse
+        """
+        previewPath = self.meshes.get(skinCluster)
+        if previewPath is None or not previewPath.isValid():
+            return False
+        current = self._points[skinCluster]
+        current[rows] = points
+        meshTopology.setPoints(om.MFnMesh(previewPath),current)
+        return True
+
+    def end(self,*args,**kwargs):
+        """一時的なトランスフォームごとプレビュー用のメッシュを削除し、元のメッシュの表示を戻す
+        プレビューの前に保存済みだったシーンは、その後にundoできる操作がなければ保存済みの状態に戻します。
+
+        Returns:
+            None
+        """
+        self._unwatchScene()
+        for source,hidden in self._sources.values():
+            if hidden and source.isValid():
+                om.MFnDependencyNode(source.node()).findPlug('visibility',False).setBool(True)
+        if self._root is not None and self._root.isValid():
+            modifier = om.MDagModifier()
+            modifier.deleteNode(self._root.node())
+            modifier.doIt()
+        if self._sceneState is not None:
+            modified,undoName = self._sceneState
+            if not modified and cmds.undoInfo(q = True,undoName = True) == undoName:
+                cmds.file(modified = False)
+        self.meshes = {}
+        self._points = {}
+        self._sources = {}
+        self._root = None
+        self._sceneState = None
+
+    def _watchScene(self,*args,**kwargs):
+        """シーンの保存・書き出し・開く・新規の前にプレビューを終了するコールバックを登録する
+        """
+        self._unwatchScene()
+        self._callbackIds = [om.MSceneMessage.addCallback(message,self._beforeSceneChanged)
+                             for message in (om.MSceneMessage.kBeforeSave,
+                                             om.MSceneMessage.kBeforeExport,
+                                             om.MSceneMessage.kBeforeOpen,
+                                             om.MSceneMessage.kBeforeNew)]
+
+    def _unwatchScene(self,*args,**kwargs):
+        """コールバックを解除する
+        """
+        if self._callbackIds:
+            om.MMessage.removeCallbacks(self._callbackIds)
+        self._callbackIds = []
+
+    def _beforeSceneChanged(self,*args):
+        """シーンの保存・書き出し・開く・新規の前のコールバック
+        """
+        self.end()
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""UIイベントの処理をまとめて実行するためのモジュール
+連続して発生するUIイベントを、Mayaがアイドルになったときに1回の処理にまとめます(IdleCoalescer)。
+ドラッグのように処理し続けるイベントは、上限の頻度に間引いて処理します(RateLimiter)。
+
+Attributes:
+    * None
+Todo:
+    * None
+"""
+from __future__ import absolute_import, division, generators, print_function
+try:
+    from future_builtins import *
+except:
+    pass
+import sys
+sys.dont_write_bytecode = True
+# ------------------------------------------------------------------------------
+import math
+import time
+import maya.cmds as cmds
+try:
+    from PySide6 import QtCore
+except ImportError:
+    try:
+        from PySide2 import QtCore
+    except ImportError:
+        QtCore = None
+
+def _createTimer(callback,*args,**kwargs):
+    """単発のQTimerを作成する
+
+    Args:
+        callback (function): 時間になったときに呼び出す関数
+
+    Returns:
+        QtCore.QTimer: タイマー。Qtがない、またはイベントループがない(mayapyなど)場合はNone
+    """
+    if QtCore is None or QtCore.QCoreApplication.instance() is None:
+        return None
+    timer = QtCore.QTimer()
+    timer.setSingleShot(True)
+    timer.timeout.connect(callback)
+    return timer
+
+class IdleCoalescer(object):
+    """連続したイベントを1回の処理にまとめるクラス
+    requestが呼ばれるたびにイベントを受け付け、最後のイベントから
+    latency秒以上経過した後のアイドル時に、指定の関数を1回だけ実行します。
+
+    待ち時間は単発のQTimerで待ち、時間になったらアイドル時の実行を1回だけ予約します。
+    待っている間にイベントが来た場合は、残りの時間でタイマーをかけなおすので、
+    アイドルキューに予約し続けることはありません。
+    Qtのイベントループがない場合(mayapyや代用品)は待たずに、次のアイドル時に実行します。
+
+    Attributes:
+        func (function): まとめて実行する関数
+        latency (float): 最後のイベントから実行までに待つ時間[秒]
+        received (int): 受け付けたイベントの数
+        applied (int): 実際に関数を実行した回数
+    """
+
+    def __init__(self,func,latency = 0.05,*args,**kwargs):
+        self.func = func
+        self.latency = latency
+        self.received = 0
+        self.applied = 0
+        self._pending = False
+        self._lastEventTime = 0.0
+        self._timer = None
+        self._timerChecked = False
+
+    def __call__(self,*args,**kwargs):
+        self.request()
+
+    def _getTimer(self,*args,**kwargs):
+        """タイマーを取得する。最初の呼び出し時に作成する
+        """
+        if not self._timerChecked:
+            self._timerChecked = True
+            self._timer = _createTimer(self._onTimer)
+        return self._timer
+
+    def _wait(self,delay,*args,**kwargs):
+        """delay秒後にアイドル時の実行を予約する
+        タイマーがない場合は、すぐに予約します。
+        """
+        timer = self._getTimer()
+        if timer is None:
+            cmds.evalDeferred(self._onIdle,lowestPriority = True)
+        else:
+            timer.start(max(int(math.ceil(delay * 1000.0)),0))
+
+    def request(self,*args,**kwargs):
+        """イベントを受け付ける
+        まだ実行待ちでなければ、latency秒後の実行を予約します。
+
+        Returns:
+            None
+        """
+        self.received += 1
+        self._lastEventTime = time.time()
+        if self._pending:
+            return
+        self._pending = True
+        self._wait(self.latency)
+
+    def _onTimer(self,*args,**kwargs):
+        """タイマーのコールバック
+        アイドル時の実行を1回だけ予約します。
+        """
+        if self._pending:
+            cmds.evalDeferred(self._onIdle,lowestPriority = True)
+
+    def _onIdle(self,*args,**kwargs):
+        """アイドル時のコールバック
+        待っている間にイベントが来て、最後のイベントからlatency秒経っていなければ、
+        残りの時間でタイマーをかけなおします。
+        """
+        if not self._pending:
+            return
+        remaining = self.latency - (time.time() - self._lastEventTime)
+        if remaining > 0.0 and self._getTimer() is not None:
+            self._wait(remaining)
+            return
+        self.flush()
+
+    def flush(self,*args,**kwargs):
+        """実行待ちのイベントがあれば、すぐに関数を実行する
+
+        Returns:
+            None
+        """
+        if not self._pending:
+            return
+        self._pending = False
+        if self._timer is not None:
+            self._timer.stop()
+        self.applied += 1
+        self.func()
+
+    def cancel(self,*args,**kwargs):
+        """実行待ちのイベントを破棄する
+
+        Returns:
+            None
+        """
+        self._pending = False
+        if self._timer is not None:
+            self._timer.stop()
+
+    def resetCounters(self,*args,**kwargs):
+        """イベントのカウンターをリセットする
+
+        Returns:
+            None
+        """
+        self.received = 0
+        self.applied = 0
+
+class RateLimiter(object):
+    """連続したイベントを、指定の間隔以上空けて処理するクラス
+    前回の実行からinterval秒経っていれば、requestですぐに関数を実行します。
+    経っていなければ、残りの時間を単発のQTimerで待ち、アイドル時に最新の状態で1回だけ実行します。
+    IdleCoalescerと違い、イベントが続いている間もinterval秒ごとに実行します。
+
+    Qtのイベントループがない場合(mayapyや代用品)は、アイドル時に間隔が経っていなければ実行せず、
+    次のrequest、またはflushで実行します。アイドルキューに予約し続けることはありません。
+
+    Attributes:
+        func (function): 実行する関数
+        interval (float): 実行の最小の間隔[秒]
+        received (int): 受け付けたイベントの数
+        applied (int): 実際に関数を実行した回数
+    """
+
+    def __init__(self,func,interval = 1.0 / 30.0,*args,**kwargs):
+        self.func = func
+        self.interval = interval
+        self.received = 0
+        self.applied = 0
+        self._pending = False
+        self._scheduled = False
+        self._lastRunTime = 0.0
+        self._timer = None
+        self._timerChecked = False
+
+    def __call__(self,*args,**kwargs):
+        self.request()
+
+    def _getTimer(self,*args,**kwargs):
+        """タイマーを取得する。最初の呼び出し時に作成する
+        """
+        if not self._timerChecked:
+            self._timerChecked = True
+            self._timer = _createTimer(self._onTimer)
+        return self._timer
+
+    def _remaining(self,*args,**kwargs):
+        """次に実行できるまでの時間[秒]を返す
+        """
+        return self.interval - (time.time() - self._lastRunTime)
+
+    def request(self,*args,**kwargs):
+        """イベントを受け付ける
+        前回の実行からinterval秒経っていればすぐに実行し、
+        経っていなければ残りの時間の後の実行を予約します。
+
+        Returns:
+            None
+        """
+        self.received += 1
+        self._pending = True
+        remaining = self._remaining()
+        if remaining <= 0.0:
+            self.flush()
+        elif not self._scheduled:
+            self._scheduled = True
+            timer = self._getTimer()
+            if timer is None:
+                cmds.evalDeferred(self._onIdle,lowestPriority = True)
+            else:
+                timer.start(max(int(math.ceil(remaining * 1000.0)),0))
+
+    def _onTimer(self,*args,**kwargs):
+        """タイマーのコールバック
+        アイドル時の実行を1回だけ予約します。
+        """
+        if self._pending:
+            cmds.evalDeferred(self._onIdle,lowestPriority = True)
+        else:
+            self._scheduled = False
+
+    def _onIdle(self,*args,**kwargs):
+        """アイドル時のコールバック
+        間隔が経っていなければ、タイマーがある場合は残りの時間でかけなおし、
+        ない場合は次のrequestかflushに任せます。
+        """
+        self._scheduled = False
+        if not self._pending:
+            return
+        remaining = self._remaining()
+        if remaining > 0.0:
+            timer = self._getTimer()
+            if timer is not None:
+                self._scheduled = True
+                timer.start(max(int(math.ceil(remaining * 1000.0)),0))
+            return
+        self.flush()
+
+    def flush(self,*args,**kwargs):
+        """実行待ちのイベントがあれば、間隔によらずすぐに関数を実行する
+
+        Returns:
+            None
+        """
+        if not self._pending:
+            return
+        self._pending = False
+        self._lastRunTime = time.time()
+        self.applied += 1
+        self.func()
+
+    def cancel(self,*args,**kwargs):
+        """実行待ちのイベントを破棄し、次のrequestはすぐに実行する
+
+        Returns:
+            None
+        """
+        self._pending = False
+        self._scheduled = False
+        self._lastRunTime = 0.0
+        if self._timer is not None:
+            self._timer.stop()
+
+    def resetCounters(self,*args,**kwargs):
+        """イベントのカウンターをリセットする
+
+        Returns:
+            None
+        """
+        self.received = 0
+        self.applied = 0
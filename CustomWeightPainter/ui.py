@@ -6,7 +6,6 @@ Attributes:
 
 Todo:
     ・ジョイントの回転コントロールをもう少し使いやすくする
-    ・inflenceLockにキーふぁふられている場合、inflenceリストの南京錠マークを赤くする（したい）
 """
 from __future__ import absolute_import, division, generators, print_function
 try:
@@ -14,7 +13,6 @@ try:
 except:
     pass
 import sys
-from importlib import reload
 sys.dont_write_bytecode = True
 # ------------------------------------------------------------------------------
 import maya.cmds as cmds
@@ -23,7 +21,18 @@ import maya.api.OpenMaya as om
 from maya.common.ui import LayoutManager
 
 from . import utilityProc
-reload(utilityProc)
+from . import influenceIndex
+from . import perf
+from . import scheduler
+from . import dragPose
+from . import poseSnapshot
+from . import lockMonitor
+from . import weightData
+from . import mirrorMap
+from . import weightHistory
+from . import meshTopology
+from . import parallel
+from . import romSweep
 
 def createScriptJob(func,event,parentUi,*args,**kwargs):
     """スクリプトジョブを作成する。
@@ -42,6 +51,36 @@ def createScriptJob(func,event,parentUi,*args,**kwargs):
     scriptJob = cmds.scriptJob(e = [event,func],p=parentUi)
     return scriptJob
 
+# インフルエンスを選ぶモードのコンテキストの名前
+PICK_CONTEXT = 'CustomWeightPainterPickInflenceCtx'
+
+# UI言語ごとの、ウエイトペイントToolのインフルエンスframeLayoutのラベル
+INFLUENCE_FRAME_LABELS = {
+    'ja_JP':'インフルエンス',
+    'en_US':'Influences',
+}
+
+# セッション中に一度だけ調べた値を保持する
+_uiLanguage = None
+_influenceFrameLabels = None
+_influenceFrameLayouts = {}
+
+def getUiLanguage(*args,**kwargs):
+    """MayaのUI言語を取得する
+    最初の呼び出し時にだけcmds.aboutで問い合わせ、以降は記憶した値を返します。
+
+    Args:
+        None
+
+    Returns:
+        str: UI言語 (ja_JP, en_USなど)
+
+    """
+    global _uiLanguage
+    if _uiLanguage is None:
+        _uiLanguage = cmds.about(uiLanguage=True)
+    return _uiLanguage
+
 def isJapaneseLanguage(*args,**kwargs):
     """Mayaが日本語の言語設定かどうかを判定する
     現在のMayaの言語設定が日本語かどうかを判定します。
@@ -53,11 +92,85 @@ def isJapaneseLanguage(*args,**kwargs):
         bool: 日本語の場合はTrue、それ以外はFalse
 
     """
-    if cmds.about(uiLanguage=True) == 'ja_JP':
+    if getUiLanguage() == 'ja_JP':
         return True
     else:
         return False
 
+def getInfluenceFrameLabels(*args,**kwargs):
+    """インフルエンスframeLayoutのラベルとして認めるラベルを取得する
+    Maya自身のUIリソースからローカライズされたラベルを取得し、
+    取得できない言語でも動くように、既知のラベルを加えて返します。
+
+    Args:
+        None
+
+    Returns:
+        set: ラベルのセット
+
+    """
+    global _influenceFrameLabels
+    if _influenceFrameLabels is not None:
+        return _influenceFrameLabels
+
+    labels = set([INFLUENCE_FRAME_LABELS['en_US']])
+    language = getUiLanguage()
+    if language in INFLUENCE_FRAME_LABELS:
+        labels.add(INFLUENCE_FRAME_LABELS[language])
+    try:
+        labels.add(mel.eval('uiRes("m_artAttrSkinProperties.kInfluences")'))
+    except:
+        pass
+    labels.discard('')
+    labels.discard(None)
+    _influenceFrameLabels = labels
+    return _influenceFrameLabels
+
+def isInfluenceFrameLayout(frameLayout,*args,**kwargs):
+    """インフルエンスリストのframeLayoutかどうかを判定する
+
+    Args:
+        frameLayout (str): frameLayoutの名前
+
+    Returns:
+        bool: インフルエンスリストのframeLayoutの場合はTrue
+
+    """
+    if not cmds.frameLayout(frameLayout,q = True,ex = True):
+        return False
+    return cmds.frameLayout(frameLayout,q = True,l = True) in getInfluenceFrameLabels()
+
+def findInfluenceFrameLayout(mainToolSettingsLayout,*args,**kwargs):
+    """toolPropertyWindowからインフルエンスリストのframeLayoutを探す
+    前回見つけたframeLayoutがまだ有効であればそれを返し、
+    無効な場合だけtabLayoutの中をすべて調べます。
+
+    Args:
+        mainToolSettingsLayout (str): toolPropertyWindowのtabLayout
+
+    Returns:
+        str: frameLayoutのフルパス。見つからない場合はNone
+
+    """
+    cached = _influenceFrameLayouts.get(mainToolSettingsLayout)
+    if cached and isInfluenceFrameLayout(cached):
+        return cached
+
+    _influenceFrameLayouts.pop(mainToolSettingsLayout,None)
+    for v in cmds.tabLayout(mainToolSettingsLayout, q = True, ca = True) or []:
+        col = '{}|{}'.format(mainToolSettingsLayout,v)
+        if not cmds.columnLayout(col,q = True,ex = True):
+            continue
+
+        children = cmds.columnLayout(col,q = True,ca = True) or []
+        for ch in children:
+            frame = '{}|{}'.format(col,ch)
+            if not isInfluenceFrameLayout(frame):
+                continue
+            _influenceFrameLayouts[mainToolSettingsLayout] = frame
+            return frame
+    return None
+
 class poseActionStateObj(object):
     """ポーズアクションの状態を保持するクラス
     CutomWitghtPainterで対象のインフルエンスジョイントを回転させた後の
@@ -96,17 +209,123 @@ class CustomWeightPainterUI(object):
         poseActionState (poseActionStateObj): ポーズアクションの状態を保持するオブジェクト
         targetInflence (str): 対象のインフルエンスジョイント
         preValues (list): 回転前の値
+        index (influenceIndex.InfluenceIndex): ペイント対象のskinClusterとインフルエンスのインデックス
+        startupTimer (perf.StartupTimer): 起動時間の内訳を記録するオブジェクト
+        inflListChangedScheduler (scheduler.IdleCoalescer): インフルエンスリストの選択変更をまとめて処理するオブジェクト
+        dragMode (bool): ドラッグで回転をプレビューするスライダーを使うか
+        dragPoser (dragPose.DragPoser): ドラッグ中の回転を管理するオブジェクト
+        poseStore (poseSnapshot.PoseSnapshotStore): Tool起動時のポーズなどを保持するオブジェクト
+        sessionInflences (frozenset): Tool起動時のポーズを記録したインフルエンス
+        lockDetector (lockMonitor.KeyedLockDetector): inflenceLockにキーが振られているインフルエンスを監視するオブジェクト
+        weightCache (weightData.SkinWeightCache): skinClusterごとのウエイト配列のキャッシュ
+        statsThreshold (float): ウエイトの統計で数える頂点のしきい値
+        pruneMaxInfluences (int): Pruneで残す1頂点あたりの最大インフルエンス数
+        pruneThreshold (float): Pruneで0にするウエイトのしきい値
+        workerCount (int): skinClusterごとのウエイトの計算に使うスレッド数
+        meshPipeline (parallel.MeshPipeline): skinClusterごとのウエイトの計算を並列に実行するオブジェクト
+        smoothIterations (int): Smoothの反復回数
+        smoothStrength (float): Smoothで1回の反復で平均に近づける割合
+        adjacencyCache (meshTopology.AdjacencyCache): メッシュのトポロジーごとの頂点の隣接行列のキャッシュ
+        mirrorAxis (str): Mirrorの軸
+        mirrorPositiveToNegative (bool): Mirrorで+側から-側へコピーするか
+        mirrorTolerance (float): Mirrorで頂点が一致とみなす距離
+        mirrorCache (mirrorMap.MirrorMapCache): メッシュのトポロジーと頂点座標ごとの頂点の対応のキャッシュ
+        selectMinWeight (float): ウエイトで頂点を選択するときの下限
+        selectMaxWeight (float): ウエイトで頂点を選択するときの上限
+        weightFileDirectory (str): 前回ウエイトファイルを書き出した・読み込んだディレクトリ
+        weightHistory (weightHistory.WeightHistory): ウエイトの変更の差分の履歴
+        historyScheduler (scheduler.IdleCoalescer): ストロークの変更をまとめて履歴に記録するオブジェクト
+        historyMaxMB (int): 履歴に使うメモリの上限[MB]
+        romSamples (int): ROMの記録で1軸あたりに記録する角度の数
+        romRange (float): ROMの記録で回転させる角度の範囲(±)
+        romMaxMB (int): ROMの記録に使うメモリの上限[MB]
+        romCache (romSweep.RomSweepCache): インフルエンスを回転させた変形後の座標のキャッシュ
+        romPreview (romSweep.RomPreview): キャッシュした座標を表示するプレビュー用のメッシュ
+        profiling (bool): 操作ごとの処理時間とcmds/melの呼び出し回数を記録するか
 
     """
 
     poseActionState = poseActionStateObj()
     
     preValues = [0.0,0.0,0.0]
+
+    # インフルエンスリストの選択変更を反映するまでに待つ時間[秒]
+    inflListLatency = 0.05
+
+    # ドラッグ中に回転を反映する最大の頻度[Hz]
+    dragRate = 30.0
+    dragMode = False
+
+    # Tool起動時に記録するポーズの名前
+    sessionPose = 'session'
+
+    statsThreshold = 0.5
+
+    pruneMaxInfluences = 4
+    pruneThreshold = 0.001
+
+    workerCount = parallel.defaultWorkerCount()
+
+    smoothIterations = 10
+    smoothStrength = 0.5
+
+    mirrorAxis = 'x'
+    mirrorPositiveToNegative = True
+    mirrorTolerance = 0.001
+    # ウエイトによる頂点選択の設定
+    selectMinWeight = 0.5
+    selectMaxWeight = 1.0
+
+    weightFileDirectory = None
+
+    # ウエイトの変更が止まってから履歴に記録するまでに待つ時間[秒] (1回のストロークを1つの差分にまとめる)
+    historyLatency = 0.3
+    historyMaxMB = 256
+
+    # ROMの記録の設定
+    romSamples = 9
+    romRange = 90.0
+    romMaxMB = 64
+    # 操作の記録 (perf.actionProfiler)
+    profiling = False
     
     def __init__(self):
         self.customUi = 'CustomWeightPainterUI_UserControl'
         self.toolName = False
-        pass
+        self.index = influenceIndex.InfluenceIndex()
+        self.startupTimer = perf.StartupTimer()
+        self.inflListChangedScheduler = scheduler.IdleCoalescer(self.applyInflListChanged,
+                                                                latency = self.inflListLatency)
+        self.targetInflence = None
+        self.attrControlX = None
+        self.attrControlY = None
+        self.attrControlZ = None
+        self.dragPoser = dragPose.DragPoser(maxRate = self.dragRate)
+        self.dragControls = {}
+        self.attrSliderLayout = None
+        self.dragSliderLayout = None
+        self.poseStore = poseSnapshot.PoseSnapshotStore()
+        self.sessionInflences = frozenset()
+        self.lockDetector = lockMonitor.KeyedLockDetector(self.index)
+        self.weightCache = weightData.SkinWeightCache()
+        self.mirrorCache = mirrorMap.MirrorMapCache()
+        self.adjacencyCache = meshTopology.AdjacencyCache()
+        self.meshPipeline = parallel.MeshPipeline(self.workerCount)
+        self.weightHistory = weightHistory.WeightHistory(maxBytes = self.historyMaxMB * 1024 * 1024)
+        self.historyScheduler = scheduler.IdleCoalescer(self.recordWeightHistory,
+                                                        latency = self.historyLatency)
+        self.weightCache.onDirty = lambda *args:self.historyScheduler.request()
+        self.weightCache.onRefresh = self.recordWeightDelta
+        self.romCache = romSweep.RomSweepCache(maxBytes = self.romMaxMB * 1024 * 1024)
+        self.romPreview = romSweep.RomPreview()
+        self.romControls = {}
+        # ROMを記録したインフルエンスと、記録したときの回転値
+        self.romInflence = None
+        self.romBaseValues = None
+        self.weightCache.onUpdate = self.invalidateRomRows
+        self.historyText = None
+        self.historyList = None
+        self.statsText = None
     
     def errorPrint(self,errorType = 0,*args,**kwargs):
         """エラーメッセージを表示する
@@ -133,9 +352,11 @@ class CustomWeightPainterUI(object):
         elif errorType == 4:
             om.MGlobal.displayWarning('カスタムUIの格納に失敗しました。\nToolの動作が正常でない可能性があります。')
 
+    @perf.profiled
     def showWindow(self,*args,**kwargs):
         """ウィンドウを表示する
         ウィンドウを表示します。
+        toolPropertyWindowにカスタムUIが残っている場合は、UIを作り直さずに使いまわします。
 
         Args:
             None
@@ -143,25 +364,83 @@ class CustomWeightPainterUI(object):
         Returns:
             None
         """
-        self.toolName = mel.eval('artAttrSkinToolScript 3')
-        self.attrControlX = None
-        self.attrControlY = None
-        self.attrControlZ = None
-        cmds.evalDeferred(self.createUI)
+        with self.startupTimer.measure('artAttrSkinToolScript'):
+            self.toolName = mel.eval('artAttrSkinToolScript 3')
+        with self.startupTimer.measure('index'):
+            self.index.build(self.toolName)
+            self.index.startWatching()
+        with self.startupTimer.measure('poseSnapshot'):
+            self.captureSessionPose()
+
+        if not self.isCustomUiAttached():
+            self.attrControlX = None
+            self.attrControlY = None
+            self.attrControlZ = None
+            cmds.evalDeferred(lambda *args:self._timedCall('createUI',self.createUI))
         cmds.evalDeferred(self.setCustomArtSkinInflListChanged)
-        cmds.evalDeferred(self.setTargetJoint)
+        cmds.evalDeferred(lambda *args:self._timedCall('setTargetJoint',self.setTargetJoint))
 
-    # button action
-    def poseAction(self,axis='x',*args,**kwargs):
-        """ポーズアクションを実行する
-        weightPaintToolで選択されているインフルエンスジョイントに対して、
-        指定のポーズアクションを実行します。
+    def captureSessionPose(self,*args,**kwargs):
+        """Tool起動時のポーズを記録する
+        まだ記録していない場合と、インフルエンスの構成が変わった場合だけ記録します。
+        キーのカット後の更新や、Toolの再表示では記録済みのポーズを残します。
 
         Args:
-            axis (str): 回転軸
+            None
 
         Returns:
+            bool: 記録した場合はTrue
+        """
+        influences = self.index.influences()
+        if self.sessionPose in self.poseStore and frozenset(influences) == self.sessionInflences:
+            return False
+        self.poseStore.capture(self.sessionPose,influences)
+        self.sessionInflences = frozenset(influences)
+        return True
+
+    def _timedCall(self,name,func,*args,**kwargs):
+        """関数を実行し、処理時間を起動時間の内訳に記録する
+
+        Args:
+            name (str): 工程名
+            func (function): 実行する関数
+
+        Returns:
+            関数の戻り値
+        """
+        with self.startupTimer.measure(name):
+            return func(*args,**kwargs)
+
+    def isCustomUiAttached(self,*args,**kwargs):
+        """カスタムUIが使いまわせる状態かどうかを判定する
+        カスタムUIと回転コントロールが、現在のtoolPropertyWindowの中に残っているかを調べます。
+
+        Args:
+            None
+
+        Returns:
+            bool: 使いまわせる場合はTrue
+        """
+        if not cmds.paneLayout(self.customUi,q = True,ex = True):
+            return False
+        for control in (self.attrControlX,self.attrControlY,self.attrControlZ):
+            if not control or not cmds.attrFieldSliderGrp(control,q = True,ex = True):
+                return False
+        mainToolSettingsLayout = cmds.toolPropertyWindow(q = True,loc = True)
+        if not mainToolSettingsLayout:
+            return False
+        fullPath = cmds.paneLayout(self.customUi,q = True,fpn = True)
+        return fullPath.startswith(mainToolSettingsLayout)
+
+    # button action
+    def getPoseActionType(self,*args,**kwargs):
+        """現在のポーズアクションの種類を取得する
+
+        Args:
             None
+
+        Returns:
+            str: ポーズアクションの種類 (hold, revert, zero)。未選択の場合はFalse
         """
         actionType = False
         if self.poseActionState.hold:
@@ -170,12 +449,90 @@ class CustomWeightPainterUI(object):
             actionType = 'revert'
         elif self.poseActionState.zero:
             actionType = 'zero'
+        return actionType
+
+    @perf.profiled
+    def poseAction(self,axis='x',*args,**kwargs):
+        """ポーズアクションを実行する
+        weightPaintToolで選択されているインフルエンスジョイントに対して、
+        指定のポーズアクションを実行します。
+
+        Args:
+            axis (str): 回転軸
+
+        Returns:
+            None
+        """
+        actionType = self.getPoseActionType()
 
         utilityProc.poseAction(targetNode = self.targetInflence,
                                 axis = axis,
                                 preValues = self.preValues,
-                                actionType = actionType)
+                                actionType = actionType,
+                                index = self.index)
+        if actionType == 'hold':
+            self.poseStore.update(self.sessionPose,[self.targetInflence])
+
+    @perf.profiled
+    def revertAllPose(self,*args,**kwargs):
+        """全インフルエンスのポーズをTool起動時の状態に戻す
+        Tool起動時に記録したポーズを、リグ全体に一括で書き込みます。
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        count = self.poseStore.restore(self.sessionPose)
+        om.MGlobal.displayInfo('{} 個のインフルエンスのポーズを元に戻しました。'.format(count))
+        if self.dragMode:
+            self.refreshDragSliders(self.poseStore.rotation(self.sessionPose,self.targetInflence))
+
+    @perf.profiled
+    def dragRotate(self,axis,value,*args,**kwargs):
+        """ドラッグ用スライダーのドラッグコマンド
+        ドラッグ中の回転値をDragPoserに渡します。
+
+        Args:
+            axis (str): 回転軸
+            value (float): 回転値
+
+        Returns:
+            None
+        """
+        if not self.targetInflence:
+            return
+        if not self.dragPoser.active:
+            self.dragPoser.begin(self.targetInflence)
+        self.dragPoser.update(axis,value)
+
+    @perf.profiled
+    def endDragRotate(self,axis,value,*args,**kwargs):
+        """ドラッグ用スライダーのチェンジコマンド
+        ドラッグを終了し、ポーズアクションを1回だけ実行して確定します。
+        数値を直接入力した場合も同じように確定します。
+
+        Args:
+            axis (str): 回転軸
+            value (float): 回転値
+
+        Returns:
+            None
+        """
+        if not self.targetInflence:
+            return
+        if not self.dragPoser.active:
+            self.dragPoser.begin(self.targetInflence)
+        actionType = self.getPoseActionType()
+        values = self.dragPoser.end(axis,value,
+                                    actionType = actionType,
+                                    preValues = self.preValues)
+        if actionType == 'hold':
+            self.poseStore.update(self.sessionPose,[self.targetInflence])
+        self.refreshDragSliders(values)
     
+    @perf.profiled
     def cutKeyInflenceLock(self,all = False,*args,**kwargs):
         """キーをカットする
         インフルエンスのロックを解除してキーをカットします。
@@ -187,21 +544,33 @@ class CustomWeightPainterUI(object):
             None
         """
         if all:
-            skinClusters = cmds.artAttrSkinPaintCtx(self.toolName,q = True,pna = True).split(' ')
-            targetIngluences = []
-            for skinCluster in skinClusters:
-                if cmds.objectType(skinCluster) != 'skinCluster':
-                    continue
-                influences = cmds.skinCluster(skinCluster,q = True,inf = True)
-                targetIngluences.extend(influences)
-            influences = list(set(targetIngluences))
-            utilityProc.cutKeyInflenceLock(targetIngluences)
+            utilityProc.cutKeyInflenceLock(self.index.influences(),index = self.index,
+                                            keyedInflences = self.lockDetector.keyed)
         else:
-            utilityProc.cutKeyInflenceLock(targetInflence = [self.targetInflence])
+            utilityProc.cutKeyInflenceLock([self.targetInflence],index = self.index,
+                                            keyedInflences = self.lockDetector.keyed)
         
         # UIを更新
         cmds.evalDeferred(self.showWindow)
 
+    def getSelectedInflences(self,*args,**kwargs):
+        """インフルエンスリストで選択されているインフルエンスを取得する
+        選択が取得できない場合は、対象のインフルエンスジョイントを返します。
+
+        Args:
+            None
+
+        Returns:
+            list: インフルエンスのリスト
+        """
+        infListUi = mel.eval('$temp=$gArtSkinInfluencesList;')
+        selected = []
+        if infListUi and cmds.treeView(infListUi,q = True,ex = True):
+            selected = cmds.treeView(infListUi,q = True,si = True) or []
+        if not selected and self.targetInflence:
+            selected = [self.targetInflence]
+        return selected
+
     # for ui process
     def deleteUserControl(self,*args,**kwargs):
         """カスタムUIを削除する
@@ -226,8 +595,10 @@ class CustomWeightPainterUI(object):
         Returns:
             customUi (str): カスタムUIの名前
         """
-        selection = cmds.ls(sl = True)
-        tmpNode = cmds.createNode('transform')
+        # スライダーは現在のインフルエンスで作成する(一時ノードを作るとシーンとundoが汚れるため)
+        targetInflence = cmds.artAttrSkinPaintCtx(self.toolName,q = True,inf = True)
+        if not self.index.hasInfluence(targetInflence):
+            targetInflence = None
         with LayoutManager(cmds.paneLayout(self.customUi,configuration='vertical2',ps = (1,20,100),p = parent)) as pane:
             with LayoutManager(cmds.columnLayout(adj = True,p = self.customUi,w = 200)) as col2:
                 cmds.separator()
@@ -246,25 +617,151 @@ class CustomWeightPainterUI(object):
                                 ofc = lambda *args:setattr(self.poseActionState,'zero',False))
                 cmds.setParent('..')
 
+                cmds.rowLayout(nc = 3,p = col2,adj = 1)
                 cmds.text(l = 'Rotate inflence',al = 'left')
-                self.attrControlX = cmds.attrFieldSliderGrp( min=-180, max=180,
-                                                            cw = [(1,60),(2,50)],
-                                                            p=col2,
-                                                            cat = (1,'left',10),
-                                                            cc=lambda *args:self.poseAction(axis='x'),
-                                                            at='{}.rx'.format(tmpNode))
-                self.attrControlY = cmds.attrFieldSliderGrp( min=-180, max=180,
-                                                            cw = [(1,60),(2,50)],
-                                                            p=col2,
-                                                            cat = (1,'left',10),
-                                                            cc=lambda *args:self.poseAction(axis='y'),
-                                                            at='{}.ry'.format(tmpNode))
-                self.attrControlZ = cmds.attrFieldSliderGrp( min=-180, max=180,
-                                                            cw = [(1,60),(2,50)],
-                                                            p=col2,
-                                                            cat = (1,'left',10),
-                                                            cc=lambda *args:self.poseAction(axis='z'),
-                                                            at='{}.rz'.format(tmpNode))
+                cmds.button(l = 'Pick',w = 40,
+                            ann = 'ビューでクリックした頂点で、ウエイトが最も大きいインフルエンスを選ぶ',
+                            c = lambda *args:self.enterPickInflenceMode())
+                cmds.checkBox(l = 'Drag',v = self.dragMode,
+                            cc = lambda value,*args:self.setDragMode(value))
+                cmds.setParent('..')
+
+                self.attrSliderLayout = cmds.columnLayout(adj = True,p = col2)
+                self.attrControlX = self.createRotateSlider(axis = 'x',
+                                                            parent = self.attrSliderLayout,
+                                                            targetInflence = targetInflence)
+                self.attrControlY = self.createRotateSlider(axis = 'y',
+                                                            parent = self.attrSliderLayout,
+                                                            targetInflence = targetInflence)
+                self.attrControlZ = self.createRotateSlider(axis = 'z',
+                                                            parent = self.attrSliderLayout,
+                                                            targetInflence = targetInflence)
+
+                self.dragSliderLayout = cmds.columnLayout(adj = True,p = col2)
+                for axis in dragPose.AXES:
+                    self.dragControls[axis] = self.createDragSlider(axis = axis,
+                                                                    parent = self.dragSliderLayout)
+                self.setDragMode(self.dragMode)
+
+                cmds.separator(p = col2)
+                cmds.rowLayout(nc = 2,p = col2,adj = 1)
+                cmds.text(l = 'Weight stats',al = 'left')
+                cmds.floatField(v = self.statsThreshold,min = 0.0,max = 1.0,pre = 2,w = 50,
+                                ann = 'しきい値',
+                                cc = lambda value,*args:self.setStatsThreshold(value))
+                cmds.setParent('..')
+                self.statsText = cmds.text(l = '',al = 'left',p = col2)
+
+                cmds.rowLayout(nc = 3,p = col2,adj = 1)
+                cmds.text(l = 'Prune',al = 'left')
+                cmds.intField(v = self.pruneMaxInfluences,min = 0,w = 40,
+                                ann = '1頂点あたりの最大インフルエンス数',
+                                cc = lambda value,*args:setattr(CustomWeightPainterUI,'pruneMaxInfluences',value))
+                cmds.floatField(v = self.pruneThreshold,min = 0.0,max = 1.0,pre = 3,w = 50,
+                                ann = 'しきい値',
+                                cc = lambda value,*args:setattr(CustomWeightPainterUI,'pruneThreshold',value))
+                cmds.setParent('..')
+
+                cmds.rowLayout(nc = 4,p = col2,adj = 1)
+                cmds.text(l = 'Workers',al = 'left')
+                cmds.intField(v = self.workerCount,min = 1,w = 40,
+                                ann = 'skinClusterごとのウエイトの計算に使うスレッド数',
+                                cc = lambda value,*args:self.setWorkerCount(value))
+                cmds.button(l = 'Check',w = 45,
+                            ann = 'ペイント対象のウエイトに問題のある頂点を調べる',
+                            c = lambda *args:self.validateWeights())
+                cmds.button(l = 'Norm',w = 45,
+                            ann = 'ペイント対象のウエイトを正規化する',
+                            c = lambda *args:self.normalizeWeights())
+                cmds.setParent('..')
+
+                cmds.rowLayout(nc = 3,p = col2,adj = 1)
+                cmds.text(l = 'Smooth',al = 'left')
+                cmds.intField(v = self.smoothIterations,min = 1,w = 40,
+                                ann = '反復回数',
+                                cc = lambda value,*args:setattr(CustomWeightPainterUI,'smoothIterations',value))
+                cmds.floatField(v = self.smoothStrength,min = 0.0,max = 1.0,pre = 2,w = 50,
+                                ann = '1回の反復で平均に近づける割合',
+                                cc = lambda value,*args:setattr(CustomWeightPainterUI,'smoothStrength',value))
+                cmds.setParent('..')
+
+                cmds.rowLayout(nc = 3,p = col2,adj = 1)
+                cmds.text(l = 'Mirror',al = 'left')
+                axisMenu = cmds.optionMenu(cc = lambda value,*args:setattr(CustomWeightPainterUI,'mirrorAxis',value.lower()))
+                for axis in dragPose.AXES:
+                    cmds.menuItem(l = axis.upper())
+                cmds.optionMenu(axisMenu,e = True,v = self.mirrorAxis.upper())
+                cmds.checkBox(l = '+ to -',v = self.mirrorPositiveToNegative,
+                            cc = lambda value,*args:setattr(CustomWeightPainterUI,'mirrorPositiveToNegative',value))
+                cmds.setParent('..')
+
+                cmds.rowLayout(nc = 6,p = col2,adj = 1)
+                cmds.text(l = 'Select',al = 'left')
+                cmds.floatField(v = self.selectMinWeight,min = 0.0,max = 1.0,pre = 2,w = 40,
+                                ann = '選択するウエイトの下限',
+                                cc = lambda value,*args:setattr(CustomWeightPainterUI,'selectMinWeight',value))
+                cmds.floatField(v = self.selectMaxWeight,min = 0.0,max = 1.0,pre = 2,w = 40,
+                                ann = '選択するウエイトの上限',
+                                cc = lambda value,*args:setattr(CustomWeightPainterUI,'selectMaxWeight',value))
+                cmds.button(l = 'Sel',w = 30,
+                            ann = 'ペイント中のインフルエンスのウエイトが範囲内の頂点を選択する',
+                            c = lambda *args:self.selectByWeight())
+                cmds.button(l = '+',w = 20,
+                            ann = '選択をウエイトが範囲内の隣接する頂点へ広げる',
+                            c = lambda *args:self.growSelectionByWeight())
+                cmds.button(l = '-',w = 20,
+                            ann = '選択の境界からウエイトが範囲外の頂点を外す',
+                            c = lambda *args:self.growSelectionByWeight(shrink = True))
+                cmds.setParent('..')
+
+                cmds.separator(p = col2)
+                cmds.rowLayout(nc = 6,p = col2,adj = 1)
+                cmds.text(l = 'ROM sweep',al = 'left')
+                cmds.intField(v = self.romSamples,min = 2,w = 35,
+                                ann = '1軸あたりに記録する角度の数',
+                                cc = lambda value,*args:setattr(CustomWeightPainterUI,'romSamples',value))
+                cmds.floatField(v = self.romRange,min = 1.0,max = 180.0,pre = 0,w = 35,
+                                ann = '回転させる角度の範囲(±)',
+                                cc = lambda value,*args:setattr(CustomWeightPainterUI,'romRange',value))
+                cmds.intField(v = self.romMaxMB,min = 1,w = 35,
+                                ann = 'ROMの記録に使うメモリの上限[MB]',
+                                cc = lambda value,*args:self.setRomMaxMB(value))
+                cmds.button(l = 'Sweep',w = 45,
+                            ann = 'ペイント中のインフルエンスを軸ごとに回転させた変形を記録して、プレビューを開始する',
+                            c = lambda *args:self.sweepRom())
+                cmds.button(l = 'End',w = 30,
+                            ann = 'プレビューを終了して元のメッシュを表示する',
+                            c = lambda *args:self.endRomPreview())
+                cmds.setParent('..')
+                for axis in romSweep.AXES:
+                    self.romControls[axis] = self.createRomSlider(axis = axis,parent = col2)
+
+                cmds.separator(p = col2)
+                cmds.rowLayout(nc = 2,p = col2,adj = 1)
+                cmds.text(l = 'Weight history',al = 'left')
+                cmds.intField(v = self.historyMaxMB,min = 1,w = 50,
+                                ann = '履歴に使うメモリの上限[MB]',
+                                cc = lambda value,*args:self.setHistoryMaxMB(value))
+                cmds.setParent('..')
+                self.historyText = cmds.text(l = '',al = 'left',p = col2)
+                self.historyList = cmds.textScrollList(h = 80,p = col2,
+                                                       dcc = lambda *args:self.restoreWeightHistory())
+                cmds.rowLayout(nc = 2,p = col2)
+                cmds.button(l = 'Restore',w = 80,c = lambda *args:self.restoreWeightHistory())
+                cmds.button(l = 'Clear',w = 80,c = lambda *args:self.clearWeightHistory())
+                cmds.setParent('..')
+                self.refreshHistoryUi()
+
+                cmds.separator(p = col2)
+                cmds.rowLayout(nc = 3,p = col2,adj = 1)
+                cmds.text(l = 'Perf',al = 'left')
+                cmds.checkBox(l = 'Profile',v = self.profiling,
+                            ann = '操作ごとの処理時間とcmds/melの呼び出し回数を記録する',
+                            cc = lambda value,*args:self.setProfiling(value))
+                cmds.button(l = 'Dump',w = 60,
+                            ann = '処理時間の長い操作をスクリプトエディタに表示する',
+                            c = lambda *args:self.dumpProfile())
+                cmds.setParent('..')
                 
             with LayoutManager(cmds.columnLayout(adj = True,p = pane)) as col1:
                 cmds.separator()
@@ -274,7 +771,7 @@ class CustomWeightPainterUI(object):
                 cmds.shelfButton(style='iconAndTextVertical',
                                 label='GotoBP',ndp = True,
                                 image1='goToBindPose.png',
-                                c = utilityProc.gotoBindPose)
+                                c = lambda *args:utilityProc.restoreBindPose(skinClusters = self.index.paintableSkinClusters()))
                 cmds.shelfButton(style='iconAndTextVertical',
                                 label='SelObj',ndp = True,
                                 image1='polyMesh.png',
@@ -294,18 +791,132 @@ class CustomWeightPainterUI(object):
                                 iol = 'key',
                                 label='Set',ndp = True,bgc = (0.2,0.2,0.4),
                                 image1='setKeyframe.png',
-                                c = lambda *args:utilityProc.setKeyToTargetInflence(self.targetInflence))
+                                c = lambda *args:utilityProc.setKeyToInflences(self.getSelectedInflences(),index = self.index))
                 cmds.shelfButton(style='iconAndTextVertical',
                                 iol = 'key',
                                 label='Del',ndp = True,bgc = (0.4,0.2,0.2),
                                 image1='setKeyframe.png',
-                                c = lambda *args:utilityProc.cutKeyTotargetInflence(self.targetInflence))
-                
-        cmds.delete(tmpNode)
-        cmds.select(selection)
+                                c = lambda *args:utilityProc.cutKeyInflences(self.getSelectedInflences(),index = self.index))
+                cmds.shelfButton(style='iconAndTextVertical',
+                                label='RevAll',ndp = True,
+                                image1='undo.png',
+                                c = lambda *args:self.revertAllPose())
+                cmds.shelfButton(style='iconAndTextVertical',
+                                label='Prune',ndp = True,
+                                image1='pruneWeights.png',
+                                c = lambda *args:self.pruneWeights())
+                cmds.shelfButton(style='iconAndTextVertical',
+                                label='Mirror',ndp = True,
+                                image1='mirrorSkinWeight.png',
+                                c = lambda *args:self.mirrorWeights())
+                cmds.shelfButton(style='iconAndTextVertical',
+                                label='Smooth',ndp = True,
+                                image1='smoothSkinWeights.png',
+                                c = lambda *args:self.smoothWeights())
+
+                cmds.shelfButton(style='iconAndTextVertical',
+                                label='Export',ndp = True,
+                                image1='exportSmoothSkin.png',
+                                c = lambda *args:self.exportWeights())
+                cmds.shelfButton(style='iconAndTextVertical',
+                                label='Import',ndp = True,
+                                image1='importSmoothSkin.png',
+                                c = lambda *args:self.importWeights())
 
         return self.customUi
+
+    def createRotateSlider(self,axis,parent,targetInflence = None,*args,**kwargs):
+        """インフルエンスの回転用attrFieldSliderGrpを作成する
+
+        Args:
+            axis (str): 回転軸
+            parent (str): 親UI
+            targetInflence (str): 最初に接続するインフルエンス。Noneの場合は接続しない
+
+        Returns:
+            str: attrFieldSliderGrpの名前
+        """
+        flags = {}
+        if targetInflence:
+            flags['at'] = '{}.r{}'.format(targetInflence,axis)
+        return cmds.attrFieldSliderGrp(min=-180, max=180,
+                                        cw = [(1,60),(2,50)],
+                                        p=parent,
+                                        cat = (1,'left',10),
+                                        cc=lambda *args:self.poseAction(axis=axis),
+                                        **flags)
+
+    def createDragSlider(self,axis,parent,*args,**kwargs):
+        """インフルエンスの回転用のドラッグ対応floatSliderGrpを作成する
+        ドラッグ中の値はdragRotate、確定時の値はendDragRotateに渡されます。
+
+        Args:
+            axis (str): 回転軸
+            parent (str): 親UI
+
+        Returns:
+            str: floatSliderGrpの名前
+        """
+        return cmds.floatSliderGrp(l = 'Rotate {}'.format(axis.upper()),f = True,
+                                    min=-180, max=180,fmn = -360,fmx = 360,
+                                    cw = [(1,60),(2,50)],
+                                    p=parent,
+                                    cat = (1,'left',10),
+                                    dc=lambda value,*args:self.dragRotate(axis,value),
+                                    cc=lambda value,*args:self.endDragRotate(axis,value))
+
+    def createRomSlider(self,axis,parent,*args,**kwargs):
+        """記録したROMを表示するfloatSliderGrpを作成する
+
+        Args:
+            axis (str): 回転軸
+            parent (str): 親UI
+
+        Returns:
+            str: floatSliderGrpの名前
+        """
+        return cmds.floatSliderGrp(l = 'ROM {}'.format(axis.upper()),f = True,
+                                    min = -self.romRange,max = self.romRange,v = 0.0,
+                                    cw = [(1,60),(2,50)],
+                                    p = parent,
+                                    cat = (1,'left',10),
+                                    dc = lambda value,*args:self.scrubRom(axis,value),
+                                    cc = lambda value,*args:self.scrubRom(axis,value))
+
+    def setDragMode(self,state,*args,**kwargs):
+        """ドラッグ用スライダーと通常のスライダーを切り替える
+
+        Args:
+            state (bool): Trueの場合はドラッグ用スライダーを表示する
+
+        Returns:
+            None
+        """
+        CustomWeightPainterUI.dragMode = bool(state)
+        if self.attrSliderLayout and cmds.columnLayout(self.attrSliderLayout,q = True,ex = True):
+            cmds.columnLayout(self.attrSliderLayout,e = True,vis = not self.dragMode)
+        if self.dragSliderLayout and cmds.columnLayout(self.dragSliderLayout,q = True,ex = True):
+            cmds.columnLayout(self.dragSliderLayout,e = True,vis = self.dragMode)
+        if self.dragMode:
+            self.refreshDragSliders(self.preValues)
+
+    def refreshDragSliders(self,values,*args,**kwargs):
+        """ドラッグ用スライダーの値を更新する
+
+        Args:
+            values (list): 回転値 [x,y,z]
+
+        Returns:
+            None
+        """
+        if not values:
+            return
+        for axis,value in zip(dragPose.AXES,values):
+            control = self.dragControls.get(axis)
+            if control and cmds.floatSliderGrp(control,q = True,ex = True):
+                cmds.floatSliderGrp(control,e = True,v = value)
     
+    @perf.profiled
     def setTargetJoint(self,*args,**kwargs):
         """対象のジョイントを設定する
         ウエイトペイントモードToolで選択されているインフルエンスジョイントを取得し、
@@ -325,8 +936,11 @@ class CustomWeightPainterUI(object):
        
         self.targetInflence = cmds.artAttrSkinPaintCtx(self.toolName,q = True,inf = True)
 
-        if cmds.objExists(self.targetInflence):
-            self.preValues = cmds.getAttr('{}.r'.format(self.targetInflence))[0]
+        if self.index.hasInfluence(self.targetInflence):
+            # Tool起動時(Holdした場合はその時点)に記録した値を使う
+            self.preValues = self.poseStore.rotation(self.sessionPose,self.targetInflence)
+            if self.preValues is None:
+                self.preValues = utilityProc.getRotation(self.targetInflence)
         else:
             self.errorPrint(errorType = 3)
             self.targetInflence = None
@@ -341,11 +955,568 @@ class CustomWeightPainterUI(object):
                                     at = '{}.rz'.format(self.targetInflence))
         except:
             return
+        if self.dragMode:
+            self.refreshDragSliders(self.preValues)
+        self.updateWeightStats()
+
+    def enterPickInflenceMode(self,*args,**kwargs):
+        """インフルエンスを選ぶモードに入る
+        ビューをクリックするとその位置のインフルエンスを選び、ウエイトペイントモードToolに戻ります。
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        if not cmds.draggerContext(PICK_CONTEXT,q = True,ex = True):
+            cmds.draggerContext(PICK_CONTEXT)
+        cmds.draggerContext(PICK_CONTEXT,e = True,space = 'screen',cursor = 'hand',
+                            pressCommand = self.pickInflenceAtPress)
+        cmds.setToolTo(PICK_CONTEXT)
+
+    def pickInflenceAtPress(self,*args,**kwargs):
+        """インフルエンスを選ぶモードのクリックのコマンド
+        ウエイトペイントモードToolに戻してから、クリックした位置のインフルエンスを選びます。
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        viewX,viewY = cmds.draggerContext(PICK_CONTEXT,q = True,anchorPoint = True)[:2]
+        cmds.setToolTo(self.toolName)
+        if not self.isCustomUiAttached():
+            self.createUI()
+        self.pickInflence(viewX,viewY)
+
+    @perf.profiled
+    def pickInflence(self,viewX,viewY,*args,**kwargs):
+        """ビューの位置にある頂点で、ウエイトが最も大きいインフルエンスを選ぶ
+        インフルエンスリストで選択し、リストの選択を変更した場合と同じように対象のジョイントを設定します。
+
+        Args:
+            viewX (int): ビューの横の位置[ピクセル] (左端が0)
+            viewY (int): ビューの縦の位置[ピクセル] (下端が0)
+
+        Returns:
+            str: 選んだインフルエンス。見つからない場合はNone
+        """
+        result = utilityProc.pickDominantInfluence(self.index.paintableSkinClusters(),viewX,viewY,
+                                                   weightCache = self.weightCache)
+        if result is None:
+            om.MGlobal.displayWarning('クリックした位置にウエイトのある頂点が見つかりません。')
+            return None
+        self.selectInflence(result['influence'])
+        return result['influence']
+
+    def selectInflence(self,influence,*args,**kwargs):
+        """インフルエンスリストで指定のインフルエンスを選択する
+
+        Args:
+            influence (str): インフルエンス
+
+        Returns:
+            None
+        """
+        infListUi = mel.eval('$temp=$gArtSkinInfluencesList;')
+        if not cmds.treeView(infListUi,q = True,ex = True):
+            self.errorPrint(errorType = 0)
+            return
+        cmds.treeView(infListUi,e = True,clearSelection = True)
+        cmds.treeView(infListUi,e = True,selectItem = (influence,True))
+        cmds.treeView(infListUi,e = True,showItem = influence)
+        self.inflListChangedScheduler.cancel()
+        self.applyInflListChanged()
+
+    @perf.profiled
+    def pruneWeights(self,*args,**kwargs):
+        """ペイント対象のskinClusterのウエイトを刈り込む
+        コンポーネントが選択されていればその頂点だけ、なければメッシュ全体を対象にします。
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        utilityProc.pruneWeights(skinClusters = self.index.paintableSkinClusters(),
+                                 maxInfluences = self.pruneMaxInfluences,
+                                 threshold = self.pruneThreshold,
+                                 weightCache = self.weightCache,
+                                 history = self.weightHistory,
+                                 pipeline = self.meshPipeline)
+        self.updateWeightStats()
+        self.refreshHistoryUi()
+
+    @perf.profiled
+    def normalizeWeights(self,*args,**kwargs):
+        """ペイント対象のskinClusterのウエイトを正規化する
+        コンポーネントが選択されていればその頂点だけ、なければメッシュ全体を対象にします。
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        utilityProc.normalizeSkinWeights(skinClusters = self.index.paintableSkinClusters(),
+                                         weightCache = self.weightCache,
+                                         history = self.weightHistory,
+                                         pipeline = self.meshPipeline)
+        self.updateWeightStats()
+        self.refreshHistoryUi()
+
+    @perf.profiled
+    def validateWeights(self,*args,**kwargs):
+        """ペイント対象のskinClusterのウエイトに問題のある頂点を調べる
+        インフルエンス数はPruneの最大インフルエンス数と比べます。
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        utilityProc.validateSkinWeights(skinClusters = self.index.paintableSkinClusters(),
+                                        maxInfluences = self.pruneMaxInfluences,
+                                        weightCache = self.weightCache,
+                                        pipeline = self.meshPipeline)
+
+    def setWorkerCount(self,value,*args,**kwargs):
+        """skinClusterごとのウエイトの計算に使うスレッド数を設定する
+
+        Args:
+            value (int): スレッド数
+
+        Returns:
+            None
+        """
+        CustomWeightPainterUI.workerCount = max(1,int(value))
+        self.meshPipeline.setWorkerCount(self.workerCount)
+
+    @perf.profiled
+    def smoothWeights(self,*args,**kwargs):
+        """ペイント中のインフルエンスのウエイトをスムースする
+        コンポーネントが選択されていればその頂点だけ、なければメッシュ全体を対象にします。
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        if not self.targetInflence:
+            return
+        utilityProc.smoothSkinWeights(self.index.skinClustersOfInfluence(self.targetInflence),
+                                      self.targetInflence,
+                                      iterations = self.smoothIterations,
+                                      strength = self.smoothStrength,
+                                      weightCache = self.weightCache,
+                                      adjacencyCache = self.adjacencyCache,
+                                      history = self.weightHistory)
+        self.updateWeightStats()
+        self.refreshHistoryUi()
+
+    @perf.profiled
+    def mirrorWeights(self,*args,**kwargs):
+        """ペイント対象のskinClusterのウエイトをミラーする
+        コンポーネントが選択されていればその頂点だけ、なければメッシュ全体を対象にします。
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        utilityProc.mirrorSkinWeights(skinClusters = self.index.paintableSkinClusters(),
+                                      axis = self.mirrorAxis,
+                                      positiveToNegative = self.mirrorPositiveToNegative,
+                                      tolerance = self.mirrorTolerance,
+                                      weightCache = self.weightCache,
+                                      mirrorCache = self.mirrorCache,
+                                      history = self.weightHistory)
+        self.updateWeightStats()
+        self.refreshHistoryUi()
+
+    @perf.profiled
+    def selectByWeight(self,*args,**kwargs):
+        """ペイント中のインフルエンスのウエイトが範囲内の頂点を選択する
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        if not self.targetInflence:
+            return
+        utilityProc.selectVerticesByWeight(self.index.skinClustersOfInfluence(self.targetInflence),
+                                           self.targetInflence,
+                                           minWeight = self.selectMinWeight,
+                                           maxWeight = self.selectMaxWeight,
+                                           weightCache = self.weightCache)
+
+    @perf.profiled
+    def growSelectionByWeight(self,shrink = False,*args,**kwargs):
+        """選択している頂点を、ペイント中のインフルエンスのウエイトの範囲に沿って広げる・狭める
+
+        Args:
+            shrink (bool): Trueの場合は狭める
+
+        Returns:
+            None
+        """
+        if not self.targetInflence:
+            return
+        utilityProc.growVertexSelectionByWeight(self.index.skinClustersOfInfluence(self.targetInflence),
+                                                self.targetInflence,
+                                                minWeight = self.selectMinWeight,
+                                                maxWeight = self.selectMaxWeight,
+                                                shrink = shrink,
+                                                weightCache = self.weightCache,
+                                                adjacencyCache = self.adjacencyCache)
+
+    def getWeightFileDirectory(self,caption,*args,**kwargs):
+        """ウエイトファイルのディレクトリをダイアログで選択する
+
+        Args:
+            caption (str): ダイアログのタイトル
+
+        Returns:
+            str: 選択したディレクトリ。キャンセルした場合はNone
+        """
+        directory = cmds.fileDialog2(fm = 3,cap = caption,okc = 'Select',
+                                     dir = self.weightFileDirectory or cmds.workspace(q = True,rd = True))
+        if not directory:
+            return None
+        CustomWeightPainterUI.weightFileDirectory = directory[0]
+        return directory[0]
+
+    @perf.profiled
+    def exportWeights(self,*args,**kwargs):
+        """ペイント対象のskinClusterのウエイトをバイナリファイルに書き出す
+        メッシュごとに、選択したディレクトリへ書き出します。
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        directory = self.getWeightFileDirectory('Export Weights')
+        if not directory:
+            return
+        utilityProc.exportSkinWeights(self.index.paintableSkinClusters(),directory)
+
+    @perf.profiled
+    def importWeights(self,*args,**kwargs):
+        """ペイント対象のskinClusterにバイナリファイルからウエイトを読み込む
+        メッシュごとに、選択したディレクトリにある同じ名前のファイルを読み込みます。
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        directory = self.getWeightFileDirectory('Import Weights')
+        if not directory:
+            return
+        utilityProc.importSkinWeights(self.index.paintableSkinClusters(),directory,
+                                      weightCache = self.weightCache,
+                                      history = self.weightHistory)
+        self.updateWeightStats()
+        self.refreshHistoryUi()
+
+    def recordWeightDelta(self,skinCluster,rows,oldWeights,newWeights,influences,*args,**kwargs):
+        """キャッシュが読み込みなおしたウエイトの変更を、ペイントの差分として記録する
+        SkinWeightCache.onRefreshに設定します。
+
+        Args:
+            skinCluster (str): skinClusterの名前
+            rows (numpy.ndarray): 頂点番号
+            oldWeights (numpy.ndarray): 変更前のウエイト
+            newWeights (numpy.ndarray): 変更後のウエイト
+            influences (list): インフルエンス名のリスト
+
+        Returns:
+            None
+        """
+        self.weightHistory.record(skinCluster,rows,oldWeights,newWeights,influences,label = 'Paint')
+
+    @perf.profiled
+    def recordWeightHistory(self,*args,**kwargs):
+        """ストロークで変更された頂点を読み込みなおして、履歴に記録する
+        ウエイトの変更が止まったアイドル時に、historySchedulerから呼び出されます。
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        for skinCluster in self.weightCache.dirtySkinClusters():
+            self.weightCache.refresh(skinCluster)
+        self.updateWeightStats()
+        self.refreshHistoryUi()
+
+    def refreshHistoryUi(self,*args,**kwargs):
+        """履歴の差分の数とメモリ使用量、チェックポイントの一覧を表示する
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        if not self.historyText or not cmds.text(self.historyText,q = True,ex = True):
+            return
+        history = self.weightHistory
+        cmds.text(self.historyText,e = True,
+                    l = 'Deltas {}  {:.1f} / {} MB  Evicted {}'.format(
+                        len(history),history.nbytes / 1048576.0,self.historyMaxMB,history.evicted))
+
+        checkpoints = history.checkpoints()
+        currentId = history.currentId()
+        items = ['{} (start)'.format('*' if not checkpoints or currentId < checkpoints[0].id else ' ')]
+        for delta in checkpoints:
+            items.append('{} #{} {} {} ({} verts)'.format('*' if delta.id == currentId else ' ',
+                                                          delta.id,delta.label,delta.skinCluster,len(delta.rows)))
+        cmds.textScrollList(self.historyList,e = True,ra = True)
+        cmds.textScrollList(self.historyList,e = True,a = items)
+        cmds.textScrollList(self.historyList,e = True,sii = len(items))
+
+    @perf.profiled
+    def restoreWeightHistory(self,*args,**kwargs):
+        """一覧で選択したチェックポイントの状態に戻す
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        selected = cmds.textScrollList(self.historyList,q = True,sii = True)
+        checkpoints = self.weightHistory.checkpoints()
+        if not selected or not checkpoints:
+            return
+        checkpointId = checkpoints[0].id - 1 + (selected[0] - 1)
+        # 書き込み前にストロークの変更を記録しておく
+        self.historyScheduler.flush()
+        self.weightHistory.restore(checkpointId,
+                                   lambda *args:utilityProc.writeWeightDelta(*args,weightCache = self.weightCache))
+        self.updateWeightStats()
+        self.refreshHistoryUi()
+
+    @perf.profiled
+    def clearWeightHistory(self,*args,**kwargs):
+        """履歴を全て破棄する
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.weightHistory.clear()
+        self.refreshHistoryUi()
+
+    def setHistoryMaxMB(self,value,*args,**kwargs):
+        """履歴に使うメモリの上限を設定する
+
+        Args:
+            value (int): 上限[MB]
+
+        Returns:
+            None
+        """
+        CustomWeightPainterUI.historyMaxMB = value
+        self.weightHistory.setMaxBytes(value * 1024 * 1024)
+        self.refreshHistoryUi()
+
+    @perf.profiled
+    def sweepRom(self,*args,**kwargs):
+        """ペイント中のインフルエンスを軸ごとに回転させた変形を記録し、プレビューを開始する
+        インフルエンスとその子のインフルエンスが影響する頂点だけを記録します。
+
+        Args:
+            None
+
+        Returns:
+            dict: 処理結果 (romSweep.RomSweepCache.sweepを参照)。インフルエンスがない場合はNone
+        """
+        if not self.targetInflence:
+            return None
+        self.endRomPreview()
+        angles = romSweep.sampleAngles(self.romSamples,self.romRange)
+        result = self.romCache.sweep(self.index.paintableSkinClusters(),
+                                     self.targetInflence,
+                                     angles = angles,
+                                     weightCache = self.weightCache)
+        self.romInflence = self.targetInflence
+        self.romBaseValues = utilityProc.getRotation(self.targetInflence)
+        self.romPreview.begin(result['skinClusters'])
+        for control in self.romControls.values():
+            if cmds.floatSliderGrp(control,q = True,ex = True):
+                cmds.floatSliderGrp(control,e = True,min = -self.romRange,max = self.romRange,v = 0.0)
+        return result
+
+    @perf.profiled
+    def scrubRom(self,axis,value,*args,**kwargs):
+        """記録したROMから指定の角度の変形をプレビュー用のメッシュに表示する
+        skinClusterは評価しないので、ドラッグ中でも待たずに表示できます。
+        ウエイトの変更で記録が破棄されている場合は、インフルエンスを実際に回転させて表示します。
+
+        Args:
+            axis (str): 回転軸
+            value (float): 記録したときの回転値からの角度
+
+        Returns:
+            None
+        """
+        influence = self.romInflence
+        if not influence:
+            return
+        # ペイント中の変更をキャッシュに反映し、影響する記録を破棄する
+        for skinCluster in self.weightCache.dirtySkinClusters():
+            self.weightCache.entry(skinCluster)
+
+        missing = False
+        for skinCluster in list(self.romPreview.meshes):
+            sample = self.romCache.sample(skinCluster,influence,axis,value)
+            if sample is None or not self.romPreview.show(skinCluster,*sample):
+                missing = True
+        if not missing and self.romPreview.isActive():
+            return
+        self.romPreview.end()
+        if not cmds.objExists(influence):
+            return
+        values = list(self.romBaseValues)
+        values[romSweep.AXES.index(axis)] += value
+        utilityProc.setRotation(influence,values)
+
+    def endRomPreview(self,*args,**kwargs):
+        """ROMのプレビューを終了する
+        プレビュー用のメッシュを削除し、インフルエンスを記録したときの回転値に戻します。
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.romPreview.end()
+        if self.romInflence and cmds.objExists(self.romInflence):
+            utilityProc.setRotation(self.romInflence,self.romBaseValues)
+        self.romInflence = None
+        self.romBaseValues = None
+        for control in self.romControls.values():
+            if cmds.floatSliderGrp(control,q = True,ex = True):
+                cmds.floatSliderGrp(control,e = True,v = 0.0)
+
+    def invalidateRomRows(self,skinCluster,rows,weights,*args,**kwargs):
+        """ウエイトが変わった頂点に影響するROMの記録を破棄する
+        SkinWeightCache.onUpdateとして呼び出されます。
+
+        Args:
+            skinCluster (str): skinClusterの名前
+            rows (numpy.ndarray): 変更した頂点の番号。Noneの場合は全頂点
+            weights (numpy.ndarray): 変更後のウエイト配列
+
+        Returns:
+            None
+        """
+        self.romCache.invalidateRows(skinCluster,rows,weights)
+
+    def setRomMaxMB(self,value,*args,**kwargs):
+        """ROMの記録に使うメモリの上限を設定する
+
+        Args:
+            value (int): 上限[MB]
+
+        Returns:
+            None
+        """
+        CustomWeightPainterUI.romMaxMB = value
+        self.romCache.setMaxBytes(value * 1024 * 1024)
+
+    def setProfiling(self,state,*args,**kwargs):
+        """操作ごとの処理時間とcmds/melの呼び出し回数の記録を切り替える
+        記録している間は、読み込まれている全てのToolのモジュールと、インデックスのcmds/melを
+        呼び出し回数を数えるものに置き換えます。cmds/melを使わないモジュールはそのままです。
+
+        Args:
+            state (bool): 記録するか
+
+        Returns:
+            None
+        """
+        CustomWeightPainterUI.profiling = bool(state)
+        if state:
+            prefix = __name__.rpartition('.')[0] + '.'
+            modules = [module for name,module in sorted(sys.modules.items())
+                       if name.startswith(prefix) and module is not None]
+            perf.actionProfiler.enable(modules + [self.index])
+        else:
+            perf.actionProfiler.disable()
+
+    def dumpProfile(self,*args,**kwargs):
+        """記録した操作のうち、処理時間の長いものをスクリプトエディタに表示する
+
+        Returns:
+            None
+        """
+        print(perf.actionProfiler.report())
+
+    def setStatsThreshold(self,value,*args,**kwargs):
+        """ウエイトの統計のしきい値を設定する
+
+        Args:
+            value (float): しきい値
+
+        Returns:
+            None
+        """
+        CustomWeightPainterUI.statsThreshold = value
+        self.updateWeightStats()
+
+    def updateWeightStats(self,*args,**kwargs):
+        """対象のインフルエンスのウエイトの統計を表示する
+        影響する頂点数、最大値・平均値、しきい値を超える頂点数を表示します。
+        ウエイトはskinClusterごとにキャッシュした配列から計算します。
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        if not self.statsText or not cmds.text(self.statsText,q = True,ex = True):
+            return
+        if not weightData.isAvailable():
+            cmds.text(self.statsText,e = True,l = 'NumPyが見つかりません')
+            return
+        if not self.targetInflence:
+            cmds.text(self.statsText,e = True,l = '')
+            return
+
+        skinClusters = self.index.skinClustersOfInfluence(self.targetInflence)
+        stats = self.weightCache.influenceStats(skinClusters,self.targetInflence,
+                                                threshold = self.statsThreshold,
+                                                pipeline = self.meshPipeline)
+        cmds.text(self.statsText,e = True,
+                    l = 'Verts {}  Max {:.3f}  Mean {:.3f}  >{:.2f}: {}'.format(
+                        stats['vertices'],stats['max'],stats['mean'],
+                        self.statsThreshold,stats['overThreshold']))
     
+    @perf.profiled
     def artSkinInflListChanged(self,*args,**kwargs):
         """artSkinInflListChangedのコールバック関数
         元のmelで定義されているartSkinInflListChangedをラップし、
         Tool側でターゲットのインフルエンスジョイントを取得して、回転可能にします。
+        矢印キーなどで連続して選択が変わった場合は、アイドル時に1回だけ反映します。
 
         Args:
             None
@@ -353,7 +1524,19 @@ class CustomWeightPainterUI(object):
         Returns:
             None
         """
+        self.inflListChangedScheduler.request()
 
+    @perf.profiled
+    def applyInflListChanged(self,*args,**kwargs):
+        """インフルエンスリストの選択変更を反映する
+        元のmelのartSkinInflListChangedを実行し、ターゲットのインフルエンスジョイントを設定します。
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
         mel.eval('artSkinInflListChanged artAttrSkinPaintCtx;')
         self.setTargetJoint()
 
@@ -373,7 +1556,12 @@ class CustomWeightPainterUI(object):
             return
         
         cmds.treeView(infListUi,e = True,scc = self.artSkinInflListChanged)
+
+        # 南京錠マークの色を更新し、以降は変化があったものだけを更新する
+        self.lockDetector.build()
+        self.lockDetector.startWatching()
     
+    @perf.profiled
     def createUI(self,*args,**kwargs):
         """UIを作成する
         toolPropertyWindowのレイアウトを調べ、インフルエンスリストのframeLayoutに
@@ -387,35 +1575,22 @@ class CustomWeightPainterUI(object):
         """
         MainToolSettingsLayout = cmds.toolPropertyWindow(q = True,loc = True)
         self.deleteUserControl()
-        
-        val = cmds.tabLayout(MainToolSettingsLayout, q = True, ca = True)
-        
+
         fl = None
-        for v in val:
-            col = '{}|{}'.format(MainToolSettingsLayout,v)
-            if not cmds.columnLayout(col,q = True,ex = True):
-                continue
+        frame = findInfluenceFrameLayout(MainToolSettingsLayout)
+        if frame:
+            fl = cmds.frameLayout(frame,q = True,ca=True)[0]
+            controls = cmds.formLayout(fl,q = True,ca = True)
 
-            children = cmds.columnLayout(col,q = True,ca = True) or []
-            for ch in children:
-                if not cmds.frameLayout(ch,q = True,ex = True):
-                    continue
-                labelName = cmds.frameLayout(ch,q =True,l = True)
-                if isJapaneseLanguage():
-                    if not labelName == 'インフルエンス':
-                        continue
-                elif not labelName == 'Influences':
-                    continue
-                
-                # print(col)
-                fl = cmds.frameLayout(ch,q = True,ca=True)[0]
-                controls = cmds.formLayout(fl,q = True,ca = True)
-                break
-        
         if not fl:
             self.errorPrint(errorType = 4)
             return
         self.createCostomUi(parent=fl)
+        createScriptJob(self.index.invalidate,'SceneOpened',self.customUi)
+        createScriptJob(self.weightCache.invalidate,'SceneOpened',self.customUi)
+        createScriptJob(self.clearWeightHistory,'SceneOpened',self.customUi)
+        createScriptJob(self.endRomPreview,'SceneOpened',self.customUi)
+        createScriptJob(self.romCache.invalidate,'SceneOpened',self.customUi)
         cmds.formLayout(fl,e = True,ac = [(controls[-1],'bottom',0,self.customUi)],
                                     af = [(self.customUi,'bottom',0),
                                             (self.customUi,'left',0),
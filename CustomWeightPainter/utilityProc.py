@@ -15,16 +15,78 @@ except:
 import sys
 sys.dont_write_bytecode = True
 # ------------------------------------------------------------------------------
-import traceback
+import os
+import time
+import functools
 import maya.cmds as cmds
 import maya.mel as mel
 import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+import maya.api.OpenMayaUI as omui
+
+from . import weightData
+from . import weightMath
+from . import mirrorMap
+from . import meshTopology
+from . import weightFile
+from . import perf
+from . import parallel
+from . import modifierCommand
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # wrapper
+class AutoKeyGuard(object):
+    """autoKeyを止めて、処理を1つのundoチャンクにまとめるコンテキストマネージャー
+    最も外側のwithに入るときにundoチャンクを開き、autoKeyが有効なら解除します。
+    withを抜けるときは、例外が発生した場合も含めて必ずautoKeyを元に戻し、undoチャンクを閉じます。
+
+    入れ子になったwithや、AvoidAutoKeyをかけた関数の中から呼ばれた関数では何もしないので
+    (参照カウント)、ドラッグや一括処理でautoKeyの状態を何度も切り替えません。
+    例外は握りつぶさずにそのまま送出します。
+
+    Attributes:
+        chunkName (str): undoチャンクの名前
+        depth (int): 現在の入れ子の深さ (クラス全体で共有)
+    """
+
+    depth = 0
+    _autoKeyState = False
+
+    def __init__(self,chunkName = 'CustomWeightPainter',*args,**kwargs):
+        self.chunkName = chunkName
+
+    def __enter__(self):
+        if AutoKeyGuard.depth == 0:
+            cmds.undoInfo(openChunk = True,chunkName = self.chunkName)
+            try:
+                AutoKeyGuard._autoKeyState = cmds.autoKeyframe(q = True,state = True)
+                if AutoKeyGuard._autoKeyState:
+                    cmds.autoKeyframe(state = False)
+            except:
+                cmds.undoInfo(closeChunk = True)
+                raise
+        AutoKeyGuard.depth += 1
+        return self
+
+    def __exit__(self,excType,excValue,excTraceback):
+        AutoKeyGuard.depth -= 1
+        if AutoKeyGuard.depth == 0:
+            try:
+                if AutoKeyGuard._autoKeyState:
+                    cmds.autoKeyframe(state = True)
+            finally:
+                AutoKeyGuard._autoKeyState = False
+                cmds.undoInfo(closeChunk = True)
+        return False
+
 def AvoidAutoKey(func):
     """autoKeyを回避して指定の関数を実行するためのデコレーター
-    処理前にautoKeyFrameの状態を取得し、autoKeyを解除、
-    関数を実行したのちに元に戻します。
+    関数をAutoKeyGuardの中で実行します。
+    関数の処理は関数名のundoチャンク1つにまとまり、入れ子で呼ばれた場合はautoKeyを切り替えません。
+    例外は握りつぶさずに送出します。
 
     Args:
         func (function): デコレータをかける関数
@@ -33,18 +95,15 @@ def AvoidAutoKey(func):
         function: デコレータをかけた関数
     """
 
+    @functools.wraps(func)
     def wrapper(*args,**kwargs):
-        autoKeyState = cmds.autoKeyframe(q = True,state = True)
-        cmds.autoKeyframe(state = False)
-        try:
-            func(*args,**kwargs)
-        except:
-            om.MGlobal.displayError(traceback.format_exc())
-        cmds.autoKeyframe(state = autoKeyState)
+        with AutoKeyGuard(func.__name__):
+            return func(*args,**kwargs)
     return wrapper
 
 # ------------------------------------------------------------------------------
 # utility Procs
+@perf.profiled
 @AvoidAutoKey
 def gotoBindPose(*args,**kwargs):
     """バインドポーズに戻す
@@ -60,9 +119,156 @@ def gotoBindPose(*args,**kwargs):
     """
     mel.eval('GoToBindPose')
 
+def _getBindWorldMatrices(skinClusters,*args,**kwargs):
+    """skinClusterのbindPreMatrixから、インフルエンスのバインド時のワールド行列を取得する
+    複数のskinClusterで使われているインフルエンスは、最初に見つかったものを使います。
+
+    Args:
+        skinClusters (list): skinClusterのリスト
+
+    Returns:
+        tuple: (フルパス → (MDagPath, バインド時のワールド行列)の辞書, フルパス → 失敗理由の辞書)
+    """
+    bindWorlds = {}
+    failed = {}
+    for skinCluster in skinClusters:
+        selList = om.MSelectionList()
+        try:
+            selList.add(skinCluster)
+        except RuntimeError:
+            continue
+        skinObj = selList.getDependNode(0)
+        if not skinObj.hasFn(om.MFn.kSkinClusterFilter):
+            continue
+        skinFn = oma.MFnSkinCluster(skinObj)
+        bindPreMatrixPlug = skinFn.findPlug('bindPreMatrix',False)
+
+        for dagPath in skinFn.influenceObjects():
+            fullPath = dagPath.fullPathName()
+            if fullPath in bindWorlds:
+                continue
+            logicalIndex = skinFn.indexForInfluenceObject(dagPath)
+            plug = bindPreMatrixPlug.elementByLogicalIndex(logicalIndex)
+            try:
+                bindPreMatrix = om.MFnMatrixData(plug.asMObject()).matrix()
+            except RuntimeError:
+                failed.setdefault(fullPath,'bindPreMatrixを取得できません')
+                continue
+            if abs(bindPreMatrix.det4x4()) < 1.0e-12:
+                failed.setdefault(fullPath,'bindPreMatrixが逆行列を持ちません')
+                continue
+            bindWorlds[fullPath] = (om.MDagPath(dagPath),bindPreMatrix.inverse())
+            failed.pop(fullPath,None)
+    return bindWorlds,failed
+
+def _getParentPath(dagPath,*args,**kwargs):
+    """親のMDagPathを取得する
+
+    Args:
+        dagPath (om.MDagPath): 対象のパス
+
+    Returns:
+        om.MDagPath: 親のパス。ワールド直下の場合はNone
+    """
+    parentPath = om.MDagPath(dagPath)
+    parentPath.pop()
+    if parentPath.length() == 0:
+        return None
+    return parentPath
+
+@perf.profiled
+@AvoidAutoKey
+def restoreBindPose(skinClusters = None,*args,**kwargs):
+    """skinClusterのbindPreMatrixからバインドポーズに戻す
+    dagPoseノードを使わず、skinClusterのbindPreMatrixから各インフルエンスの
+    バインド時のローカル行列を求め、1回のDGModifierでまとめて移動・回転を書き込みます。
+    dagPoseが複数ある、または壊れているリグでも動作し、選択にも依存しません。
+
+    ロックされている、または接続されているアトリビュートは書き込まず、
+    戻せなかったインフルエンスとして報告します。
+    DGModifierはmodifierCommandで実行するので、1回のundoで元に戻ります。
+
+    Args:
+        skinClusters (list): 対象のskinCluster。Noneの場合はシーン内の全skinCluster
+
+    Returns:
+        dict: 処理結果 (restored: 戻したインフルエンスのリスト,
+              failed: インフルエンス → 戻せなかった理由の辞書, time: 処理時間[秒])
+    """
+    startTime = time.time()
+    if skinClusters is None:
+        skinClusters = cmds.ls(type = 'skinCluster') or []
+    bindWorlds,failed = _getBindWorldMatrices(skinClusters)
+
+    # 親から順に、戻した後のワールド行列を求める
+    worldMatrices = {}
+    def getWorldMatrix(dagPath):
+        fullPath = dagPath.fullPathName()
+        if fullPath in worldMatrices:
+            return worldMatrices[fullPath]
+        if fullPath in bindWorlds:
+            matrix = bindWorlds[fullPath][1]
+        else:
+            localMatrix = dagPath.inclusiveMatrix() * dagPath.exclusiveMatrixInverse()
+            parentPath = _getParentPath(dagPath)
+            matrix = localMatrix * getWorldMatrix(parentPath) if parentPath else localMatrix
+        worldMatrices[fullPath] = matrix
+        return matrix
+
+    restored = []
+    modifier = om.MDGModifier()
+    for fullPath in sorted(bindWorlds,key = lambda path:path.count('|')):
+        dagPath,bindWorld = bindWorlds[fullPath]
+        parentPath = _getParentPath(dagPath)
+        localMatrix = bindWorld
+        if parentPath:
+            localMatrix = bindWorld * getWorldMatrix(parentPath).inverse()
+
+        transformFn = om.MFnTransform(dagPath)
+        # joint: [RO][R][JO] / transform: [RO][R] の回転成分からRだけを取り出す
+        rotation = om.MTransformationMatrix(localMatrix).rotation(asQuaternion = True)
+        rotation = transformFn.rotateOrientation(om.MSpace.kTransform).inverse() * rotation
+        if dagPath.hasFn(om.MFn.kJoint):
+            rotation = rotation * oma.MFnIkJoint(dagPath).orientation().inverse()
+        euler = rotation.asEulerRotation()
+        euler.reorderIt(transformFn.rotationOrder() - 1)
+
+        depFn = om.MFnDependencyNode(dagPath.node())
+        values = [('translateX',om.MDistance(localMatrix.getElement(3,0))),
+                  ('translateY',om.MDistance(localMatrix.getElement(3,1))),
+                  ('translateZ',om.MDistance(localMatrix.getElement(3,2))),
+                  ('rotateX',om.MAngle(euler.x)),
+                  ('rotateY',om.MAngle(euler.y)),
+                  ('rotateZ',om.MAngle(euler.z))]
+        blocked = []
+        for attr,value in values:
+            plug = depFn.findPlug(attr,False)
+            if plug.isLocked or plug.isDestination:
+                blocked.append(attr)
+                continue
+            if isinstance(value,om.MAngle):
+                modifier.newPlugValueMAngle(plug,value)
+            else:
+                modifier.newPlugValueMDistance(plug,value)
+        if blocked:
+            failed[fullPath] = 'ロックまたは接続されています: {}'.format(', '.join(blocked))
+        else:
+            restored.append(fullPath)
+    modifierCommand.commit(modifier)
+
+    for fullPath,reason in sorted(failed.items()):
+        om.MGlobal.displayWarning('バインドポーズに戻せませんでした: {} ({})'.format(fullPath,reason))
+    result = {'restored':restored,
+              'failed':failed,
+              'time':time.time() - startTime}
+    om.MGlobal.displayInfo('{} 個のインフルエンスをバインドポーズに戻しました。({:.3f} 秒)'.format(
+                            len(restored),result['time']))
+    return result
+
 # Pose action
+@perf.profiled
 @AvoidAutoKey
-def poseAction(targetNode,axis = 'x',preValues=[0.0,0.0,0.0],actionType='hold',*args,**kwargs):
+def poseAction(targetNode,axis = 'x',preValues=[0.0,0.0,0.0],actionType='hold',index = None,*args,**kwargs):
     """指定のノードに対してポーズアクションを実行する
     指定のノードに対してポーズアクションを実行します。
     
@@ -75,11 +281,15 @@ def poseAction(targetNode,axis = 'x',preValues=[0.0,0.0,0.0],actionType='hold',*
         axis (str): ポーズアクションを実行する軸
         preValues (list): ポーズアクションを実行する前の値
         actionType (str): ポーズアクションの種類
+        index (influenceIndex.InfluenceIndex): 指定した場合、インデックスにないノードは無視します
 
     Returns:
         None
 
     """
+    if index is not None and not index.hasInfluence(targetNode):
+        return
+
     if not actionType:
         return
     elif actionType == 'hold':
@@ -98,12 +308,84 @@ def poseAction(targetNode,axis = 'x',preValues=[0.0,0.0,0.0],actionType='hold',*
     elif actionType == 'zero':
         cmds.setAttr('{}.r{}'.format(targetNode,axis),0.0)
 
+@perf.profiled
+def getTransformFn(targetNode,*args,**kwargs):
+    """指定のノードのMFnTransformを取得する
+
+    Args:
+        targetNode (str): ノード
+
+    Returns:
+        om.MFnTransform: ノードのMFnTransform
+    """
+    selList = om.MSelectionList()
+    selList.add(targetNode)
+    return om.MFnTransform(selList.getDagPath(0))
+
+@perf.profiled
+def getRotation(targetNode,*args,**kwargs):
+    """指定のノードの回転値を取得する
+    APIで3軸の回転値をまとめて取得します。
+
+    Args:
+        targetNode (str or om.MFnTransform): ノード
+
+    Returns:
+        list: 回転値 [x,y,z] (UIの角度単位)
+    """
+    transformFn = targetNode
+    if not isinstance(transformFn,om.MFnTransform):
+        transformFn = getTransformFn(targetNode)
+    unit = om.MAngle.uiUnit()
+    euler = transformFn.rotation(om.MSpace.kTransform)
+    return [om.MAngle(value).asUnits(unit) for value in (euler.x,euler.y,euler.z)]
+
+@perf.profiled
+def setRotation(targetNode,values,*args,**kwargs):
+    """指定のノードに回転値を設定する
+    APIで3軸の回転値を1回で設定します。
+    undoキューに積まれないので、ドラッグ中のプレビューなどに使います。
+
+    Args:
+        targetNode (str or om.MFnTransform): ノード
+        values (list): 回転値 [x,y,z] (UIの角度単位)
+
+    Returns:
+        None
+    """
+    transformFn = targetNode
+    if not isinstance(transformFn,om.MFnTransform):
+        transformFn = getTransformFn(targetNode)
+    unit = om.MAngle.uiUnit()
+    euler = transformFn.rotation(om.MSpace.kTransform)
+    euler.x,euler.y,euler.z = [om.MAngle(value,unit).asRadians() for value in values]
+    transformFn.setRotation(euler,om.MSpace.kTransform)
+
+@perf.profiled
+@AvoidAutoKey
+def applyRotation(targetNode,values,*args,**kwargs):
+    """指定のノードに回転値を確定する
+    3軸の回転値を1回のsetAttrで設定するので、undoは1回で元に戻ります。
+
+    Args:
+        targetNode (str): ノード
+        values (list): 回転値 [x,y,z]
+
+    Returns:
+        None
+    """
+    cmds.setAttr('{}.r'.format(targetNode),values[0],values[1],values[2])
+
 # select action
+@perf.profiled
 def convertSelectionToObj(*args,**kwargs):
     """選択状態をオブジェクト選択モードに戻す。
     選択状態をオブジェクト選択モードに戻します。
     頂点選択状態を解除する際に便利です。
 
+    選択リストをAPIで取得し、コンポーネントはそれを持つシェイプのトランスフォームに置き換えて、
+    重複をまとめた選択リストを1回で設定します。
+
     Args:
         None
         
@@ -111,19 +393,232 @@ def convertSelectionToObj(*args,**kwargs):
         None
         
     """
-    selection = cmds.ls(sl = True)
-    if not selection:
+    selList = om.MGlobal.getActiveSelectionList()
+    if selList.isEmpty():
         return
-    
-    selObj = []
-    for sel in selection:
-        selObj.append(sel.split('.')[0])
 
-    selObj = list(set(selObj))
-    if not selObj:
-        return
-    cmds.select(selObj)
+    objects = om.MSelectionList()
+    for i in range(selList.length()):
+        try:
+            dagPath,component = selList.getComponent(i)
+        except (TypeError,RuntimeError):
+            objects.add(selList.getDependNode(i),True)
+            continue
+        if not component.isNull() and dagPath.node().hasFn(om.MFn.kShape):
+            dagPath.pop()
+        objects.add(dagPath,True)
+    om.MGlobal.setActiveSelectionList(objects)
+
+def _getInfluenceColumn(skinCluster,influence,weightCache = None,*args,**kwargs):
+    """skinClusterのウエイト配列から、インフルエンスの列を取得する
+
+    Args:
+        skinCluster (str): skinClusterの名前
+        influence (str): インフルエンス
+        weightCache (weightData.SkinWeightCache): 指定した場合、キャッシュしたウエイトを使う
+
+    Returns:
+        numpy.ndarray: 頂点ごとのウエイト (頂点数)。skinClusterのインフルエンスでない場合はNone
+    """
+    if weightCache is not None:
+        entry = weightCache.entry(skinCluster)
+        weights,influences = entry['weights'],entry['influences']
+    else:
+        weights,influences = weightData.readWeights(skinCluster)
+    if not influence in influences:
+        return None
+    return weights[:,influences.index(influence)]
+
+def _setVertexSelection(selections,add = False,*args,**kwargs):
+    """メッシュごとの頂点のマスクから、頂点の選択を1回で設定する
+    全頂点の場合は、頂点番号を並べずに全体を指すコンポーネントにします。
+
+    Args:
+        selections (list): (om.MDagPath, 頂点ごとのマスク)のリスト
+        add (bool): Trueの場合は現在の選択に加える
+
+    Returns:
+        int: 選択した頂点数
+    """
+    selList = om.MGlobal.getActiveSelectionList() if add else om.MSelectionList()
+    count = 0
+    for dagPath,mask in selections:
+        rows = np.flatnonzero(mask)
+        if not len(rows):
+            continue
+        vertices = None if len(rows) == len(mask) else rows
+        selList.add((dagPath,weightData.createVertexComponent(vertices,len(mask))),True)
+        count += len(rows)
+    om.MGlobal.setActiveSelectionList(selList)
+    return count
+
+@perf.profiled
+def selectVerticesByWeight(skinClusters,influence,minWeight = 0.5,maxWeight = 1.0,add = False,weightCache = None,*args,**kwargs):
+    """インフルエンスのウエイトが範囲内の頂点を選択する
+    ウエイト配列の列からNumPyでマスクを作り、メッシュごとに1つの頂点コンポーネントにまとめて選択します。
+    skinPercentで頂点ごとに調べないため、頂点数が多いメッシュでもすぐに終わります。
+
+    Args:
+        skinClusters (list): 対象のskinCluster
+        influence (str): インフルエンス
+        minWeight (float): 選択するウエイトの下限
+        maxWeight (float): 選択するウエイトの上限
+        add (bool): Trueの場合は現在の選択に加える
+        weightCache (weightData.SkinWeightCache): 指定した場合、キャッシュしたウエイトを使う
+
+    Returns:
+        dict: 処理結果 (vertices: 選択した頂点数, time: 処理時間[秒])。NumPyがない場合はNone
+    """
+    if not weightData.isAvailable():
+        om.MGlobal.displayError('NumPyが見つからないため、ウエイトで頂点を選択できません。')
+        return None
+    startTime = time.time()
+    selections = []
+    for skinCluster in skinClusters:
+        column = _getInfluenceColumn(skinCluster,influence,weightCache = weightCache)
+        if column is None:
+            continue
+        dagPath = weightData.getSkinClusterFn(skinCluster)[1]
+        selections.append((dagPath,(column >= minWeight) & (column <= maxWeight)))
+    count = _setVertexSelection(selections,add = add)
+
+    result = {'vertices':count,
+              'time':time.time() - startTime}
+    om.MGlobal.displayInfo('Select: {} のウエイトが {:.3f} - {:.3f} の {} 頂点を選択しました。({:.3f} 秒)'.format(
+                            influence,minWeight,maxWeight,count,result['time']))
+    return result
+
+@perf.profiled
+def growVertexSelectionByWeight(skinClusters,influence,minWeight = 0.0,maxWeight = 1.0,steps = 1,shrink = False,weightCache = None,adjacencyCache = None,*args,**kwargs):
+    """選択している頂点を、インフルエンスのウエイトの範囲に沿って広げる・狭める
+    広げる場合は、選択に隣接する頂点のうちウエイトが範囲内のものを加えます。
+    狭める場合は、選択の境界の頂点のうちウエイトが範囲外のものを外します。
+    メッシュの隣接行列(adjacencyCache)とウエイト配列の列から、NumPyでまとめて計算します。
+
+    skinClustersに含まれないメッシュの選択はそのまま残します。
+
+    Args:
+        skinClusters (list): 対象のskinCluster
+        influence (str): インフルエンス
+        minWeight (float): ウエイトの範囲の下限
+        maxWeight (float): ウエイトの範囲の上限
+        steps (int): 広げる・狭める回数
+        shrink (bool): Trueの場合は狭める
+        weightCache (weightData.SkinWeightCache): 指定した場合、キャッシュしたウエイトを使う
+        adjacencyCache (meshTopology.AdjacencyCache): 隣接行列のキャッシュ。Noneの場合はキャッシュしない
+
+    Returns:
+        dict: 処理結果 (vertices: 選択した頂点数, time: 処理時間[秒])。頂点が選択されていない、またはNumPyがない場合はNone
+    """
+    if not weightData.isAvailable():
+        om.MGlobal.displayError('NumPyが見つからないため、ウエイトで頂点を選択できません。')
+        return None
+    startTime = time.time()
+    if adjacencyCache is None:
+        adjacencyCache = meshTopology.AdjacencyCache()
+    selected = getSelectedVertices()
+    if not selected:
+        om.MGlobal.displayWarning('頂点が選択されていません。')
+        return None
+
+    selections = []
+    for skinCluster in skinClusters:
+        dagPath = weightData.getSkinClusterFn(skinCluster)[1]
+        vertices = selected.pop(dagPath.fullPathName(),None)
+        if not vertices:
+            continue
+        column = _getInfluenceColumn(skinCluster,influence,weightCache = weightCache)
+        if column is None:
+            selected[dagPath.fullPathName()] = vertices
+            continue
+        mask = np.zeros(len(column),dtype = bool)
+        mask[vertices] = True
+        mask = weightMath.growVertexMask(mask,adjacencyCache.adjacency(skinCluster),
+                                         band = (column >= minWeight) & (column <= maxWeight),
+                                         steps = steps,shrink = shrink)
+        selections.append((dagPath,mask))
+
+    # 対象外のメッシュの選択を残す
+    for shape,vertices in selected.items():
+        selList = om.MSelectionList()
+        selList.add(shape)
+        dagPath = selList.getDagPath(0)
+        mask = np.zeros(om.MFnMesh(dagPath).numVertices,dtype = bool)
+        mask[vertices] = True
+        selections.append((dagPath,mask))
+    count = _setVertexSelection(selections)
+
+    result = {'vertices':count,
+              'time':time.time() - startTime}
+    om.MGlobal.displayInfo('{}: {} 頂点を選択しました。({:.3f} 秒)'.format(
+                            'Shrink' if shrink else 'Grow',count,result['time']))
+    return result
+
+@perf.profiled
+def findVertexAtViewPoint(skinClusters,viewX,viewY,*args,**kwargs):
+    """アクティブなビューの指定の位置にある頂点を探す
+    ビューの位置からレイを飛ばし、skinClusterのメッシュ(変形後)と最も手前で交わるフェースの、
+    交点に最も近い頂点を返します。
+
+    Args:
+        skinClusters (list): 対象のskinCluster
+        viewX (int): ビューの横の位置[ピクセル] (左端が0)
+        viewY (int): ビューの縦の位置[ピクセル] (下端が0)
+
+    Returns:
+        tuple: (skinCluster, 頂点番号)。どのメッシュとも交わらない場合はNone
+    """
+    source,direction = omui.M3dView.active3dView().viewToWorld(int(viewX),int(viewY))
+    source = om.MFloatPoint(source)
+    direction = om.MFloatVector(direction)
+
+    found = None
+    nearest = None
+    for skinCluster in skinClusters:
+        meshFn = om.MFnMesh(weightData.getSkinClusterFn(skinCluster)[1])
+        hit = meshFn.closestIntersection(source,direction,om.MSpace.kWorld,1.0e7,False)
+        hitPoint,hitParam,hitFace = hit[0],hit[1],hit[2]
+        if hitFace < 0 or (nearest is not None and hitParam >= nearest):
+            continue
+        hitPoint = om.MPoint(hitPoint)
+        vertices = meshFn.getPolygonVertices(hitFace)
+        distances = [meshFn.getPoint(vertex,om.MSpace.kWorld).distanceTo(hitPoint) for vertex in vertices]
+        nearest = hitParam
+        found = (skinCluster,vertices[distances.index(min(distances))])
+    return found
+
+@perf.profiled
+def pickDominantInfluence(skinClusters,viewX,viewY,weightCache = None,*args,**kwargs):
+    """アクティブなビューの指定の位置にある頂点で、ウエイトが最も大きいインフルエンスを求める
+    weightCacheを指定した場合は、キャッシュした頂点ごとの列番号を引くだけで求めます。
+
+    Args:
+        skinClusters (list): 対象のskinCluster
+        viewX (int): ビューの横の位置[ピクセル] (左端が0)
+        viewY (int): ビューの縦の位置[ピクセル] (下端が0)
+        weightCache (weightData.SkinWeightCache): 指定した場合、キャッシュしたウエイトを使う
+
+    Returns:
+        dict: 結果 (influence: インフルエンス名, skinCluster: skinClusterの名前, vertex: 頂点番号)。
+              頂点が見つからない、またはウエイトがすべて0の場合はNone
+    """
+    found = findVertexAtViewPoint(skinClusters,viewX,viewY)
+    if found is None:
+        return None
+    skinCluster,vertex = found
+    if weightCache is not None:
+        influence = weightCache.dominantInfluence(skinCluster,vertex)
+    else:
+        weights,influences = weightData.readWeights(skinCluster,[vertex])
+        column = weightMath.dominantInfluences(weights)[0]
+        influence = influences[column] if column >= 0 else None
+    if influence is None:
+        return None
+    return {'influence':influence,
+            'skinCluster':skinCluster,
+            'vertex':vertex}
 
+@perf.profiled
 def createQuickSelectionSet(*args,**kwargs):
     """クイックセレクションセットを作成する
     クイックセレクションセットを作成します。
@@ -141,53 +636,824 @@ def createQuickSelectionSet(*args,**kwargs):
     mel.eval('CreateQuickSelectSet;')
 
 # animation action
-def setKeyToTargetInflence(targetInflence,*args,**kwargs):
+ROTATE_ATTRS = ('rx','ry','rz')
+
+def _getKeyTargets(targetInflences,index = None,*args,**kwargs):
+    """キーフレームを操作する対象のインフルエンスを絞り込む
+    重複を取り除き、存在しないノードを取り除きます。
+
+    Args:
+        targetInflences (str or list): インフルエンス
+        index (influenceIndex.InfluenceIndex): 指定した場合、objExistsの代わりにインデックスで存在を確認します
+
+    Returns:
+        list: 対象のインフルエンス
+    """
+    if not targetInflences:
+        return []
+    if not isinstance(targetInflences,(list,tuple,set)):
+        targetInflences = [targetInflences]
+    targetInflences = _uniqueList(targetInflences)
+    if index is not None:
+        return [node for node in targetInflences if index.hasInfluence(node)]
+    return [node for node in targetInflences if cmds.objExists(node)]
+
+@perf.profiled
+def setKeyToInflences(targetInflences,attributes = ROTATE_ATTRS,frameRange = None,index = None,*args,**kwargs):
+    """複数のインフルエンスにまとめてキーフレームを打つ
+    全インフルエンス・全アトリビュートに対して、1回のsetKeyframeでキーフレームを打ちます。
+    処理全体は1つのundoチャンクになります。
+
+    Args:
+        targetInflences (str or list): キーフレームを打つインフルエンス
+        attributes (list): キーフレームを打つアトリビュート
+        frameRange (tuple): (開始フレーム, 終了フレーム)。指定した場合は両端のフレームに、
+                            指定しない場合は現在のフレームにキーフレームを打ちます
+        index (influenceIndex.InfluenceIndex): 指定した場合、objExistsの代わりにインデックスで存在を確認します
+
+    Returns:
+        int: キーフレームを打ったインフルエンスの数
+
+    """
+    targetInflences = _getKeyTargets(targetInflences,index = index)
+    if not targetInflences:
+        return 0
+
+    flags = {}
+    if frameRange:
+        flags['t'] = _uniqueList([frameRange[0],frameRange[-1]])
+    with AutoKeyGuard('setKeyToInflences'):
+        cmds.setKeyframe(targetInflences,at = list(attributes),**flags)
+    return len(targetInflences)
+
+@perf.profiled
+def cutKeyInflences(targetInflences,attributes = ROTATE_ATTRS,frameRange = None,index = None,*args,**kwargs):
+    """複数のインフルエンスのキーフレームをまとめて削除する
+    全インフルエンス・全アトリビュートに対して、1回のcutKeyでキーフレームを削除します。
+    処理全体は1つのundoチャンクになります。
+
+    Args:
+        targetInflences (str or list): キーフレームを削除するインフルエンス
+        attributes (list): キーフレームを削除するアトリビュート
+        frameRange (tuple): (開始フレーム, 終了フレーム)。指定した場合はその範囲のキーフレームだけを削除します
+        index (influenceIndex.InfluenceIndex): 指定した場合、インデックスにないノードは無視します
+
+    Returns:
+        int: キーフレームを削除したインフルエンスの数
+
+    """
+    targetInflences = _getKeyTargets(targetInflences,index = index)
+    if not targetInflences:
+        return 0
+
+    flags = {}
+    if frameRange:
+        flags['time'] = (frameRange[0],frameRange[-1])
+    with AutoKeyGuard('cutKeyInflences'):
+        cmds.cutKey(targetInflences,at = list(attributes),cl = True,**flags)
+    return len(targetInflences)
+
+@perf.profiled
+def setKeyToTargetInflence(targetInflence,index = None,*args,**kwargs):
     """指定のインフルエンスにキーフレームを打つ
     指定のインフルエンスにキーフレームを打ちます。
     3軸一斉にキーフレームを打ちたい場合に便利です。
+    複数のインフルエンスを渡すこともできます。
 
     Args:
-        targetInflence (str): キーフレームを打つインフルエンス
+        targetInflence (str or list): キーフレームを打つインフルエンス
+        index (influenceIndex.InfluenceIndex): 指定した場合、objExistsの代わりにインデックスで存在を確認します
 
     Returns:
         None
 
     """
-    if not cmds.objExists(targetInflence):
-        return
-    
-    cmds.setKeyframe(targetInflence,at = 'rx')
-    cmds.setKeyframe(targetInflence,at = 'ry')
-    cmds.setKeyframe(targetInflence,at = 'rz')
+    setKeyToInflences(targetInflence,index = index)
 
-def cutKeyTotargetInflence(targetInflences,*args,**kwargs):
+@perf.profiled
+def cutKeyTotargetInflence(targetInflences,index = None,*args,**kwargs):
     """指定のインフルエンスのキーフレームを削除する
     指定のインフルエンスのキーフレームを削除します。
 
     Args:
-        targetInflence (str): キーフレームを削除するインフルエンス
+        targetInflence (str or list): キーフレームを削除するインフルエンス
+        index (influenceIndex.InfluenceIndex): 指定した場合、インデックスにないノードは無視します
 
     Returns:
         None
 
     """
-    
-    cmds.cutKey(targetInflences,at = 'rx')
-    cmds.cutKey(targetInflences,at = 'ry')
-    cmds.cutKey(targetInflences,at = 'rz')
+    cutKeyInflences(targetInflences,index = index)
+
+def _uniqueList(items,*args,**kwargs):
+    """順序を保ったまま重複を取り除く
 
-def cutKeyInflenceLock(targetInflences,*args,**kwargs):
+    Args:
+        items (list): 対象のリスト
+
+    Returns:
+        list: 重複を取り除いたリスト
+    """
+    result = []
+    found = set()
+    for item in items:
+        if item in found:
+            continue
+        found.add(item)
+        result.append(item)
+    return result
+
+@perf.profiled
+def findInflenceLockTargets(targetInflences,keyedInflences = None,*args,**kwargs):
+    """inflenceLockの後始末が必要なインフルエンスを探す
+    MSelectionListでまとめてノードを取得し、liwプラグの状態をAPIで調べます。
+    ノードごとにcmdsを呼ばないため、インフルエンスが数千あっても高速です。
+
+    Args:
+        targetInflences (list): 調べるインフルエンス
+        keyedInflences (set): キーが振られていることが分かっているインフルエンス。
+                              指定した場合は接続を調べず、ロック状態だけを調べます
+
+    Returns:
+        tuple: (キーが振られているインフルエンスのリスト, ロックされているインフルエンスのリスト)
+    """
+    keyed = []
+    locked = []
+    for node in _uniqueList(targetInflences):
+        selList = om.MSelectionList()
+        try:
+            selList.add(node)
+        except RuntimeError:
+            continue
+        depFn = om.MFnDependencyNode(selList.getDependNode(0))
+        if not depFn.hasAttribute('liw'):
+            continue
+        plug = depFn.findPlug('liw',False)
+
+        if keyedInflences is not None:
+            if node in keyedInflences:
+                keyed.append(node)
+            elif plug.asBool():
+                locked.append(node)
+            continue
+        source = plug.source()
+        if not source.isNull and source.node().hasFn(om.MFn.kAnimCurve):
+            keyed.append(node)
+        elif plug.asBool():
+            locked.append(node)
+    return keyed,locked
+
+@perf.profiled
+def cutKeyInflenceLock(targetInflences,index = None,keyedInflences = None,*args,**kwargs):
     """指定のインフルエンスのinflenceLockのキーを削除する。
     指定のインフルエンスのinflenceLockのキーを削除し、アンロックします。
     誤ってinflenceLockにキーが振られているケースで便利です。
 
+    実際にキーが振られている、またはロックされているインフルエンスだけを対象に、
+    cutKeyを1回にまとめて実行し、アンロックは1回のDGModifierでまとめて書き込みます。
+    DGModifierはmodifierCommandのコマンドで実行するので、処理全体は1回のundoで元に戻ります。
+
     Args:
         targetInflences(list): キーフレームを削除するインフルエンス
+        index (influenceIndex.InfluenceIndex): 指定した場合、インデックスにないノードは無視します
+        keyedInflences (set): キーが振られていることが分かっているインフルエンス (lockMonitor.KeyedLockDetector.keyed)
 
     Returns:
+        dict: 処理結果 (keyed: キーを削除した数, unlocked: アンロックした数, time: 処理時間[秒])
+    """
+    startTime = time.time()
+    if index is not None:
+        targetInflences = [node for node in targetInflences if index.hasInfluence(node)]
+    keyed,locked = findInflenceLockTargets(targetInflences,keyedInflences = keyedInflences)
+
+    with AutoKeyGuard('cutKeyInflenceLock'):
+        if keyed:
+            cmds.cutKey(keyed,at = 'liw',cl = True)
+        # キーを削除しても値はロックのまま残るので、まとめてアンロックする
+        if keyed or locked:
+            modifier = om.MDGModifier()
+            for node in keyed + locked:
+                selList = om.MSelectionList()
+                selList.add(node)
+                plug = om.MFnDependencyNode(selList.getDependNode(0)).findPlug('liw',False)
+                modifier.newPlugValueBool(plug,False)
+            modifierCommand.commit(modifier)
+
+    result = {'keyed':len(keyed),
+              'unlocked':len(keyed) + len(locked),
+              'time':time.time() - startTime}
+    om.MGlobal.displayInfo('inflenceLock: {} 個のキーを削除、{} 個をアンロックしました。({:.3f} 秒)'.format(
+                            result['keyed'],result['unlocked'],result['time']))
+    return result
+
+# weight action
+@perf.profiled
+def getSelectedVertices(*args,**kwargs):
+    """選択中のコンポーネントを、メッシュごとの頂点番号に変換する
+    エッジやフェースが選択されている場合は、それを構成する頂点に変換します。
+
+    Args:
         None
 
+    Returns:
+        dict: メッシュのシェイプのフルパス → 頂点番号のリスト(昇順)。コンポーネントが選択されていない場合は空
+    """
+    selection = [sel for sel in cmds.ls(sl = True) or [] if '.' in sel]
+    if not selection:
+        return {}
+    vertices = cmds.polyListComponentConversion(selection,tv = True) or []
+    selList = om.MSelectionList()
+    for vertex in vertices:
+        selList.add(vertex)
+
+    result = {}
+    for i in range(selList.length()):
+        dagPath,component = selList.getComponent(i)
+        if component.isNull() or not component.hasFn(om.MFn.kMeshVertComponent):
+            continue
+        dagPath.extendToShape()
+        elements = om.MFnSingleIndexedComponent(component).getElements()
+        result.setdefault(dagPath.fullPathName(),set()).update(elements)
+    return dict((shape,sorted(elements)) for shape,elements in result.items())
+
+def _readSkinWeights(skinCluster,selected = None,weightCache = None,*args,**kwargs):
+    """skinClusterのウエイトを、計算に渡すために読み込む
+    MeshPipeline.runのreadとしてメインスレッドで呼び出します。
+
+    Args:
+        skinCluster (str): skinClusterの名前
+        selected (dict): getSelectedVerticesの結果。空でない場合は選択された頂点だけを読み込む
+        weightCache (weightData.SkinWeightCache): 指定した場合、キャッシュしたウエイトを使う
+
+    Returns:
+        dict: (vertices: 頂点番号の配列(全頂点の場合はNone), weights: ウエイト配列,
+              influences: インフルエンス名のリスト, locked: ロックされたインフルエンスの真偽値の配列)。
+              選択された頂点がない場合はNone
+    """
+    vertices = None
+    if selected:
+        skinFn,dagPath = weightData.getSkinClusterFn(skinCluster)
+        vertices = selected.get(dagPath.fullPathName())
+        if not vertices:
+            return None
+        vertices = np.asarray(vertices,dtype = np.int64)
+
+    if weightCache is not None:
+        entry = weightCache.entry(skinCluster)
+        weights,influences = entry['weights'],entry['influences']
+        if vertices is not None:
+            weights = weights[vertices]
+    else:
+        weights,influences = weightData.readWeights(skinCluster,vertices)
+    return {'vertices':vertices,
+            'weights':weights,
+            'influences':influences,
+            'locked':weightData.getLockedInfluences(influences)}
+
+def _writeChangedWeights(skinCluster,data,newWeights,label,weightCache = None,history = None,*args,**kwargs):
+    """計算したウエイトのうち、値が変わった頂点だけを書き込む
+    MeshPipeline.runのwriteとしてメインスレッドで呼び出します。
+    ロックされたインフルエンスは書き込みの対象に含めません。
+
+    Args:
+        skinCluster (str): skinClusterの名前
+        data (dict): _readSkinWeightsの結果
+        newWeights (numpy.ndarray): 計算したウエイト配列
+        label (str): 履歴に記録する名前
+        weightCache (weightData.SkinWeightCache): 指定した場合、書き込んだ結果を反映する
+        history (weightHistory.WeightHistory): 指定した場合、変更を差分として記録する
+
+    Returns:
+        int: 変更した頂点数
     """
-    cmds.cutKey(targetInflences,at = 'liw')
-    for node in targetInflences:
-        cmds.setAttr('{}.liw'.format(node),False)
\ No newline at end of file
+    weights,vertices,locked = data['weights'],data['vertices'],data['locked']
+    changed = weightMath.findChangedRows(newWeights,weights)
+    if not len(changed):
+        return 0
+    rows = changed if vertices is None else vertices[changed]
+    columns = np.flatnonzero(~locked)
+    weightData.writeWeights(skinCluster,newWeights[changed][:,columns],rows,columns)
+    if history is not None:
+        history.record(skinCluster,rows,weights[changed],newWeights[changed],data['influences'],label = label)
+    if weightCache is not None:
+        weightCache.update(skinCluster,rows,newWeights[changed])
+    return len(changed)
+
+@perf.profiled
+def pruneWeights(skinClusters = None,maxInfluences = 4,threshold = 0.001,useSelection = True,weightCache = None,history = None,pipeline = None,*args,**kwargs):
+    """ウエイトの刈り込みと、1頂点あたりのインフルエンス数の制限を行う
+    skinClusterごとにウエイトを一括で読み込み、しきい値以下のウエイトを0にして、
+    大きい順にmaxInfluences個まで残して正規化します。
+    計算はweightMath.limitInfluencesでまとめて行い、値が変わった頂点だけを
+    skinClusterごとに1回のsetWeightsで書き込みます。
+    pipelineのワーカー数が2以上の場合、skinClusterごとの計算を並列に実行します。
+
+    ロック(liw)されたインフルエンスの値は変更せず、書き込みの対象にも含めません。
+    ロックされたインフルエンスだけで上限に達している頂点は上限を超えたままになるので、
+    その頂点数を警告し、処理結果のoverLimitで返します。
+    setWeightsで書き込むため、Mayaのundoキューには積まれません。
+
+    Args:
+        skinClusters (list): 対象のskinCluster。Noneの場合はシーン内の全skinCluster
+        maxInfluences (int): 1頂点あたりの最大インフルエンス数。0以下の場合は制限しない
+        threshold (float): このウエイト以下を0にする
+        useSelection (bool): Trueの場合、コンポーネントが選択されていればその頂点だけを対象にする
+        weightCache (weightData.SkinWeightCache): 指定した場合、キャッシュしたウエイトを使い、書き込んだ結果を反映する
+        history (weightHistory.WeightHistory): 指定した場合、変更を差分として記録する
+        pipeline (parallel.MeshPipeline): skinClusterごとの計算を実行するオブジェクト。Noneの場合は順番に実行する
+
+    Returns:
+        dict: 処理結果 (skinClusters: 書き込んだskinClusterのリスト, vertices: 変更した頂点数,
+              overLimit: skinCluster → 上限を超えたままの頂点数の辞書,
+              time: 処理時間[秒], timings: skinClusterごとの処理時間)。NumPyがない場合はNone
+    """
+    if not weightData.isAvailable():
+        om.MGlobal.displayError('NumPyが見つからないため、ウエイトを刈り込めません。')
+        return None
+    startTime = time.time()
+    if skinClusters is None:
+        skinClusters = cmds.ls(type = 'skinCluster') or []
+    if pipeline is None:
+        pipeline = parallel.MeshPipeline()
+    selected = getSelectedVertices() if useSelection else {}
+
+    written = []
+    changedCounts = []
+    overLimit = {}
+    def compute(skinCluster,data):
+        return weightMath.limitInfluencesChunked(data['weights'],locked = data['locked'],
+                                                 maxInfluences = maxInfluences,
+                                                 threshold = threshold)
+    def write(skinCluster,data,newWeights):
+        count = _writeChangedWeights(skinCluster,data,newWeights,'Prune',
+                                     weightCache = weightCache,history = history)
+        if count:
+            written.append(skinCluster)
+            changedCounts.append(count)
+        if maxInfluences > 0:
+            over = int(np.count_nonzero(weightMath.countInfluences(newWeights) > maxInfluences))
+            if over:
+                overLimit[skinCluster] = over
+    pipeline.run(skinClusters,
+                 lambda skinCluster:_readSkinWeights(skinCluster,selected,weightCache = weightCache),
+                 compute,write)
+
+    result = {'skinClusters':written,
+              'vertices':sum(changedCounts),
+              'overLimit':overLimit,
+              'time':time.time() - startTime,
+              'timings':pipeline.timings}
+    for skinCluster,over in sorted(overLimit.items()):
+        om.MGlobal.displayWarning('Prune: {} の {} 頂点は、ロックされたインフルエンスだけで {} 個に達しているため、'
+                                  '上限を超えたままです。'.format(skinCluster,over,maxInfluences))
+    om.MGlobal.displayInfo('Prune: {} 個のskinClusterで {} 頂点のウエイトを変更しました。({:.3f} 秒, {} スレッド)'.format(
+                            len(written),result['vertices'],result['time'],pipeline.workerCount))
+    return result
+
+@perf.profiled
+def normalizeSkinWeights(skinClusters = None,useSelection = True,weightCache = None,history = None,pipeline = None,*args,**kwargs):
+    """各頂点のウエイトの合計が1になるように正規化する
+    ロックされていないインフルエンスのウエイトを拡大・縮小し(weightMath.normalizeWeights)、
+    値が変わった頂点だけをskinClusterごとに1回のsetWeightsで書き込みます。
+    pipelineのワーカー数が2以上の場合、skinClusterごとの計算を並列に実行します。
+
+    Args:
+        skinClusters (list): 対象のskinCluster。Noneの場合はシーン内の全skinCluster
+        useSelection (bool): Trueの場合、コンポーネントが選択されていればその頂点だけを対象にする
+        weightCache (weightData.SkinWeightCache): 指定した場合、キャッシュしたウエイトを使い、書き込んだ結果を反映する
+        history (weightHistory.WeightHistory): 指定した場合、変更を差分として記録する
+        pipeline (parallel.MeshPipeline): skinClusterごとの計算を実行するオブジェクト。Noneの場合は順番に実行する
+
+    Returns:
+        dict: 処理結果 (skinClusters: 書き込んだskinClusterのリスト, vertices: 変更した頂点数,
+              time: 処理時間[秒], timings: skinClusterごとの処理時間)。NumPyがない場合はNone
+    """
+    if not weightData.isAvailable():
+        om.MGlobal.displayError('NumPyが見つからないため、ウエイトを正規化できません。')
+        return None
+    startTime = time.time()
+    if skinClusters is None:
+        skinClusters = cmds.ls(type = 'skinCluster') or []
+    if pipeline is None:
+        pipeline = parallel.MeshPipeline()
+    selected = getSelectedVertices() if useSelection else {}
+
+    written = []
+    changedCounts = []
+    def write(skinCluster,data,newWeights):
+        count = _writeChangedWeights(skinCluster,data,newWeights,'Normalize',
+                                     weightCache = weightCache,history = history)
+        if count:
+            written.append(skinCluster)
+            changedCounts.append(count)
+    pipeline.run(skinClusters,
+                 lambda skinCluster:_readSkinWeights(skinCluster,selected,weightCache = weightCache),
+                 lambda skinCluster,data:weightMath.normalizeWeights(data['weights'],locked = data['locked']),
+                 write)
+
+    result = {'skinClusters':written,
+              'vertices':sum(changedCounts),
+              'time':time.time() - startTime,
+              'timings':pipeline.timings}
+    om.MGlobal.displayInfo('Normalize: {} 個のskinClusterで {} 頂点のウエイトを正規化しました。({:.3f} 秒, {} スレッド)'.format(
+                            len(written),result['vertices'],result['time'],pipeline.workerCount))
+    return result
+
+@perf.profiled
+def validateSkinWeights(skinClusters = None,maxInfluences = 4,tolerance = 0.001,weightCache = None,pipeline = None,*args,**kwargs):
+    """ウエイトに問題のある頂点を調べる
+    NaNや負の値、合計が1でない頂点、インフルエンス数が多すぎる頂点を、skinClusterごとに数えます。
+    ウエイトは変更しません。
+    pipelineのワーカー数が2以上の場合、skinClusterごとの計算を並列に実行します。
+
+    Args:
+        skinClusters (list): 対象のskinCluster。Noneの場合はシーン内の全skinCluster
+        maxInfluences (int): 1頂点あたりの最大インフルエンス数。0以下の場合は数えない
+        tolerance (float): 合計が1から外れているとみなす差
+        weightCache (weightData.SkinWeightCache): 指定した場合、キャッシュしたウエイトを使う
+        pipeline (parallel.MeshPipeline): skinClusterごとの計算を実行するオブジェクト。Noneの場合は順番に実行する
+
+    Returns:
+        dict: 処理結果 (reports: skinCluster → weightMath.validateWeightsの結果, time: 処理時間[秒],
+              timings: skinClusterごとの処理時間)。NumPyがない場合はNone
+    """
+    if not weightData.isAvailable():
+        om.MGlobal.displayError('NumPyが見つからないため、ウエイトを調べられません。')
+        return None
+    startTime = time.time()
+    if skinClusters is None:
+        skinClusters = cmds.ls(type = 'skinCluster') or []
+    if pipeline is None:
+        pipeline = parallel.MeshPipeline()
+
+    results = pipeline.run(skinClusters,
+                           lambda skinCluster:_readSkinWeights(skinCluster,weightCache = weightCache),
+                           lambda skinCluster,data:weightMath.validateWeights(data['weights'],
+                                                                              maxInfluences = maxInfluences,
+                                                                              tolerance = tolerance))
+    reports = dict(results)
+    for skinCluster,report in results:
+        problems = ['{} {}'.format(key,report[key]) for key in ('invalid','negative','notNormalized','overInfluences')
+                    if report[key]]
+        if problems:
+            om.MGlobal.displayWarning('{}: {} / {} 頂点'.format(skinCluster,', '.join(problems),report['vertices']))
+
+    result = {'reports':reports,
+              'time':time.time() - startTime,
+              'timings':pipeline.timings}
+    om.MGlobal.displayInfo('Check: {} 個のskinClusterのうち {} 個に問題があります。({:.3f} 秒, {} スレッド)'.format(
+                            len(reports),
+                            sum(1 for report in reports.values()
+                                if report['invalid'] or report['negative'] or report['notNormalized'] or report['overInfluences']),
+                            result['time'],pipeline.workerCount))
+    return result
+
+@perf.profiled
+def mirrorSkinWeights(skinClusters = None,axis = 'x',positiveToNegative = True,tolerance = 0.001,useSelection = True,weightCache = None,mirrorCache = None,history = None,*args,**kwargs):
+    """ウエイトを軸の反対側にミラーする
+    入力メッシュの頂点を空間ハッシュで反対側の頂点と対応付け、インフルエンスは名前の
+    左右(L/R, Left/Rightなど)を入れ替えて、ウエイト配列をまとめてコピーします。
+    頂点の対応はmirrorCacheにメッシュのトポロジーと頂点座標ごとにキャッシュされます。
+    値が変わった頂点だけを、skinClusterごとに1回のsetWeightsで書き込みます。
+
+    ロック(liw)されたインフルエンスの値は変更せず、書き込みの対象にも含めません。
+    setWeightsで書き込むため、Mayaのundoキューには積まれません。
+
+    Args:
+        skinClusters (list): 対象のskinCluster。Noneの場合はシーン内の全skinCluster
+        axis (str): ミラーの軸 (x, y, z)
+        positiveToNegative (bool): Trueの場合は+側から-側へ、Falseの場合は-側から+側へコピーする
+        tolerance (float): 頂点が一致とみなす距離
+        useSelection (bool): Trueの場合、コンポーネントが選択されていればその頂点(と反対側の頂点)だけを対象にする
+        weightCache (weightData.SkinWeightCache): 指定した場合、キャッシュしたウエイトを使い、書き込んだ結果を反映する
+        mirrorCache (mirrorMap.MirrorMapCache): 頂点の対応のキャッシュ。Noneの場合はキャッシュしない
+        history (weightHistory.WeightHistory): 指定した場合、変更を差分として記録する
+
+    Returns:
+        dict: 処理結果 (skinClusters: 書き込んだskinClusterのリスト, vertices: 変更した頂点数,
+              unmatchedVertices: 反対側の頂点が見つからなかった頂点数,
+              unmatchedInfluences: 反対側のインフルエンスが見つからなかったインフルエンスのリスト,
+              time: 処理時間[秒])。NumPyがない場合はNone
+    """
+    if not weightData.isAvailable():
+        om.MGlobal.displayError('NumPyが見つからないため、ウエイトをミラーできません。')
+        return None
+    startTime = time.time()
+    if skinClusters is None:
+        skinClusters = cmds.ls(type = 'skinCluster') or []
+    if mirrorCache is None:
+        mirrorCache = mirrorMap.MirrorMapCache()
+    selected = getSelectedVertices() if useSelection else {}
+    destination = -1 if positiveToNegative else 1
+
+    written = []
+    changedCount = 0
+    unmatchedVertices = 0
+    unmatchedInfluences = []
+    for skinCluster in skinClusters:
+        skinFn,dagPath = weightData.getSkinClusterFn(skinCluster)
+        mirror = mirrorCache.entry(skinCluster,axis = axis,tolerance = tolerance)
+        vertexMap,side = mirror['vertexMap'],mirror['side']
+        targets = np.flatnonzero(side == destination)
+        if selected:
+            vertices = selected.get(dagPath.fullPathName())
+            if not vertices:
+                continue
+            # 反対側の頂点が選択されている場合も、その書き込み先を対象にする
+            vertices = np.asarray(vertices,dtype = np.int64)
+            mirrored = vertexMap[vertices]
+            vertices = np.union1d(vertices,mirrored[mirrored >= 0])
+            targets = vertices[side[vertices] == destination]
+        unmatchedVertices += int(np.count_nonzero(vertexMap[targets] < 0))
+
+        if weightCache is not None:
+            entry = weightCache.entry(skinCluster)
+            weights,influences = entry['weights'],entry['influences']
+        else:
+            weights,influences = weightData.readWeights(skinCluster)
+        columnMap,unmatched = weightMath.buildInfluenceMirrorMap(influences)
+        unmatchedInfluences.extend(name for name in unmatched if not name in unmatchedInfluences)
+
+        locked = weightData.getLockedInfluences(influences)
+        rows,newWeights = weightMath.mirrorWeights(weights,vertexMap,columnMap,targets,locked = locked)
+        changed = weightMath.findChangedRows(newWeights,weights[rows])
+        if not len(changed):
+            continue
+        rows = rows[changed]
+        newWeights = newWeights[changed]
+        columns = np.flatnonzero(~locked)
+        weightData.writeWeights(skinCluster,newWeights[:,columns],rows,columns)
+        if history is not None:
+            history.record(skinCluster,rows,weights[rows],newWeights,influences,label = 'Mirror')
+        if weightCache is not None:
+            weightCache.update(skinCluster,rows,newWeights)
+        written.append(skinCluster)
+        changedCount += len(changed)
+
+    for name in unmatchedInfluences:
+        om.MGlobal.displayWarning('反対側のインフルエンスが見つかりません: {}'.format(name))
+    if unmatchedVertices:
+        om.MGlobal.displayWarning('反対側の頂点が見つからない頂点が {} 個あります。'.format(unmatchedVertices))
+    result = {'skinClusters':written,
+              'vertices':changedCount,
+              'unmatchedVertices':unmatchedVertices,
+              'unmatchedInfluences':unmatchedInfluences,
+              'time':time.time() - startTime}
+    om.MGlobal.displayInfo('Mirror: {} 個のskinClusterで {} 頂点のウエイトをミラーしました。({:.3f} 秒)'.format(
+                            len(written),changedCount,result['time']))
+    return result
+
+@perf.profiled
+def getWeightFilePath(directory,skinCluster,*args,**kwargs):
+    """skinClusterのウエイトファイルのパスを求める
+    ファイル名は、skinClusterがデフォームしているメッシュのトランスフォームの名前にします。
+
+    Args:
+        directory (str): ウエイトファイルを置くディレクトリ
+        skinCluster (str): skinClusterの名前
+
+    Returns:
+        str: ウエイトファイルのパス
+    """
+    skinFn,dagPath = weightData.getSkinClusterFn(skinCluster)
+    dagPath.pop()
+    name = dagPath.partialPathName().replace('|','_').replace(':','_')
+    return os.path.join(directory,name + weightFile.FILE_EXTENSION)
+
+@perf.profiled
+def exportSkinWeights(skinClusters,directory,chunkVertices = 65536,*args,**kwargs):
+    """skinClusterのウエイトをバイナリファイルに書き出す
+    頂点の範囲ごとにウエイトを読み込み、0でない要素だけをweightFileの形式で書き出します。
+    メッシュ全体のウエイト配列は持たないので、使うメモリはchunkVertices頂点分に収まります。
+
+    Args:
+        skinClusters (list): 対象のskinCluster
+        directory (str): 書き出すディレクトリ
+        chunkVertices (int): 一度に読み込む頂点数
+
+    Returns:
+        dict: 処理結果 (files: skinCluster → 書き出したファイルのパスの辞書, time: 処理時間[秒])。NumPyがない場合はNone
+    """
+    if not weightData.isAvailable():
+        om.MGlobal.displayError('NumPyが見つからないため、ウエイトを書き出せません。')
+        return None
+    startTime = time.time()
+    files = {}
+    for skinCluster in skinClusters:
+        skinFn,dagPath = weightData.getSkinClusterFn(skinCluster)
+        vertexCount = om.MFnMesh(dagPath).numVertices
+        influences = weightData.getInfluenceNames(skinFn)
+
+        def chunks():
+            for start in range(0,vertexCount,chunkVertices):
+                vertices = range(start,min(start + chunkVertices,vertexCount))
+                yield start,weightData.readWeights(skinCluster,vertices)[0]
+
+        path = getWeightFilePath(directory,skinCluster)
+        weightFile.writeSparseWeightChunks(path,chunks(),influences,vertexCount,
+                                           metadata = {'skinCluster':skinCluster,
+                                                       'mesh':dagPath.fullPathName()})
+        files[skinCluster] = path
+
+    result = {'files':files,
+              'time':time.time() - startTime}
+    om.MGlobal.displayInfo('{} 個のskinClusterのウエイトを書き出しました。({:.3f} 秒)'.format(
+                            len(files),result['time']))
+    return result
+
+@perf.profiled
+def importSkinWeights(skinClusters,directory,chunkVertices = 65536,weightCache = None,history = None,*args,**kwargs):
+    """バイナリファイルからskinClusterにウエイトを読み込む
+    ファイルをメモリマップし、頂点の範囲ごとにsetWeightsで書き込むので、
+    使うメモリはchunkVertices頂点分に収まります。
+    インフルエンスは名前で対応付けるので、インフルエンスの順番が違うリグにも読み込めます。
+    対応するインフルエンスがない場合、そのウエイトは捨てて残りを正規化します。
+    ファイルにウエイトがない頂点は書き込まず、元のウエイトのまま残して報告します。
+
+    ロック(liw)は無視して、ファイルの値をそのまま書き込みます。
+    setWeightsで書き込むため、Mayaのundoキューには積まれません。
+
+    Args:
+        skinClusters (list): 対象のskinCluster
+        directory (str): ウエイトファイルのあるディレクトリ
+        chunkVertices (int): 一度に書き込む頂点数
+        weightCache (weightData.SkinWeightCache): 指定した場合、読み込んだskinClusterのキャッシュを破棄する
+        history (weightHistory.WeightHistory): 指定した場合、skinClusterごとに変更を1つの差分として記録する
+
+    Returns:
+        dict: 処理結果 (files: skinCluster → 読み込んだファイルのパスの辞書,
+              missing: skinCluster → 対応するインフルエンスがなかったインフルエンスのリストの辞書,
+              uncovered: skinCluster → ファイルにウエイトがなかった頂点番号の配列の辞書,
+              time: 処理時間[秒])。NumPyがない場合はNone
+    """
+    if not weightData.isAvailable():
+        om.MGlobal.displayError('NumPyが見つからないため、ウエイトを読み込めません。')
+        return None
+    startTime = time.time()
+    files = {}
+    missing = {}
+    uncovered = {}
+    for skinCluster in skinClusters:
+        path = getWeightFilePath(directory,skinCluster)
+        if not os.path.isfile(path):
+            om.MGlobal.displayWarning('ウエイトファイルが見つかりません: {}'.format(path))
+            continue
+        skinFn,dagPath = weightData.getSkinClusterFn(skinCluster)
+        vertexCount = om.MFnMesh(dagPath).numVertices
+        influences = weightData.getInfluenceNames(skinFn)
+
+        header = weightFile.readHeader(path)
+        if header['vertexCount'] != vertexCount:
+            om.MGlobal.displayWarning('頂点数が一致しません: {} ({} / {})'.format(
+                                        path,header['vertexCount'],vertexCount))
+        remap,missingInfluences = weightFile.buildInfluenceRemap(header['influences'],influences)
+        for name in missingInfluences:
+            om.MGlobal.displayWarning('{}: 対応するインフルエンスが見つかりません: {}'.format(skinCluster,name))
+
+        covered = np.zeros(vertexCount,dtype = bool)
+        changes = []
+        for vertices,weights in weightFile.iterSparseWeights(path,influences,chunkVertices = chunkVertices):
+            inRange = vertices < vertexCount
+            if not inRange.all():
+                vertices,weights = vertices[inRange],weights[inRange]
+            if not len(vertices):
+                continue
+            covered[vertices] = True
+            oldWeights = weightData.writeWeights(skinCluster,weights,vertices)
+            if history is not None:
+                oldWeights = np.fromiter(oldWeights,dtype = np.float64,count = len(oldWeights))
+                changes.append((vertices,oldWeights.reshape(weights.shape),weights))
+        if changes:
+            # 範囲ごとではなく、skinClusterごとに1回の変更として記録する
+            history.record(skinCluster,np.concatenate([change[0] for change in changes]),
+                           np.concatenate([change[1] for change in changes]),
+                           np.concatenate([change[2] for change in changes]),
+                           influences,label = 'Import')
+        uncoveredVertices = np.flatnonzero(~covered)
+        if len(uncoveredVertices):
+            om.MGlobal.displayWarning('{}: ファイルにウエイトがない頂点は元のウエイトのままです: {} 頂点 (vtx[{}] など)'.format(
+                                        skinCluster,len(uncoveredVertices),uncoveredVertices[0]))
+        if weightCache is not None:
+            weightCache.invalidate(skinCluster)
+        files[skinCluster] = path
+        missing[skinCluster] = missingInfluences
+        uncovered[skinCluster] = uncoveredVertices
+
+    result = {'files':files,
+              'missing':missing,
+              'uncovered':uncovered,
+              'time':time.time() - startTime}
+    om.MGlobal.displayInfo('{} 個のskinClusterにウエイトを読み込みました。({:.3f} 秒)'.format(
+                            len(files),result['time']))
+    return result
+
+@perf.profiled
+def writeWeightDelta(skinCluster,rows,influences,values,weightCache = None,*args,**kwargs):
+    """記録した差分のウエイトをskinClusterに書き込む
+    weightHistory.WeightHistory.restoreに渡す書き込み用の関数です。
+    インフルエンスは名前で対応付けるので、記録後にインフルエンスが追加されていても書き込めます。
+
+    Args:
+        skinCluster (str): skinClusterの名前
+        rows (numpy.ndarray): 頂点番号
+        influences (list): インフルエンス名 (valuesの列の順番)
+        values (numpy.ndarray): 書き込むウエイト (頂点数 x インフルエンス数)
+        weightCache (weightData.SkinWeightCache): 指定した場合、書き込んだ結果を反映する
+
+    Returns:
+        None
+    """
+    skinFn,dagPath = weightData.getSkinClusterFn(skinCluster)
+    nameToIndex = dict((name,i) for i,name in enumerate(weightData.getInfluenceNames(skinFn)))
+    keep = [i for i,name in enumerate(influences) if name in nameToIndex]
+    if not keep:
+        return
+    columns = np.array([nameToIndex[influences[i]] for i in keep],dtype = np.int64)
+    values = values[:,keep]
+    weightData.writeWeights(skinCluster,values,rows,columns)
+    if weightCache is not None:
+        weightCache.update(skinCluster,rows,values,columns)
+
+@perf.profiled
+def smoothSkinWeights(skinClusters,influence,iterations = 10,strength = 0.5,useSelection = True,weightCache = None,adjacencyCache = None,history = None,*args,**kwargs):
+    """インフルエンスのウエイトを、隣接する頂点の平均に近づけてスムースする
+    メッシュの隣接行列(CSR形式の疎行列)を使い、対象のインフルエンスと、
+    それと重なって影響しているインフルエンスの列をまとめてiterations回スムースします。
+    隣接行列はadjacencyCacheにメッシュのトポロジーごとにキャッシュされます。
+    値が変わった頂点だけを、skinClusterごとに1回のsetWeightsで書き込みます。
+
+    ロック(liw)されたインフルエンスの値は変更せず、書き込みの対象にも含めません。
+    setWeightsで書き込むため、Mayaのundoキューには積まれません。
+
+    Args:
+        skinClusters (list): 対象のskinCluster
+        influence (str): スムースするインフルエンス
+        iterations (int): 反復回数
+        strength (float): 1回の反復で平均に近づける割合 (0-1)
+        useSelection (bool): Trueの場合、コンポーネントが選択されていればその頂点だけを対象にする
+        weightCache (weightData.SkinWeightCache): 指定した場合、キャッシュしたウエイトを使い、書き込んだ結果を反映する
+        adjacencyCache (meshTopology.AdjacencyCache): 隣接行列のキャッシュ。Noneの場合はキャッシュしない
+        history (weightHistory.WeightHistory): 指定した場合、変更を差分として記録する
+
+    Returns:
+        dict: 処理結果 (skinClusters: 書き込んだskinClusterのリスト, vertices: 変更した頂点数,
+              time: 処理時間[秒])。NumPyがない場合はNone
+    """
+    if not weightData.isAvailable():
+        om.MGlobal.displayError('NumPyが見つからないため、ウエイトをスムースできません。')
+        return None
+    startTime = time.time()
+    if adjacencyCache is None:
+        adjacencyCache = meshTopology.AdjacencyCache()
+    selected = getSelectedVertices() if useSelection else {}
+
+    written = []
+    changedCount = 0
+    for skinCluster in skinClusters:
+        skinFn,dagPath = weightData.getSkinClusterFn(skinCluster)
+        vertices = None
+        if selected:
+            vertices = selected.get(dagPath.fullPathName())
+            if not vertices:
+                continue
+            vertices = np.asarray(vertices,dtype = np.int64)
+
+        if weightCache is not None:
+            entry = weightCache.entry(skinCluster)
+            weights,influences = entry['weights'],entry['influences']
+        else:
+            weights,influences = weightData.readWeights(skinCluster)
+        if not influence in influences:
+            continue
+        locked = weightData.getLockedInfluences(influences)
+        if locked[influences.index(influence)]:
+            om.MGlobal.displayWarning('{} はロックされているため、スムースできません。'.format(influence))
+            continue
+
+        adjacency = adjacencyCache.adjacency(skinCluster)
+        columns = weightMath.findSmoothColumns(weights,adjacency,influences.index(influence),
+                                               rows = vertices,locked = locked)
+        rows,newWeights = weightMath.smoothWeights(weights,adjacency,columns,rows = vertices,
+                                                   iterations = iterations,strength = strength,
+                                                   locked = locked)
+        changed = weightMath.findChangedRows(newWeights,weights[rows])
+        if not len(changed):
+            continue
+        oldWeights = weights[rows[changed]]
+        rows = rows[changed]
+        newWeights = newWeights[changed]
+        columns = np.flatnonzero(~locked)
+        weightData.writeWeights(skinCluster,newWeights[:,columns],rows,columns)
+        if history is not None:
+            history.record(skinCluster,rows,oldWeights,newWeights,influences,label = 'Smooth')
+        if weightCache is not None:
+            weightCache.update(skinCluster,rows,newWeights)
+        written.append(skinCluster)
+        changedCount += len(changed)
+
+    result = {'skinClusters':written,
+              'vertices':changedCount,
+              'time':time.time() - startTime}
+    om.MGlobal.displayInfo('Smooth: {} 個のskinClusterで {} 頂点のウエイトをスムースしました。({:.3f} 秒)'.format(
+                            len(written),changedCount,result['time']))
+    return result
@@ -0,0 +1,401 @@
+# -*- coding: utf-8 -*-
+"""skinClusterのウエイトを一括で読み書きするためのモジュール
+ウエイトを頂点ごとにskinPercentで問い合わせるのではなく、
+MFnSkinClusterで一括取得してNumPyの配列(頂点数 x インフルエンス数)として扱います。
+配列に対する計算はweightMathモジュールにまとめています。
+
+NumPyがインストールされていない環境では、isAvailable()がFalseを返し、
+このモジュールの機能は使えません。
+
+Attributes:
+    * None
+Todo:
+    * None
+"""
+from __future__ import absolute_import, division, generators, print_function
+try:
+    from future_builtins import *
+except:
+    pass
+import sys
+sys.dont_write_bytecode = True
+# ------------------------------------------------------------------------------
+import re
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from . import weightMath
+
+_WEIGHT_PLUG = re.compile(r'^(?:weightList|wl)\[(\d+)\]')
+
+def isAvailable(*args,**kwargs):
+    """NumPyが使えるかどうかを判定する
+
+    Returns:
+        bool: NumPyが使える場合はTrue
+    """
+    return np is not None
+
+def getSkinClusterFn(skinCluster,*args,**kwargs):
+    """skinClusterのMFnSkinClusterと、ペイント対象のメッシュのMDagPathを取得する
+
+    Args:
+        skinCluster (str): skinClusterの名前
+
+    Returns:
+        tuple: (oma.MFnSkinCluster, om.MDagPath)
+    """
+    selList = om.MSelectionList()
+    selList.add(skinCluster)
+    skinFn = oma.MFnSkinCluster(selList.getDependNode(0))
+    dagPath = skinFn.getPathAtIndex(skinFn.indexForOutputConnection(0))
+    return skinFn,dagPath
+
+def getInfluenceNames(skinFn,*args,**kwargs):
+    """skinClusterのインフルエンス名のリストを取得する
+    リストの順番は、ウエイト配列の列の順番と同じです。
+
+    Args:
+        skinFn (oma.MFnSkinCluster): skinCluster
+
+    Returns:
+        list: インフルエンス名のリスト
+    """
+    return [dagPath.partialPathName() for dagPath in skinFn.influenceObjects()]
+
+def createVertexComponent(vertices = None,vertexCount = 0,*args,**kwargs):
+    """頂点コンポーネントを作成する
+
+    Args:
+        vertices (list or numpy.ndarray): 頂点番号のリスト。Noneの場合は全頂点
+        vertexCount (int): 全頂点の場合の頂点数
+
+    Returns:
+        om.MObject: 頂点コンポーネント
+    """
+    componentFn = om.MFnSingleIndexedComponent()
+    component = componentFn.create(om.MFn.kMeshVertComponent)
+    if vertices is None:
+        componentFn.setCompleteData(vertexCount)
+    else:
+        # NumPyの配列はtolistでまとめてintのリストにする
+        if hasattr(vertices,'tolist'):
+            vertices = vertices.tolist()
+        else:
+            vertices = [int(vertex) for vertex in vertices]
+        componentFn.addElements(om.MIntArray(vertices))
+    return component
+
+def readWeights(skinCluster,vertices = None,*args,**kwargs):
+    """skinClusterのウエイトを一括で取得する
+
+    Args:
+        skinCluster (str): skinClusterの名前
+        vertices (list): 取得する頂点番号のリスト(昇順)。Noneの場合は全頂点
+
+    Returns:
+        tuple: (ウエイト配列 (頂点数 x インフルエンス数), インフルエンス名のリスト)
+    """
+    skinFn,dagPath = getSkinClusterFn(skinCluster)
+    vertexCount = om.MFnMesh(dagPath).numVertices
+    component = createVertexComponent(vertices,vertexCount)
+    weights,influenceCount = skinFn.getWeights(dagPath,component)
+    array = np.fromiter(weights,dtype = np.float64,count = len(weights))
+    return array.reshape(-1,max(influenceCount,1)),getInfluenceNames(skinFn)
+
+def writeWeights(skinCluster,weights,vertices = None,influenceIndices = None,*args,**kwargs):
+    """skinClusterにウエイトを一括で書き込む
+    MFnSkinCluster.setWeightsを1回だけ呼び出します。
+    正規化はしないので、各行の合計が1になるように渡してください。
+
+    Args:
+        skinCluster (str): skinClusterの名前
+        weights (numpy.ndarray): ウエイト配列 (頂点数 x 書き込むインフルエンス数)
+        vertices (list): 書き込む頂点番号のリスト(昇順)。Noneの場合は全頂点
+        influenceIndices (list): 書き込むインフルエンスの列番号。Noneの場合は全インフルエンス
+
+    Returns:
+        om.MDoubleArray: 書き込む前のウエイト
+    """
+    skinFn,dagPath = getSkinClusterFn(skinCluster)
+    vertexCount = om.MFnMesh(dagPath).numVertices
+    component = createVertexComponent(vertices,vertexCount)
+    weights = np.asarray(weights,dtype = np.float64)
+    if influenceIndices is None:
+        influenceIndices = range(weights.shape[1])
+    return skinFn.setWeights(dagPath,component,
+                             om.MIntArray([int(i) for i in influenceIndices]),
+                             om.MDoubleArray(weights.ravel().tolist()),
+                             False,True)
+
+def getLockedInfluences(influences,*args,**kwargs):
+    """liwでロックされているインフルエンスの真偽値の配列を取得する
+
+    Args:
+        influences (list): インフルエンス名のリスト
+
+    Returns:
+        numpy.ndarray: ロックされている場合はTrueの配列
+    """
+    locked = np.zeros(len(influences),dtype = bool)
+    for i,influence in enumerate(influences):
+        selList = om.MSelectionList()
+        try:
+            selList.add(influence)
+        except RuntimeError:
+            continue
+        depFn = om.MFnDependencyNode(selList.getDependNode(0))
+        if depFn.hasAttribute('liw'):
+            locked[i] = depFn.findPlug('liw',False).asBool()
+    return locked
+
+class SkinWeightCache(object):
+    """skinClusterごとにウエイト配列をキャッシュするクラス
+    最初の参照時にウエイトを一括で取得し、skinClusterのweightListが変更された場合は、
+    変更のあった頂点だけを次回の参照時に読み込みなおします。
+    インフルエンスごとの統計もキャッシュし、変更があった場合だけ計算しなおします。
+
+    Attributes:
+        onDirty (function): weightListが変更されたときに、onDirty(skinCluster)で呼び出す関数
+        onRefresh (function): 変更のあった頂点を読み込みなおしたときに、
+                              onRefresh(skinCluster, rows, oldWeights, newWeights, influences)で呼び出す関数
+        onUpdate (function): キャッシュのウエイトが変わったときに、onUpdate(skinCluster, rows, weights)で呼び出す関数。
+                             ストロークを読み込みなおした場合とupdateで反映した場合の両方で呼び出し、
+                             インフルエンスが増減した場合のrowsはNone
+    """
+
+    def __init__(self,*args,**kwargs):
+        self._entries = {}
+        self.onDirty = None
+        self.onRefresh = None
+        self.onUpdate = None
+
+    def __contains__(self,skinCluster):
+        return skinCluster in self._entries
+
+    def _load(self,skinCluster,*args,**kwargs):
+        """skinClusterのウエイトを読み込み、変更の監視を開始する
+        """
+        weights,influences = readWeights(skinCluster)
+        selList = om.MSelectionList()
+        selList.add(skinCluster)
+        callbackId = om.MNodeMessage.addAttributeChangedCallback(selList.getDependNode(0),
+                                                                 self._attributeChangedCallback,
+                                                                 skinCluster)
+        entry = {'weights':weights,
+                 'influences':influences,
+                 'nameToIndex':dict((name,i) for i,name in enumerate(influences)),
+                 'dirty':set(),
+                 'stats':{},
+                 'dominant':None,
+                 'callbackId':callbackId}
+        self._entries[skinCluster] = entry
+        return entry
+
+    def _attributeChangedCallback(self,msg,plug,otherPlug,skinCluster,*args):
+        """skinClusterのアトリビュート変更のコールバック
+        weightListが変更された頂点を記録します。
+        """
+        if not msg & om.MNodeMessage.kAttributeSet:
+            return
+        entry = self._entries.get(skinCluster)
+        if entry is None:
+            return
+        match = _WEIGHT_PLUG.match(plug.partialName(useLongNames = True))
+        if match:
+            entry['dirty'].add(int(match.group(1)))
+            if self.onDirty is not None:
+                self.onDirty(skinCluster)
+
+    def dirtySkinClusters(self,*args,**kwargs):
+        """変更があって、まだ読み込みなおしていないskinClusterのリストを返す
+
+        Returns:
+            list: skinClusterのリスト
+        """
+        return [skinCluster for skinCluster,entry in self._entries.items() if entry['dirty']]
+
+    def entry(self,skinCluster,*args,**kwargs):
+        """skinClusterのキャッシュを取得する
+        変更のあった頂点があれば、その頂点だけ読み込みなおします。
+
+        Args:
+            skinCluster (str): skinClusterの名前
+
+        Returns:
+            dict: キャッシュ (weights: ウエイト配列, influences: インフルエンス名のリスト,
+                  nameToIndex: インフルエンス名 → 列番号,
+                  dominant: 頂点ごとのウエイトが最も大きいインフルエンスの列番号。未計算の場合はNone)
+        """
+        entry = self._entries.get(skinCluster)
+        if entry is None:
+            return self._load(skinCluster)
+        if entry['dirty']:
+            self.refresh(skinCluster)
+        return entry
+
+    def weights(self,skinCluster,*args,**kwargs):
+        """skinClusterのウエイト配列を取得する
+
+        Args:
+            skinCluster (str): skinClusterの名前
+
+        Returns:
+            numpy.ndarray: ウエイト配列 (頂点数 x インフルエンス数)
+        """
+        return self.entry(skinCluster)['weights']
+
+    def refresh(self,skinCluster,vertices = None,*args,**kwargs):
+        """指定の頂点のウエイトを読み込みなおす
+
+        Args:
+            skinCluster (str): skinClusterの名前
+            vertices (list): 読み込みなおす頂点番号。Noneの場合は変更が記録された頂点
+
+        Returns:
+            tuple: (頂点番号の配列, 変更前のウエイト, 変更後のウエイト)。
+                   キャッシュがない場合はNone。インフルエンスが増減した場合、変更前のウエイトはNone
+        """
+        entry = self._entries.get(skinCluster)
+        if entry is None:
+            return None
+        if vertices is None:
+            vertices = entry['dirty']
+        rows = np.array(sorted(vertices),dtype = np.int64)
+        entry['dirty'] = set()
+        rows = rows[rows < entry['weights'].shape[0]]
+        if not len(rows):
+            return rows,entry['weights'][rows],entry['weights'][rows]
+
+        newWeights,influences = readWeights(skinCluster,rows)
+        if influences != entry['influences']:
+            # インフルエンスが増減した場合は全体を読み込みなおす
+            self.invalidate(skinCluster)
+            entry = self._load(skinCluster)
+            if self.onUpdate is not None:
+                self.onUpdate(skinCluster,None,entry['weights'])
+            return rows,None,newWeights
+
+        oldWeights = entry['weights'][rows].copy()
+        entry['weights'][rows] = newWeights
+        entry['stats'] = {}
+        self._patchDominant(entry,rows)
+        if self.onRefresh is not None:
+            self.onRefresh(skinCluster,rows,oldWeights,newWeights,influences)
+        if self.onUpdate is not None:
+            self.onUpdate(skinCluster,rows,entry['weights'])
+        return rows,oldWeights,newWeights
+
+    def update(self,skinCluster,rows,weights,columns = None,*args,**kwargs):
+        """書き込んだウエイトをキャッシュに反映する
+        Toolの処理でウエイトを書き込んだ後に呼び出すと、読み込みなおす必要がなくなります。
+
+        Args:
+            skinCluster (str): skinClusterの名前
+            rows (numpy.ndarray): 頂点番号の配列。Noneの場合は全頂点
+            weights (numpy.ndarray): 書き込んだウエイト配列
+            columns (numpy.ndarray): 書き込んだインフルエンスの列番号。Noneの場合は全インフルエンス
+
+        Returns:
+            None
+        """
+        entry = self._entries.get(skinCluster)
+        if entry is None:
+            return
+        if rows is None:
+            rows = np.arange(entry['weights'].shape[0])
+        if columns is None:
+            entry['weights'][rows] = weights
+        else:
+            entry['weights'][np.ix_(rows,columns)] = weights
+        if len(rows) == entry['weights'].shape[0]:
+            entry['dirty'] = set()
+        else:
+            entry['dirty'].difference_update(int(row) for row in rows)
+        entry['stats'] = {}
+        self._patchDominant(entry,rows)
+        if self.onUpdate is not None:
+            self.onUpdate(skinCluster,rows,entry['weights'])
+
+    def _patchDominant(self,entry,rows,*args,**kwargs):
+        """変更のあった頂点だけ、ウエイトが最も大きいインフルエンスを求めなおす
+        """
+        if entry['dominant'] is not None:
+            entry['dominant'][rows] = weightMath.dominantInfluences(entry['weights'][rows])
+
+    def invalidate(self,skinCluster = None,*args,**kwargs):
+        """キャッシュを破棄する
+
+        Args:
+            skinCluster (str): skinClusterの名前。Noneの場合は全skinCluster
+
+        Returns:
+            None
+        """
+        skinClusters = list(self._entries) if skinCluster is None else [skinCluster]
+        for name in skinClusters:
+            entry = self._entries.pop(name,None)
+            if entry is None:
+                continue
+            try:
+                om.MMessage.removeCallback(entry['callbackId'])
+            except RuntimeError:
+                pass
+
+    def dominantInfluence(self,skinCluster,vertex,*args,**kwargs):
+        """頂点でウエイトが最も大きいインフルエンスを返す
+        頂点ごとの列番号は最初の参照時に一括で求め、以降はウエイトが変更された頂点だけを求めなおします。
+
+        Args:
+            skinCluster (str): skinClusterの名前
+            vertex (int): 頂点番号
+
+        Returns:
+            str: インフルエンス名。ウエイトがすべて0の場合はNone
+        """
+        entry = self.entry(skinCluster)
+        if entry['dominant'] is None:
+            entry['dominant'] = weightMath.dominantInfluences(entry['weights'])
+        column = entry['dominant'][vertex]
+        if column < 0:
+            return None
+        return entry['influences'][column]
+
+    def influenceStats(self,skinClusters,influence,threshold = 0.5,pipeline = None,*args,**kwargs):
+        """インフルエンスのウエイトの統計を求める
+        複数のskinClusterで使われている場合は、まとめた統計を返します。
+        キャッシュにない統計は、pipelineを指定した場合skinClusterごとに並列に計算します。
+
+        Args:
+            skinClusters (list): skinClusterのリスト
+            influence (str): インフルエンス名
+            threshold (float): しきい値
+            pipeline (parallel.MeshPipeline): 統計の計算を実行するオブジェクト。Noneの場合は順番に計算する
+
+        Returns:
+            dict: 統計 (weightMath.computeInfluenceStatsを参照)
+        """
+        key = (influence,threshold)
+        statsList = []
+        missing = []
+        for skinCluster in skinClusters:
+            entry = self.entry(skinCluster)
+            column = entry['nameToIndex'].get(influence)
+            if column is None:
+                continue
+            stats = entry['stats'].get(key)
+            if stats is None:
+                missing.append((entry,column))
+            else:
+                statsList.append(stats)
+
+        compute = lambda item:weightMath.computeInfluenceStats(item[0]['weights'][:,item[1]],threshold = threshold)
+        computed = pipeline.map(compute,missing) if pipeline is not None else [compute(item) for item in missing]
+        for (entry,column),stats in zip(missing,computed):
+            entry['stats'][key] = stats
+            statsList.append(stats)
+        return weightMath.mergeInfluenceStats(statsList)
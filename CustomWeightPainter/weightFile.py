@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""ウエイトをバイナリファイルに書き出し・読み込むためのモジュール
+ウエイトが0でない要素だけを(頂点番号, インフルエンス番号, ウエイト)の配列として書き出し、
+先頭にインフルエンス名などのヘッダーを付けます。
+読み込み時はファイルをメモリマップし、頂点の範囲ごとに少しずつ取り出すので、
+大きなメッシュでも使うメモリが一定に収まります。
+Mayaに依存しないので、Maya外からも読み書きできます。
+
+ファイルの構成:
+    * マジックナンバー(4byte) + バージョン(uint32) + ヘッダーの長さ(uint32)
+    * ヘッダー (JSON, utf-8。8byte境界まで空白で埋める)
+    * 要素の配列 (vertex: uint32, influence: uint32, weight: float32)。頂点番号の昇順
+
+Attributes:
+    * None
+Todo:
+    * None
+"""
+from __future__ import absolute_import, division, generators, print_function
+try:
+    from future_builtins import *
+except:
+    pass
+import sys
+sys.dont_write_bytecode = True
+# ------------------------------------------------------------------------------
+import io
+import json
+import struct
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from . import weightMath
+
+FILE_EXTENSION = '.cww'
+MAGIC = b'CWPW'
+VERSION = 1
+_PREFIX = struct.Struct('<4sII')
+ENTRY_DTYPE = [('vertex','<u4'),('influence','<u4'),('weight','<f4')] if np is not None else None
+
+def _shortName(name,*args,**kwargs):
+    """DAGパスとネームスペースを取り除いた名前を返す
+    """
+    return name.rpartition('|')[2].rpartition(':')[2]
+
+def _encodeHeader(header,*args,**kwargs):
+    """ヘッダーをJSONにして、8byte境界まで空白で埋める
+    """
+    data = json.dumps(header,sort_keys = True).encode('utf-8')
+    padding = -(_PREFIX.size + len(data)) % 8
+    return data + b' ' * padding
+
+def writeSparseWeightChunks(path,chunks,influences,vertexCount,threshold = 0.0,metadata = None,*args,**kwargs):
+    """行ごとに分割したウエイト配列を、疎なバイナリファイルに書き出す
+    分割した配列を順に受け取って書き出すので、メッシュ全体のウエイト配列を持たずに書き出せます。
+
+    Args:
+        path (str): 書き出すファイルのパス
+        chunks (iterable): (先頭の頂点番号, ウエイト配列 (行数 x インフルエンス数))を頂点番号の昇順に返すイテレーター
+        influences (list): インフルエンス名のリスト (ウエイト配列の列の順番)
+        vertexCount (int): 頂点数
+        threshold (float): このウエイト以下の要素は書き出さない
+        metadata (dict): ヘッダーに追加する情報 (skinCluster名やメッシュ名など)
+
+    Returns:
+        dict: ヘッダー
+    """
+    header = dict(metadata or {})
+    header.update({'influences':list(influences),
+                   'vertexCount':int(vertexCount),
+                   'entryCount':0})
+    limit = max(threshold,0.0)
+
+    with io.open(path,'wb') as f:
+        # 要素数は書き出した後に分かるので、とりあえず最大の要素数で場所を確保し、後で書き直す
+        header['entryCount'] = int(vertexCount) * len(influences)
+        headerData = _encodeHeader(header)
+        f.write(_PREFIX.pack(MAGIC,VERSION,len(headerData)))
+        f.write(headerData)
+
+        entryCount = 0
+        for start,chunk in chunks:
+            rows,columns = np.nonzero(chunk > limit)
+            entries = np.empty(len(rows),dtype = ENTRY_DTYPE)
+            entries['vertex'] = rows + start
+            entries['influence'] = columns
+            entries['weight'] = chunk[rows,columns]
+            f.write(entries.tobytes())
+            entryCount += len(rows)
+
+        header['entryCount'] = entryCount
+        newHeaderData = _encodeHeader(header)
+        newHeaderData += b' ' * (len(headerData) - len(newHeaderData))
+        f.seek(_PREFIX.size)
+        f.write(newHeaderData)
+    return header
+
+def writeSparseWeights(path,weights,influences,threshold = 0.0,metadata = None,chunkSize = 65536,*args,**kwargs):
+    """ウエイト配列を疎なバイナリファイルに書き出す
+    行ごとに分割して、0でない要素だけを書き出します。
+
+    Args:
+        path (str): 書き出すファイルのパス
+        weights (numpy.ndarray): ウエイト配列 (頂点数 x インフルエンス数)
+        influences (list): インフルエンス名のリスト (ウエイト配列の列の順番)
+        threshold (float): このウエイト以下の要素は書き出さない
+        metadata (dict): ヘッダーに追加する情報 (skinCluster名やメッシュ名など)
+        chunkSize (int): 一度に処理する行数
+
+    Returns:
+        dict: ヘッダー
+    """
+    weights = np.asarray(weights)
+    chunks = ((start,weights[start:start + chunkSize]) for start in range(0,weights.shape[0],chunkSize))
+    return writeSparseWeightChunks(path,chunks,influences,weights.shape[0],
+                                   threshold = threshold,metadata = metadata)
+
+def readHeader(path,*args,**kwargs):
+    """ファイルのヘッダーを読み込む
+
+    Args:
+        path (str): ファイルのパス
+
+    Returns:
+        dict: ヘッダー。要素の配列の開始位置をoffsetに追加します
+
+    Raises:
+        ValueError: ウエイトファイルではない、または対応していないバージョンの場合
+    """
+    with io.open(path,'rb') as f:
+        prefix = f.read(_PREFIX.size)
+        if len(prefix) < _PREFIX.size:
+            raise ValueError('ウエイトファイルではありません: {}'.format(path))
+        magic,version,headerLength = _PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError('ウエイトファイルではありません: {}'.format(path))
+        if version > VERSION:
+            raise ValueError('対応していないバージョンです: {} (version {})'.format(path,version))
+        header = json.loads(f.read(headerLength).decode('utf-8'))
+    header['offset'] = _PREFIX.size + headerLength
+    return header
+
+def openSparseWeights(path,*args,**kwargs):
+    """ファイルをメモリマップして開く
+
+    Args:
+        path (str): ファイルのパス
+
+    Returns:
+        tuple: (ヘッダー, 要素の配列(numpy.memmap))
+    """
+    header = readHeader(path)
+    if not header['entryCount']:
+        return header,np.zeros(0,dtype = ENTRY_DTYPE)
+    entries = np.memmap(path,dtype = ENTRY_DTYPE,mode = 'r',
+                        offset = header['offset'],shape = (header['entryCount'],))
+    return header,entries
+
+def buildInfluenceRemap(sourceInfluences,targetInfluences,*args,**kwargs):
+    """ファイルのインフルエンスを、読み込み先のインフルエンスの列に対応付ける
+    名前が完全に一致するものを優先し、なければネームスペースとDAGパスを除いた名前で対応付けます。
+
+    Args:
+        sourceInfluences (list): ファイルのインフルエンス名のリスト
+        targetInfluences (list): 読み込み先のインフルエンス名のリスト
+
+    Returns:
+        tuple: (ファイルの列ごとの読み込み先の列番号の配列(見つからない場合は-1),
+                見つからなかったインフルエンスのリスト)
+    """
+    fullNames = dict((name,i) for i,name in enumerate(targetInfluences))
+    shortNames = {}
+    for i,name in enumerate(targetInfluences):
+        shortNames.setdefault(_shortName(name),i)
+
+    remap = np.full(len(sourceInfluences),-1,dtype = np.int64)
+    missing = []
+    for i,name in enumerate(sourceInfluences):
+        column = fullNames.get(name,shortNames.get(_shortName(name)))
+        if column is None:
+            missing.append(name)
+        else:
+            remap[i] = column
+    return remap,missing
+
+def iterSparseWeights(path,targetInfluences = None,chunkVertices = 65536,normalize = True,*args,**kwargs):
+    """ファイルのウエイトを、頂点の範囲ごとに密な配列にして取り出す
+    ファイルはメモリマップし、一度に取り出すのはchunkVertices頂点分だけです。
+
+    Args:
+        path (str): ファイルのパス
+        targetInfluences (list): 読み込み先のインフルエンス名のリスト。Noneの場合はファイルの順番のまま
+        chunkVertices (int): 一度に取り出す頂点番号の範囲
+        normalize (bool): Trueの場合、各頂点の合計が1になるように正規化する
+                          (対応しないインフルエンスのウエイトを捨てた場合や、float32の誤差を補正します)
+
+    Yields:
+        tuple: (頂点番号の配列, ウエイト配列 (頂点数 x 読み込み先のインフルエンス数))。ファイルにある頂点だけを含みます
+    """
+    header,entries = openSparseWeights(path)
+    if targetInfluences is None:
+        targetInfluences = header['influences']
+    remap,missing = buildInfluenceRemap(header['influences'],targetInfluences)
+    influenceCount = len(targetInfluences)
+    # 同じ列に対応するインフルエンスがある場合だけ、加算して書き込む
+    mapped = remap[remap >= 0]
+    accumulate = len(np.unique(mapped)) != len(mapped)
+
+    vertexColumn = entries['vertex']
+    for start in range(0,header['vertexCount'],chunkVertices):
+        begin,end = np.searchsorted(vertexColumn,[start,start + chunkVertices])
+        if begin == end:
+            continue
+        chunk = np.asarray(entries[begin:end])
+        vertices,rows = np.unique(chunk['vertex'],return_inverse = True)
+        columns = remap[chunk['influence']]
+        valid = columns >= 0
+        weights = np.zeros((len(vertices),influenceCount),dtype = np.float64)
+        if accumulate:
+            np.add.at(weights,(rows[valid],columns[valid]),chunk['weight'][valid])
+        else:
+            weights[rows[valid],columns[valid]] = chunk['weight'][valid]
+        if normalize:
+            total = weights.sum(axis = 1)
+            np.divide(weights,total[:,None],out = weights,where = total[:,None] > weightMath.WEIGHT_EPSILON)
+        yield vertices.astype(np.int64),weights
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""ウエイトの変更履歴を差分で記録するモジュール
+ペイントのストロークやUtilityの処理ごとに、変更のあった頂点とインフルエンスだけを
+(頂点番号, 変更前のウエイト, 変更後のウエイト)の差分として記録します。
+メッシュ全体のウエイトをコピーしないので、長い作業でもメモリを抑えられます。
+記録に使うメモリには上限があり、超えた場合は古い差分から破棄します。
+
+差分の書き込みは呼び出し側から渡す関数で行うので、このモジュールはMayaに依存しません。
+
+Attributes:
+    * None
+Todo:
+    * None
+"""
+from __future__ import absolute_import, division, generators, print_function
+try:
+    from future_builtins import *
+except:
+    pass
+import sys
+sys.dont_write_bytecode = True
+# ------------------------------------------------------------------------------
+import time
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class WeightDelta(object):
+    """1回の変更の差分を保持するクラス
+
+    Attributes:
+        id (int): 差分の番号。この差分を適用した後の状態をチェックポイントとして指定できます
+        skinCluster (str): skinClusterの名前
+        label (str): 変更の名前 (Paint, Pruneなど)
+        rows (numpy.ndarray): 変更のあった頂点番号
+        influences (list): 変更のあったインフルエンス名 (oldValues, newValuesの列の順番)
+        oldValues (numpy.ndarray): 変更前のウエイト (頂点数 x インフルエンス数)
+        newValues (numpy.ndarray): 変更後のウエイト (頂点数 x インフルエンス数)
+        time (float): 記録した時刻
+    """
+
+    __slots__ = ('id','skinCluster','label','rows','influences','oldValues','newValues','time')
+
+    def __init__(self,deltaId,skinCluster,label,rows,influences,oldValues,newValues,*args,**kwargs):
+        self.id = deltaId
+        self.skinCluster = skinCluster
+        self.label = label
+        self.rows = rows
+        self.influences = influences
+        self.oldValues = oldValues
+        self.newValues = newValues
+        self.time = time.time()
+
+    @property
+    def nbytes(self):
+        """差分が使っているメモリ[byte]
+        """
+        return self.rows.nbytes + self.oldValues.nbytes + self.newValues.nbytes
+
+def createDelta(deltaId,skinCluster,rows,oldWeights,newWeights,influences,label = '',*args,**kwargs):
+    """変更前後のウエイトから差分を作成する
+    値が変わった頂点とインフルエンスだけを取り出します。
+
+    Args:
+        deltaId (int): 差分の番号
+        skinCluster (str): skinClusterの名前
+        rows (numpy.ndarray): 頂点番号
+        oldWeights (numpy.ndarray): 変更前のウエイト (頂点数 x インフルエンス数)
+        newWeights (numpy.ndarray): 変更後のウエイト (頂点数 x インフルエンス数)
+        influences (list): インフルエンス名のリスト (ウエイト配列の列の順番)
+        label (str): 変更の名前
+
+    Returns:
+        WeightDelta: 差分。値が変わっていない場合はNone
+    """
+    changed = np.asarray(oldWeights) != np.asarray(newWeights)
+    changedRows = np.flatnonzero(changed.any(axis = 1))
+    if not len(changedRows):
+        return None
+    columns = np.flatnonzero(changed[changedRows].any(axis = 0))
+    rows = np.asarray(rows,dtype = np.int64)[changedRows].astype(np.int32)
+    return WeightDelta(deltaId,skinCluster,label,rows,[influences[i] for i in columns],
+                       np.asarray(oldWeights)[changedRows][:,columns],
+                       np.asarray(newWeights)[changedRows][:,columns])
+
+class WeightHistory(object):
+    """ウエイトの差分の履歴を保持するクラス
+    差分は記録した順に並び、任意のチェックポイント(ある差分を適用した後の状態)に戻せます。
+    チェックポイントに戻した後に新しい差分を記録すると、それより先の差分は破棄します。
+
+    Attributes:
+        maxBytes (int): 記録に使うメモリの上限[byte]
+        evicted (int): 上限を超えたために破棄した差分の数
+    """
+
+    def __init__(self,maxBytes = 256 * 1024 * 1024,*args,**kwargs):
+        self.maxBytes = maxBytes
+        self.evicted = 0
+        self._deltas = []
+        # 現在の状態が何番目の差分まで適用した状態か
+        self._position = 0
+        self._nextId = 1
+        self._nbytes = 0
+
+    def __len__(self):
+        return len(self._deltas)
+
+    @property
+    def nbytes(self):
+        """記録に使っているメモリ[byte]
+        """
+        return self._nbytes
+
+    def currentId(self,*args,**kwargs):
+        """現在の状態のチェックポイントの番号を返す
+
+        Returns:
+            int: チェックポイントの番号。最も古い差分より前の状態の場合は、その差分の番号 - 1
+        """
+        if self._position:
+            return self._deltas[self._position - 1].id
+        return self._deltas[0].id - 1 if self._deltas else self._nextId - 1
+
+    def checkpoints(self,*args,**kwargs):
+        """記録している差分の一覧を返す (古い順)
+
+        Returns:
+            list: 差分のリスト
+        """
+        return list(self._deltas)
+
+    def record(self,skinCluster,rows,oldWeights,newWeights,influences,label = '',*args,**kwargs):
+        """変更を差分として記録する
+
+        Args:
+            skinCluster (str): skinClusterの名前
+            rows (numpy.ndarray): 頂点番号
+            oldWeights (numpy.ndarray): 変更前のウエイト (頂点数 x インフルエンス数)
+            newWeights (numpy.ndarray): 変更後のウエイト (頂点数 x インフルエンス数)
+            influences (list): インフルエンス名のリスト (ウエイト配列の列の順番)
+            label (str): 変更の名前
+
+        Returns:
+            WeightDelta: 記録した差分。値が変わっていない、または上限を超えるため記録できない場合はNone
+        """
+        delta = createDelta(self._nextId,skinCluster,rows,oldWeights,newWeights,influences,label = label)
+        if delta is None:
+            return None
+        self._nextId += 1
+        self._discardRedo()
+        if delta.nbytes > self.maxBytes:
+            # 記録できない変更より前には戻せなくなるので、履歴を全部破棄する
+            self.evicted += len(self._deltas) + 1
+            self.clear()
+            return None
+
+        self._deltas.append(delta)
+        self._position = len(self._deltas)
+        self._nbytes += delta.nbytes
+        self._evict()
+        return delta
+
+    def _discardRedo(self,*args,**kwargs):
+        """現在の状態より先の差分を破棄する
+        """
+        for delta in self._deltas[self._position:]:
+            self._nbytes -= delta.nbytes
+        del self._deltas[self._position:]
+
+    def _evict(self,*args,**kwargs):
+        """メモリの上限を超えている間、古い差分から破棄する
+        """
+        while self._nbytes > self.maxBytes and self._deltas:
+            if not self._position:
+                # 最も古い差分より前の状態にいる場合は、残りの差分とつながらなくなるので全て破棄する
+                self.evicted += len(self._deltas)
+                self.clear()
+                break
+            delta = self._deltas.pop(0)
+            self._nbytes -= delta.nbytes
+            self._position = max(self._position - 1,0)
+            self.evicted += 1
+
+    def setMaxBytes(self,maxBytes,*args,**kwargs):
+        """記録に使うメモリの上限を変更する
+        上限を超えている場合は、古い差分から破棄します。
+
+        Args:
+            maxBytes (int): 上限[byte]
+
+        Returns:
+            None
+        """
+        self.maxBytes = maxBytes
+        self._evict()
+
+    def restore(self,checkpointId,writer,*args,**kwargs):
+        """指定のチェックポイントの状態に戻す
+        現在の状態から、指定の状態までの差分を順に書き込みます。
+
+        Args:
+            checkpointId (int): チェックポイントの番号 (WeightDelta.id)。
+                                最も古い差分の番号 - 1を指定すると、記録を始める前の状態に戻します
+            writer (function): writer(skinCluster, rows, influences, values)で差分を書き込む関数
+
+        Returns:
+            int: 書き込んだ差分の数。戻せないチェックポイントの場合は-1
+        """
+        if not self._deltas:
+            return -1
+        target = checkpointId - self._deltas[0].id + 1
+        if target < 0 or target > len(self._deltas):
+            return -1
+
+        count = 0
+        while self._position > target:
+            delta = self._deltas[self._position - 1]
+            writer(delta.skinCluster,delta.rows,delta.influences,delta.oldValues)
+            self._position -= 1
+            count += 1
+        while self._position < target:
+            delta = self._deltas[self._position]
+            writer(delta.skinCluster,delta.rows,delta.influences,delta.newValues)
+            self._position += 1
+            count += 1
+        return count
+
+    def undo(self,writer,*args,**kwargs):
+        """1つ前のチェックポイントに戻す
+
+        Args:
+            writer (function): 差分を書き込む関数 (restoreを参照)
+
+        Returns:
+            int: 書き込んだ差分の数。戻せない場合は-1
+        """
+        return self.restore(self.currentId() - 1,writer)
+
+    def redo(self,writer,*args,**kwargs):
+        """1つ先のチェックポイントに進める
+
+        Args:
+            writer (function): 差分を書き込む関数 (restoreを参照)
+
+        Returns:
+            int: 書き込んだ差分の数。進められない場合は-1
+        """
+        return self.restore(self.currentId() + 1,writer)
+
+    def clear(self,*args,**kwargs):
+        """履歴を全て破棄する
+
+        Returns:
+            None
+        """
+        self._deltas = []
+        self._position = 0
+        self._nbytes = 0
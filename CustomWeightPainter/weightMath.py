@@ -0,0 +1,671 @@
+# -*- coding: utf-8 -*-
+"""ウエイト配列に対する計算をまとめたモジュール
+ウエイト配列(頂点数 x インフルエンス数)に対する計算をNumPyでまとめて行います。
+Mayaに依存しないので、Maya外からも読み込んでベンチマークなどに使うことができます。
+
+Attributes:
+    * None
+Todo:
+    * None
+"""
+from __future__ import absolute_import, division, generators, print_function
+try:
+    from future_builtins import *
+except:
+    pass
+import sys
+sys.dont_write_bytecode = True
+# ------------------------------------------------------------------------------
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    import scipy.sparse as sparse
+except ImportError:
+    sparse = None
+
+# これより小さいウエイトは0として扱う
+WEIGHT_EPSILON = 1.0e-6
+
+def computeInfluenceStats(column,threshold = 0.5,*args,**kwargs):
+    """1つのインフルエンスのウエイトの統計を求める
+
+    Args:
+        column (numpy.ndarray): インフルエンスのウエイト (頂点数)
+        threshold (float): しきい値
+
+    Returns:
+        dict: 統計 (vertices: 影響する頂点数, max: 最大値, mean: 影響する頂点の平均値,
+              overThreshold: しきい値を超える頂点数, sum: 影響する頂点のウエイトの合計)
+    """
+    affected = column > WEIGHT_EPSILON
+    count = int(np.count_nonzero(affected))
+    total = float(column[affected].sum()) if count else 0.0
+    return {'vertices':count,
+            'max':float(column.max()) if count else 0.0,
+            'mean':total / count if count else 0.0,
+            'overThreshold':int(np.count_nonzero(column > threshold)),
+            'sum':total}
+
+def mergeInfluenceStats(statsList,*args,**kwargs):
+    """複数のskinClusterの統計をまとめる
+
+    Args:
+        statsList (list): computeInfluenceStatsの結果のリスト
+
+    Returns:
+        dict: まとめた統計
+    """
+    count = sum(stats['vertices'] for stats in statsList)
+    total = sum(stats['sum'] for stats in statsList)
+    return {'vertices':count,
+            'max':max([stats['max'] for stats in statsList] or [0.0]),
+            'mean':total / count if count else 0.0,
+            'overThreshold':sum(stats['overThreshold'] for stats in statsList),
+            'sum':total}
+
+def _keepLargest(weights,keepCount,*args,**kwargs):
+    """各行で大きい順にkeepCount個だけ値を残し、それ以外を0にする
+    上限を超えている行だけを取り出し、各行の最大値をkeepCount回取り出して残す値を決めます。
+    行ごとにソートするより高速です。同じ値が並んだ場合は、列番号の小さい方を残します。
+
+    Args:
+        weights (numpy.ndarray): ウエイト配列 (行数 x 列数)。直接書き換えます
+        keepCount (numpy.ndarray): 行ごとの残す個数
+
+    Returns:
+        numpy.ndarray: 処理後のウエイト配列
+    """
+    over = np.flatnonzero(np.count_nonzero(weights,axis = 1) > keepCount)
+    if not len(over):
+        return weights
+
+    work = weights[over]
+    keep = keepCount[over]
+    keepMask = np.zeros(work.shape,dtype = bool)
+    rows = np.arange(len(over))
+    for i in range(int(keep.max())):
+        columns = np.argmax(work,axis = 1)
+        active = (keep > i) & (work[rows,columns] > 0.0)
+        keepMask[rows[active],columns[active]] = True
+        work[rows,columns] = -1.0
+    work = weights[over]
+    work *= keepMask
+    weights[over] = work
+    return weights
+
+def limitInfluences(weights,locked = None,maxInfluences = 4,threshold = 0.0,*args,**kwargs):
+    """ウエイトの刈り込みと、1頂点あたりのインフルエンス数の制限を行う
+    しきい値以下のウエイトを0にし、各頂点でウエイトの大きい順にmaxInfluences個まで残して、
+    合計が1になるように正規化します。
+    ロックされたインフルエンスの値は変更せず、影響数にだけ数えます。
+    残りのウエイトは、ロックされていないインフルエンスだけで(1 - ロックされた合計)になるように正規化します。
+
+    ロックされたインフルエンスだけで上限に達している、またはしきい値で全部刈り込まれてしまう頂点でも、
+    (1 - ロックされた合計)が残っていれば、ロックされていない最大のウエイトを1つだけ残して合計を保ちます。
+    そのため、ロックされたインフルエンスがmaxInfluences個以上ある頂点は上限を超えます。
+    上限を超えた頂点はcountInfluencesで確認してください。
+
+    Args:
+        weights (numpy.ndarray): ウエイト配列 (頂点数 x インフルエンス数)
+        locked (numpy.ndarray): ロックされたインフルエンスの真偽値の配列 (インフルエンス数)
+        maxInfluences (int): 1頂点あたりの最大インフルエンス数。0以下の場合は制限しない
+        threshold (float): このウエイト以下を0にする
+
+    Returns:
+        numpy.ndarray: 処理後のウエイト配列
+    """
+    source = weights
+    weights = np.array(weights,dtype = np.float64)
+    influenceCount = weights.shape[1]
+    if locked is None:
+        locked = np.zeros(influenceCount,dtype = bool)
+    locked = np.asarray(locked,dtype = bool)
+    if locked.all():
+        return weights
+
+    # ロックされたインフルエンスの列は退避して0にしておき、配列全体をそのまま処理する
+    hasLocked = bool(locked.any())
+    lockedWeights = weights[:,locked] if hasLocked else None
+    if hasLocked:
+        weights[:,locked] = 0.0
+    originalSum = weights.sum(axis = 1)
+    # ロックされていないインフルエンスに残す合計 (1 - ロックされた合計)
+    target = np.clip(1.0 - lockedWeights.sum(axis = 1),0.0,1.0) if hasLocked else 1.0
+    target = np.where(originalSum > WEIGHT_EPSILON,target,originalSum)
+    needed = target > WEIGHT_EPSILON
+    np.putmask(weights,weights <= max(threshold,WEIGHT_EPSILON),0.0)
+
+    if maxInfluences > 0:
+        keepCount = np.full(weights.shape[0],maxInfluences,dtype = np.int64)
+        if hasLocked:
+            keepCount -= np.count_nonzero(lockedWeights > WEIGHT_EPSILON,axis = 1)
+            # ロックされたインフルエンスで上限に達していても、合計を保つために1つは残す
+            np.maximum(keepCount,needed.astype(np.int64),out = keepCount)
+        _keepLargest(weights,keepCount)
+
+    newSum = weights.sum(axis = 1)
+    # しきい値で全部刈り込まれた行は、元のロックされていない最大のウエイトを1つだけ残す
+    emptyRows = np.flatnonzero((newSum <= WEIGHT_EPSILON) & needed)
+    if len(emptyRows):
+        work = np.array(np.asarray(source)[emptyRows],dtype = np.float64)
+        work[:,locked] = 0.0
+        columns = np.argmax(work,axis = 1)
+        weights[emptyRows,columns] = work[np.arange(len(emptyRows)),columns]
+        newSum[emptyRows] = weights[emptyRows].sum(axis = 1)
+
+    # ロックされていないインフルエンスの合計を(1 - ロックされた合計)にする
+    scale = np.divide(target,newSum,out = np.zeros_like(newSum),where = newSum > WEIGHT_EPSILON)
+    weights *= scale[:,None]
+    if hasLocked:
+        weights[:,locked] = lockedWeights
+    return weights
+
+def limitInfluencesChunked(weights,locked = None,maxInfluences = 4,threshold = 0.0,chunkSize = 16384,*args,**kwargs):
+    """limitInfluencesを行ごとに分割して実行する
+    一度に処理する行数を制限し、作業用の配列のメモリを抑えます。
+
+    Args:
+        weights (numpy.ndarray): ウエイト配列 (頂点数 x インフルエンス数)
+        locked (numpy.ndarray): ロックされたインフルエンスの真偽値の配列 (インフルエンス数)
+        maxInfluences (int): 1頂点あたりの最大インフルエンス数
+        threshold (float): このウエイト以下を0にする
+        chunkSize (int): 一度に処理する行数
+
+    Returns:
+        numpy.ndarray: 処理後のウエイト配列
+    """
+    result = np.empty(weights.shape,dtype = np.float64)
+    for start in range(0,weights.shape[0],chunkSize):
+        end = min(start + chunkSize,weights.shape[0])
+        result[start:end] = limitInfluences(weights[start:end],locked = locked,
+                                            maxInfluences = maxInfluences,threshold = threshold)
+    return result
+
+def countInfluences(weights,*args,**kwargs):
+    """各頂点のインフルエンス数を数える
+
+    Args:
+        weights (numpy.ndarray): ウエイト配列 (頂点数 x インフルエンス数)
+
+    Returns:
+        numpy.ndarray: 頂点ごとのインフルエンス数
+    """
+    return np.count_nonzero(weights > WEIGHT_EPSILON,axis = 1)
+
+def findChangedRows(newWeights,weights,tolerance = WEIGHT_EPSILON,*args,**kwargs):
+    """ウエイトが変わった行を探す
+    計算の丸め誤差で生じるtolerance以下の差は、変更とみなしません。
+
+    Args:
+        newWeights (numpy.ndarray): 計算したウエイト配列 (行数 x インフルエンス数)
+        weights (numpy.ndarray): 元のウエイト配列 (行数 x インフルエンス数)
+        tolerance (float): 変更とみなさない差
+
+    Returns:
+        numpy.ndarray: 変わった行の番号
+    """
+    return np.flatnonzero((np.abs(newWeights - weights) > tolerance).any(axis = 1))
+
+def normalizeWeights(weights,locked = None,*args,**kwargs):
+    """各行の合計が1になるように、ロックされていないインフルエンスのウエイトを拡大・縮小する
+    ロックされていないウエイトがすべて0の行は、元のままにします。
+
+    Args:
+        weights (numpy.ndarray): ウエイト配列 (頂点数 x インフルエンス数)
+        locked (numpy.ndarray): ロックされたインフルエンスの真偽値の配列 (インフルエンス数)
+
+    Returns:
+        numpy.ndarray: 処理後のウエイト配列
+    """
+    result = np.array(weights,dtype = np.float64)
+    if locked is None:
+        locked = np.zeros(result.shape[1],dtype = bool)
+    unlocked = ~np.asarray(locked,dtype = bool)
+    available = np.clip(1.0 - result[:,~unlocked].sum(axis = 1),0.0,1.0)
+    total = result[:,unlocked].sum(axis = 1)
+    scale = np.divide(available,total,out = np.ones_like(total),where = total > WEIGHT_EPSILON)
+    result[:,unlocked] *= scale[:,None]
+    return result
+
+def validateWeights(weights,maxInfluences = 4,tolerance = 0.001,*args,**kwargs):
+    """ウエイト配列の問題のある頂点を数える
+
+    Args:
+        weights (numpy.ndarray): ウエイト配列 (頂点数 x インフルエンス数)
+        maxInfluences (int): 1頂点あたりの最大インフルエンス数。0以下の場合は数えない
+        tolerance (float): 合計が1から外れているとみなす差
+
+    Returns:
+        dict: 問題のある頂点数 (invalid: NaNや無限大を含む, negative: 負の値を含む,
+              notNormalized: 合計が1でない, overInfluences: インフルエンス数が多すぎる, vertices: 頂点数)
+    """
+    finite = np.isfinite(weights).all(axis = 1)
+    total = np.where(finite,weights.sum(axis = 1),1.0)
+    return {'vertices':int(weights.shape[0]),
+            'invalid':int(np.count_nonzero(~finite)),
+            'negative':int(np.count_nonzero((weights < -WEIGHT_EPSILON).any(axis = 1))),
+            'notNormalized':int(np.count_nonzero(np.abs(total - 1.0) > tolerance)),
+            'overInfluences':int(np.count_nonzero(countInfluences(weights) > maxInfluences)) if maxInfluences > 0 else 0}
+
+# mirror
+AXIS_INDEX = {'x':0,'y':1,'z':2}
+
+# 左右を表すトークンの組 (名前を'_'で区切ったトークン、または先頭の単語と比較します)
+MIRROR_TOKENS = (('L','R'),('l','r'),('Left','Right'),('left','right'),('Lf','Rt'),('lf','rt'))
+
+def matchMirrorVertices(points,axis = 'x',tolerance = 0.001,*args,**kwargs):
+    """頂点を軸で反転した位置にある頂点を探す
+    頂点をtolerance x 2の大きさのセルに分けた空間ハッシュを作り、
+    反転した位置の周囲8セルだけを探索します。
+
+    Args:
+        points (numpy.ndarray): 頂点の座標 (頂点数 x 3)
+        axis (str): 反転する軸 (x, y, z)
+        tolerance (float): 一致とみなす距離
+
+    Returns:
+        numpy.ndarray: 頂点ごとの反対側の頂点番号。見つからない場合は-1
+    """
+    points = np.asarray(points,dtype = np.float64).reshape(-1,3)
+    mirrored = points.copy()
+    mirrored[:,AXIS_INDEX[axis]] *= -1.0
+    cellSize = max(tolerance,WEIGHT_EPSILON) * 2.0
+
+    # セルが十分に大きいので、距離tolerance以内の頂点は各軸で自分のセルか近い側の隣のセルにある
+    cells = np.floor(points / cellSize).astype(np.int64)
+    scaled = mirrored / cellSize
+    queryCells = np.floor(scaled).astype(np.int64)
+    nearSide = np.where(scaled - queryCells < 0.5,-1,1)
+    low = np.minimum(cells.min(axis = 0),queryCells.min(axis = 0)) - 1
+    size = np.maximum(cells.max(axis = 0),queryCells.max(axis = 0)) + 2 - low
+
+    def cellKeys(cells):
+        cells = cells - low
+        return (cells[:,0] * size[1] + cells[:,1]) * size[2] + cells[:,2]
+
+    keys = cellKeys(cells)
+    order = np.argsort(keys,kind = 'stable')
+    sortedKeys = keys[order]
+
+    best = np.full(len(points),-1,dtype = np.int64)
+    bestDistance = np.full(len(points),np.inf)
+    for offset in ((0,0,0),(1,0,0),(0,1,0),(0,0,1),(1,1,0),(1,0,1),(0,1,1),(1,1,1)):
+        queryKeys = cellKeys(queryCells + nearSide * np.array(offset,dtype = np.int64))
+        start = np.searchsorted(sortedKeys,queryKeys,side = 'left')
+        count = np.searchsorted(sortedKeys,queryKeys,side = 'right') - start
+        for i in range(int(count.max()) if len(count) else 0):
+            rows = np.flatnonzero(count > i)
+            candidates = order[start[rows] + i]
+            distance = ((points[candidates] - mirrored[rows]) ** 2).sum(axis = 1)
+            better = distance < bestDistance[rows]
+            best[rows[better]] = candidates[better]
+            bestDistance[rows[better]] = distance[better]
+    best[bestDistance > tolerance * tolerance] = -1
+    return best
+
+def mirrorInfluenceName(name,tokens = MIRROR_TOKENS,*args,**kwargs):
+    """インフルエンス名の左右を入れ替えた名前を求める
+    名前を'_'で区切ったトークンのうち、左右を表すものを入れ替えます。
+    トークンが見つからない場合は、先頭の単語(LeftArmのLeftなど)を入れ替えます。
+    ネームスペースとDAGパスの親は変更しません。
+
+    Args:
+        name (str): インフルエンス名
+        tokens (tuple): 左右を表すトークンの組
+
+    Returns:
+        str: 左右を入れ替えた名前。左右を表すトークンがない場合はNone
+    """
+    head,sep,shortName = name.rpartition('|')
+    namespace,colon,shortName = shortName.rpartition(':')
+    swap = {}
+    for left,right in tokens:
+        swap[left] = right
+        swap[right] = left
+
+    parts = shortName.split('_')
+    mirrored = [swap.get(part,part) for part in parts]
+    if mirrored != parts:
+        return head + sep + namespace + colon + '_'.join(mirrored)
+
+    for word in sorted(swap,key = len,reverse = True):
+        rest = shortName[len(word):]
+        if len(word) > 1 and shortName.startswith(word) and rest[:1].isupper():
+            return head + sep + namespace + colon + swap[word] + rest
+    return None
+
+def buildInfluenceMirrorMap(influences,tokens = MIRROR_TOKENS,*args,**kwargs):
+    """インフルエンスの列を、左右を入れ替えた列に対応付ける
+
+    Args:
+        influences (list): インフルエンス名のリスト (ウエイト配列の列の順番)
+        tokens (tuple): 左右を表すトークンの組
+
+    Returns:
+        tuple: (列ごとの反対側の列番号の配列, 反対側が見つからなかったインフルエンスのリスト)。
+               中央のインフルエンスは自分自身の列に対応付けます
+    """
+    nameToIndex = dict((name,i) for i,name in enumerate(influences))
+    columnMap = np.arange(len(influences),dtype = np.int64)
+    unmatched = []
+    for i,name in enumerate(influences):
+        mirrored = mirrorInfluenceName(name,tokens)
+        if mirrored is None:
+            continue
+        if mirrored in nameToIndex:
+            columnMap[i] = nameToIndex[mirrored]
+        else:
+            unmatched.append(name)
+    return columnMap,unmatched
+
+def mirrorWeights(weights,vertexMap,columnMap,targets,locked = None,*args,**kwargs):
+    """反対側の頂点のウエイトを、インフルエンスの左右を入れ替えてコピーする
+    ロックされたインフルエンスの値は変更せず、残りのウエイトを(1 - ロックされた合計)に正規化します。
+
+    Args:
+        weights (numpy.ndarray): ウエイト配列 (頂点数 x インフルエンス数)
+        vertexMap (numpy.ndarray): 頂点ごとの反対側の頂点番号 (matchMirrorVertices)
+        columnMap (numpy.ndarray): 列ごとの反対側の列番号 (buildInfluenceMirrorMap)
+        targets (numpy.ndarray): 書き込み先の頂点番号
+        locked (numpy.ndarray): ロックされたインフルエンスの真偽値の配列 (インフルエンス数)
+
+    Returns:
+        tuple: (書き込み先の頂点番号の配列, 書き込むウエイト配列)。反対側の頂点がない頂点は含みません
+    """
+    targets = np.asarray(targets,dtype = np.int64)
+    sources = vertexMap[targets]
+    valid = sources >= 0
+    targets = targets[valid]
+    mirrored = weights[sources[valid]][:,columnMap]
+    if locked is not None and np.any(locked):
+        locked = np.asarray(locked,dtype = bool)
+        lockedWeights = weights[targets][:,locked]
+        mirrored[:,locked] = 0.0
+        total = mirrored.sum(axis = 1)
+        target = np.clip(1.0 - lockedWeights.sum(axis = 1),0.0,1.0)
+        scale = np.divide(target,total,out = np.zeros_like(total),where = total > WEIGHT_EPSILON)
+        mirrored *= scale[:,None]
+        mirrored[:,locked] = lockedWeights
+        # ロックされていないインフルエンスに配れない行は元のままにする
+        emptyRows = (total <= WEIGHT_EPSILON) & (target > WEIGHT_EPSILON)
+        mirrored[emptyRows] = weights[targets[emptyRows]]
+    return targets,mirrored
+
+# smooth
+class CsrMatrix(object):
+    """SciPyがない場合に使う、最小限のCSR形式の疎行列
+    行の取り出し(getRows)と、密な配列との積(dot)だけを実装しています。
+    積は、行ごとの要素を最大の要素数に揃えた表を作っておき、要素数の列ごとにまとめて計算します。
+    メッシュの隣接行列のように、行ごとの要素数がほぼ揃っている場合に高速です。
+
+    Attributes:
+        shape (tuple): 行列の形
+        data (numpy.ndarray): 0でない要素の値
+        indices (numpy.ndarray): 0でない要素の列番号
+        indptr (numpy.ndarray): 行ごとの要素の開始位置
+    """
+
+    def __init__(self,data,indices,indptr,shape,*args,**kwargs):
+        self.data = np.asarray(data,dtype = np.float64)
+        self.indices = np.asarray(indices,dtype = np.int64)
+        self.indptr = np.asarray(indptr,dtype = np.int64)
+        self.shape = tuple(shape)
+        self._table = None
+
+    def getRows(self,rows,*args,**kwargs):
+        """指定の行だけを取り出した行列を返す
+
+        Args:
+            rows (numpy.ndarray): 行番号
+
+        Returns:
+            CsrMatrix: (行数 x 列数)の行列
+        """
+        rows = np.asarray(rows,dtype = np.int64)
+        starts = self.indptr[rows]
+        counts = self.indptr[rows + 1] - starts
+        indptr = np.zeros(len(rows) + 1,dtype = np.int64)
+        np.cumsum(counts,out = indptr[1:])
+        positions = np.repeat(starts - indptr[:-1],counts) + np.arange(indptr[-1])
+        return CsrMatrix(self.data[positions],self.indices[positions],indptr,(len(rows),self.shape[1]))
+
+    def _buildTable(self,*args,**kwargs):
+        """行ごとの要素を、最大の要素数の列に揃えた表を作る
+        """
+        counts = np.diff(self.indptr)
+        width = int(counts.max()) if len(counts) else 0
+        rowIds = np.repeat(np.arange(self.shape[0]),counts)
+        positions = np.arange(len(self.indices)) - self.indptr[rowIds]
+        # 要素がない場所は、積に使う配列の末尾に追加する0の行を指す (列ごとに連続した配列にする)
+        indices = np.full((width,self.shape[0]),self.shape[1],dtype = np.int64)
+        data = np.zeros((width,self.shape[0]),dtype = np.float64)
+        indices[positions,rowIds] = self.indices
+        data[positions,rowIds] = self.data
+        # 列ごとに、その列に要素がある行。半分以上の行にある場合は、0の要素も含めて全行を計算する(None)
+        rowsByColumn = [None if np.count_nonzero(counts > i) * 2 >= len(counts) else np.flatnonzero(counts > i)
+                        for i in range(width)]
+        self._table = (indices,data,rowsByColumn)
+
+    def dot(self,values,*args,**kwargs):
+        """行列と密な配列の積を求める
+
+        Args:
+            values (numpy.ndarray): 密な配列 (列数) または (列数 x k)
+
+        Returns:
+            numpy.ndarray: 積 (行数) または (行数 x k)
+        """
+        if self._table is None:
+            self._buildTable()
+        indices,data,rowsByColumn = self._table
+        values = np.asarray(values,dtype = np.float64)
+        padded = np.concatenate([values,np.zeros((1,) + values.shape[1:])])
+        result = np.zeros((self.shape[0],) + values.shape[1:])
+        for i,rows in enumerate(rowsByColumn):
+            if rows is None:
+                column = padded[indices[i]]
+                np.multiply(column,data[i] if values.ndim == 1 else data[i][:,None],out = column)
+                result += column
+            else:
+                column = padded[indices[i][rows]]
+                column *= data[i][rows] if values.ndim == 1 else data[i][rows][:,None]
+                result[rows] += column
+        return result
+
+def buildEdgesFromFaces(counts,connects,*args,**kwargs):
+    """フェースを構成する頂点番号から、重複のないエッジの配列を作る
+
+    Args:
+        counts (numpy.ndarray): フェースごとの頂点数
+        connects (numpy.ndarray): フェースごとの頂点番号を並べた配列
+
+    Returns:
+        numpy.ndarray: エッジの両端の頂点番号 (エッジ数 x 2)。小さい頂点番号が先
+    """
+    counts = np.asarray(counts,dtype = np.int64)
+    connects = np.asarray(connects,dtype = np.int64)
+    # フェース内の次の頂点を指す番号。フェースの最後の頂点は先頭に戻す
+    following = np.arange(1,len(connects) + 1,dtype = np.int64)
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    valid = counts > 0
+    following[ends[valid] - 1] = starts[valid]
+    edges = np.stack([connects,connects[following]],axis = 1)
+    edges.sort(axis = 1)
+    edges = edges[edges[:,0] != edges[:,1]]
+    # 2つの頂点番号を1つの整数にまとめて重複を取り除く
+    vertexCount = int(connects.max()) + 1 if len(connects) else 0
+    keys = np.unique(edges[:,0] * vertexCount + edges[:,1])
+    return np.stack([keys // max(vertexCount,1),keys % max(vertexCount,1)],axis = 1)
+
+def buildAdjacency(edges,vertexCount,*args,**kwargs):
+    """隣接する頂点の平均を求めるCSR形式の疎行列を作る
+    行ごとの合計が1になるように、各要素を隣接する頂点数で割ります。
+    SciPyがある場合はscipy.sparse.csr_matrixを、ない場合はCsrMatrixを返します。
+
+    Args:
+        edges (numpy.ndarray): エッジの両端の頂点番号 (エッジ数 x 2)
+        vertexCount (int): 頂点数
+
+    Returns:
+        scipy.sparse.csr_matrix or CsrMatrix: 隣接行列 (頂点数 x 頂点数)
+    """
+    edges = np.asarray(edges,dtype = np.int64).reshape(-1,2)
+    rows = np.concatenate([edges[:,0],edges[:,1]])
+    columns = np.concatenate([edges[:,1],edges[:,0]])
+    order = np.lexsort((columns,rows))
+    rows,columns = rows[order],columns[order]
+    degree = np.bincount(rows,minlength = vertexCount)
+    data = 1.0 / degree[rows]
+    indptr = np.zeros(vertexCount + 1,dtype = np.int64)
+    np.cumsum(degree,out = indptr[1:])
+    if sparse is not None:
+        return sparse.csr_matrix((data,columns,indptr),shape = (vertexCount,vertexCount))
+    return CsrMatrix(data,columns,indptr,(vertexCount,vertexCount))
+
+def findSmoothColumns(weights,adjacency,influence,rows = None,locked = None,*args,**kwargs):
+    """スムースする列を求める
+    対象のインフルエンスと、それが影響する頂点(とその隣の頂点)に影響する
+    ロックされていないインフルエンスの列を返します。
+
+    Args:
+        weights (numpy.ndarray): ウエイト配列 (頂点数 x インフルエンス数)
+        adjacency (scipy.sparse.csr_matrix or CsrMatrix): 隣接行列 (buildAdjacency)
+        influence (int): 対象のインフルエンスの列番号
+        rows (numpy.ndarray): スムースする頂点番号。Noneの場合は全頂点
+        locked (numpy.ndarray): ロックされたインフルエンスの真偽値の配列 (インフルエンス数)
+
+    Returns:
+        numpy.ndarray: 列番号の配列
+    """
+    affected = weights[:,influence] > WEIGHT_EPSILON
+    if rows is not None:
+        region = np.zeros(len(affected),dtype = bool)
+        region[rows] = True
+        affected &= region
+    # 隣の頂点まで広げる
+    affected |= adjacency.dot(affected.astype(np.float64)) > 0.0
+    columns = np.flatnonzero((weights[affected] > WEIGHT_EPSILON).any(axis = 0))
+    columns = np.union1d(columns,[influence])
+    if locked is not None:
+        columns = columns[~np.asarray(locked,dtype = bool)[columns]]
+    return columns
+
+def smoothWeights(weights,adjacency,columns,rows = None,iterations = 10,strength = 0.5,locked = None,*args,**kwargs):
+    """指定の列のウエイトを隣接する頂点の平均に近づける (ラプラシアンスムース)
+    1回の反復は、疎行列と(頂点数 x 列数)の配列の積1回です。
+    スムースした後、ロックされたインフルエンスの値は変えずに、
+    スムースしていないインフルエンスで合計が1になるように調整します。
+
+    Args:
+        weights (numpy.ndarray): ウエイト配列 (頂点数 x インフルエンス数)
+        adjacency (scipy.sparse.csr_matrix or CsrMatrix): 隣接行列 (buildAdjacency)
+        columns (numpy.ndarray): スムースする列番号 (ロックされた列は除いておく)
+        rows (numpy.ndarray): スムースする頂点番号。Noneの場合は全頂点
+        iterations (int): 反復回数
+        strength (float): 1回の反復で平均に近づける割合 (0-1)
+        locked (numpy.ndarray): ロックされたインフルエンスの真偽値の配列 (インフルエンス数)
+
+    Returns:
+        tuple: (変更した頂点番号の配列, 変更後のウエイト (頂点数 x インフルエンス数))
+    """
+    columns = np.asarray(columns,dtype = np.int64)
+    vertexCount,influenceCount = weights.shape
+    if rows is None:
+        rows = np.arange(vertexCount)
+    rows = np.asarray(rows,dtype = np.int64)
+    if locked is None:
+        locked = np.zeros(influenceCount,dtype = bool)
+    locked = np.asarray(locked,dtype = bool)
+
+    # 対象の頂点の行だけを計算し、対象外の頂点は隣の頂点の値としてだけ使う
+    block = weights[:,columns].astype(np.float64)
+    if len(rows) == vertexCount:
+        for i in range(iterations):
+            step = adjacency.dot(block)
+            step -= block
+            step *= strength
+            block += step
+        smoothed = block
+    else:
+        subAdjacency = adjacency[rows] if sparse is not None and sparse.issparse(adjacency) else adjacency.getRows(rows)
+        for i in range(iterations):
+            current = block[rows]
+            step = subAdjacency.dot(block)
+            step -= current
+            step *= strength
+            current += step
+            block[rows] = current
+        smoothed = block[rows]
+
+    result = weights[rows].astype(np.float64)
+    smoothed = np.clip(smoothed,0.0,1.0)
+    result[:,columns] = smoothed
+
+    # スムースしていない、ロックされていない列で合計を調整する
+    others = ~locked
+    others[columns] = False
+    available = np.clip(1.0 - result[:,locked].sum(axis = 1),0.0,1.0)
+    smoothedSum = smoothed.sum(axis = 1)
+    otherSum = result[:,others].sum(axis = 1)
+    remainder = np.clip(available - smoothedSum,0.0,None)
+    # 他の列があればそこで残りを埋め、なければスムースした列を拡大・縮小する
+    useOthers = (otherSum > WEIGHT_EPSILON) & (smoothedSum <= available)
+    otherScale = np.divide(remainder,otherSum,out = np.zeros_like(otherSum),where = useOthers)
+    result[:,others] *= otherScale[:,None]
+    smoothScale = np.divide(available,smoothedSum,out = np.ones_like(smoothedSum),
+                            where = ~useOthers & (smoothedSum > WEIGHT_EPSILON))
+    result[:,columns] *= smoothScale[:,None]
+    return rows,result
+
+# selection
+def growVertexMask(mask,adjacency,band = None,steps = 1,shrink = False,*args,**kwargs):
+    """頂点のマスクを、隣接する頂点へ広げる・狭める
+    広げる場合は、マスクに隣接する頂点のうちbandに含まれるものを加えます。
+    狭める場合は、マスクの境界(マスク外の頂点に隣接する頂点)のうちbandに含まれないものを外します。
+    変化がなくなった時点で反復を打ち切ります。
+
+    Args:
+        mask (numpy.ndarray): 頂点ごとのマスク (頂点数)
+        adjacency (scipy.sparse.csr_matrix or CsrMatrix): 隣接行列 (頂点数 x 頂点数)
+        band (numpy.ndarray): ウエイトの範囲に含まれる頂点のマスク (頂点数)。
+                              Noneの場合は、広げるときは全頂点、狭めるときはどの頂点も含まないものとする
+        steps (int): 反復回数
+        shrink (bool): Trueの場合は狭める
+
+    Returns:
+        numpy.ndarray: 新しいマスク (頂点数)
+    """
+    mask = np.array(mask,dtype = bool)
+    for i in range(steps):
+        if shrink:
+            changed = mask & (adjacency.dot((~mask).astype(np.float64)) > 0.0)
+            if band is not None:
+                changed &= ~band
+        else:
+            changed = ~mask & (adjacency.dot(mask.astype(np.float64)) > 0.0)
+            if band is not None:
+                changed &= band
+        if not changed.any():
+            break
+        mask ^= changed
+    return mask
+
+# pick
+def dominantInfluences(weights,*args,**kwargs):
+    """頂点ごとに、ウエイトが最も大きいインフルエンスの列番号を求める
+
+    Args:
+        weights (numpy.ndarray): ウエイト配列 (頂点数 x インフルエンス数)
+
+    Returns:
+        numpy.ndarray: 列番号 (頂点数)。ウエイトがすべて0の頂点は-1
+    """
+    weights = np.asarray(weights)
+    if not weights.shape[1]:
+        return np.full(weights.shape[0],-1,dtype = np.int32)
+    dominant = weights.argmax(axis = 1).astype(np.int32)
+    dominant[weights[np.arange(weights.shape[0]),dominant] <= WEIGHT_EPSILON] = -1
+    return dominant
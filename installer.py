@@ -33,18 +33,13 @@ def _create_shelf(*args, **kwargs):
     """
     script_path = os.path.dirname(__file__).replace('\\', '/')
 
-    command = """try:
-    from importlib import reload
-except:
-    pass
-
-import sys
-from maya import cmds
+    # Reload is left to the tool itself (see CUSTOMWEIGHTPAINTER_DEV),
+    # so repeated clicks reuse the live tool instance.
+    command = """import sys
 if not '{0}' in sys.path:
     sys.path.append('{0}')
 
 import {1}
-reload({1})
 {1}.show()""".format(script_path, moduleName)
     shelf = mel.eval("$gShelfTopLevel=$gShelfTopLevel")
     parent = cmds.tabLayout(shelf, query=True, selectTab=True)
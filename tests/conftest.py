@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""テストの共通設定
+Toolのモジュールを読み込む前に、Mayaの代用品(mayaStandin)を登録します。
+"""
+import os
+import sys
+
+sys.dont_write_bytecode = True
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from CustomWeightPainter import mayaStandin
+
+mayaStandin.install()
+
+@pytest.fixture
+def scene():
+    """新しい代用品のシーンを返す
+    """
+    scene = mayaStandin.newScene()
+    mayaStandin.resetCallCounts()
+    return scene
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""batchのテスト
+代用品のシーンファイルをまとめて処理し、再開と、ワーカープロセスが落ちた場合を確かめます。
+"""
+import os
+import pickle
+
+import maya.cmds as cmds
+import numpy as np
+
+from CustomWeightPainter import batch
+from CustomWeightPainter import mayaStandin
+
+class _CrashOnLoad(object):
+    """読み込んだプロセスを異常終了させるオブジェクト (壊れたシーンファイルの代わり)
+    """
+
+    def __reduce__(self):
+        return (os._exit,(3,))
+
+def _createScenes(directory,count):
+    paths = []
+    for i in range(count):
+        scene = mayaStandin.newScene()
+        rig = mayaStandin.createSyntheticRig(influenceCount = 11,skinClusterCount = 1,
+                                             meshDivisions = 4,seed = i)
+        # バインド後にポーズを変えて保存する
+        for joint in rig['joints']:
+            cmds.setAttr('{}.r'.format(joint),30.0,-20.0,10.0)
+        path = os.path.join(directory,'scene{}.ma'.format(i))
+        cmds.file(rename = path)
+        cmds.file(save = True,force = True)
+        paths.append(path)
+    mayaStandin.newScene()
+    return paths
+
+def testDefaultOperationsRestoreBindPose(tmp_path):
+    assert 'restoreBindPose' in batch.DEFAULT_OPERATIONS
+    assert not 'gotoBindPose' in batch.DEFAULT_OPERATIONS
+    files = _createScenes(str(tmp_path),1)
+    outputDir = str(tmp_path / 'out')
+    summary = batch.runBatch(files,reportDir = str(tmp_path / 'reports'),standin = True,
+                             outputDir = outputDir,verbose = False)
+    assert summary['ok'] == 1
+
+    cmds.file(os.path.join(outputDir,'scene0.ma'),open = True,force = True)
+    scene = mayaStandin.currentScene()
+    skinCluster = scene.node(cmds.ls(type = 'skinCluster')[0])
+    for index,joint in enumerate(skinCluster.data['influences']):
+        world = mayaStandin._worldMatrix(joint)
+        assert np.allclose(world.dot(skinCluster.data['bindPreMatrix'][index]),np.identity(4))
+    mayaStandin.newScene()
+
+def testResumeSkipsCompletedScenes(tmp_path):
+    files = _createScenes(str(tmp_path),3)
+    reportDir = str(tmp_path / 'reports')
+    outputDir = str(tmp_path / 'out')
+    first = batch.runBatch(files,reportDir = reportDir,standin = True,outputDir = outputDir,verbose = False)
+    assert (first['ok'],first['skipped']) == (3,0)
+
+    second = batch.runBatch(files,reportDir = reportDir,standin = True,outputDir = outputDir,verbose = False)
+    assert (second['ok'],second['skipped']) == (0,3)
+
+    # 処理後に変更されたファイルだけを処理しなおす
+    os.utime(files[1],(0,0))
+    third = batch.runBatch(files,reportDir = reportDir,standin = True,outputDir = outputDir,verbose = False)
+    assert (third['ok'],third['skipped']) == (1,2)
+
+def testCrashedSceneIsReportedAndOthersFinish(tmp_path):
+    files = _createScenes(str(tmp_path),2)
+    crashPath = str(tmp_path / 'crash.ma')
+    with open(crashPath,'wb') as f:
+        pickle.dump(_CrashOnLoad(),f)
+    files.insert(1,crashPath)
+    reportDir = str(tmp_path / 'reports')
+
+    summary = batch.runBatch(files,reportDir = reportDir,workers = 2,standin = True,verbose = False)
+    assert (summary['ok'],summary['crashed'],summary['failed']) == (2,1,0)
+    assert summary['failures'] == [crashPath]
+    report = batch.loadReport(batch.reportPath(reportDir,crashPath))
+    assert report['status'] == 'crashed'
+    assert not batch.isCompleted(report,crashPath,batch.makeSettings())
+
+def testDryRunIsNotTreatedAsCompleted(tmp_path):
+    files = _createScenes(str(tmp_path),1)
+    reportDir = str(tmp_path / 'reports')
+    first = batch.runBatch(files,reportDir = reportDir,standin = True,verbose = False)
+    assert (first['ok'],first['dryRun']) == (1,True)
+    report = batch.loadReport(batch.reportPath(reportDir,files[0]))
+    assert (report['status'],report['output'],report['dryRun']) == ('ok',None,True)
+    assert not batch.isCompleted(report,files[0],batch.makeSettings())
+
+    # 試し実行は再開しても飛ばさず、保存先を指定して実行しなおせば処理する
+    second = batch.runBatch(files,reportDir = reportDir,standin = True,verbose = False)
+    assert (second['ok'],second['skipped']) == (1,0)
+    third = batch.runBatch(files,reportDir = reportDir,standin = True,outputDir = str(tmp_path / 'out'),verbose = False)
+    assert (third['ok'],third['skipped'],third['dryRun']) == (1,0,False)
+    assert os.path.isfile(os.path.join(str(tmp_path / 'out'),'scene0.ma'))
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""benchmarkSuiteとutilityProcの処理を代用品で実行し、上限を超えていないかを調べる
+"""
+import maya.cmds as cmds
+import maya.mel as mel
+import numpy as np
+import pytest
+
+from CustomWeightPainter import benchmarkSuite
+from CustomWeightPainter import influenceIndex
+from CustomWeightPainter import mayaStandin
+from CustomWeightPainter import utilityProc
+
+def testSmallPresetStaysWithinBudgets():
+    # 時間の上限はCIのマシンの速さに左右されるので緩め、呼び出し回数はそのまま比べる
+    result = benchmarkSuite.runSuite(['small'],timeScale = 10.0,verbose = False)
+    assert result['failures'] == []
+    assert [m['operation'] for m in result['results'][0]['measurements']] == list(benchmarkSuite.OPERATIONS)
+
+def testCutKeyInflenceLockIsOneUndoStep(scene):
+    rig = mayaStandin.createSyntheticRig(influenceCount = 20,skinClusterCount = 1,
+                                         meshDivisions = 4,keyedRatio = 0.3,lockedRatio = 0.3)
+    index = influenceIndex.InfluenceIndex()
+    index.build(mel.eval('artAttrSkinToolScript 3'))
+    keyed,locked = rig['keyed'],rig['locked']
+    assert keyed and locked
+    def keyedNodes():
+        return [node for node in keyed if scene.source(scene.node(node),'lockInfluenceWeights') is not None]
+
+    result = utilityProc.cutKeyInflenceLock(index.influences(),index = index,keyedInflences = set(keyed))
+    assert result['unlocked'] == len(keyed) + len(locked)
+    assert keyedNodes() == []
+    assert not any(cmds.getAttr('{}.liw'.format(node)) for node in keyed + locked)
+    cmds.undo()
+    assert keyedNodes() == keyed
+    assert all(cmds.getAttr('{}.liw'.format(node)) for node in locked)
+
+def testGotoBindPoseFailsLoudly(scene):
+    with pytest.raises(NotImplementedError):
+        utilityProc.gotoBindPose()
+
+def testRestoreBindPoseIsOneUndoStep(scene):
+    rig = mayaStandin.createSyntheticRig(influenceCount = 11,skinClusterCount = 1,meshDivisions = 4)
+    skinCluster = scene.node(rig['skinClusters'][0])
+    joints = skinCluster.data['influences']
+    # jointOrientを持つリグでバインドしなおす
+    for joint in joints[1:]:
+        joint.attrs.update({'jointOrientX':0.3,'jointOrientY':-0.2,'jointOrientZ':0.1})
+    bindPreMatrix = dict((index,np.linalg.inv(mayaStandin._worldMatrix(joint))) for index,joint in enumerate(joints))
+    skinCluster.data['bindPreMatrix'] = bindPreMatrix
+    for joint in rig['joints']:
+        cmds.setAttr('{}.r'.format(joint),40.0,-25.0,15.0)
+        cmds.setAttr('{}.tx'.format(joint),1.5)
+    posed = dict((joint.name,mayaStandin._worldMatrix(joint)) for joint in joints)
+
+    result = utilityProc.restoreBindPose()
+    assert len(result['restored']) == len(joints) and not result['failed']
+    for index,joint in enumerate(joints):
+        assert np.allclose(mayaStandin._worldMatrix(joint).dot(bindPreMatrix[index]),np.identity(4))
+    cmds.undo()
+    for joint in joints:
+        assert np.allclose(mayaStandin._worldMatrix(joint),posed[joint.name])
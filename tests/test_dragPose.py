@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""dragPose.DragPoserのテスト
+ドラッグ中の反映がmaxRateを超えないことと、終了時に1回のundoで確定することを確かめます。
+"""
+import time
+
+import maya.cmds as cmds
+
+from CustomWeightPainter import dragPose
+from CustomWeightPainter import scheduler
+
+from test_scheduler import FakeTimer
+
+def _createPoser(maxRate):
+    joint = cmds.createNode('joint',n = 'drag_jnt')
+    poser = dragPose.DragPoser(maxRate = maxRate)
+    poser.begin(joint)
+    return joint,poser
+
+def testUpdatesWithinOneIntervalAreAppliedOnce(scene):
+    joint,poser = _createPoser(maxRate = 0.5)
+    # イベントの間にアイドルになっても、間隔が経つまでは反映しない
+    for i in range(100):
+        poser.update('x',float(i))
+        scene.flushIdle()
+    assert (poser.received,poser.applied) == (100,1)
+    assert cmds.getAttr('{}.rx'.format(joint)) == 0.0
+
+    values = poser.end('x',99.0)
+    assert values == [99.0,0.0,0.0]
+    assert cmds.getAttr('{}.rx'.format(joint)) == 99.0
+    cmds.undo()
+    assert cmds.getAttr('{}.rx'.format(joint)) == 0.0
+
+def testContinuousDragIsCappedAtMaxRate(scene):
+    joint,poser = _createPoser(maxRate = 30.0)
+    startTime = time.time()
+    value = 0.0
+    while time.time() - startTime < 0.2:
+        value += 0.1
+        poser.update('y',value)
+        scene.flushIdle()
+    elapsed = time.time() - startTime
+    assert poser.received > poser.applied
+    assert poser.applied <= elapsed * poser.maxRate + 1
+    poser.end('y',value)
+
+def testPendingValueIsAppliedAfterRemainingInterval(scene,monkeypatch):
+    timers = []
+    def createTimer(callback):
+        timers.append(FakeTimer(callback))
+        return timers[-1]
+    monkeypatch.setattr(scheduler,'_createTimer',createTimer)
+    joint,poser = _createPoser(maxRate = 0.1)
+
+    poser.update('z',10.0)
+    for value in (20.0,30.0,40.0):
+        poser.update('z',value)
+    timer = timers[0]
+    # 残りの時間(最大で1/maxRate秒)でタイマーをかけ、アイドルキューには予約しない
+    assert len(timer.starts) == 1 and 0 < timer.starts[0] <= 10000
+    assert scene.pendingCount() == 0
+    assert poser.applied == 1
+
+    poser._limiter._lastRunTime -= 10.0
+    timer.fire()
+    scene.flushIdle()
+    assert poser.applied == 2
+    assert cmds.getAttr('{}.rz'.format(joint)) == 40.0
+    poser.end('z',40.0)
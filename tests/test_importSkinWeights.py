@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""utilityProc.importSkinWeightsのテスト
+"""
+import numpy as np
+
+from CustomWeightPainter import mayaStandin
+from CustomWeightPainter import utilityProc
+from CustomWeightPainter import weightData
+from CustomWeightPainter import weightFile
+from CustomWeightPainter import weightHistory
+
+def testImportRecordsOneHistoryEntryPerSkinCluster(scene,tmp_path):
+    rig = mayaStandin.createSyntheticRig(influenceCount = 10,skinClusterCount = 2,meshDivisions = 6)
+    skinClusters = rig['skinClusters']
+    utilityProc.exportSkinWeights(skinClusters,str(tmp_path))
+    originals = {}
+    for skinCluster in skinClusters:
+        weights,influences = weightData.readWeights(skinCluster)
+        originals[skinCluster] = weights.copy()
+        flat = np.zeros_like(weights)
+        flat[:,0] = 1.0
+        weightData.writeWeights(skinCluster,flat,np.arange(len(weights)))
+
+    history = weightHistory.WeightHistory()
+    result = utilityProc.importSkinWeights(skinClusters,str(tmp_path),chunkVertices = 8,history = history)
+    assert len(result['files']) == 2
+    assert len(history) == len(skinClusters)
+    assert all(not len(vertices) for vertices in result['uncovered'].values())
+    # 書き出したウエイトに戻っている
+    for skinCluster in skinClusters:
+        assert np.allclose(weightData.readWeights(skinCluster)[0],originals[skinCluster],atol = 1e-6)
+
+def testImportReportsVerticesMissingFromFile(scene,tmp_path):
+    rig = mayaStandin.createSyntheticRig(influenceCount = 10,skinClusterCount = 1,meshDivisions = 4)
+    skinCluster = rig['skinClusters'][0]
+    weights,influences = weightData.readWeights(skinCluster)
+    weights[:5] = 0.0
+    weightFile.writeSparseWeights(utilityProc.getWeightFilePath(str(tmp_path),skinCluster),weights,influences)
+
+    result = utilityProc.importSkinWeights([skinCluster],str(tmp_path))
+    assert list(result['uncovered'][skinCluster]) == [0,1,2,3,4]
+    assert any('ファイルにウエイトがない頂点' in text for level,text in scene.log if level == 'Warning')
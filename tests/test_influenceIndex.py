@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""influenceIndex.InfluenceIndexのテスト
+偽のmaya.cmdsを渡して、シーンを使わずにインデックスの更新を確認します。
+"""
+from collections import Counter
+
+from CustomWeightPainter import influenceIndex
+
+class FakeCmds(object):
+    """InfluenceIndexが使うcmdsだけを持つ偽のmaya.cmds
+    名前が一意でないインフルエンスは、Mayaと同じくpartialPathNameで返します。
+    """
+
+    def __init__(self,skinClusters):
+        # skinCluster → (メッシュのリスト, インフルエンスのリスト)
+        self.data = skinClusters
+        self.calls = Counter()
+
+    def artAttrSkinPaintCtx(self,*args,**kwargs):
+        self.calls['artAttrSkinPaintCtx'] += 1
+        return ' '.join('{}.paintWeights'.format(skinCluster) for skinCluster in self.data)
+
+    def objExists(self,name):
+        self.calls['objExists'] += 1
+        return name in self.data
+
+    def objectType(self,name):
+        self.calls['objectType'] += 1
+        return 'skinCluster'
+
+    def skinCluster(self,skinCluster,q = False,inf = False,g = False):
+        self.calls['skinCluster'] += 1
+        meshes,influences = self.data[skinCluster]
+        return list(influences) if inf else list(meshes)
+
+def createIndex(skinClusters = None):
+    fake = FakeCmds(skinClusters or {
+        'skinCluster1':(['bodyShape'],['root','L_arm','grpA|joint1']),
+        'skinCluster2':(['capShape'],['root','grpB|joint1']),
+    })
+    index = influenceIndex.InfluenceIndex(cmdsModule = fake)
+    index.build('artAttrSkinContext')
+    return index,fake
+
+def testBuildQueriesSceneOnce():
+    index,fake = createIndex()
+    assert index.paintableSkinClusters() == ['skinCluster1','skinCluster2']
+    assert index.influences() == ['root','L_arm','grpA|joint1','grpB|joint1']
+    assert index.influenceIndex('skinCluster1','L_arm') == 1
+    assert index.influenceName('skinCluster2',1) == 'grpB|joint1'
+    assert index.skinClustersOfInfluence('root') == ['skinCluster1','skinCluster2']
+    assert index.hasInfluence('grpA|joint1')
+    calls = sum(fake.calls.values())
+    index.influences()
+    index.hasInfluence('root')
+    assert sum(fake.calls.values()) == calls
+
+def testRenameUniqueInfluence():
+    index,fake = createIndex()
+    index.rename('L_arm','L_upperArm')
+    assert index.influenceIndex('skinCluster1','L_upperArm') == 1
+    assert not index.hasInfluence('L_arm')
+
+def testRenameResolvesFullPathToPartialPath():
+    index,fake = createIndex()
+    index.rename('|root|L_arm','L_upperArm')
+    assert index.influenceIndex('skinCluster1','L_upperArm') == 1
+    assert not index.hasInfluence('L_arm')
+
+def testRenameNonUniqueInfluenceRebuilds():
+    index,fake = createIndex()
+    # grpA|joint1をL_hand_jntにリネームすると、grpB|joint1はjoint1として一意になる
+    fake.data['skinCluster1'] = (['bodyShape'],['root','L_arm','L_hand_jnt'])
+    fake.data['skinCluster2'] = (['capShape'],['root','joint1'])
+    index.rename('|grpA|joint1','L_hand_jnt')
+    assert index.influenceIndex('skinCluster1','L_hand_jnt') == 2
+    assert index.influenceIndex('skinCluster2','joint1') == 1
+    assert not index.hasInfluence('grpA|joint1')
+
+def testRenameSkinClusterAndMesh():
+    index,fake = createIndex()
+    index.rename('skinCluster1','bodySkin')
+    index.rename('bodyShape','torsoShape')
+    assert 'bodySkin' in index.paintableSkinClusters()
+    assert index.meshes['torsoShape'] == ['bodySkin']
+    assert index.skinClusters['bodySkin']['meshes'] == ['torsoShape']
+
+def testRemoveInfluenceMarksSkinClusterDirty():
+    index,fake = createIndex()
+    fake.data['skinCluster1'] = (['bodyShape'],['root','grpA|joint1'])
+    index.remove('L_arm')
+    assert index.influences('skinCluster1') == ['root','grpA|joint1']
+    assert index.influences('skinCluster2') == ['root','grpB|joint1']
+
+def testRemoveSkinCluster():
+    index,fake = createIndex()
+    del fake.data['skinCluster2']
+    index.remove('skinCluster2')
+    assert index.paintableSkinClusters() == ['skinCluster1']
+    assert not 'capShape' in index.meshes
+
+def testWatchingUpdatesOnSceneRename(scene):
+    from CustomWeightPainter import mayaStandin
+    import maya.cmds as cmds
+    rig = mayaStandin.createSyntheticRig(influenceCount = 5,skinClusterCount = 1,meshDivisions = 2)
+    index = influenceIndex.InfluenceIndex()
+    index.build(mayaStandin.PAINT_CONTEXT)
+    index.startWatching()
+    try:
+        joint = rig['joints'][1]
+        cmds.rename(joint,'renamed_jnt')
+        assert index.hasInfluence('renamed_jnt')
+        assert not index.hasInfluence(joint)
+    finally:
+        index.stopWatching()
+
+def testRemovedFullPathResolvesNonUniqueInfluence():
+    index,fake = createIndex()
+    fake.data['skinCluster2'] = (['capShape'],['root'])
+    index._removed.append('|grpB|joint1')
+    calls = sum(fake.calls.values())
+    index._applyRemoved()
+    # 反映ではcmdsを呼ばず、同じ短い名前の別のインフルエンスは残す
+    assert sum(fake.calls.values()) == calls
+    assert index.influences('skinCluster2') == ['root']
+    assert index.influences('skinCluster1') == ['root','L_arm','grpA|joint1']
+
+def testWatchingDefersNodeRemovalToIdle(scene):
+    from CustomWeightPainter import mayaStandin
+    import maya.cmds as cmds
+    rig = mayaStandin.createSyntheticRig(influenceCount = 5,skinClusterCount = 1,meshDivisions = 2)
+    index = influenceIndex.InfluenceIndex()
+    index.build(mayaStandin.PAINT_CONTEXT)
+    index.startWatching()
+    try:
+        joint = rig['joints'][-1]
+        path = scene.fullPath(scene.node(joint))
+        mayaStandin.resetCallCounts()
+        cmds.delete(joint)
+        # 削除のコールバックの中では、シーンへの問い合わせもインデックスの変更もしない
+        counts = mayaStandin.getCallCounts()
+        assert set(counts) == set(['cmds.delete','cmds.evalDeferred'])
+        assert index._removed == [path]
+
+        removed = []
+        remove = index.remove
+        index.remove = lambda name:(removed.append(name),remove(name))
+        scene.flushIdle()
+        # フルパスはインデックスのpartialPathNameに解決してから反映する
+        assert index._removed == []
+        assert removed == [joint]
+        assert index._dirty == set(rig['skinClusters'])
+    finally:
+        index.stopWatching()
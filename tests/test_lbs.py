@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""lbsのテスト
+頂点ごとに sum(w_j * p * bindPreMatrix_j * worldMatrix_j) を素直に計算した結果と比べます。
+"""
+import numpy as np
+import pytest
+
+from CustomWeightPainter import lbs
+from CustomWeightPainter import weightMath
+
+VERTEX_COUNT = 50
+INFLUENCE_COUNT = 6
+
+def _randomMatrices(random,count):
+    """平行移動を含むランダムな行列 (行ベクトルの形式)
+    """
+    matrices = np.zeros((count,4,4))
+    matrices[:,:3,:3] = random.uniform(-1.0,1.0,(count,3,3)) + np.eye(3)
+    matrices[:,3,:3] = random.uniform(-5.0,5.0,(count,3))
+    matrices[:,3,3] = 1.0
+    return matrices
+
+def _randomWeights(random,vertexCount = VERTEX_COUNT,influenceCount = INFLUENCE_COUNT):
+    """頂点ごとに3つまでのインフルエンスを持つ、合計が1のウエイト
+    """
+    weights = random.uniform(0.1,1.0,(vertexCount,influenceCount))
+    for row in weights:
+        row[random.permutation(influenceCount)[3:]] = 0.0
+    return weights / weights.sum(axis = 1)[:,None]
+
+def _toCsr(weights):
+    rows,columns = np.nonzero(weights)
+    indptr = np.zeros(len(weights) + 1,dtype = np.int64)
+    np.cumsum(np.bincount(rows,minlength = len(weights)),out = indptr[1:])
+    return weightMath.CsrMatrix(weights[rows,columns],columns,indptr,weights.shape)
+
+def _reference(points,bindPreMatrices,worldMatrices,weights):
+    """頂点ごと、インフルエンスごとに行列を掛けて足し合わせる
+    """
+    result = np.zeros((len(points),3))
+    for i,point in enumerate(points):
+        homogeneous = np.append(point,1.0)
+        for j in range(len(bindPreMatrices)):
+            result[i] += weights[i,j] * homogeneous.dot(bindPreMatrices[j]).dot(worldMatrices[j])[:3]
+    return result
+
+@pytest.fixture
+def rig():
+    random = np.random.RandomState(7)
+    points = random.uniform(-10.0,10.0,(VERTEX_COUNT,3))
+    bindPreMatrices = _randomMatrices(random,INFLUENCE_COUNT)
+    worldMatrices = _randomMatrices(random,INFLUENCE_COUNT)
+    return points,bindPreMatrices,worldMatrices,_randomWeights(random),random
+
+def testDeformPointsMatchesExplicitSum(rig):
+    points,bindPreMatrices,worldMatrices,weights,random = rig
+    expected = _reference(points,bindPreMatrices,worldMatrices,weights)
+    assert np.allclose(lbs.deformPoints(points,bindPreMatrices,worldMatrices,weights),expected)
+    assert np.allclose(lbs.deformPoints(points,bindPreMatrices,worldMatrices,_toCsr(weights)),expected)
+
+def testChunkedMatchesExplicitSum(rig):
+    points,bindPreMatrices,worldMatrices,weights,random = rig
+    expected = _reference(points,bindPreMatrices,worldMatrices,weights)
+    # 頂点数を割り切れない分割数で、最後の端数の分割も確かめる
+    assert VERTEX_COUNT % 7
+    for matrix in (weights,_toCsr(weights)):
+        result = lbs.deformPointsChunked(points,bindPreMatrices,worldMatrices,matrix,chunkSize = 7)
+        assert result.dtype == np.float64
+        assert np.allclose(result,expected)
+
+    out = np.zeros((VERTEX_COUNT,3),dtype = np.float32)
+    result = lbs.deformPointsChunked(points,bindPreMatrices,worldMatrices,_toCsr(weights),chunkSize = 7,out = out)
+    assert result is out
+    assert np.allclose(out,expected,atol = 1e-3)
+
+def testBindPoseReturnsBindPoints(rig):
+    points,bindPreMatrices,worldMatrices,weights,random = rig
+    # ワールド行列がバインドプレ行列の逆行列なら、変形しない
+    inverse = np.linalg.inv(bindPreMatrices)
+    assert np.allclose(lbs.deformPoints(points,bindPreMatrices,inverse,weights),points)
+
+def testWeightErrorMatchesExplicitDifference(rig):
+    points,bindPreMatrices,worldMatrices,weights,random = rig
+    otherWeights = _randomWeights(random)
+    poses = np.stack([worldMatrices,_randomMatrices(random,INFLUENCE_COUNT)])
+    expected = np.max([np.linalg.norm(_reference(points,bindPreMatrices,pose,weights) -
+                                      _reference(points,bindPreMatrices,pose,otherWeights),axis = 1)
+                       for pose in poses],axis = 0)
+
+    distances = lbs.weightError(points,bindPreMatrices,poses,weights,otherWeights,chunkSize = 7)
+    assert np.allclose(distances,expected)
+    distances = lbs.weightError(points,bindPreMatrices,poses,_toCsr(weights),_toCsr(otherWeights),chunkSize = 7)
+    assert np.allclose(distances,expected)
+    assert not lbs.weightError(points,bindPreMatrices,poses,weights,weights).any()
+
+    stats = lbs.errorStats(distances,tolerance = 0.0)
+    assert stats['vertices'] == VERTEX_COUNT
+    assert stats['maxVertex'] == int(np.argmax(expected))
+    assert stats['overTolerance'] == np.count_nonzero(expected > 0.0)
+
+def testMismatchedInfluenceCountRaises(rig):
+    points,bindPreMatrices,worldMatrices,weights,random = rig
+    with pytest.raises(ValueError):
+        lbs.deformPoints(points,bindPreMatrices,worldMatrices[:-1],weights)
+    with pytest.raises(ValueError):
+        lbs.deformPoints(points,bindPreMatrices,worldMatrices,weights[:,:-1])
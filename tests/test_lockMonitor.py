@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""lockMonitor.KeyedLockDetectorのテスト
+"""
+import maya.mel as mel
+
+from CustomWeightPainter import influenceIndex
+from CustomWeightPainter import lockMonitor
+from CustomWeightPainter import mayaStandin
+from CustomWeightPainter import utilityProc
+
+def testDisconnectsAreRefreshedInOneIdle(scene,monkeypatch):
+    rig = mayaStandin.createSyntheticRig(influenceCount = 40,skinClusterCount = 1,
+                                         meshDivisions = 4,keyedRatio = 0.5)
+    index = influenceIndex.InfluenceIndex()
+    index.build(mel.eval('artAttrSkinToolScript 3'))
+    detector = lockMonitor.KeyedLockDetector(index)
+    detector.build()
+    scene.flushIdle()
+    refreshed = []
+    monkeypatch.setattr(detector,'refreshRows',lambda influences:refreshed.append(set(influences)))
+    detector.startWatching()
+    try:
+        utilityProc.cutKeyInflenceLock(index.influences(),index = index,keyedInflences = detector.keyed)
+        assert scene.pendingCount() == 1
+        scene.flushIdle()
+    finally:
+        detector.stopWatching()
+    assert refreshed == [set(rig['keyed'])]
+    assert not detector.keyed
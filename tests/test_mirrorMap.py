@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""mirrorMap.MirrorMapCacheのテスト
+"""
+import numpy as np
+
+from CustomWeightPainter import mayaStandin
+from CustomWeightPainter import meshTopology
+from CustomWeightPainter import mirrorMap
+
+def testEntryIsRebuiltWhenPointsMove(scene):
+    rig = mayaStandin.createSyntheticRig(influenceCount = 10,skinClusterCount = 1,meshDivisions = 4)
+    skinCluster = rig['skinClusters'][0]
+    cache = mirrorMap.MirrorMapCache()
+    first = cache.entry(skinCluster)
+    assert cache.entry(skinCluster) is first
+    assert (cache.hits,cache.misses) == (1,1)
+
+    meshFn = meshTopology.getInputMesh(skinCluster)
+    points = meshTopology.getPoints(meshFn)
+    points[:,0] += 0.5
+    meshTopology.setPoints(meshFn,points)
+    second = cache.entry(skinCluster)
+    assert second is not first
+    assert cache.misses == 2
+    assert not np.array_equal(second['side'],first['side'])
+
+def testGetPointsDropsW(scene):
+    rig = mayaStandin.createSyntheticRig(influenceCount = 10,skinClusterCount = 1,meshDivisions = 2)
+    points = meshTopology.getPoints(meshTopology.getInputMesh(rig['skinClusters'][0]))
+    assert points.shape == (9,3)
+    assert points.dtype == np.float64
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""perf.ActionProfilerのテスト
+"""
+import types
+
+from CustomWeightPainter import perf
+
+class FakeCmds(object):
+    def ls(self,*args,**kwargs):
+        return []
+
+def testNestedCallsCountWithoutCopyingCounters(monkeypatch):
+    module = types.ModuleType('profiledModule')
+    module.cmds = FakeCmds()
+    profiler = perf.ActionProfiler()
+    profiler.enable([module])
+    copies = []
+    original = perf.Counter
+    def countingCounter(*args,**kwargs):
+        copies.append(1)
+        return original(*args,**kwargs)
+    monkeypatch.setattr(perf,'Counter',countingCounter)
+
+    def inner():
+        module.cmds.ls()
+        module.cmds.ls()
+    def outer():
+        module.cmds.ls()
+        for i in range(10):
+            profiler.call('inner',inner)
+    try:
+        profiler.call('outer',outer)
+    finally:
+        profiler.disable()
+
+    records = list(profiler.records)
+    assert [record.calls for record in records] == [2] * 10 + [21]
+    assert records[-1].commands == {'cmds.ls':21}
+    assert all(not record.commands for record in records[:-1])
+    assert len(copies) == 1
+    assert isinstance(module.cmds,FakeCmds)
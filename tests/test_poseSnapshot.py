@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""poseSnapshot.PoseSnapshotStoreのテスト
+"""
+import maya.cmds as cmds
+
+from CustomWeightPainter import mayaStandin
+from CustomWeightPainter import poseSnapshot
+
+def _createJoints(count):
+    joints = [cmds.createNode('joint',n = 'pose{}_jnt'.format(i)) for i in range(count)]
+    mayaStandin.resetCallCounts()
+    return joints
+
+def testRestoreWritesOnlyChangedNodes(scene):
+    joints = _createJoints(10)
+    store = poseSnapshot.PoseSnapshotStore()
+    store.capture('session',joints)
+    cmds.setAttr('{}.r'.format(joints[3]),10.0,20.0,30.0)
+    mayaStandin.resetCallCounts()
+
+    assert store.restore('session') == len(joints)
+    assert cmds.getAttr('{}.r'.format(joints[3]))[0] == (0.0,0.0,0.0)
+    counts = mayaStandin.getCallCounts()
+    assert counts['cmds.setAttr'] == 0
+    assert counts['cmds.customWeightPainterModifier'] == 1
+
+def _restoreCallCount(joints,changedCount):
+    store = poseSnapshot.PoseSnapshotStore()
+    store.capture('session',joints)
+    for joint in joints[:changedCount]:
+        cmds.setAttr('{}.r'.format(joint),10.0,20.0,30.0)
+    mayaStandin.resetCallCounts()
+    store.restore('session')
+    assert all(cmds.getAttr('{}.r'.format(joint))[0] == (0.0,0.0,0.0) for joint in joints)
+    return sum(mayaStandin.getCallCounts().values())
+
+def testRestoreCallCountDoesNotGrowWithChangedNodes(scene):
+    joints = _createJoints(200)
+    # プラグインの読み込みを計測から外す
+    _restoreCallCount(joints,1)
+    few = _restoreCallCount(joints,2)
+    many = _restoreCallCount(joints,200)
+    assert few == many
+    assert mayaStandin.getCallCounts()['cmds.setAttr'] == 0
+
+def testRestoreWithoutChangesWritesNothing(scene):
+    joints = _createJoints(5)
+    store = poseSnapshot.PoseSnapshotStore()
+    store.capture('session',joints)
+    undoCount = len(scene.undoQueue)
+    store.restore('session')
+    assert sum(mayaStandin.getCallCounts().values()) == 0
+    assert len(scene.undoQueue) == undoCount
+
+def testRestoreIsUndoable(scene):
+    joints = _createJoints(3)
+    store = poseSnapshot.PoseSnapshotStore()
+    store.capture('session',joints)
+    for joint in joints:
+        cmds.setAttr('{}.r'.format(joint),45.0,0.0,0.0)
+
+    store.restore('session')
+    assert [cmds.getAttr('{}.rx'.format(joint)) for joint in joints] == [0.0] * 3
+    cmds.undo()
+    assert [cmds.getAttr('{}.rx'.format(joint)) for joint in joints] == [45.0] * 3
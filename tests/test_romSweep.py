@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""romSweep.RomSweepCacheとRomPreviewのテスト
+プレビューがundoキューとユーザーのノードに触れず、シーンファイルに保存されないことを確かめます。
+"""
+import maya.cmds as cmds
+import numpy as np
+
+from CustomWeightPainter import mayaStandin
+from CustomWeightPainter import romSweep
+
+def _sweep(scene):
+    rig = mayaStandin.createSyntheticRig(influenceCount = 11,skinClusterCount = 2,meshDivisions = 6)
+    cache = romSweep.RomSweepCache()
+    # 末端のインフルエンスから探し、一部の頂点だけに影響するものを使う
+    for joint in reversed(rig['joints']):
+        result = cache.sweep(rig['skinClusters'],joint,angles = [-30.0,0.0,30.0])
+        if result['skinClusters']:
+            return rig,cache,joint,result
+    raise AssertionError('どのインフルエンスもウエイトを持っていません')
+
+def _previewNodes(scene):
+    return [name for name,node in scene.nodes.items()
+            if name == romSweep.PREVIEW_ROOT or name.endswith(romSweep.PREVIEW_SUFFIX) or
+            (node.parent is not None and node.parent.name.endswith(romSweep.PREVIEW_SUFFIX))]
+
+def testSampleReturnsOnlyAffectedRows(scene):
+    rig,cache,joint,result = _sweep(scene)
+    skinCluster = result['skinClusters'][0]
+    vertexCount = len(scene.shape(scene.node(rig['meshes'][0])).data['points'])
+
+    rows,points = cache.sample(skinCluster,joint,'x',15.0)
+    assert 0 < len(rows) < vertexCount
+    assert points.shape == (len(rows),3)
+    assert points.dtype == np.float32
+    # 記録は頂点番号と、3軸 x 3角度の影響する頂点の座標だけ
+    samples = [cache.sample(name,joint,'x',0.0) for name in result['skinClusters']]
+    assert cache.nbytes == sum(rows.nbytes + 9 * points.nbytes for rows,points in samples)
+    cache.invalidate()
+    assert cache.nbytes == 0
+
+def testPreviewLeavesUndoAndUserNodesAlone(scene):
+    rig,cache,joint,result = _sweep(scene)
+    cmds.file(modified = False)
+    undoCount = len(scene.undoQueue)
+    children = dict((mesh,list(scene.node(mesh).children)) for mesh in rig['meshes'])
+
+    preview = romSweep.RomPreview()
+    preview.begin(result['skinClusters'])
+    assert preview.isActive()
+    assert len(scene.undoQueue) == undoCount
+    assert dict((mesh,list(scene.node(mesh).children)) for mesh in rig['meshes']) == children
+    root = scene.node(romSweep.PREVIEW_ROOT)
+    assert root.parent is None and root.doNotWrite
+    for skinCluster in result['skinClusters']:
+        previewShape = scene.node(preview.meshes[skinCluster].partialPathName())
+        assert previewShape.doNotWrite and previewShape.parent.doNotWrite
+        assert previewShape.data['shadingGroup'] == romSweep.PREVIEW_SHADING_GROUP
+
+    skinCluster = result['skinClusters'][0]
+    rows,points = cache.sample(skinCluster,joint,'x',30.0)
+    moved = points + 1.0
+    assert preview.show(skinCluster,rows,moved)
+    previewPoints = scene.node(preview.meshes[skinCluster].partialPathName()).data['points']
+    assert np.allclose(previewPoints[rows],moved)
+
+    preview.end()
+    assert not preview.isActive()
+    assert _previewNodes(scene) == []
+    assert all(cmds.getAttr('{}.v'.format(scene.shape(scene.node(mesh)).name)) for mesh in rig['meshes'])
+    assert len(scene.undoQueue) == undoCount
+    assert not cmds.file(q = True,modified = True)
+
+def testPreviewKeepsUserChangesModified(scene):
+    rig,cache,joint,result = _sweep(scene)
+    cmds.file(modified = False)
+    preview = romSweep.RomPreview()
+    preview.begin(result['skinClusters'])
+    cmds.setAttr('{}.rx'.format(joint),10.0)
+    preview.end()
+    assert cmds.file(q = True,modified = True)
+
+def testPreviewIsNotSaved(scene,tmp_path):
+    rig,cache,joint,result = _sweep(scene)
+    preview = romSweep.RomPreview()
+    preview.begin(result['skinClusters'])
+
+    # コールバックを通さずに保存しても、プレビュー用のノードは書き出さない
+    rawPath = str(tmp_path / 'raw.ma')
+    scene.save(rawPath)
+    scene.load(rawPath)
+    assert _previewNodes(scene) == []
+    assert all(node.parent is None or node in node.parent.children for node in scene.nodes.values())
+
+    scene = mayaStandin.newScene()
+    rig,cache,joint,result = _sweep(scene)
+    preview = romSweep.RomPreview()
+    preview.begin(result['skinClusters'])
+    path = str(tmp_path / 'scene.ma')
+    cmds.file(rename = path)
+    cmds.file(save = True,force = True)
+    assert not preview.isActive()
+    assert scene.callbackCount() == 0
+
+    cmds.file(path,open = True,force = True)
+    scene = mayaStandin.currentScene()
+    assert _previewNodes(scene) == []
+    assert all(cmds.getAttr('{}.v'.format(scene.shape(scene.node(mesh)).name)) for mesh in rig['meshes'])
+    mayaStandin.newScene()
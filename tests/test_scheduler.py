@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""scheduler.IdleCoalescerのテスト
+"""
+from CustomWeightPainter import scheduler
+
+class FakeTimer(object):
+    """単発のQTimerの代わりに、startの呼び出しを記録するタイマー
+    """
+
+    def __init__(self,callback):
+        self.callback = callback
+        self.starts = []
+        self.active = False
+
+    def start(self,msec):
+        self.starts.append(msec)
+        self.active = True
+
+    def stop(self):
+        self.active = False
+
+    def fire(self):
+        self.active = False
+        self.callback()
+
+def testBurstIsAppliedOnceWithoutTimer(scene):
+    calls = []
+    coalescer = scheduler.IdleCoalescer(lambda:calls.append(1),latency = 10.0)
+    for i in range(20):
+        coalescer.request()
+    assert scene.pendingCount() == 1
+    scene.flushIdle()
+    assert calls == [1]
+    assert (coalescer.received,coalescer.applied) == (20,1)
+
+def testTimerRearmsInsteadOfRepostingIdle(scene,monkeypatch):
+    timers = []
+    def createTimer(callback):
+        timers.append(FakeTimer(callback))
+        return timers[-1]
+    monkeypatch.setattr(scheduler,'_createTimer',createTimer)
+    calls = []
+    coalescer = scheduler.IdleCoalescer(lambda:calls.append(1),latency = 10.0)
+
+    coalescer.request()
+    timer = timers[0]
+    assert timer.starts == [10000]
+    # 待っている間はアイドルキューに何も予約しない
+    assert scene.pendingCount() == 0
+
+    coalescer.request()
+    timer.fire()
+    assert scene.pendingCount() == 1
+    scene.flushIdle()
+    # 最後のイベントからlatencyが経っていないので、残りの時間でかけなおす
+    assert calls == []
+    assert len(timer.starts) == 2 and 0 < timer.starts[1] <= 10000
+    assert scene.pendingCount() == 0
+
+    coalescer._lastEventTime -= 10.0
+    timer.fire()
+    scene.flushIdle()
+    assert calls == [1]
+    assert not timer.active
+
+def testCancelStopsTimer(scene,monkeypatch):
+    timers = []
+    monkeypatch.setattr(scheduler,'_createTimer',lambda callback:timers.append(FakeTimer(callback)) or timers[-1])
+    calls = []
+    coalescer = scheduler.IdleCoalescer(lambda:calls.append(1),latency = 0.0)
+    coalescer.request()
+    coalescer.cancel()
+    assert not timers[0].active
+    timers[0].fire()
+    scene.flushIdle()
+    assert calls == []
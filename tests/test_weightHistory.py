@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""weightHistory.WeightHistoryのテスト
+ウエイトの配列に差分を書き込む関数を渡して、チェックポイントへの復元と上限による破棄を確かめます。
+"""
+import numpy as np
+
+from CustomWeightPainter import weightHistory
+
+INFLUENCES = ['root','spine','L_arm','R_arm']
+
+class WeightStore(object):
+    """skinClusterごとのウエイトを配列で持ち、差分を書き込む偽のシーン
+    """
+
+    def __init__(self,vertexCount = 8):
+        self.weights = {'skinCluster1':np.tile(np.array([0.4,0.3,0.2,0.1]),(vertexCount,1))}
+
+    def write(self,skinCluster,rows,influences,values):
+        columns = [INFLUENCES.index(influence) for influence in influences]
+        self.weights[skinCluster][np.ix_(rows,columns)] = values
+
+    def change(self,history,rows,values,label = ''):
+        """頂点のウエイトを変更して履歴に記録する
+        """
+        old = self.weights['skinCluster1'][rows].copy()
+        new = old.copy()
+        new[:] = values
+        self.weights['skinCluster1'][rows] = new
+        return history.record('skinCluster1',rows,old,new,INFLUENCES,label = label)
+
+def testRestoreFirstCheckpointAfterTwoDeltas():
+    store = WeightStore()
+    history = weightHistory.WeightHistory()
+    original = store.weights['skinCluster1'].copy()
+    first = store.change(history,[0,1],[1.0,0.0,0.0,0.0],label = 'Paint')
+    afterFirst = store.weights['skinCluster1'].copy()
+    second = store.change(history,[1,5],[0.0,0.0,0.5,0.5],label = 'Smooth')
+    afterSecond = store.weights['skinCluster1'].copy()
+    assert [delta.id for delta in history.checkpoints()] == [first.id,second.id]
+    # 差分は変更のあった頂点とインフルエンスだけ
+    assert list(first.rows) == [0,1] and first.influences == INFLUENCES
+    assert list(second.rows) == [1,5] and second.oldValues.shape == (2,4)
+
+    assert history.restore(first.id,store.write) == 1
+    assert np.array_equal(store.weights['skinCluster1'],afterFirst)
+    assert history.currentId() == first.id
+    assert history.restore(first.id - 1,store.write) == 1
+    assert np.array_equal(store.weights['skinCluster1'],original)
+    assert history.restore(second.id,store.write) == 2
+    assert np.array_equal(store.weights['skinCluster1'],afterSecond)
+
+def testUndoRedo():
+    store = WeightStore()
+    history = weightHistory.WeightHistory()
+    original = store.weights['skinCluster1'].copy()
+    store.change(history,[2],[0.0,1.0,0.0,0.0])
+    changed = store.weights['skinCluster1'].copy()
+
+    assert history.undo(store.write) == 1
+    assert np.array_equal(store.weights['skinCluster1'],original)
+    assert history.undo(store.write) == -1
+    assert history.redo(store.write) == 1
+    assert np.array_equal(store.weights['skinCluster1'],changed)
+    assert history.redo(store.write) == -1
+
+def testRecordAfterUndoDiscardsRedo():
+    store = WeightStore()
+    history = weightHistory.WeightHistory()
+    store.change(history,[0],[1.0,0.0,0.0,0.0])
+    store.change(history,[1],[1.0,0.0,0.0,0.0])
+    history.undo(store.write)
+    third = store.change(history,[2],[0.0,0.0,0.0,1.0])
+    assert len(history) == 2
+    assert history.checkpoints()[-1] is third
+    assert history.redo(store.write) == -1
+
+def testUnchangedWeightsAreNotRecorded():
+    store = WeightStore()
+    history = weightHistory.WeightHistory()
+    assert store.change(history,[0],[0.4,0.3,0.2,0.1]) is None
+    assert len(history) == 0
+
+def testEvictOldestWhenOverCap():
+    store = WeightStore()
+    history = weightHistory.WeightHistory()
+    deltas = [store.change(history,[i],[0.25,0.25,0.25,0.25 + i]) for i in range(3)]
+    history.setMaxBytes(sum(delta.nbytes for delta in deltas))
+    assert history.evicted == 0
+
+    fourth = store.change(history,[3],[0.0,0.0,1.0,0.0])
+    # 上限を超えたので最も古い差分だけを破棄し、残りは記録した順のまま
+    assert history.evicted == 1
+    assert history.checkpoints() == deltas[1:] + [fourth]
+    assert history.nbytes <= history.maxBytes
+    # 破棄した差分より前には戻せない
+    assert history.restore(deltas[0].id - 1,store.write) == -1
+    assert history.restore(deltas[0].id,store.write) == 3
+    assert history.undo(store.write) == -1
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""weightMathのテスト
+"""
+import numpy as np
+
+from CustomWeightPainter import mayaStandin
+from CustomWeightPainter import utilityProc
+from CustomWeightPainter import weightData
+from CustomWeightPainter import weightMath
+
+def testChangedRowsIgnoreRoundingNoise():
+    weights = np.array([[0.5,0.5],[0.25,0.75],[1.0,0.0]])
+    newWeights = weights.copy()
+    newWeights[0] += (1.0e-9,-1.0e-9)
+    newWeights[1] = (0.3,0.7)
+    assert list(weightMath.findChangedRows(newWeights,weights)) == [1]
+    assert list(weightMath.findChangedRows(newWeights,weights,tolerance = 0.0)) == [0,1]
+
+def testLimitInfluencesPrunesBelowThreshold():
+    weights = np.array([[0.6,0.3995,0.0005],[0.5,0.5,0.0]])
+    result = weightMath.limitInfluences(weights,maxInfluences = 0,threshold = 0.001)
+    assert result[0,2] == 0.0
+    assert np.allclose(result.sum(axis = 1),1.0)
+    assert np.allclose(result[1],weights[1])
+
+def testLimitInfluencesKeepsLargest():
+    weights = np.array([[0.1,0.4,0.2,0.3],[0.25,0.25,0.25,0.25]])
+    result = weightMath.limitInfluences(weights,maxInfluences = 2)
+    assert np.allclose(result[0],[0.0,4.0 / 7.0,0.0,3.0 / 7.0])
+    # 同じ値が並んだ場合は列番号の小さい方を残す
+    assert np.allclose(result[1],[0.5,0.5,0.0,0.0])
+    assert list(weightMath.countInfluences(result)) == [2,2]
+
+def testLimitInfluencesKeepsLockedColumns():
+    weights = np.array([[0.1,0.2,0.3,0.4]])
+    locked = np.array([True,False,False,False])
+    result = weightMath.limitInfluences(weights,locked = locked,maxInfluences = 2)
+    assert result[0,0] == 0.1
+    assert np.allclose(result[0],[0.1,0.0,0.0,0.9])
+
+def testLimitInfluencesWithSaturatedLocks():
+    # ロックされたインフルエンスだけで上限に達している行
+    weights = np.array([[0.3,0.3,0.2,0.1999,0.0001],
+                        [0.5,0.5,0.0,0.0,0.0]])
+    locked = np.array([True,True,False,False,False])
+    result = weightMath.limitInfluences(weights,locked = locked,maxInfluences = 2,threshold = 0.001)
+    assert np.allclose(result[:,locked],weights[:,locked])
+    assert np.allclose(result.sum(axis = 1),1.0)
+    # 合計を保つために、ロックされていない最大のウエイトを1つだけ残し、しきい値以下は残さない
+    assert np.allclose(result[0],[0.3,0.3,0.4,0.0,0.0])
+    assert np.allclose(result[1],weights[1])
+    assert list(weightMath.countInfluences(result) > 2) == [True,False]
+
+def testLimitInfluencesRowPrunedByThreshold():
+    # ロックされていないウエイトが全てしきい値以下の行も、合計を保って最大の1つを残す
+    weights = np.array([[0.9995,0.0003,0.0002]])
+    locked = np.array([True,False,False])
+    result = weightMath.limitInfluences(weights,locked = locked,maxInfluences = 4,threshold = 0.001)
+    assert np.allclose(result[0],[0.9995,0.0005,0.0])
+
+def testPruneReportsVerticesOverLimit(scene):
+    rig = mayaStandin.createSyntheticRig(influenceCount = 11,skinClusterCount = 1,meshDivisions = 10)
+    skinCluster = rig['skinClusters'][0]
+    result = utilityProc.pruneWeights([skinCluster],maxInfluences = 2,useSelection = False)
+    counts = weightMath.countInfluences(weightData.readWeights(skinCluster)[0])
+    assert result['overLimit'] == {skinCluster:int(np.count_nonzero(counts > 2))}
+    assert result['overLimit'][skinCluster] > 0
+    assert any(level == 'Warning' and skinCluster in text for level,text in scene.log)
+
+def _gridAdjacency(size):
+    """size x size頂点の四角形ポリゴンのグリッドの隣接行列を作る
+    """
+    faces = [(y * size + x,y * size + x + 1,(y + 1) * size + x + 1,(y + 1) * size + x)
+             for y in range(size - 1) for x in range(size - 1)]
+    edges = weightMath.buildEdgesFromFaces([4] * len(faces),np.ravel(faces))
+    return edges,weightMath.buildAdjacency(edges,size * size)
+
+def testAdjacencyAveragesNeighbours():
+    edges,adjacency = _gridAdjacency(4)
+    # 4 x 4頂点のグリッドのエッジは横12本 + 縦12本
+    assert len(edges) == 24
+    dense = np.zeros((16,16))
+    dense[edges[:,0],edges[:,1]] = 1.0
+    dense[edges[:,1],edges[:,0]] = 1.0
+    dense /= dense.sum(axis = 1)[:,None]
+    values = np.random.RandomState(3).uniform(size = (16,3))
+    assert np.allclose(adjacency.dot(values),dense.dot(values))
+
+    csr = weightMath.CsrMatrix(dense[dense > 0],np.nonzero(dense)[1],
+                               np.concatenate([[0],np.cumsum((dense > 0).sum(axis = 1))]),dense.shape)
+    assert np.allclose(csr.dot(values),dense.dot(values))
+    assert np.allclose(csr.getRows([1,5,15]).dot(values),dense[[1,5,15]].dot(values))
+
+def testSmoothGridKeepsSumAndLockedColumns():
+    size = 5
+    edges,adjacency = _gridAdjacency(size)
+    # 左半分はインフルエンス0、右半分はインフルエンス1。インフルエンス2はロックして全体に0.2
+    weights = np.zeros((size * size,3))
+    left = np.arange(size * size) % size < size // 2
+    weights[left,0] = 0.8
+    weights[~left,1] = 0.8
+    weights[:,2] = 0.2
+    locked = np.array([False,False,True])
+    columns = weightMath.findSmoothColumns(weights,adjacency,0,locked = locked)
+    assert list(columns) == [0,1]
+
+    for rows in (None,np.arange(size,3 * size)):
+        smoothedRows,result = weightMath.smoothWeights(weights,adjacency,columns,rows = rows,
+                                                       iterations = 5,strength = 0.5,locked = locked)
+        assert len(result) == len(smoothedRows)
+        assert np.allclose(result.sum(axis = 1),1.0)
+        assert np.allclose(result[:,2],0.2)
+        assert (result >= 0.0).all()
+        # 境界の頂点は両方のインフルエンスを持つようになる
+        boundary = np.flatnonzero((smoothedRows % size) == size // 2 - 1)
+        assert (result[boundary,0] > 0.0).all() and (result[boundary,1] > 0.0).all()